@@ -1,9 +1,20 @@
+import asyncio
+import logging
 import os
+import sys
+import time
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from shared.db import init_db
-from shared.schema import create_tables
+from shared.broadcast import broadcaster
+from shared.db import init_db, close_db
+from shared.migrations import migrate, verify_schema
+from shared.jobs import scheduler
+from shared.rollups import ROLLUP_LOCK_ID, STATS_ROLLUP_INTERVAL, refresh_rollups
 from shared.seed import seed_data
+from shared.ws_hub import close_hubs
+from modules.chat.writer import chat_writer
+from modules.doctors.availability import SLOT_EXPIRY_INTERVAL, SLOT_EXPIRY_LOCK_ID, expire_availability_slots
+from modules.doctors.listing import DOCTOR_LISTING_INTERVAL, DOCTOR_LISTING_LOCK_ID, flush_listing_refreshes, refresh_doctor_listing
 from modules.auth.router import router as auth_router
 from modules.feeds.router import router as feed_router
 from modules.doctors.router import router as doctors_router
@@ -18,6 +29,8 @@ from modules.notifications.router import router as notifications_router
 from shared.stats_router import router as stats_router
 from fastapi.middleware.cors import CORSMiddleware
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Mental Health Therapy App")
 
 # Ensure uploads directory exists and use absolute path
@@ -38,6 +51,10 @@ app.include_router(subscription_router, prefix="/subscriptions", tags=["subscrip
 app.include_router(notifications_router, prefix="/notifications", tags=["notifications"])
 app.include_router(stats_router, prefix="/stats", tags=["stats"])
 
+scheduler.register("stats-rollup", STATS_ROLLUP_INTERVAL, refresh_rollups, ROLLUP_LOCK_ID)
+scheduler.register("doctor-listing", DOCTOR_LISTING_INTERVAL, refresh_doctor_listing, DOCTOR_LISTING_LOCK_ID)
+scheduler.register("slot-expiry", SLOT_EXPIRY_INTERVAL, expire_availability_slots, SLOT_EXPIRY_LOCK_ID)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -48,11 +65,46 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
+    started = time.perf_counter()
     await init_db()
-    await create_tables()
-    await seed_data()
+    if os.getenv("AUTO_MIGRATE", "false").lower() == "true":
+        await migrate()
+        await seed_data()
+    version = await verify_schema()
+    await broadcaster.start()
+    scheduler.start()
+    logger.info(f"[STARTUP] Schema version {version}, startup took {(time.perf_counter() - started) * 1000:.0f} ms")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.stop()
+    await broadcaster.stop()
+    await close_hubs()
+    await chat_writer.stop()
+    await flush_listing_refreshes()
+    await close_db()
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to the amcan App"}
\ No newline at end of file
+    return {"message": "Welcome to the amcan App"}
+
+
+async def run_migrations():
+    """Applies pending migrations and seeds reference data; run once per deploy."""
+    started = time.perf_counter()
+    await init_db()
+    try:
+        await migrate()
+        await seed_data()
+    finally:
+        await close_db()
+    logger.info(f"[MIGRATIONS] Migrate and seed took {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    if "--migrate" in sys.argv:
+        logging.basicConfig(level=logging.INFO)
+        asyncio.run(run_migrations())
+    else:
+        print("Usage: python main.py --migrate")
+        sys.exit(1)
@@ -0,0 +1,134 @@
+"""
+Concurrency check and benchmark for AppointmentManager.book_appointment.
+
+Against a scratch database (BENCH_DB_DSN), for BENCH_ROUNDS fresh slots, fires
+BENCH_BOOKINGS (500) simultaneous bookings of the same slot by different
+patients and asserts that exactly one succeeds, that every other attempt is
+rejected with ValueError, and that the slot holds exactly one active
+appointment. Prints attempts per second for each round, then the latency
+of uncontended bookings.
+
+Usage:
+    BENCH_DB_DSN=postgresql://.../amcan_bench python -m modules.appointments.bench_booking
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+import asyncpg
+from modules.appointments.manager import AppointmentManager
+from modules.appointments.models import AppointmentCreate
+from shared.bench import summarize
+from shared.db import db
+from shared.migrations import migrate
+
+BENCH_DB_DSN = os.getenv("BENCH_DB_DSN")
+BOOKINGS = int(os.getenv("BENCH_BOOKINGS", "500"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+POOL_SIZE = int(os.getenv("BENCH_POOL_SIZE", "20"))
+
+
+async def seed(conn) -> tuple:
+    user_ids = await conn.fetch(
+        """
+        INSERT INTO users (email, password_hash, is_doctor)
+        SELECT 'bench-booking-' || g || '-' || extract(epoch FROM now())::bigint || '@example.com', 'x', g = 0
+        FROM generate_series(0, $1) g
+        RETURNING id
+        """,
+        BOOKINGS,
+    )
+    doctor_id = await conn.fetchval(
+        """
+        INSERT INTO doctors (user_id, first_name, last_name, title, bio, experience_years, location)
+        VALUES ($1, 'Bench', 'Doctor', 'Psychiatrist', 'Booking benchmark', 1, 'Lagos')
+        RETURNING id
+        """,
+        user_ids[0]["id"],
+    )
+    return doctor_id, [row["id"] for row in user_ids[1:]]
+
+
+async def book_round(conn, doctor_id: int, patient_ids: list, slot_time: datetime) -> dict:
+    await conn.execute(
+        "INSERT INTO doctor_availability_slots (doctor_id, available_at, status) VALUES ($1, $2, 'available')",
+        doctor_id,
+        slot_time,
+    )
+    samples, rejected, unexpected = [], 0, []
+
+    async def attempt(patient_id: int):
+        nonlocal rejected
+        booking = AppointmentCreate(doctor_id=doctor_id, patient_id=patient_id, complain="bench", slot_time=slot_time)
+        t0 = time.perf_counter()
+        try:
+            await AppointmentManager.book_appointment(booking)
+        except ValueError:
+            rejected += 1
+            return
+        except Exception as e:
+            unexpected.append(e)
+            return
+        samples.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(attempt(patient_id) for patient_id in patient_ids))
+    elapsed = time.perf_counter() - started
+
+    active = await conn.fetchval(
+        """
+        SELECT COUNT(*) FROM appointments
+        WHERE doctor_id = $1 AND slot_time = $2 AND status IN ('pending', 'confirmed')
+        """,
+        doctor_id,
+        slot_time.replace(tzinfo=None),
+    )
+    assert not unexpected, f"unexpected errors: {unexpected[:3]}"
+    assert len(samples) == 1, f"{len(samples)} bookings succeeded"
+    assert rejected == len(patient_ids) - 1
+    assert active == 1, f"{active} active appointments for one slot"
+    return {"attempts_per_s": round(len(patient_ids) / elapsed, 1), "elapsed_ms": round(elapsed * 1000, 1)}
+
+
+async def main():
+    if not BENCH_DB_DSN:
+        raise SystemExit("Set BENCH_DB_DSN to a scratch database")
+    pool = await asyncpg.create_pool(dsn=BENCH_DB_DSN, min_size=1, max_size=POOL_SIZE)
+    db.pool = pool
+    try:
+        await migrate()
+        async with pool.acquire() as conn:
+            doctor_id, patient_ids = await seed(conn)
+            base = datetime.now(timezone.utc).replace(microsecond=0, second=0) + timedelta(days=1)
+            for round_no in range(ROUNDS):
+                slot_time = base + timedelta(minutes=30 * round_no)
+                stats = await book_round(conn, doctor_id, patient_ids, slot_time)
+                print(
+                    f"round {round_no + 1}: {len(patient_ids)} concurrent bookings, 1 winner, "
+                    f"{stats['attempts_per_s']} attempts/s in {stats['elapsed_ms']}ms"
+                )
+            # Uncontended throughput: one booking per fresh slot
+            samples = []
+            started = time.perf_counter()
+            for i, patient_id in enumerate(patient_ids[:200]):
+                slot_time = base + timedelta(days=1, minutes=30 * i)
+                await conn.execute(
+                    "INSERT INTO doctor_availability_slots (doctor_id, available_at, status) VALUES ($1, $2, 'available')",
+                    doctor_id,
+                    slot_time,
+                )
+                t0 = time.perf_counter()
+                await AppointmentManager.book_appointment(
+                    AppointmentCreate(doctor_id=doctor_id, patient_id=patient_id, complain="bench", slot_time=slot_time)
+                )
+                samples.append(time.perf_counter() - t0)
+            stats = summarize(samples, time.perf_counter() - started)
+            print(f"uncontended: p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms")
+    finally:
+        db.pool = None
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,121 +1,107 @@
+import asyncio
+import asyncpg
 import logging
+from typing import Optional
 from .models import AppointmentCreate, AppointmentResponse
+from modules.doctors.listing import mark_listing_dirty
 from shared.db import db
+from shared.pagination import Keyset, SortKey, cursor_meta, cursor_total
+from shared.query import Filters, PagedQuery
+from shared.search import APPOINTMENT_COMPLAIN_SEARCH, DOCTOR_NAME_SEARCH, PATIENT_NAME_SEARCH, like_pattern
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# $1 doctor_id, $2 patient_id, $3 slot time (doctor_availability_slots is
+# timestamptz), $4 complain, $5 slot time (appointments.slot_time is timestamp).
+# Booking is the slot's 'available' -> 'booked' transition; the partial unique
+# index from migration 0009 backs it up for writes that skip the slot row.
+BOOK_APPOINTMENT_QUERY = """
+    WITH slot AS (
+        UPDATE doctor_availability_slots
+        SET status = 'booked'
+        WHERE doctor_id = $1 AND available_at = $3 AND status = 'available'
+        RETURNING doctor_id
+    ),
+    booked AS (
+        INSERT INTO appointments (doctor_id, patient_id, slot_time, complain, status)
+        SELECT doctor_id, $2, $5, $4, 'pending' FROM slot
+        RETURNING id, doctor_id, patient_id, slot_time, complain, status, created_at
+    )
+    SELECT b.id, b.doctor_id, b.patient_id, b.slot_time, b.complain, b.status, b.created_at,
+           d.title AS doctor_title, d.bio AS doctor_bio, d.rating AS doctor_rating,
+           d.location AS doctor_location, d.first_name AS doctor_first_name, d.last_name AS doctor_last_name
+    FROM booked b
+    JOIN doctors d ON d.id = b.doctor_id
+"""
+
 class AppointmentManager:
     @staticmethod
     async def book_appointment(appointment: AppointmentCreate) -> dict:
         logger.info(f"[APPOINTMENT MANAGER] book_appointment called for patient_id={appointment.patient_id}, doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}")
+        slot_time_naive = appointment.slot_time.replace(tzinfo=None)
         try:
             async with db.get_connection() as conn:
-                # Check if doctor exists
-                doctor = await conn.fetchrow(
-                    "SELECT id FROM doctors WHERE id = $1",
-                    appointment.doctor_id
-                )
-                if not doctor:
-                    logger.warning(f"[APPOINTMENT MANAGER] Doctor not found: doctor_id={appointment.doctor_id}")
-                    raise ValueError(f"Doctor not found (doctor_id={appointment.doctor_id})")
-
-                # Check availability in doctor_availability_slots
-                slot_time_naive = appointment.slot_time.replace(tzinfo=None)
-                availability = await conn.fetchrow(
-                    """
-                    SELECT id, status FROM doctor_availability_slots
-                    WHERE doctor_id = $1 AND available_at = $2
-                    """,
-                    appointment.doctor_id,
-                    slot_time_naive
-                )
-
-                currently_available = await conn.fetchrow(
-                    """
-                    SELECT available_at FROM doctor_availability_slots 
-                    WHERE doctor_id = $1 AND status = 'available'
-                    """,
-                    appointment.doctor_id
-                )
-                if not availability:
-                    logger.warning(f"[APPOINTMENT MANAGER] No availability for slot_time={appointment.slot_time} (doctor_id={appointment.doctor_id})")
-                    raise ValueError(f"No availability for {appointment.slot_time} for doctor_id={appointment.doctor_id}")
-                if availability['status'] != 'available':
-                    logger.warning(f"[APPOINTMENT MANAGER] Slot not available: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}, status={availability['status']}")
-                    raise ValueError(f"Slot not available: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}, status={availability['status']}: available: {currently_available}")
-
-                # Check if slot is already booked
-                existing = await conn.fetchrow(
-                    """
-                    SELECT 1 FROM appointments
-                    WHERE doctor_id = $1 AND slot_time = $2
-                    """,
-                    appointment.doctor_id,
-                    slot_time_naive
-                )
-                if existing:
+                try:
+                    # Claim the slot and book it in one statement: concurrent
+                    # bookings of a slot queue on its row lock and only the
+                    # first still sees status = 'available'.
+                    row = await conn.fetchrow(
+                        BOOK_APPOINTMENT_QUERY,
+                        appointment.doctor_id,
+                        appointment.patient_id,
+                        slot_time_naive,
+                        appointment.complain,
+                        slot_time_naive
+                    )
+                except asyncpg.UniqueViolationError:
+                    # An active appointment exists although the slot was open
                     logger.warning(f"[APPOINTMENT MANAGER] Slot already booked: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}")
-                    raise ValueError(f"Slot already booked: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time} available: {availability}")
+                    raise ValueError(f"Slot already booked: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}")
+                if not row:
+                    await AppointmentManager._raise_booking_failure(conn, appointment, slot_time_naive)
 
-                # Update availability slot status to 'booked'
-                await conn.execute(
-                    """
-                    UPDATE doctor_availability_slots
-                    SET status = 'booked'
-                    WHERE id = $1
-                    """,
-                    availability['id']
-                )
+            mark_listing_dirty([appointment.doctor_id])
 
-                # Book the appointment
-                row = await conn.fetchrow(
-                    """
-                    INSERT INTO appointments (doctor_id, patient_id, slot_time, complain, status)
-                    VALUES ($1, $2, $3, $4, $5)
-                    RETURNING id, doctor_id, patient_id, slot_time, complain, status, created_at
-                    """,
-                    appointment.doctor_id,
-                    appointment.patient_id,
-                    slot_time_naive,
-                    appointment.complain,
-                    'pending'
-                )
-                if not row:
-                    logger.error(f"[APPOINTMENT MANAGER] Failed to book appointment for unknown reasons.")
-                    raise RuntimeError("Failed to book appointment for unknown reasons.")
+            response = dict(row)
+            if 'created_at' in response and isinstance(response['created_at'], datetime):
+                response['created_at'] = response['created_at'].isoformat()
+            if 'slot_time' in response and isinstance(response['slot_time'], datetime):
+                response['slot_time'] = response['slot_time'].isoformat()
 
-                # Fetch doctor details for response
-                doctor_row = await conn.fetchrow(
-                    """
-                    SELECT d.id AS doctor_id, d.title AS doctor_title, d.bio AS doctor_bio, d.rating AS doctor_rating, 
-                           d.location AS doctor_location, d.first_name AS doctor_first_name, d.last_name AS doctor_last_name
-                    FROM doctors d
-                    WHERE d.id = $1
-                    """,
-                    appointment.doctor_id
-                )
-                if not doctor_row:
-                    logger.warning(f"[APPOINTMENT MANAGER] Doctor not found for response: doctor_id={appointment.doctor_id}")
-                    raise ValueError(f"Doctor not found for response: doctor_id={appointment.doctor_id}")
-
-                response = dict(row)
-                response.update(dict(doctor_row))
-                if 'created_at' in response and isinstance(response['created_at'], datetime):
-                    response['created_at'] = response['created_at'].isoformat()
-                if 'slot_time' in response and isinstance(response['slot_time'], datetime):
-                    response['slot_time'] = response['slot_time'].isoformat()
-
-                logger.info(f"[APPOINTMENT MANAGER] Appointment booked: {response}")
-                return response
+            logger.info(f"[APPOINTMENT MANAGER] Appointment booked: {response}")
+            return response
         except Exception as exc:
             logger.exception(f"[APPOINTMENT MANAGER] Exception in book_appointment: {exc}")
             raise
 
+    @staticmethod
+    async def _raise_booking_failure(conn, appointment: AppointmentCreate, slot_time_naive: datetime):
+        """Works out why BOOK_APPOINTMENT_QUERY booked nothing; only runs on the failure path."""
+        row = await conn.fetchrow(
+            """
+            SELECT EXISTS (SELECT 1 FROM doctors WHERE id = $1) AS doctor_exists,
+                   (SELECT status FROM doctor_availability_slots WHERE doctor_id = $1 AND available_at = $2) AS slot_status
+            """,
+            appointment.doctor_id,
+            slot_time_naive
+        )
+        if not row["doctor_exists"]:
+            logger.warning(f"[APPOINTMENT MANAGER] Doctor not found: doctor_id={appointment.doctor_id}")
+            raise ValueError(f"Doctor not found (doctor_id={appointment.doctor_id})")
+        if row["slot_status"] is None:
+            logger.warning(f"[APPOINTMENT MANAGER] No availability for slot_time={appointment.slot_time} (doctor_id={appointment.doctor_id})")
+            raise ValueError(f"No availability for {appointment.slot_time} for doctor_id={appointment.doctor_id}")
+        if row["slot_status"] == 'booked':
+            logger.warning(f"[APPOINTMENT MANAGER] Slot already booked: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}")
+            raise ValueError(f"Slot already booked: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}")
+        logger.warning(f"[APPOINTMENT MANAGER] Slot not available: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}, status={row['slot_status']}")
+        raise ValueError(f"Slot not available: doctor_id={appointment.doctor_id}, slot_time={appointment.slot_time}, status={row['slot_status']}")
+
     @staticmethod
     async def get_patient_appointments(patient_id: int) -> list:
         logger.info(f"[APPOINTMENT MANAGER] get_patient_appointments called for patient_id={patient_id}")
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             rows = await conn.fetch(
                 """
                 SELECT 
@@ -163,7 +149,7 @@ class AppointmentManager:
     @staticmethod
     async def get_appointments_for_doctor(doctor_id: int) -> list:
         logger.info(f"[APPOINTMENT MANAGER] get_appointments_for_doctor called for doctor_id={doctor_id}")
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             rows = await conn.fetch(
                 """
                 SELECT 
@@ -273,16 +259,17 @@ class AppointmentManager:
                     appointment_id,
                     doctor_id
                 )
-                if row:
-                    result = dict(row)
-                    if 'created_at' in result and isinstance(result['created_at'], datetime):
-                        result['created_at'] = result['created_at'].isoformat()
-                    if 'slot_time' in result and isinstance(result['slot_time'], datetime):
-                        result['slot_time'] = result['slot_time'].isoformat()
-                    logger.info(f"[APPOINTMENT MANAGER] Appointment cancelled: {result}")
-                    return result
-                logger.warning(f"[APPOINTMENT MANAGER] No appointment updated for id={appointment_id} and doctor_id={doctor_id}")
-                return {"error": "No matching appointment found or already cancelled"}
+            if row:
+                mark_listing_dirty([doctor_id])
+                result = dict(row)
+                if 'created_at' in result and isinstance(result['created_at'], datetime):
+                    result['created_at'] = result['created_at'].isoformat()
+                if 'slot_time' in result and isinstance(result['slot_time'], datetime):
+                    result['slot_time'] = result['slot_time'].isoformat()
+                logger.info(f"[APPOINTMENT MANAGER] Appointment cancelled: {result}")
+                return result
+            logger.warning(f"[APPOINTMENT MANAGER] No appointment updated for id={appointment_id} and doctor_id={doctor_id}")
+            return {"error": "No matching appointment found or already cancelled"}
         except Exception as e:
             logger.error(f"[APPOINTMENT MANAGER] Error cancelling appointment: {e}")
             raise
@@ -299,77 +286,48 @@ class AppointmentManager:
         search: str = None,
         created_at_from: datetime = None,
         created_at_to: datetime = None,
+        cursor: Optional[str] = None,
     ) -> dict:
         """
         Get all appointments with optional filters and pagination.
         Returns a dict with 'data', 'total', 'page', 'page_size'.
+        Passing a cursor (empty string for the first page) switches from
+        OFFSET paging to keyset paging on (slot_time, id); meta then carries
+        'next_cursor' instead of 'page'.
         """
         logger.info(
             f"[APPOINTMENT MANAGER] get_all_appointments called (admin) with filters: "
             f"doctor_id={doctor_id}, patient_id={patient_id}, status={status}, "
             f"slot_time_from={slot_time_from}, slot_time_to={slot_time_to}, "
             f"created_at_from={created_at_from}, created_at_to={created_at_to}, "
-            f"page={page}, page_size={page_size}, search={search}"
+            f"page={page}, page_size={page_size}, search={search}, cursor={cursor!r}"
         )
-        filters = []
-        params = []
-        param_idx = 1
-
+        filters = Filters()
         if doctor_id is not None:
-            filters.append(f"a.doctor_id = ${param_idx}")
-            params.append(doctor_id)
-            param_idx += 1
+            filters.add("a.doctor_id = {}", doctor_id)
         if patient_id is not None:
-            filters.append(f"a.patient_id = ${param_idx}")
-            params.append(patient_id)
-            param_idx += 1
+            filters.add("a.patient_id = {}", patient_id)
         if status is not None:
-            filters.append(f"a.status = ${param_idx}")
-            params.append(status)
-            param_idx += 1
+            filters.add("a.status = {}", status)
         if slot_time_from is not None:
-            filters.append(f"a.slot_time >= ${param_idx}")
-            params.append(slot_time_from)
-            param_idx += 1
+            filters.add("a.slot_time >= {}", slot_time_from)
         if slot_time_to is not None:
-            filters.append(f"a.slot_time <= ${param_idx}")
-            params.append(slot_time_to)
-            param_idx += 1
+            filters.add("a.slot_time <= {}", slot_time_to)
         if created_at_from is not None:
-            filters.append(f"a.created_at >= ${param_idx}")
-            params.append(created_at_from)
-            param_idx += 1
+            filters.add("a.created_at >= {}", created_at_from)
         if created_at_to is not None:
-            filters.append(f"a.created_at <= ${param_idx}")
-            params.append(created_at_to)
-            param_idx += 1
+            filters.add("a.created_at <= {}", created_at_to)
         if search:
             # Search in doctor or patient name or complain
-            filters.append(
-                f"(d.first_name ILIKE ${param_idx} OR d.last_name ILIKE ${param_idx} "
-                f"OR p.first_name ILIKE ${param_idx} OR p.last_name ILIKE ${param_idx} "
-                f"OR a.complain ILIKE ${param_idx})"
+            filters.add(
+                f"({DOCTOR_NAME_SEARCH.ids_matching('a.doctor_id')} "
+                f"OR {PATIENT_NAME_SEARCH.ids_matching('a.patient_id')} "
+                f"OR {APPOINTMENT_COMPLAIN_SEARCH.matches('a')})",
+                like_pattern(search),
             )
-            params.append(f"%{search}%")
-            param_idx += 1
-
-        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
-        offset = (page - 1) * page_size
 
-        # Count query for total
-        count_query = f"""
-            SELECT COUNT(*) FROM appointments a
-            JOIN doctors d ON a.doctor_id = d.id
-            JOIN patients p ON a.patient_id = p.id
-            JOIN users u ON p.user_id = u.id
-            LEFT JOIN therapy t ON p.therapy_type = t.id
-            LEFT JOIN appointments_summary asumm ON a.id = asumm.id
-            {where_clause}
-        """
-
-        # Data query with pagination
-        data_query = f"""
-            SELECT 
+        paged = PagedQuery(
+            select="""
                 a.id AS appointment_id,
                 a.doctor_id,
                 a.patient_id,
@@ -392,21 +350,40 @@ class AppointmentManager:
                 asumm.notes,
                 asumm.prescription,
                 asumm.follow_up_date
-            FROM appointments a
-            JOIN doctors d ON a.doctor_id = d.id
-            JOIN patients p ON a.patient_id = p.id
-            JOIN users u ON p.user_id = u.id
-            LEFT JOIN therapy t ON p.therapy_type = t.id
-            LEFT JOIN appointments_summary asumm ON a.id = asumm.id
-            {where_clause}
-            ORDER BY a.slot_time DESC
-            LIMIT {page_size} OFFSET {offset}
-        """
+            """,
+            from_clause="""
+                appointments a
+                JOIN doctors d ON a.doctor_id = d.id
+                JOIN patients p ON a.patient_id = p.id
+                JOIN users u ON p.user_id = u.id
+                LEFT JOIN therapy t ON p.therapy_type = t.id
+                LEFT JOIN appointments_summary asumm ON a.id = asumm.id
+            """,
+            filters=filters,
+            order_by="a.slot_time DESC",
+        )
 
-        async with db.get_connection() as conn:
-            total = await conn.fetchval(count_query, *params)
-            rows = await conn.fetch(data_query, *params)
-            result = [dict(row) for row in rows]
+        if cursor is not None:
+            keyset = Keyset(SortKey("a.slot_time"), SortKey("a.id"))
+            data_query, params = paged.keyset_page(keyset, cursor, page_size)
+
+            async def fetch_page():
+                async with db.get_connection(readonly=True, replica=True) as conn:
+                    return await conn.fetch(data_query, *params)
+
+            rows, total = await asyncio.gather(
+                fetch_page(),
+                cursor_total("appointments", *paged.count(), replica=True),
+            )
+            result, next_cursor = keyset.paginate(rows, page_size)
+            return {
+                "appointments": result,
+                "meta": cursor_meta(page_size, next_cursor, total),
+            }
+
+        offset = (page - 1) * page_size
+        async with db.get_connection(readonly=True, replica=True) as conn:
+            result, total = await paged.fetch(conn, page_size, offset)
             meta_data = {"total": total,
                 "page": page,
                 "page_size": page_size,}
@@ -418,7 +395,7 @@ class AppointmentManager:
     @staticmethod
     async def get_appointment_by_id(appointment_id: int, current_user: dict) -> dict:
         logger.info(f"[APPOINTMENT MANAGER] get_appointment_by_id called for appointment_id={appointment_id} by user_id={current_user['id']}")
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             row = await conn.fetchrow(
                 """
                 SELECT 
@@ -644,13 +621,14 @@ class AppointmentManager:
                 """,
                 appointment_id
             )
-            result = dict(updated_appt)
-            if 'created_at' in result and isinstance(result['created_at'], datetime):
-                result['created_at'] = result['created_at'].isoformat()
-            if 'slot_time' in result and isinstance(result['slot_time'], datetime):
-                result['slot_time'] = result['slot_time'].isoformat()
-            logger.info(f"[APPOINTMENT MANAGER] Returning updated appointment: {result}")
-            return result
+        mark_listing_dirty([doctor_id])
+        result = dict(updated_appt)
+        if 'created_at' in result and isinstance(result['created_at'], datetime):
+            result['created_at'] = result['created_at'].isoformat()
+        if 'slot_time' in result and isinstance(result['slot_time'], datetime):
+            result['slot_time'] = result['slot_time'].isoformat()
+        logger.info(f"[APPOINTMENT MANAGER] Returning updated appointment: {result}")
+        return result
 
     @staticmethod
     async def update_appointment(
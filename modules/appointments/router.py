@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from .models import AppointmentCreate, AppointmentResponse, RescheduleAppointment
 from .manager import AppointmentManager
-from modules.auth.utils import get_current_user, get_current_admin, get_current_doctor
+from modules.auth.utils import get_current_principal, get_current_admin, get_current_doctor
 from shared.response import success_response, error_response
 from typing import List
 
 router = APIRouter()
 
 @router.post("/")
-async def book_appointment(appointment: AppointmentCreate, current_user: dict = Depends(get_current_user)):
+async def book_appointment(appointment: AppointmentCreate, current_user: dict = Depends(get_current_principal)):
     try:
         appointment_data = await AppointmentManager.book_appointment(appointment)
         return success_response(data=appointment_data, message="Appointment booked successfully")
@@ -18,7 +18,7 @@ async def book_appointment(appointment: AppointmentCreate, current_user: dict =
         return error_response(str(e), status_code=500)
 
 @router.get("/")
-async def get_appointments(current_user: dict = Depends(get_current_user)):
+async def get_appointments(current_user: dict = Depends(get_current_principal)):
     try:
         appointments = await AppointmentManager.get_all_appointments()
         return success_response(data=appointments, message="Appointments retrieved successfully")
@@ -37,7 +37,7 @@ async def confirm_appointment(appointment_id: int, doctor_id: int, current_user:
         return error_response(str(e), status_code=500)
 
 @router.post("/{appointment_id}/cancel")
-async def cancel_appointment(appointment_id: int, doctor_id:int, current_user: dict = Depends(get_current_user)):
+async def cancel_appointment(appointment_id: int, doctor_id:int, current_user: dict = Depends(get_current_principal)):
     try:
         result = await AppointmentManager.cancel_appointment(appointment_id, doctor_id)
         return success_response(data=result, message="Appointment cancelled successfully")
@@ -47,7 +47,7 @@ async def cancel_appointment(appointment_id: int, doctor_id:int, current_user: d
         return error_response(str(e), status_code=500)
 
 @router.get("/patients/{patient_id}")
-async def get_patient_appointments(patient_id, current_user: dict = Depends(get_current_user)):
+async def get_patient_appointments(patient_id, current_user: dict = Depends(get_current_principal)):
     try:
         appointments = await AppointmentManager.get_patient_appointments(patient_id)
         return {"success": True, "data": appointments, "message": "Patient appointments retrieved successfully"}
@@ -66,10 +66,12 @@ async def get_all_appointments(
     page: int = 1,
     page_size: int = 20,
     search: str = None,
+    cursor: str = None,
     current_admin: dict = Depends(get_current_admin)
 ):
     """
     Admin endpoint to get all appointments with optional filters and pagination.
+    Pass cursor (empty for the first page) to page by keyset instead of page numbers.
     """
     from datetime import datetime
 
@@ -91,13 +93,16 @@ async def get_all_appointments(
             search=search,
             created_at_from=created_at_from_dt,
             created_at_to=created_at_to_dt,
+            cursor=cursor,
         )
         return success_response(appointments, message="All appointments retrieved successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
     except Exception as e:
         return error_response(str(e), status_code=500)
 
 @router.get("/{appointment_id}")
-async def get_appointment_by_id(appointment_id: int, current_user: dict = Depends(get_current_user)):
+async def get_appointment_by_id(appointment_id: int, current_user: dict = Depends(get_current_principal)):
     try:
         appointment = await AppointmentManager.get_appointment_by_id(appointment_id, current_user)
         return success_response(data=appointment, message="Appointment retrieved successfully")
@@ -108,7 +113,7 @@ async def get_appointment_by_id(appointment_id: int, current_user: dict = Depend
     
 
 @router.get("/doctor/{doctor_id}")
-async def get_doctor_appointments(doctor_id: int, current_user: dict = Depends(get_current_user)):
+async def get_doctor_appointments(doctor_id: int, current_user: dict = Depends(get_current_principal)):
     try:
         appointments = await AppointmentManager.get_appointments_for_doctor(doctor_id)
         print("print doctors appointment", appointments)
@@ -121,7 +126,7 @@ async def get_doctor_appointments(doctor_id: int, current_user: dict = Depends(g
 async def reschedule_appointment(
     appointment_id: int,
     new_slot_time: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
     """
     Reschedule an appointment to a new slot time.
@@ -146,7 +151,7 @@ async def update_appointment(
     slot_time: str = None,
     complain: str = None,
     status: str = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
     """
     Update an appointment's details. Only provided fields will be updated.
@@ -0,0 +1,57 @@
+"""
+Booking race test for AppointmentManager.book_appointment.
+
+Runs only when TEST_DB_DSN points at a scratch database. For each round it
+opens a fresh slot, fires TEST_BOOKINGS (500) simultaneous bookings of it by
+different patients through the shared pool, and asserts exactly one winner:
+every other attempt is rejected with ValueError and the slot ends up with a
+single active appointment. Run with -s to see attempts/s per round.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+import asyncpg
+import pytest
+import pytest_asyncio
+from modules.appointments.bench_booking import book_round, seed
+from shared.db import db
+from shared.migrations import migrate
+
+TEST_DB_DSN = os.getenv("TEST_DB_DSN")
+ROUNDS = int(os.getenv("TEST_BOOKING_ROUNDS", "3"))
+POOL_SIZE = int(os.getenv("TEST_POOL_SIZE", "20"))
+
+pytestmark = pytest.mark.skipif(not TEST_DB_DSN, reason="set TEST_DB_DSN to a scratch database")
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def booking_conn():
+    pool = await asyncpg.create_pool(dsn=TEST_DB_DSN, min_size=1, max_size=POOL_SIZE)
+    previous_pool, db.pool = db.pool, pool
+    try:
+        await migrate()
+        async with pool.acquire() as conn:
+            yield conn
+    finally:
+        db.pool = previous_pool
+        await pool.close()
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_concurrent_bookings_have_one_winner(booking_conn):
+    doctor_id, patient_ids = await seed(booking_conn)
+    base = datetime.now(timezone.utc).replace(microsecond=0, second=0) + timedelta(days=1)
+    for round_no in range(ROUNDS):
+        slot_time = base + timedelta(minutes=30 * round_no)
+        # book_round asserts one success, len - 1 ValueErrors and one active row
+        stats = await book_round(booking_conn, doctor_id, patient_ids, slot_time)
+        print(
+            f"round {round_no + 1}: {len(patient_ids)} concurrent bookings, 1 winner, "
+            f"{stats['attempts_per_s']} attempts/s in {stats['elapsed_ms']}ms"
+        )
+        slot_status = await booking_conn.fetchval(
+            "SELECT status FROM doctor_availability_slots WHERE doctor_id = $1 AND available_at = $2",
+            doctor_id,
+            slot_time,
+        )
+        assert slot_status == "booked"
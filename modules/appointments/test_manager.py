@@ -1,7 +1,8 @@
+import asyncpg
 import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
-from modules.appointments.manager import AppointmentManager
+from modules.appointments.manager import AppointmentManager, BOOK_APPOINTMENT_QUERY
 from modules.appointments.models import AppointmentCreate
 from datetime import datetime
 
@@ -115,4 +116,70 @@ async def test_cancel_appointment_not_found(mock_get_conn):
     mock_conn.fetchrow.return_value = None
     mock_get_conn.return_value.__aenter__.return_value = mock_conn
     with pytest.raises(ValueError, match="Appointment not found or cannot be cancelled"):
-        await AppointmentManager.cancel_appointment(1, 1) 
\ No newline at end of file
+        await AppointmentManager.cancel_appointment(1, 1) 
+@pytest.mark.asyncio
+@patch("modules.appointments.manager.db.get_connection")
+async def test_get_all_appointments_cursor_mode(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetch.return_value = [
+        {"appointment_id": i, "_cursor_0": datetime(2024, 6, 10, 9, i), "_cursor_1": i} for i in (3, 2, 1)
+    ]
+    mock_conn.fetchval.return_value = 1000  # planner estimate
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+
+    result = await AppointmentManager.get_all_appointments(page_size=2, cursor="")
+    query = mock_conn.fetch.await_args.args[0]
+    assert "OFFSET" not in query and "LIMIT 3" in query
+    assert [a["appointment_id"] for a in result["appointments"]] == [3, 2]
+    assert result["meta"]["has_next"] and result["meta"]["total_estimated"]
+
+    await AppointmentManager.get_all_appointments(page_size=2, doctor_id=7, cursor=result["meta"]["next_cursor"])
+    args = mock_conn.fetch.await_args.args
+    assert "(a.slot_time, a.id) < ($2, $3)" in args[0]
+    assert args[1:] == (7, datetime(2024, 6, 10, 9, 2), 2)
+
+def make_booking():
+    return AppointmentCreate(doctor_id=2, patient_id=5, complain="Anxiety", slot_time=datetime(2024, 6, 10, 9, 0))
+
+@pytest.mark.asyncio
+@patch("modules.appointments.manager.mark_listing_dirty")
+@patch("modules.appointments.manager.db.get_connection")
+async def test_book_appointment_is_one_statement(mock_get_conn, mock_mark_dirty):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = {
+        "id": 1, "doctor_id": 2, "patient_id": 5, "slot_time": datetime(2024, 6, 10, 9, 0),
+        "complain": "Anxiety", "status": "pending", "created_at": datetime(2024, 6, 1), "doctor_title": "Psychiatrist",
+    }
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    result = await AppointmentManager.book_appointment(make_booking())
+    mock_conn.fetchrow.assert_awaited_once_with(
+        BOOK_APPOINTMENT_QUERY, 2, 5, datetime(2024, 6, 10, 9, 0), "Anxiety", datetime(2024, 6, 10, 9, 0)
+    )
+    # Refreshed after commit, not inside the booking transaction
+    mock_mark_dirty.assert_called_once_with([2])
+    assert mock_get_conn.return_value.__aexit__.await_count == 1
+    assert result["status"] == "pending" and result["slot_time"] == "2024-06-10T09:00:00"
+
+@pytest.mark.asyncio
+@patch("modules.appointments.manager.db.get_connection")
+async def test_book_appointment_explains_lost_slot(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    for diagnosis, message in (
+        ({"doctor_exists": False, "slot_status": None}, "Doctor not found"),
+        ({"doctor_exists": True, "slot_status": None}, "No availability"),
+        ({"doctor_exists": True, "slot_status": "booked"}, "Slot already booked"),
+        ({"doctor_exists": True, "slot_status": "expired"}, "Slot not available"),
+    ):
+        mock_conn.fetchrow.side_effect = [None, diagnosis]
+        with pytest.raises(ValueError, match=message):
+            await AppointmentManager.book_appointment(make_booking())
+
+@pytest.mark.asyncio
+@patch("modules.appointments.manager.db.get_connection")
+async def test_book_appointment_maps_unique_violation(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.side_effect = asyncpg.UniqueViolationError("duplicate key")
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    with pytest.raises(ValueError, match="Slot already booked"):
+        await AppointmentManager.book_appointment(make_booking())
@@ -0,0 +1,60 @@
+"""
+Load test for login bursts.
+
+Hammers /auth/login while sampling latency of unrelated endpoints, first
+with no login traffic (baseline) and then under load. With bcrypt on the
+dedicated pool the p99 of the unrelated endpoints should stay roughly flat;
+logins beyond the pool's queue come back as 503 rather than stalling the loop.
+
+Usage:
+    BENCH_EMAIL=user@example.com BENCH_PASSWORD=password123 python -m modules.auth.bench_login
+"""
+
+import asyncio
+import os
+import aiohttp
+from shared.bench import measure, print_report
+
+BASE_URL = os.getenv("BENCH_BASE_URL", "http://localhost:8000")
+EMAIL = os.getenv("BENCH_EMAIL", "user@example.com")
+PASSWORD = os.getenv("BENCH_PASSWORD", "password123")
+LOGIN_REQUESTS = int(os.getenv("BENCH_LOGIN_REQUESTS", "400"))
+LOGIN_CONCURRENCY = int(os.getenv("BENCH_LOGIN_CONCURRENCY", "50"))
+PROBE_REQUESTS = int(os.getenv("BENCH_PROBE_REQUESTS", "500"))
+PROBE_CONCURRENCY = int(os.getenv("BENCH_PROBE_CONCURRENCY", "10"))
+
+
+async def main():
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{BASE_URL}/auth/login", data={"username": EMAIL, "password": PASSWORD}) as response:
+            if response.status != 200:
+                print(f"Login failed: {response.status}")
+                return
+            token = (await response.json())["data"]["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def getter(path):
+            async def call():
+                async with session.get(f"{BASE_URL}{path}", headers=headers) as resp:
+                    await resp.read()
+                    return resp.status == 200
+            return call
+
+        async def login():
+            async with session.post(f"{BASE_URL}/auth/login", data={"username": EMAIL, "password": PASSWORD}) as resp:
+                await resp.read()
+                return resp.status == 200
+
+        probes = ["/", "/notifications/unread-count"]
+        for path in probes:
+            print_report(f"{path} [idle]", await measure(getter(path), PROBE_REQUESTS, PROBE_CONCURRENCY))
+
+        for path in probes:
+            login_task = asyncio.create_task(measure(login, LOGIN_REQUESTS, LOGIN_CONCURRENCY))
+            probe_stats = await measure(getter(path), PROBE_REQUESTS, PROBE_CONCURRENCY)
+            print_report(f"{path} [during logins]", probe_stats)
+            print_report("/auth/login", await login_task)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
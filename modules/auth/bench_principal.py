@@ -0,0 +1,57 @@
+"""
+Benchmark for the slim principal dependency.
+
+Compares per-request latency on /appointments/ and /notifications/unread-count
+for three ways of authenticating the same user against a running server:
+
+- claims:  a token from /auth/login, resolved from its JWT claims alone
+- legacy:  a sub-only token, resolved through the cached principal lookup
+- profile: /auth/me, which still builds the full patient/doctor profile
+
+Usage:
+    BENCH_EMAIL=user@example.com BENCH_PASSWORD=password123 python -m modules.auth.bench_principal
+"""
+
+import asyncio
+import os
+import aiohttp
+from modules.auth.utils import create_access_token
+from shared.bench import measure, print_report
+
+BASE_URL = os.getenv("BENCH_BASE_URL", "http://localhost:8000")
+EMAIL = os.getenv("BENCH_EMAIL", "user@example.com")
+PASSWORD = os.getenv("BENCH_PASSWORD", "password123")
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "1000"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "20"))
+
+ENDPOINTS = ["/appointments/", "/notifications/unread-count"]
+
+
+async def main():
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{BASE_URL}/auth/login", data={"username": EMAIL, "password": PASSWORD}) as response:
+            if response.status != 200:
+                print(f"Login failed: {response.status}")
+                return
+            claims_token = (await response.json())["data"]["access_token"]
+        legacy_token = create_access_token(data={"sub": EMAIL})
+
+        def getter(path, token):
+            headers = {"Authorization": f"Bearer {token}"}
+
+            async def call():
+                async with session.get(f"{BASE_URL}{path}", headers=headers) as resp:
+                    await resp.read()
+                    return resp.status == 200
+            return call
+
+        for path in ENDPOINTS:
+            for label, token in (("claims", claims_token), ("legacy", legacy_token)):
+                stats = await measure(getter(path, token), requests=REQUESTS, concurrency=CONCURRENCY)
+                print_report(f"{path} [{label}]", stats)
+        stats = await measure(getter("/auth/me", claims_token), requests=REQUESTS, concurrency=CONCURRENCY)
+        print_report("/auth/me [profile]", stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,6 @@
 import logging
 from .models import UserCreate
-from .utils import hash_password, verify_password, create_access_token, create_refresh_token, verify_refresh_token
+from .utils import hash_password, verify_password, create_access_token, create_refresh_token, verify_refresh_token, invalidate_principal, principal_claims, run_password_job
 from shared.db import db
 
 logger = logging.getLogger(__name__)
@@ -9,6 +9,8 @@ class AuthManager:
     @staticmethod
     async def register(user: UserCreate) -> dict:
         logger.info(f"[AUTH MANAGER] register called for email: {user.email}")
+        # Hashed before taking a connection so bcrypt never holds one open
+        password_hash = await run_password_job(hash_password, user.password)
         async with db.get_connection() as conn:
             # Check if email already exists
             existing_user = await conn.fetchrow(
@@ -19,7 +21,6 @@ class AuthManager:
                 logger.warning(f"[AUTH MANAGER] Registration failed: Email already registered: {user.email}")
                 raise ValueError("Email already registered")
             logger.info(f"[AUTH MANAGER] Registering new user: {user.email}")
-            password_hash = hash_password(user.password)
             result = await conn.fetchrow(
                 """
                 INSERT INTO users (email, password_hash)
@@ -47,29 +48,36 @@ class AuthManager:
     @staticmethod
     async def login(email: str, password: str) -> dict:
         logger.info(f"[AUTH MANAGER] login called for email and password: {email} and {password}")
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             user = await conn.fetchrow(
-                "SELECT id, email, password_hash FROM users WHERE email = $1",
+                """
+                SELECT u.id, u.email, u.password_hash, u.is_admin, u.is_doctor,
+                       p.id AS patient_id, d.id AS doctor_id
+                FROM users u
+                LEFT JOIN patients p ON p.user_id = u.id
+                LEFT JOIN doctors d ON d.user_id = u.id
+                WHERE u.email = $1
+                LIMIT 1
+                """,
                 email
             )
-            if not user:
-                logger.warning(f"[AUTH MANAGER] Login failed: No user found for email: {email}")
-                raise ValueError("Invalid email or password")
-            if not verify_password(password, user["password_hash"]):
-                logger.info(f"[AUTH MANAGER] Password verification result: {verify_password(password, user['password_hash'])}")
-                logger.info(f"[AUTH MANAGER] Password: {password}")
-                logger.info(f"[AUTH MANAGER] Password hash: {user['password_hash']}")
-                logger.warning(f"[AUTH MANAGER] Login failed: Incorrect password for email and password: {email} and {password}")
-                raise ValueError("Invalid email or password")
-            logger.info(f"[AUTH MANAGER] Login successful for email: {email}")
-            access_token = create_access_token(data={"sub": email})
-            refresh_token = create_refresh_token(data={"sub": email})
-            return {
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "token_type": "bearer",
-                "expires_in": 30 * 60  # 30 minutes in seconds
-            }
+        if not user:
+            logger.warning(f"[AUTH MANAGER] Login failed: No user found for email: {email}")
+            raise ValueError("Invalid email or password")
+        if not await run_password_job(verify_password, password, user["password_hash"]):
+            logger.info(f"[AUTH MANAGER] Password: {password}")
+            logger.info(f"[AUTH MANAGER] Password hash: {user['password_hash']}")
+            logger.warning(f"[AUTH MANAGER] Login failed: Incorrect password for email and password: {email} and {password}")
+            raise ValueError("Invalid email or password")
+        logger.info(f"[AUTH MANAGER] Login successful for email: {email}")
+        access_token = create_access_token(data=principal_claims(user))
+        refresh_token = create_refresh_token(data={"sub": email})
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+            "expires_in": 30 * 60  # 30 minutes in seconds
+        }
 
     @staticmethod
     async def refresh_token(refresh_token: str) -> dict:
@@ -80,9 +88,17 @@ class AuthManager:
             email = payload.get("sub")
             
             # Check if user still exists
-            async with db.get_connection() as conn:
+            async with db.get_connection(readonly=True) as conn:
                 user = await conn.fetchrow(
-                    "SELECT id, email FROM users WHERE email = $1",
+                    """
+                    SELECT u.id, u.email, u.is_admin, u.is_doctor,
+                           p.id AS patient_id, d.id AS doctor_id
+                    FROM users u
+                    LEFT JOIN patients p ON p.user_id = u.id
+                    LEFT JOIN doctors d ON d.user_id = u.id
+                    WHERE u.email = $1
+                    LIMIT 1
+                    """,
                     email
                 )
                 if not user:
@@ -90,7 +106,7 @@ class AuthManager:
                     raise ValueError("User not found")
                 
                 logger.info(f"[AUTH MANAGER] Refresh successful for email: {email}")
-                access_token = create_access_token(data={"sub": email})
+                access_token = create_access_token(data=principal_claims(user))
                 new_refresh_token = create_refresh_token(data={"sub": email})
                 return {
                     "access_token": access_token,
@@ -105,7 +121,7 @@ class AuthManager:
     @staticmethod
     async def get_all_users() -> list:
         logger.info("[AUTH MANAGER] get_all_users called")
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             rows = await conn.fetch(
                 """
                 SELECT id, email, is_admin, is_doctor
@@ -152,8 +168,10 @@ class AuthManager:
             if not result:
                 logger.warning(f"[AUTH MANAGER] User not found for update: {user_id}")
                 raise ValueError("User not found")
-            logger.info(f"[AUTH MANAGER] User updated successfully: {user_id}")
-            return dict(result)
+        # After commit, so a concurrent lookup cannot re-cache the old row
+        invalidate_principal(user_id=user_id)
+        logger.info(f"[AUTH MANAGER] User updated successfully: {user_id}")
+        return dict(result)
 
     @staticmethod
     async def delete_user(user_id: int, current_user: dict) -> dict:
@@ -166,5 +184,7 @@ class AuthManager:
             if not result:
                 logger.warning(f"[AUTH MANAGER] User not found for delete: {user_id}")
                 raise ValueError("User not found")
-            logger.info(f"[AUTH MANAGER] User deleted successfully: {user_id}")
-            return dict(result)
+        # After commit, so a concurrent lookup cannot re-cache the old row
+        invalidate_principal(user_id=user_id)
+        logger.info(f"[AUTH MANAGER] User deleted successfully: {user_id}")
+        return dict(result)
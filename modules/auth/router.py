@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from .models import UserCreate, UserResponse, UserUpdate, TokenResponse, RefreshTokenRequest
 from .manager import AuthManager
-from .utils import get_current_admin, get_current_user
+from .utils import get_current_admin, get_current_user, get_current_user_profile
 from shared.response import success_response, error_response
 
 
@@ -39,7 +39,7 @@ async def refresh_token(refresh_request: RefreshTokenRequest):
         return error_response(str(e), status_code=401)
 
 @router.get("/me")
-async def get_me(current_user: dict = Depends(get_current_user)):
+async def get_me(current_user: dict = Depends(get_current_user_profile)):
     print(f"[AUTH] /me called for user: {current_user.get('email', 'unknown')}")
     print("*** current user", current_user)
     return success_response(data=current_user, message="User details retrieved")
@@ -63,4 +63,22 @@ async def test_login_wrong_password(mock_verify, mock_get_conn, user_data):
     mock_conn.fetchrow.return_value = {"id": 1, "email": user_data.email, "password_hash": "hashedpass"}
     mock_get_conn.return_value.__aenter__.return_value = mock_conn
     with pytest.raises(ValueError, match="Invalid email or password"):
-        await AuthManager.login(user_data.email, "wrongpassword") 
\ No newline at end of file
+        await AuthManager.login(user_data.email, "wrongpassword")
+
+@pytest.mark.asyncio
+@patch("modules.auth.manager.db.get_connection")
+async def test_password_jobs_run_without_a_connection(mock_get_conn, user_data):
+    mock_conn = AsyncMock()
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    held = []
+
+    async def password_job(func, *args):
+        held.append(mock_get_conn.return_value.__aenter__.await_count - mock_get_conn.return_value.__aexit__.await_count)
+        return True
+
+    with patch("modules.auth.manager.run_password_job", side_effect=password_job):
+        mock_conn.fetchrow.return_value = {"id": 1, "email": user_data.email, "password_hash": "hashedpass"}
+        await AuthManager.login(user_data.email, user_data.password)
+        mock_conn.fetchrow.side_effect = [None, {"id": 1, "email": user_data.email}]
+        await AuthManager.register(user_data)
+    assert held == [0, 0]
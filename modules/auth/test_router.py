@@ -1,7 +1,7 @@
 import pytest
 from httpx import AsyncClient
 from modules.auth.manager import AuthManager
-from modules.auth.utils import get_current_user
+from modules.auth.utils import get_current_user, get_current_user_profile
 from main import app
 
 @pytest.mark.asyncio
@@ -64,7 +64,7 @@ async def test_login_invalid(monkeypatch):
 async def test_get_me_success(monkeypatch):
     async def mock_get_current_user():
         return {"id": 1, "email": "test@example.com", "first_name": "Test", "last_name": "User", "is_admin": False, "is_doctor": False}
-    app.dependency_overrides[get_current_user] = mock_get_current_user
+    app.dependency_overrides[get_current_user_profile] = mock_get_current_user
     async with AsyncClient(app=app, base_url="http://test") as ac:
         resp = await ac.get("/auth/me")
     assert resp.status_code == 200
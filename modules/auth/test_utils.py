@@ -0,0 +1,101 @@
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+from . import utils
+from .utils import create_access_token, get_current_principal, get_current_user, hash_password, invalidate_principal, principal_cache, principal_claims, principal_revocations, run_password_job, verify_password
+
+PRINCIPAL_ROW = {"id": 1, "email": "test@example.com", "is_admin": False, "is_doctor": False, "patient_id": 7, "doctor_id": None}
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    principal_revocations.clear()
+    yield
+    principal_cache.clear()
+    principal_revocations.clear()
+
+@pytest.mark.asyncio
+@patch("modules.auth.utils.db.get_connection")
+async def test_get_current_user_caches_principal(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = PRINCIPAL_ROW
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    token = create_access_token({"sub": "test@example.com"})
+    first = await get_current_user(token)
+    second = await get_current_user(token)
+    assert first == second == PRINCIPAL_ROW
+    assert mock_conn.fetchrow.await_count == 1
+
+@pytest.mark.asyncio
+@patch("modules.auth.utils.db.get_connection")
+async def test_invalidate_principal_forces_reload(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = PRINCIPAL_ROW
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    token = create_access_token({"sub": "test@example.com"})
+    await get_current_user(token)
+    invalidate_principal(user_id=1)
+    await get_current_user(token)
+    assert mock_conn.fetchrow.await_count == 2
+
+@pytest.mark.asyncio
+@patch("modules.auth.utils.db.get_connection")
+async def test_get_current_user_returns_copy(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = PRINCIPAL_ROW
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    token = create_access_token({"sub": "test@example.com"})
+    user = await get_current_user(token)
+    user["is_admin"] = True
+    assert (await get_current_user(token))["is_admin"] is False
+
+@pytest.mark.asyncio
+@patch("modules.auth.utils.db.get_connection")
+async def test_get_current_principal_uses_claims(mock_get_conn):
+    token = create_access_token(principal_claims(PRINCIPAL_ROW))
+    user = await get_current_principal(token)
+    assert user == PRINCIPAL_ROW
+    mock_get_conn.assert_not_called()
+
+@pytest.mark.asyncio
+@patch("modules.auth.utils.db.get_connection")
+async def test_get_current_principal_reloads_after_invalidation(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = {**PRINCIPAL_ROW, "is_admin": True}
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    token = create_access_token(principal_claims(PRINCIPAL_ROW))
+    invalidate_principal(user_id=1)
+    user = await get_current_principal(token)
+    assert user["is_admin"] is True
+    assert mock_conn.fetchrow.await_count == 1
+
+@pytest.mark.asyncio
+@patch("modules.auth.utils.db.get_connection")
+async def test_get_current_principal_resolves_admin_claims(mock_get_conn):
+    mock_conn = AsyncMock()
+    # Demoted on another worker; this worker saw no invalidation
+    mock_conn.fetchrow.return_value = PRINCIPAL_ROW
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    token = create_access_token(principal_claims({**PRINCIPAL_ROW, "is_admin": True}))
+    user = await get_current_principal(token)
+    assert user["is_admin"] is False
+    assert mock_conn.fetchrow.await_count == 1
+
+@pytest.mark.asyncio
+async def test_run_password_job_runs_off_loop():
+    hashed = await run_password_job(hash_password, "secret")
+    assert await run_password_job(verify_password, "secret", hashed) is True
+
+@pytest.mark.asyncio
+@patch("modules.auth.utils.PASSWORD_HASH_TIMEOUT", 0.01)
+async def test_run_password_job_rejects_when_saturated():
+    slots = utils._password_slots._value
+    for _ in range(slots):
+        await utils._password_slots.acquire()
+    try:
+        with pytest.raises(HTTPException) as exc:
+            await run_password_job(hash_password, "secret")
+        assert exc.value.status_code == 503
+    finally:
+        for _ in range(slots):
+            utils._password_slots.release()
@@ -1,9 +1,16 @@
+import asyncio
 import bcrypt
 import jwt
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
 from fastapi import Depends, HTTPException, WebSocket
 from fastapi.security import OAuth2PasswordBearer
+from modules.doctors.availability import AVAILABILITY_SLOTS_SQL
+from shared.cache import TTLCache
 from shared.db import db
 
 # Configure logging
@@ -17,6 +24,25 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Slim principals keyed by token subject (email). Per worker, so a role change
+# can take up to AUTH_PRINCIPAL_CACHE_TTL seconds to reach the other workers.
+AUTH_PRINCIPAL_CACHE_TTL = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "60"))
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+principal_cache = TTLCache(maxsize=AUTH_PRINCIPAL_CACHE_SIZE, ttl=AUTH_PRINCIPAL_CACHE_TTL)
+# user_id -> wall-clock time of the last invalidation; claim-bearing access
+# tokens issued before it are re-resolved. Per worker like principal_cache, so
+# only patient claims are ever trusted on their own (see _principal_from_claims).
+principal_revocations = TTLCache(maxsize=AUTH_PRINCIPAL_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# bcrypt holds a CPU for 100-300 ms per call, so hashing runs on a small
+# dedicated pool. At most WORKERS + QUEUE jobs are admitted per worker process;
+# callers beyond that wait up to PASSWORD_HASH_TIMEOUT seconds and then get a 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
 def hash_password(password: str) -> str:
     logger.debug(f"Entered hash_password with password: {password}")
     hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
@@ -31,11 +57,27 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     logger.debug("Exiting verify_password")
     return result
 
+async def run_password_job(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs hash_password/verify_password (or any other blocking call) on the
+    bcrypt pool without blocking the event loop.
+    """
+    try:
+        await asyncio.wait_for(_password_slots.acquire(), timeout=PASSWORD_HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Password hashing pool saturated, rejecting request")
+        raise HTTPException(status_code=503, detail="Authentication service busy, please retry")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_slots.release()
+
 def create_access_token(data: dict) -> str:
     logger.info(f"Creating access token for data: {data}")
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "iat": int(time.time()), "type": "access"})
     logger.debug(f"Token payload to encode: {to_encode}")
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     logger.debug(f"Token created: {token}")
@@ -78,68 +120,159 @@ def verify_refresh_token(token: str) -> dict:
         logger.error(f"JWT decode error for refresh token: {e}")
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def _decode_access_token(token: str) -> dict:
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    logger.debug(f"Decoded JWT payload: {payload}")
+
+    # Check if it's an access token
+    if payload.get("type") != "access":
+        logger.warning("Token is not an access token")
+        raise HTTPException(status_code=401, detail="Invalid token type")
+
+    if payload.get("sub") is None:
+        logger.warning("Token does not contain 'sub' (email)")
+        raise HTTPException(status_code=401, detail="Invalid token")
+    logger.debug(f"Extracted email from token: {payload['sub']}")
+    return payload
+
+def principal_claims(user) -> dict:
+    """JWT claims that let get_current_principal skip the database entirely."""
+    return {
+        "sub": user["email"],
+        "uid": user["id"],
+        "is_admin": bool(user.get("is_admin")),
+        "is_doctor": bool(user.get("is_doctor")),
+        "patient_id": user.get("patient_id"),
+        "doctor_id": user.get("doctor_id"),
+    }
+
+def _principal_from_claims(payload: dict) -> Optional[dict]:
+    """
+    The principal carried by a token's claims, or None if it has to come from
+    _resolve_principal. Admin and doctor claims always do: a demotion on one
+    worker is not seen by the others' principal_revocations, and a stale
+    claim would keep granting the role until the token expires.
+    """
+    user_id = payload.get("uid")
+    if user_id is None:
+        return None
+    if payload.get("is_admin") or payload.get("is_doctor") or payload.get("doctor_id") is not None:
+        return None
+    revoked_at = principal_revocations.get(user_id)
+    if revoked_at is not None and payload.get("iat", 0) <= revoked_at:
+        logger.debug(f"Claims for user_id {user_id} predate invalidation, reloading")
+        return None
+    return {
+        "id": user_id,
+        "email": payload["sub"],
+        "is_admin": payload.get("is_admin", False),
+        "is_doctor": payload.get("is_doctor", False),
+        "patient_id": payload.get("patient_id"),
+        "doctor_id": payload.get("doctor_id"),
+    }
+
+async def _resolve_principal(email: str) -> Optional[dict]:
+    """
+    Returns the slim principal for a token subject, consulting the principal
+    cache first and falling back to a single users lookup.
+    """
+    principal = principal_cache.get(email)
+    if principal is not None:
+        logger.debug(f"Principal cache hit for email: {email}")
+        return dict(principal)
+
+    async with db.get_connection(readonly=True) as conn:
+        logger.info(f"Fetching principal from DB with email: {email}")
+        row = await conn.fetchrow(
+            """
+            SELECT
+                u.id,
+                u.email,
+                u.is_admin,
+                u.is_doctor,
+                p.id AS patient_id,
+                d.id AS doctor_id
+            FROM users u
+            LEFT JOIN patients p ON p.user_id = u.id
+            LEFT JOIN doctors d ON d.user_id = u.id
+            WHERE u.email = $1
+            LIMIT 1
+            """,
+            email
+        )
+    if row is None:
+        return None
+    principal = dict(row)
+    principal_cache.set(email, principal)
+    return dict(principal)
+
+def invalidate_principal(user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+    """
+    Drops cached principals for a user. Call this after any write that changes
+    a user's email, roles, or patient/doctor record.
+    """
+    if email is not None:
+        principal_cache.pop(email)
+    if user_id is not None:
+        principal_revocations.set(user_id, time.time())
+        dropped = principal_cache.pop_where(lambda _, principal: principal["id"] == user_id)
+        logger.debug(f"Invalidated {dropped} cached principal(s) for user_id: {user_id}")
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Resolves the bearer token to the slim principal:
+    id, email, is_admin, is_doctor, patient_id and doctor_id.
+    Endpoints that need the full patient/doctor profile should depend on
+    get_current_user_profile instead.
+    """
     logger.info(f"Entered get_current_user with token: {token}")
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.debug(f"Decoded JWT payload: {payload}")
-        
-        # Check if it's an access token
-        if payload.get("type") != "access":
-            logger.warning("Token is not an access token")
-            raise HTTPException(status_code=401, detail="Invalid token type")
-        
-        email: str = payload.get("sub")
-        if email is None:
-            logger.warning("Token does not contain 'sub' (email)")
-            raise HTTPException(status_code=401, detail="Invalid token")
-        logger.debug(f"Extracted email from token: {email}")
-        async with db.get_connection() as conn:
-            logger.info(f"Fetching user from DB with email: {email}")
-            user = await conn.fetchrow(
-                """
-                SELECT id, email, is_admin, is_doctor
-                FROM users WHERE email = $1
-                """,
-                email
-            )
-            logger.debug(f"DB fetch result: {user}")
-
-            user = dict(user)
+        email = _decode_access_token(token)["sub"]
+        user = await _resolve_principal(email)
+        if user is None:
+            logger.warning(f"User not found for email: {email}")
+            raise HTTPException(status_code=404, detail="User not found")
+        logger.debug("Exiting get_current_user successfully")
+        return user
+    except jwt.ExpiredSignatureError:
+        logger.warning("Access token has expired")
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.PyJWTError as e:
+        logger.error(f"JWT decode error: {e}")
+        raise HTTPException(status_code=401, detail="Invalid token")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_current_user: {e}")
+        raise
 
-            patient = await conn.fetchrow(
-                """
-                SELECT 
-                    u.id AS id,
-                    u.email,
-                    u.is_admin,
-                    u.is_doctor,
-                    p.id AS patient_id,
-                    p.first_name,
-                    p.last_name,
-                    p.date_of_birth,
-                    p.address,
-                    p.profile_image_url,
-                    p.phone_number,
-                    p.occupation,
-                    t.therapy_type,
-                    p.therapy_criticality,
-                    p.emergency_contact_name,
-                    p.emergency_contact_phone,
-                    p.marital_status,
-                    p.created_at
-                FROM 
-                    users u
-                    INNER JOIN patients p ON u.id = p.user_id
-                    LEFT JOIN therapy t ON p.therapy_type = t.id
-                WHERE 
-                    u.id = $1;
-                """,
-                user['id']
-            )
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Authorization-only dependency. Patient tokens issued with principal_claims
+    are resolved without touching the database; admin and doctor tokens, older
+    tokens, and tokens issued before the user was last invalidated fall back
+    to the cached lookup.
+    """
+    try:
+        payload = _decode_access_token(token)
+        user = _principal_from_claims(payload)
+        if user is None:
+            user = await _resolve_principal(payload["sub"])
+        if user is None:
+            logger.warning(f"User not found for email: {payload['sub']}")
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+    except jwt.ExpiredSignatureError:
+        logger.warning("Access token has expired")
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.PyJWTError as e:
+        logger.error(f"JWT decode error: {e}")
+        raise HTTPException(status_code=401, detail="Invalid token")
 
+async def load_user_profile(user: dict) -> dict:
+    """Builds the full patient or doctor profile for a resolved principal."""
+    async with db.get_connection(readonly=True) as conn:
+        if user["is_doctor"]:
             doctor = await conn.fetchrow(
-                """
+                f"""
                 SELECT 
                     d.id AS doctor_id,
                     d.user_id AS id,
@@ -183,23 +316,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
                         FROM doctors_experience de 
                         WHERE de.doctor_id = d.id
                     ) AS experiences,
-                    (
-                        SELECT JSONB_AGG(
-                            JSONB_BUILD_OBJECT(
-                                'slot_id', das.id,
-                                'available_at', das.available_at,
-                                'status', das.status,
-                                'created_at', das.created_at
-                            )
-                        )
-                        FROM doctor_availability_slots das 
-                        WHERE das.doctor_id = d.id
-                    ) AS availability_slots,
+                    {AVAILABILITY_SLOTS_SQL},
                     (
                         SELECT COUNT(*) 
                         FROM appointments a 
                         WHERE a.doctor_id = d.id 
-                        AND DATE(a.slot_time) = CURRENT_DATE
+                        AND a.slot_time >= CURRENT_DATE AND a.slot_time < CURRENT_DATE + 1
                     ) AS appointment_count_today,
                     (
                         SELECT COUNT(DISTINCT dp.patient_id) 
@@ -218,38 +340,56 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
                     ) FILTER (WHERE a.id IS NOT NULL) AS appointments_today
                 FROM doctors d
                 JOIN users u ON d.user_id = u.id
-                LEFT JOIN appointments a ON d.id = a.doctor_id AND DATE(a.slot_time) = CURRENT_DATE
-                LEFT JOIN doctors_reviews dr ON d.id = dr.doctor_id
-                LEFT JOIN doctors_experience de ON d.id = de.doctor_id
-                LEFT JOIN doctors_patients dp ON d.id = dp.doctor_id
+                LEFT JOIN appointments a ON d.id = a.doctor_id AND a.slot_time >= CURRENT_DATE AND a.slot_time < CURRENT_DATE + 1
                 WHERE d.user_id = $1
                 GROUP BY d.id, d.user_id, d.first_name, d.last_name, u.email, d.title, d.bio, d.experience_years, d.patients_count, d.location, d.rating, d.profile_picture_url, d.created_at, u.is_doctor, u.is_admin;
                 """,
                 user["id"]
-
             )
-
-            if user is None:
-                logger.warning(f"User not found for email: {email}")
-                raise HTTPException(status_code=404, detail="User not found")
-            if user["is_doctor"]:
+            if doctor is not None:
                 return dict(doctor)
-            if patient is None and not user["is_doctor"]:
-                logger.warning(f"Patient not found for user_id: {user['id']}")
-                return dict(user)
-            
-            logger.info(f"User found: {dict(user)}")
-            logger.debug("Exiting get_current_user successfully")
-            return dict(patient)
-    except jwt.ExpiredSignatureError:
-        logger.warning("Access token has expired")
-        raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.PyJWTError as e:
-        logger.error(f"JWT decode error: {e}")
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception as e:
-        logger.error(f"Unexpected error in get_current_user: {e}")
-        raise
+            logger.warning(f"Doctor not found for user_id: {user['id']}")
+            return dict(user)
+
+        patient = await conn.fetchrow(
+            """
+            SELECT 
+                u.id AS id,
+                u.email,
+                u.is_admin,
+                u.is_doctor,
+                p.id AS patient_id,
+                p.first_name,
+                p.last_name,
+                p.date_of_birth,
+                p.address,
+                p.profile_image_url,
+                p.phone_number,
+                p.occupation,
+                t.therapy_type,
+                p.therapy_criticality,
+                p.emergency_contact_name,
+                p.emergency_contact_phone,
+                p.marital_status,
+                p.created_at
+            FROM 
+                users u
+                INNER JOIN patients p ON u.id = p.user_id
+                LEFT JOIN therapy t ON p.therapy_type = t.id
+            WHERE 
+                u.id = $1;
+            """,
+            user["id"]
+        )
+        if patient is None:
+            logger.warning(f"Patient not found for user_id: {user['id']}")
+            return dict(user)
+        return dict(patient)
+
+async def get_current_user_profile(current_user: dict = Depends(get_current_user)) -> dict:
+    """Opt-in dependency for endpoints that return the full patient/doctor profile."""
+    logger.info(f"Loading profile for user: {current_user['email']}")
+    return await load_user_profile(current_user)
 
 async def get_current_admin(current_user: dict = Depends(get_current_user)) -> dict:
     logger.info(f"Entered get_current_admin with user: {current_user}")
@@ -283,22 +423,12 @@ async def get_current_user_ws(websocket: WebSocket) -> dict:
             logger.warning("Websocket token does not contain 'sub' (email)")
             raise Exception("Invalid token")
         logger.debug(f"Extracted email from websocket token: {email}")
-        async with db.get_connection() as conn:
-            logger.info(f"Fetching user from DB with email: {email}")
-            user = await conn.fetchrow(
-                """
-                SELECT id, email, first_name, last_name, is_admin
-                FROM users WHERE email = $1
-                """,
-                email
-            )
-            logger.debug(f"DB fetch result (ws): {user}")
-            if user is None:
-                logger.warning(f"User not found for email: {email}")
-                raise Exception("User not found")
-            logger.info(f"User found: {dict(user)}")
-            logger.debug("Exiting get_current_user_ws successfully")
-            return dict(user)
+        user = await _resolve_principal(email)
+        if user is None:
+            logger.warning(f"User not found for email: {email}")
+            raise Exception("User not found")
+        logger.debug("Exiting get_current_user_ws successfully")
+        return user
     except jwt.PyJWTError as e:
         logger.error(f"JWT decode error (websocket): {e}")
         raise Exception("Invalid token")
@@ -1,6 +1,7 @@
 import logging
 from typing import List, Optional
 from .models import BlogPostCreateModel, BlogPostResponseModel, MoodRecommendationModel
+from shared.pagination import Keyset, SortKey, cursor_meta
 from .utils import db_connection, execute_query, fetch_all, fetch_one, upload_to_cloudinary, upload_image
 import uuid
 import json
@@ -47,7 +48,7 @@ async def get_blog_posts_by_mood(user_id: str, limit: int = 5, offset: int = 0):
     This function fetches posts where the current mood exists in mood_relevance and its value > 0.
     """
     logger.debug(f"Fetching blog posts for user_id={user_id}, limit={limit}, offset={offset}")
-    async with db_connection() as conn:
+    async with db_connection(readonly=True) as conn:
         # Get the user's current mood
         mood_query = """
             SELECT current_mood FROM mood_recommendations
@@ -117,10 +118,31 @@ async def update_user_mood(user_id: str, mood: str) -> None:
         logger.info(f"Upserted mood for user_id={user_id} to mood={mood}")
 
 
-async def get_all_blog_posts(limit: int = 20, offset: int = 0) -> List:
-    """Fetch all blog posts with pagination."""
-    logger.debug(f"Fetching all blog posts, limit={limit}, offset={offset}")
-    async with db_connection() as conn:
+BLOG_KEYSET = Keyset(SortKey("created_at"), SortKey("id"))
+
+
+async def get_all_blog_posts(limit: int = 20, offset: int = 0, cursor: Optional[str] = None):
+    """
+    Fetch all blog posts with pagination. A cursor ('' for the first page)
+    switches to keyset paging and returns {"posts": [...], "meta": {...}}.
+    """
+    logger.debug(f"Fetching all blog posts, limit={limit}, offset={offset}, cursor={cursor!r}")
+    if cursor is not None:
+        condition, params = BLOG_KEYSET.condition(cursor, 1)
+        async with db_connection(readonly=True) as conn:
+            query = f"""
+                SELECT id, title, description, content_type, content_url, duration, mood_relevance, created_at, user_id, thumbnail_url,
+                    {BLOG_KEYSET.columns()}
+                FROM blog_posts
+                {f"WHERE {condition}" if condition else ""}
+                {BLOG_KEYSET.order_by()}
+                LIMIT {BLOG_KEYSET.fetch_size(limit)}
+            """
+            rows = await fetch_all(conn, query, tuple(params))
+        posts, next_cursor = BLOG_KEYSET.paginate(rows, limit)
+        logger.info(f"Fetched {len(posts)} blog posts by cursor")
+        return {"posts": posts, "meta": cursor_meta(limit, next_cursor)}
+    async with db_connection(readonly=True) as conn:
         query = """
             SELECT id, title, description, content_type, content_url, duration, mood_relevance, created_at, user_id, thumbnail_url
             FROM blog_posts
@@ -2,9 +2,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from .models import BlogPostCreateModel, BlogPostResponseModel, MoodRecommendationModel
 from .manager import create_blog_post, get_blog_posts_by_mood, update_user_mood, get_all_blog_posts
-from .utils import db_connection
-from typing import List
-from asyncpg import Connection
+from typing import List, Optional
 import json
 from modules.auth.utils import get_current_user
 from shared.response import success_response, error_response
@@ -16,10 +14,6 @@ logging.basicConfig(level=logging.INFO)
 
 router = APIRouter()
 
-async def get_db() -> Connection:
-    async with db_connection() as conn:
-        yield conn
-
 @router.post("/posts")
 async def create_post(
     user_id: str = Depends(get_current_user),
@@ -80,8 +74,7 @@ async def create_post(
 async def get_mood_based_posts(
     user_id: str,
     limit: int = 5,
-    offset: int = 0,
-    db: Connection = Depends(get_db)
+    offset: int = 0
 ):
     logger.info(f"Fetching posts for user_id={user_id}, limit={limit}, offset={offset}")
     try:
@@ -98,8 +91,7 @@ async def get_mood_based_posts(
 @router.post("/mood", response_model=None)
 async def update_mood(
     user_id: str,
-    mood: MoodRecommendationModel,
-    db: Connection = Depends(get_db)
+    mood: MoodRecommendationModel
 ):
     logger.info(f"Updating mood for user_id={user_id} to {mood.current_mood}")
     try:
@@ -115,16 +107,18 @@ async def update_mood(
 async def get_all_posts(
     limit: int = 20,
     offset: int = 0,
-    db: Connection = Depends(get_db)
+    cursor: Optional[str] = None
 ):
-    logger.info(f"Fetching all blog posts, limit={limit}, offset={offset}")
+    logger.info(f"Fetching all blog posts, limit={limit}, offset={offset}, cursor={cursor!r}")
     try:
-        posts = await get_all_blog_posts(limit, offset)
+        posts = await get_all_blog_posts(limit, offset, cursor)
         logger.info(f"Fetched {len(posts) if posts else 0} blog posts")
         if not posts:
             logger.warning("No blog posts found")
             raise HTTPException(status_code=404, detail="No blog posts found")
         return success_response(data=posts, message="All blog posts fetched successfully")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching all blog posts: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching all blog posts: {str(e)}")
@@ -2,6 +2,7 @@ import asyncpg
 from typing import Optional, List, Any, Tuple
 import os
 from contextlib import asynccontextmanager
+from shared.db import db
 import cloudinary
 import cloudinary.uploader
 
@@ -12,28 +13,17 @@ cloudinary.config(
     api_secret=os.getenv("CLOUDINARY_API_SECRET")
 )
 
-async def get_db_connection() -> asyncpg.Connection:
-    """Establish a connection to the PostgreSQL database."""
-    try:
-        conn = await asyncpg.connect(
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_DB"),
-            host=os.getenv("DB_HOST", "localhost"),
-            port=os.getenv("DB_PORT", "5432")
-        )
-        return conn
-    except Exception as e:
-        raise ConnectionError(f"Failed to connect to database: {str(e)}")
-
 @asynccontextmanager
-async def db_connection():
-    """Context manager for database connection."""
-    conn = await get_db_connection()
-    try:
+async def db_connection(readonly: bool = False):
+    """
+    Context manager for a connection from the shared pool. No transaction is
+    opened: each statement commits on its own, as it did on the per-request
+    connections this replaced. Call sites that need several writes to commit
+    together open ``conn.transaction()`` themselves. ``readonly`` is kept for
+    existing callers and changes nothing.
+    """
+    async with db.acquire() as conn:
         yield conn
-    finally:
-        await conn.close()
 
 async def execute_query(conn: asyncpg.Connection, query: str, params: Tuple = ()) -> None:
     """Execute a raw SQL query that does not return results."""
@@ -0,0 +1,164 @@
+"""
+Messages per second per chat socket for each way of storing chat messages.
+
+Against a scratch database (BENCH_DB_DSN), opens BENCH_SOCKETS simulated
+chat sockets, each on its own confirmed appointment, and has every socket
+store BENCH_MESSAGES messages one after another, as the receive loop does.
+Three paths are compared:
+
+- ``per-message``: what the loop did before: resolve the receiver on a pooled
+  connection (appointment, then the doctor's user), then an INSERT in its
+  own transaction (save_message below).
+- ``session``: participants resolved once by open_session, messages stored
+  through ChatManager.save_session_message (the batched writer).
+- ``write-behind``: the same with WriteBehindChatWriter (CHAT_WRITE_BEHIND);
+  its time includes the final flush, so the total counts stored messages.
+
+Prints messages/s per socket and in total, and the save latency (for
+write-behind, the time until the message could be broadcast).
+
+Usage:
+    BENCH_DB_DSN=postgresql://.../amcan_bench python -m modules.chat.bench_chat
+"""
+
+import asyncio
+import os
+import time
+import asyncpg
+from modules.chat.manager import ChatManager
+from modules.chat.utils import open_session
+from modules.chat.writer import WriteBehindChatWriter, chat_writer
+from shared.bench import summarize
+from shared.db import db
+from shared.migrations import migrate
+
+BENCH_DB_DSN = os.getenv("BENCH_DB_DSN")
+SOCKETS = int(os.getenv("BENCH_SOCKETS", "50"))
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "200"))
+POOL_SIZE = int(os.getenv("BENCH_POOL_SIZE", "20"))
+
+
+async def seed(conn) -> list:
+    suffix = int(time.time())
+    doctor_user = await conn.fetchval(
+        "INSERT INTO users (email, password_hash, is_doctor) VALUES ($1, 'x', true) RETURNING id",
+        f"bench-chat-doctor-{suffix}@example.com",
+    )
+    doctor_id = await conn.fetchval(
+        """
+        INSERT INTO doctors (user_id, first_name, last_name, title, bio, experience_years, location)
+        VALUES ($1, 'Bench', 'Doctor', 'Psychiatrist', 'Chat benchmark', 1, 'Lagos')
+        RETURNING id
+        """,
+        doctor_user,
+    )
+    rows = await conn.fetch(
+        """
+        WITH patients AS (
+            INSERT INTO users (email, password_hash, is_doctor)
+            SELECT 'bench-chat-' || g || '-' || $3::text || '@example.com', 'x', false
+            FROM generate_series(1, $2) g
+            RETURNING id
+        )
+        INSERT INTO appointments (doctor_id, patient_id, slot_time, complain, status)
+        SELECT $1, id, now() + make_interval(mins => id), 'bench', 'confirmed' FROM patients
+        RETURNING id, patient_id
+        """,
+        doctor_id,
+        SOCKETS,
+        str(suffix),
+    )
+    return [(row["id"], row["patient_id"]) for row in rows]
+
+
+async def resolve_receiver(appointment_id: int, sender_id: int) -> int:
+    async with db.get_connection(readonly=True) as conn:
+        appointment = await conn.fetchrow(
+            "SELECT patient_id, doctor_id FROM appointments WHERE id = $1",
+            appointment_id,
+        )
+        if sender_id == appointment["patient_id"]:
+            return await conn.fetchval("SELECT user_id FROM doctors WHERE id = $1", appointment["doctor_id"])
+        return appointment["patient_id"]
+
+
+async def save_message(appointment_id: int, sender_id: int, receiver_id: int, message: str) -> dict:
+    async with db.get_connection() as conn:
+        row = await conn.fetchrow(
+            """
+            INSERT INTO chat_messages (appointment_id, sender_id, receiver_id, message)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id, appointment_id, sender_id, receiver_id, message, sent_at
+            """,
+            appointment_id,
+            sender_id,
+            receiver_id,
+            message
+        )
+        return dict(row)
+
+
+async def per_message(appointment_id: int, user_id: int, samples: list) -> None:
+    for i in range(MESSAGES):
+        t0 = time.perf_counter()
+        receiver_id = await resolve_receiver(appointment_id, user_id)
+        await save_message(appointment_id, user_id, receiver_id, f"bench {i}")
+        samples.append(time.perf_counter() - t0)
+
+
+async def with_session(appointment_id: int, user_id: int, samples: list) -> None:
+    session = await open_session(appointment_id, user_id)
+    for i in range(MESSAGES):
+        t0 = time.perf_counter()
+        await ChatManager.save_session_message(session, f"bench {i}")
+        samples.append(time.perf_counter() - t0)
+
+
+def write_behind(writer: WriteBehindChatWriter):
+    async def socket_loop(appointment_id: int, user_id: int, samples: list) -> None:
+        session = await open_session(appointment_id, user_id)
+        for i in range(MESSAGES):
+            t0 = time.perf_counter()
+            await writer.write(session.appointment_id, session.user_id, session.receiver_id, f"bench {i}")
+            samples.append(time.perf_counter() - t0)
+    return socket_loop
+
+
+async def run(label: str, socket_loop, sockets: list, finish=None) -> None:
+    samples: list = []
+    started = time.perf_counter()
+    await asyncio.gather(*(socket_loop(appointment_id, user_id, samples) for appointment_id, user_id in sockets))
+    if finish is not None:
+        await finish()
+    elapsed = time.perf_counter() - started
+    stats = summarize(samples, elapsed)
+    print(
+        f"{label:<12} {stats['rps'] / len(sockets):8.1f} msg/s per socket  {stats['rps']:9.1f} msg/s total  "
+        f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms"
+    )
+
+
+async def main():
+    if not BENCH_DB_DSN:
+        raise SystemExit("Set BENCH_DB_DSN to a scratch database")
+    pool = await asyncpg.create_pool(dsn=BENCH_DB_DSN, min_size=1, max_size=POOL_SIZE)
+    db.pool = pool
+    try:
+        await migrate()
+        async with pool.acquire() as conn:
+            sockets = await seed(conn)
+        print(f"{SOCKETS} sockets x {MESSAGES} messages, pool of {POOL_SIZE}")
+        await run("per-message", per_message, sockets)
+        await run("session", with_session, sockets)
+        print(f"writer: {chat_writer.stats()}")
+        behind = WriteBehindChatWriter()
+        await run("write-behind", write_behind(behind), sockets, finish=behind.stop)
+        print(f"write-behind writer: {behind.stats()}")
+    finally:
+        await chat_writer.stop()
+        db.pool = None
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
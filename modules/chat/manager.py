@@ -1,63 +1,90 @@
 # modules/chat/manager.py
+import logging
+import os
+from typing import List, Optional, Tuple
 from .models import MessageCreate, MessageResponse
-from .utils import active_connections
+from .utils import ChatSession, chat_channel, chat_hub, open_session
+from .writer import chat_writer
+from shared.broadcast import broadcaster
 from shared.db import db
 
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "50"))
+CHAT_HISTORY_MAX_LIMIT = 200
+CHAT_SYNC_BATCH = int(os.getenv("CHAT_SYNC_BATCH", "100"))
+CHAT_SYNC_MAX = int(os.getenv("CHAT_SYNC_MAX", "1000"))
+
+MESSAGE_COLUMNS = "id, appointment_id, sender_id, receiver_id, message, sent_at"
+
 class ChatManager:
     @staticmethod
     async def send_message(message: MessageCreate, sender_id: int) -> dict:
-        async with db.get_connection() as conn:
-            # Verify appointment exists and is confirmed
-            appointment = await conn.fetchrow(
-                """
-                SELECT id, status FROM appointments
-                WHERE id = $1 AND (user_id = $2 OR doctor_id = $2) AND status = 'confirmed'
-                """,
-                message.appointment_id,
-                sender_id
-            )
-            if not appointment:
-                raise ValueError("No confirmed appointment found for this user and doctor")
-
-            # Determine receiver based on appointment
-            doctor_id = await conn.fetchval(
-                "SELECT doctor_id FROM appointments WHERE id = $1",
-                message.appointment_id
-            )
-            receiver_id = doctor_id if sender_id != doctor_id else await conn.fetchval(
-                "SELECT user_id FROM appointments WHERE id = $1",
-                message.appointment_id
-            )
-            print('first receiver_id:', receiver_id)
+        """Stores a message sent over HTTP; participants are resolved the same way as for a chat socket."""
+        session = await open_session(message.appointment_id, sender_id)
+        return await ChatManager.save_session_message(session, message.message)
 
-            if receiver_id==doctor_id:
-                receiver_id = await conn.fetchval(
-                    "SELECT user_id FROM doctors WHERE id = $1",
-                    doctor_id
-                )
-                print(f"Receiver ID determined as: {receiver_id}")
-
-            row = await conn.fetchrow(
-                """
-                INSERT INTO chat_messages (appointment_id, sender_id, receiver_id, message)
-                VALUES ($1, $2, $3, $4)
-                RETURNING id, appointment_id, sender_id, receiver_id, message, sent_at
+    @staticmethod
+    async def _fetch_page(conn, appointment_id: int, before_id: Optional[int] = None,
+                          after_id: Optional[int] = None, limit: int = CHAT_HISTORY_LIMIT) -> Tuple[List[dict], bool]:
+        """
+        Up to ``limit`` messages in id order, and whether more lie beyond them:
+        the ones after ``after_id``, else the latest (before ``before_id`` if given).
+        Messages younger than the writer's history_settle are left out (see
+        modules.chat.writer), so a cursor never passes one still being flushed.
+        """
+        args = [appointment_id]
+        conditions = ["appointment_id = $1"]
+        if chat_writer.history_settle:
+            args.append(chat_writer.history_settle)
+            conditions.append(f"sent_at <= LOCALTIMESTAMP - make_interval(secs => ${len(args)})")
+        if after_id is not None:
+            args.append(after_id)
+            conditions.append(f"id > ${len(args)}")
+            rows = await conn.fetch(
+                f"""
+                SELECT {MESSAGE_COLUMNS} FROM chat_messages
+                WHERE {' AND '.join(conditions)}
+                ORDER BY id ASC
+                LIMIT ${len(args) + 1}
                 """,
-                message.appointment_id,
-                sender_id,
-                receiver_id,
-                message.message
+                *args,
+                limit + 1
             )
-            return dict(row)
+            return [dict(row) for row in rows[:limit]], len(rows) > limit
+
+        if before_id is not None:
+            args.append(before_id)
+            conditions.append(f"id < ${len(args)}")
+        rows = await conn.fetch(
+            f"""
+            SELECT {MESSAGE_COLUMNS} FROM chat_messages
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id DESC
+            LIMIT ${len(args) + 1}
+            """,
+            *args,
+            limit + 1
+        )
+        return [dict(row) for row in reversed(rows[:limit])], len(rows) > limit
 
     @staticmethod
-    async def get_chat_history(appointment_id: int, user_id: int) -> list:
-        async with db.get_connection() as conn:
+    async def get_chat_history(appointment_id: int, user_id: int, before_id: Optional[int] = None,
+                               after_id: Optional[int] = None, limit: int = CHAT_HISTORY_LIMIT) -> dict:
+        """
+        One page of an appointment's messages, oldest first. Without cursors it
+        is the latest ``limit``; pass ``before_id`` (meta_data.oldest_id) for
+        older pages or ``after_id`` (meta_data.newest_id) to catch up.
+        """
+        if before_id is not None and after_id is not None:
+            raise ValueError("Pass before_id or after_id, not both")
+        async with db.get_connection(readonly=True) as conn:
             # Verify user is part of the appointment
             appointment = await conn.fetchrow(
                 """
-                SELECT id, status FROM appointments
-                WHERE id = $1 AND (user_id = $2 OR doctor_id = $2) AND status = 'confirmed'
+                SELECT a.id, a.status FROM appointments a
+                JOIN doctors d ON d.id = a.doctor_id
+                WHERE a.id = $1 AND (a.patient_id = $2 OR d.user_id = $2) AND a.status = 'confirmed'
                 """,
                 appointment_id,
                 user_id
@@ -65,37 +92,54 @@ class ChatManager:
             if not appointment:
                 raise ValueError("No confirmed appointment found for this user")
 
-            rows = await conn.fetch(
-                """
-                SELECT id, appointment_id, sender_id, receiver_id, message, sent_at
-                FROM chat_messages
-                WHERE appointment_id = $1
-                ORDER BY sent_at ASC
-                """,
-                appointment_id
-            )
-            return [dict(row) for row in rows]
-
+            messages, has_more = await ChatManager._fetch_page(conn, appointment_id, before_id, after_id, limit)
+        return {
+            "messages": messages,
+            "meta_data": {
+                "limit": limit,
+                "has_more": has_more,
+                "oldest_id": messages[0]["id"] if messages else None,
+                "newest_id": messages[-1]["id"] if messages else None,
+            },
+        }
 
     @staticmethod
-    async def save_message(appointment_id: int, sender_id: int, receiver_id: int, message: str) -> dict:
-        async with db.get_connection() as conn:
-            row = await conn.fetchrow(
-                """
-                INSERT INTO chat_messages (appointment_id, sender_id, receiver_id, message)
-                VALUES ($1, $2, $3, $4)
-                RETURNING id, appointment_id, sender_id, receiver_id, message, sent_at
-                """,
-                appointment_id,
-                sender_id,
-                receiver_id,
-                message
-            )
-            return dict(row)
+    async def sync_missed_messages(websocket, session: ChatSession, last_seen_id) -> None:
+        """
+        Reconnect sync: queues the messages after ``last_seen_id`` on the socket
+        in "sync" frames of CHAT_SYNC_BATCH, waiting for each to be written
+        before reading the next. Stops after CHAT_SYNC_MAX messages with
+        has_more true; the client pages the rest with after_id. The socket
+        already receives live messages, so some may arrive twice; clients
+        drop ids they have seen. With CHAT_WRITE_BEHIND, messages younger
+        than the writer's history_settle are not found; they were broadcast.
+        """
+        if isinstance(last_seen_id, bool) or not isinstance(last_seen_id, int) or last_seen_id < 0:
+            chat_hub.send(websocket, {"type": "error", "message": "last_seen_id must be a non-negative integer"})
+            return
+        after_id, synced = last_seen_id, 0
+        while True:
+            async with db.get_connection(readonly=True) as conn:
+                messages, has_more = await ChatManager._fetch_page(
+                    conn, session.appointment_id, after_id=after_id, limit=min(CHAT_SYNC_BATCH, CHAT_SYNC_MAX - synced)
+                )
+            synced += len(messages)
+            has_more = has_more and bool(messages)
+            chat_hub.send(websocket, {
+                "type": "sync",
+                "data": [{**m, "sent_at": m["sent_at"].isoformat() if m["sent_at"] else None} for m in messages],
+                "has_more": has_more,
+            })
+            if not has_more or synced >= CHAT_SYNC_MAX:
+                break
+            after_id = messages[-1]["id"]
+            await chat_hub.flush(websocket)
+        logger.info(f"[CHAT MANAGER] Synced {synced} message(s) after id {last_seen_id} for appointment {session.appointment_id}")
 
-    # You should define active_connections at the module level or import it if managed elsewhere.
-    # Here is a simple in-memory example:
-    # active_connections = {}
+    @staticmethod
+    async def save_session_message(session: ChatSession, message: str) -> dict:
+        """Stores a message sent on a chat socket through the batched writer (queues it, with CHAT_WRITE_BEHIND)."""
+        return await chat_writer.write(session.appointment_id, session.user_id, session.receiver_id, message)
 
     @staticmethod
     async def broadcast_message(appointment_id: int, message_data: dict):
@@ -114,6 +158,5 @@ class ChatManager:
 
         safe_message_data = serialize(copy.deepcopy(message_data))
 
-        if appointment_id in active_connections:
-            for _, websocket in active_connections[appointment_id].items():
-                await websocket.send_json(safe_message_data)
\ No newline at end of file
+        # Reaches the appointment's sockets on every worker, this one included
+        await broadcaster.publish(chat_channel(appointment_id), safe_message_data)
\ No newline at end of file
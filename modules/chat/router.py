@@ -1,17 +1,16 @@
 # modules/chat/router.py
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, HTTPException
 from .models import MessageCreate, MessageResponse
-from .manager import ChatManager
-from modules.auth.utils import get_current_user, get_current_user_ws
+from .manager import CHAT_HISTORY_LIMIT, CHAT_HISTORY_MAX_LIMIT, ChatManager
+from modules.auth.utils import get_current_principal, get_current_user_ws
 from shared.response import success_response, error_response
 from .utils import connect_websocket, disconnect_websocket, active_connections
-from typing import List
-from shared.db import db
+from typing import List, Optional
 
 router = APIRouter()
 
 @router.post("/")
-async def send_message(message: MessageCreate, current_user: dict = Depends(get_current_user)):
+async def send_message(message: MessageCreate, current_user: dict = Depends(get_current_principal)):
     try:
         message_data = await ChatManager.send_message(message, current_user["id"])  # Receiver determined in manager
         return success_response(data=message_data, message="Message sent successfully")
@@ -21,9 +20,15 @@ async def send_message(message: MessageCreate, current_user: dict = Depends(get_
         return error_response(str(e), status_code=500)
 
 @router.get("/{appointment_id}")
-async def get_chat_history(appointment_id: int, current_user: dict = Depends(get_current_user)):
+async def get_chat_history(
+    appointment_id: int,
+    before_id: Optional[int] = Query(None, ge=1, description="Return messages older than this id"),
+    after_id: Optional[int] = Query(None, ge=0, description="Return messages newer than this id"),
+    limit: int = Query(CHAT_HISTORY_LIMIT, ge=1, le=CHAT_HISTORY_MAX_LIMIT, description="Number of messages to return"),
+    current_user: dict = Depends(get_current_principal)
+):
     try:
-        chat_history = await ChatManager.get_chat_history(appointment_id, current_user["id"])
+        chat_history = await ChatManager.get_chat_history(appointment_id, current_user["id"], before_id, after_id, limit)
         return success_response(data=chat_history, message="Chat history retrieved successfully")
     except ValueError as e:
         return error_response(str(e), status_code=400)
@@ -39,22 +44,20 @@ async def websocket_endpoint(appointment_id: int, websocket: WebSocket):
     print("current user data", current_user)
     try:
         user_id = current_user["id"]
-        user_role = await connect_websocket(websocket, appointment_id, user_id)
+        session = await connect_websocket(websocket, appointment_id, user_id)
 
         try:
             while True:
                 # Receive message from client
                 data = await websocket.receive_json()
+                if data.get("type") == "sync":
+                    # Reconnect: the client asks for what it missed after its last seen id
+                    await ChatManager.sync_missed_messages(websocket, session, data.get("last_seen_id"))
+                    continue
                 message_create = MessageCreate(**data)
                 
-                # Save message to database
-                receiver_id = await get_receiver_id(appointment_id, user_id)
-                message_data = await ChatManager.save_message(
-                    message_create.appointment_id,
-                    user_id,
-                    receiver_id,
-                    message_create.message
-                )
+                # Save message to database; participants were resolved at connect
+                message_data = await ChatManager.save_session_message(session, message_create.message)
                 
                 # Broadcast to all connected users in this appointment
                 await ChatManager.broadcast_message(appointment_id, {
@@ -70,21 +73,3 @@ async def websocket_endpoint(appointment_id: int, websocket: WebSocket):
     except HTTPException as e:
         await websocket.close(code=e.status_code)
         raise e
-
-async def get_receiver_id(appointment_id: int, sender_id: int) -> int:
-    """Determine the receiver_id based on the appointment."""
-    async with db.get_connection() as conn:
-        appointment = await conn.fetchrow(
-            "SELECT user_id, doctor_id FROM appointments WHERE id = $1",
-            appointment_id
-        )
-        if not appointment:
-            raise ValueError("Appointment not found")
-        receiver_id = appointment["doctor_id"] if sender_id == appointment["user_id"] else appointment["user_id"]
-
-        if receiver_id == appointment["doctor_id"]:
-            receiver_id = await conn.fetchval(
-                "SELECT user_id FROM doctors WHERE id = $1",
-                appointment["doctor_id"]
-            )
-        return receiver_id
\ No newline at end of file
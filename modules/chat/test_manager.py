@@ -3,6 +3,8 @@ import pytest_asyncio
 from unittest.mock import AsyncMock, patch
 from modules.chat.manager import ChatManager
 from modules.chat.models import MessageCreate
+from modules.chat.utils import ChatSession
+from modules.chat.writer import WriteBehindChatWriter
 from datetime import datetime
 
 @pytest_asyncio.fixture
@@ -10,29 +12,28 @@ def message_data():
     return MessageCreate(appointment_id=1, message="Hello!")
 
 @pytest.mark.asyncio
-@patch("modules.chat.manager.db.get_connection")
-async def test_send_message_success(mock_get_conn, message_data):
-    mock_conn = AsyncMock()
-    # fetchrow: appointment check, then insert message row
-    mock_conn.fetchrow.side_effect = [
-        {"id": 1, "status": "confirmed"},  # appointment
-        {"id": 1, "appointment_id": 1, "sender_id": 2, "receiver_id": 3, "message": message_data.message, "sent_at": datetime.now()}
-    ]
-    # fetchval: doctor_id, receiver_id, receiver_id from doctors
-    mock_conn.fetchval.side_effect = [2, 3, 3]
-    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+@patch("modules.chat.manager.chat_writer")
+@patch("modules.chat.manager.open_session")
+async def test_send_message_success(mock_open_session, mock_writer, message_data):
+    mock_open_session.return_value = ChatSession(1, 2, "patient", 3)
+    mock_writer.write = AsyncMock(return_value={
+        "id": 1, "appointment_id": 1, "sender_id": 2, "receiver_id": 3, "message": message_data.message, "sent_at": datetime.now()
+    })
     result = await ChatManager.send_message(message_data, sender_id=2)
+    mock_open_session.assert_awaited_once_with(1, 2)
+    mock_writer.write.assert_awaited_once_with(1, 2, 3, message_data.message)
     assert result["message"] == message_data.message
     assert result["appointment_id"] == 1
 
 @pytest.mark.asyncio
-@patch("modules.chat.manager.db.get_connection")
-async def test_send_message_no_confirmed_appointment(mock_get_conn, message_data):
-    mock_conn = AsyncMock()
-    mock_conn.fetchrow.return_value = None  # appointment not found
-    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+@patch("modules.chat.manager.chat_writer")
+@patch("modules.chat.manager.open_session")
+async def test_send_message_no_confirmed_appointment(mock_open_session, mock_writer, message_data):
+    mock_open_session.side_effect = ValueError("No confirmed appointment found")
+    mock_writer.write = AsyncMock()
     with pytest.raises(ValueError, match="No confirmed appointment found"):
         await ChatManager.send_message(message_data, sender_id=2)
+    mock_writer.write.assert_not_awaited()
 
 @pytest.mark.asyncio
 @patch("modules.chat.manager.db.get_connection")
@@ -44,8 +45,89 @@ async def test_get_chat_history_success(mock_get_conn):
     ]
     mock_get_conn.return_value.__aenter__.return_value = mock_conn
     result = await ChatManager.get_chat_history(1, 2)
-    assert isinstance(result, list)
-    assert result[0]["message"] == "Hello!"
+    assert result["messages"][0]["message"] == "Hello!"
+    assert result["meta_data"] == {"limit": 50, "has_more": False, "oldest_id": 1, "newest_id": 1}
+
+@pytest.mark.asyncio
+@patch("modules.chat.manager.db.get_connection")
+async def test_get_chat_history_before_id_pages_back_by_id(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = {"id": 1, "status": "confirmed"}
+    # Newest first from the query, one more than the limit
+    mock_conn.fetch.return_value = [
+        {"id": i, "appointment_id": 1, "sender_id": 2, "receiver_id": 3, "message": f"m{i}", "sent_at": datetime.now()}
+        for i in (9, 8, 7)
+    ]
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    result = await ChatManager.get_chat_history(1, 2, before_id=10, limit=2)
+    query, *args = mock_conn.fetch.await_args.args
+    assert "id < $2" in query and "ORDER BY id DESC" in query
+    assert args == [1, 10, 3]
+    assert [m["id"] for m in result["messages"]] == [8, 9]
+    assert result["meta_data"] == {"limit": 2, "has_more": True, "oldest_id": 8, "newest_id": 9}
+
+@pytest.mark.asyncio
+@patch("modules.chat.manager.db.get_connection")
+async def test_get_chat_history_after_id_reads_forward(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = {"id": 1, "status": "confirmed"}
+    mock_conn.fetch.return_value = [
+        {"id": 11, "appointment_id": 1, "sender_id": 2, "receiver_id": 3, "message": "new", "sent_at": datetime.now()}
+    ]
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    result = await ChatManager.get_chat_history(1, 2, after_id=10)
+    query, *args = mock_conn.fetch.await_args.args
+    assert "id > $2" in query and "ORDER BY id ASC" in query
+    assert args == [1, 10, 51]
+    assert result["meta_data"]["has_more"] is False
+    with pytest.raises(ValueError, match="not both"):
+        await ChatManager.get_chat_history(1, 2, before_id=5, after_id=10)
+
+@pytest.mark.asyncio
+@patch("modules.chat.manager.chat_writer", WriteBehindChatWriter(settle_ms=1500))
+@patch("modules.chat.manager.db.get_connection")
+async def test_write_behind_history_leaves_out_unsettled_messages(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = {"id": 1, "status": "confirmed"}
+    mock_conn.fetch.return_value = []
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    await ChatManager.get_chat_history(1, 2, after_id=10)
+    query, *args = mock_conn.fetch.await_args.args
+    assert "sent_at <= LOCALTIMESTAMP - make_interval(secs => $2)" in query and "id > $3" in query
+    assert args == [1, 1.5, 10, 51]
+    await ChatManager.get_chat_history(1, 2, before_id=10)
+    query, *args = mock_conn.fetch.await_args.args
+    assert "make_interval(secs => $2)" in query and "id < $3" in query and "ORDER BY id DESC" in query
+    assert args == [1, 1.5, 10, 51]
+
+@pytest.mark.asyncio
+@patch("modules.chat.manager.CHAT_SYNC_BATCH", 2)
+@patch("modules.chat.manager.chat_hub")
+@patch("modules.chat.manager.db.get_connection")
+async def test_sync_missed_messages_streams_pages_after_last_seen(mock_get_conn, mock_hub, *_):
+    mock_conn = AsyncMock()
+    rows = [
+        {"id": i, "appointment_id": 4, "sender_id": 2, "receiver_id": 3, "message": f"m{i}", "sent_at": datetime(2026, 1, 5, 9, i)}
+        for i in (6, 7, 8)
+    ]
+    mock_conn.fetch.side_effect = [rows[:3], rows[2:]]
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    mock_hub.flush = AsyncMock()
+    session = ChatSession(4, 2, "patient", 3)
+    await ChatManager.sync_missed_messages("ws", session, 5)
+    frames = [call.args[1] for call in mock_hub.send.call_args_list]
+    assert [[m["id"] for m in f["data"]] for f in frames] == [[6, 7], [8]]
+    assert [f["has_more"] for f in frames] == [True, False]
+    assert frames[0]["data"][0]["sent_at"] == "2026-01-05T09:06:00"
+    # The second page starts after the last id of the first
+    assert mock_conn.fetch.await_args_list[1].args[2] == 7
+    mock_hub.flush.assert_awaited_once_with("ws")
+
+@pytest.mark.asyncio
+@patch("modules.chat.manager.chat_hub")
+async def test_sync_missed_messages_rejects_bad_last_seen_id(mock_hub):
+    await ChatManager.sync_missed_messages("ws", ChatSession(4, 2, "patient", 3), "abc")
+    assert mock_hub.send.call_args.args[1]["type"] == "error"
 
 @pytest.mark.asyncio
 @patch("modules.chat.manager.db.get_connection")
@@ -57,13 +139,11 @@ async def test_get_chat_history_no_confirmed_appointment(mock_get_conn):
         await ChatManager.get_chat_history(1, 2)
 
 @pytest.mark.asyncio
-@patch("modules.chat.manager.db.get_connection")
-async def test_save_message_success(mock_get_conn):
-    mock_conn = AsyncMock()
-    mock_conn.fetchrow.return_value = {
-        "id": 1, "appointment_id": 1, "sender_id": 2, "receiver_id": 3, "message": "Hello!", "sent_at": datetime.now()
-    }
-    mock_get_conn.return_value.__aenter__.return_value = mock_conn
-    result = await ChatManager.save_message(1, 2, 3, "Hello!")
-    assert result["message"] == "Hello!"
-    assert result["appointment_id"] == 1 
\ No newline at end of file
+@patch("modules.chat.manager.broadcaster")
+async def test_broadcast_message_publishes_to_appointment_channel(mock_broadcaster):
+    mock_broadcaster.publish = AsyncMock()
+    sent_at = datetime(2026, 1, 5, 9, 30)
+    await ChatManager.broadcast_message(4, {"type": "message", "data": {"id": 1, "sent_at": sent_at}})
+    mock_broadcaster.publish.assert_awaited_once_with(
+        "chat:4", {"type": "message", "data": {"id": 1, "sent_at": sent_at.isoformat()}}
+    )
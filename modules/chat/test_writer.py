@@ -0,0 +1,184 @@
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+from modules.chat.utils import ChatSession, open_session
+from modules.chat.writer import INSERT_MESSAGES_QUERY, ChatWriter, WriteBehindChatWriter
+
+
+def stored(row_id, appointment_id, sender_id, receiver_id, message):
+    return {"id": row_id, "appointment_id": appointment_id, "sender_id": sender_id,
+            "receiver_id": receiver_id, "message": message, "sent_at": datetime.now()}
+
+
+@pytest.mark.asyncio
+@patch("modules.chat.writer.db.acquire")
+async def test_concurrent_writes_share_one_insert(mock_acquire):
+    mock_conn = AsyncMock()
+    first_done = asyncio.Event()
+
+    async def fetchrow(query, *row):
+        await first_done.wait()
+        return stored(1, *row)
+
+    async def fetch(query, appointment_ids, sender_ids, receiver_ids, messages):
+        rows = [stored(2 + i, *row) for i, row in enumerate(zip(appointment_ids, sender_ids, receiver_ids, messages))]
+        return list(reversed(rows))  # RETURNING order is not guaranteed
+
+    mock_conn.fetchrow.side_effect = fetchrow
+    mock_conn.fetch.side_effect = fetch
+    mock_acquire.return_value.__aenter__.return_value = mock_conn
+    writer = ChatWriter(batch_size=50)
+    try:
+        first = asyncio.create_task(writer.write(1, 10, 20, "m0"))
+        await asyncio.sleep(0)
+        # Queued while the first INSERT is in flight
+        rest = [asyncio.create_task(writer.write(1, 10, 20, f"m{i}")) for i in range(1, 6)]
+        await asyncio.sleep(0)
+        first_done.set()
+        results = await asyncio.gather(first, *rest)
+    finally:
+        await writer.stop()
+
+    assert [r["message"] for r in results] == [f"m{i}" for i in range(6)]
+    assert [r["id"] for r in results] == list(range(1, 7))
+    mock_conn.fetch.assert_awaited_once()
+    assert mock_conn.fetch.await_args.args[0] == INSERT_MESSAGES_QUERY
+    assert writer.stats() == {"queued": 0, "written": 6, "batches": 2, "failed": 0}
+
+
+@pytest.mark.asyncio
+@patch("modules.chat.writer.db.acquire")
+async def test_failed_batch_only_fails_the_bad_row(mock_acquire):
+    mock_conn = AsyncMock()
+    mock_conn.fetch.side_effect = Exception("check constraint violated")
+
+    async def fetchrow(query, *row):
+        if row[1] == row[2]:
+            raise Exception("check constraint violated")
+        return stored(row[1], *row)
+
+    mock_conn.fetchrow.side_effect = fetchrow
+    mock_acquire.return_value.__aenter__.return_value = mock_conn
+    writer = ChatWriter()
+    # Both are queued before the writer task first runs, so they form one batch
+    results = await asyncio.gather(
+        writer.write(1, 10, 20, "ok"),
+        writer.write(1, 20, 20, "bad"),
+        return_exceptions=True,
+    )
+    await writer.stop()
+    assert results[0]["message"] == "ok"
+    assert isinstance(results[1], Exception)
+    assert writer.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+@patch("modules.chat.utils.db.get_connection")
+async def test_open_session_resolves_receiver_once(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = {"patient_id": 5, "doctor_user_id": 9}
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    assert await open_session(3, 5) == ChatSession(3, 5, "patient", 9)
+    assert await open_session(3, 9) == ChatSession(3, 9, "doctor", 5)
+    with pytest.raises(ValueError, match="Unauthorized"):
+        await open_session(3, 7)
+    mock_conn.fetchrow.return_value = None
+    with pytest.raises(ValueError, match="No confirmed appointment"):
+        await open_session(3, 5)
+
+
+class FakeSequence:
+    """chat_messages_id_seq shared by every writer (worker) in a test."""
+
+    def __init__(self):
+        self.value = 0
+        self.calls = []
+
+    async def fetch(self, query, count):
+        self.calls.append(count)
+        rows = []
+        for _ in range(count):
+            self.value += 1
+            rows.append((self.value, datetime(2026, 1, 5, 9, 0)))
+        return list(reversed(rows))  # order is not guaranteed
+
+
+@pytest.mark.asyncio
+@patch("modules.chat.writer.db.acquire")
+async def test_write_behind_returns_at_once_and_copies_in_batches(mock_acquire):
+    sequence = FakeSequence()
+    mock_conn = AsyncMock()
+    mock_conn.fetch.side_effect = sequence.fetch
+    mock_acquire.return_value.__aenter__.return_value = mock_conn
+    writer = WriteBehindChatWriter(flush_ms=10_000, batch_size=4)
+    rows = await asyncio.gather(*(writer.write(1, 10, 20, f"m{i}") for i in range(3)))
+    # Concurrent sends share one id reservation, in send order; nothing is stored yet
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert sequence.calls == [3]
+    assert rows[0]["sent_at"] == datetime(2026, 1, 5, 9, 0)
+    mock_conn.copy_records_to_table.assert_not_awaited()
+    await writer.write(1, 10, 20, "m3")
+    await asyncio.sleep(0.01)
+    # The batch size triggered a COPY without waiting for the interval
+    first_copy = mock_conn.copy_records_to_table.await_args_list[0]
+    assert [r[0] for r in first_copy.kwargs["records"]] == [1, 2, 3, 4]
+    assert (await writer.write(1, 10, 20, "m4"))["id"] == 5
+    await writer.stop()
+    # stop() flushed the fifth
+    assert [r[0] for r in mock_conn.copy_records_to_table.await_args.kwargs["records"]] == [5]
+    assert writer.stats()["written"] == 5 and writer.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+@patch("modules.chat.writer.db.acquire")
+async def test_write_behind_ids_follow_send_order_across_writers(mock_acquire):
+    sequence = FakeSequence()
+    mock_conn = AsyncMock()
+    mock_conn.fetch.side_effect = sequence.fetch
+    mock_acquire.return_value.__aenter__.return_value = mock_conn
+    # Two workers, each with its own writer; with per-worker id blocks the
+    # first would hold 1..N and the second N+1.., so its earlier reply
+    # would sort after the first worker's later message
+    first, second = WriteBehindChatWriter(flush_ms=10_000), WriteBehindChatWriter(flush_ms=10_000)
+    sent = []
+    for writer, text in ((first, "hello"), (second, "hi"), (first, "how are you?"), (second, "fine")):
+        sent.append(await writer.write(1, 10, 20, text))
+    await first.stop()
+    await second.stop()
+    assert [row["id"] for row in sent] == [1, 2, 3, 4]
+    stored = sorted(
+        (record for call in mock_conn.copy_records_to_table.await_args_list for record in call.kwargs["records"]),
+        key=lambda record: record[0],
+    )
+    # A history page ordered by id reads the conversation as it was sent
+    assert [record[4] for record in stored] == ["hello", "hi", "how are you?", "fine"]
+
+
+@pytest.mark.asyncio
+@patch("modules.chat.writer.db.acquire")
+async def test_write_behind_fails_the_write_when_ids_cannot_be_reserved(mock_acquire):
+    mock_conn = AsyncMock()
+    mock_conn.fetch.side_effect = OSError("connection refused")
+    mock_acquire.return_value.__aenter__.return_value = mock_conn
+    writer = WriteBehindChatWriter(flush_ms=10_000)
+    with pytest.raises(OSError):
+        await writer.write(1, 10, 20, "hello")
+    await writer.stop()
+    assert writer.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+@patch("modules.chat.writer.db.acquire")
+async def test_write_behind_keeps_rows_when_flush_fails(mock_acquire):
+    mock_conn = AsyncMock()
+    mock_conn.fetch.side_effect = FakeSequence().fetch
+    mock_conn.copy_records_to_table.side_effect = [OSError("connection reset"), None]
+    mock_acquire.return_value.__aenter__.return_value = mock_conn
+    writer = WriteBehindChatWriter(flush_ms=1)
+    await writer.write(1, 10, 20, "hello")
+    await writer.write(1, 20, 10, "hi")
+    await writer.stop()
+    assert mock_conn.copy_records_to_table.await_count == 2
+    assert [r[4] for r in mock_conn.copy_records_to_table.await_args.kwargs["records"]] == ["hello", "hi"]
+    assert writer.stats()["retries"] == 1 and writer.stats()["written"] == 2
@@ -1,67 +1,87 @@
+import functools
 import logging
+from dataclasses import dataclass
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict
+from typing import Any, Dict
+from shared.broadcast import Handler, broadcaster
 from shared.db import db
+from shared.ws_hub import connection_hub
 
 # Configure logger
 logger = logging.getLogger("chat.utils")
 logging.basicConfig(level=logging.INFO)
 
-# In-memory storage for active WebSocket connections (for simplicity; use Redis in production)
+# This worker's WebSocket connections; other workers' sockets are reached
+# through shared.broadcast (see ChatManager.broadcast_message).
 active_connections: Dict[int, Dict[int, WebSocket]] = {}  # appointment_id -> {user_id: websocket}
+# appointment_id -> the broadcast handler subscribed while it has local sockets
+_subscriptions: Dict[int, Handler] = {}
+# A chat socket that cannot keep up is closed rather than shown a gap
+chat_hub = connection_hub("chat", policy="close")
 
-async def get_user_role(user_id: int):
-    """Determine if the user is a patient or doctor based on appointment."""
-    logger.info(f"Getting user role for user_id={user_id}")
-    async with db.get_connection() as conn:
-        appointment = await conn.fetchrow(
+
+def chat_channel(appointment_id: int) -> str:
+    return f"chat:{appointment_id}"
+
+
+async def send_local(appointment_id: int, message: Any):
+    """Queues a broadcast chat message for this worker's sockets for the appointment."""
+    chat_hub.broadcast(active_connections.get(appointment_id, {}).values(), message)
+
+@dataclass(frozen=True)
+class ChatSession:
+    """A participant's chat socket. Participants of an appointment do not change, so they are resolved once at connect."""
+    appointment_id: int
+    user_id: int
+    role: str  # "patient" or "doctor"
+    receiver_id: int
+
+
+async def open_session(appointment_id: int, user_id: int) -> ChatSession:
+    """Resolves both participants of a confirmed appointment in one query; raises ValueError for anyone else."""
+    async with db.get_connection(readonly=True) as conn:
+        participants = await conn.fetchrow(
             """
-            SELECT user_id, doctor_id, status FROM appointments
-            WHERE id = (
-                SELECT appointment_id FROM chat_messages 
-                WHERE sender_id = $1 OR receiver_id = $1
-                ORDER BY id DESC
-                LIMIT 1
-            ) AND status = 'confirmed'
+            SELECT a.patient_id, d.user_id AS doctor_user_id
+            FROM appointments a
+            JOIN doctors d ON d.id = a.doctor_id
+            WHERE a.id = $1 AND a.status = 'confirmed'
             """,
-            user_id
+            appointment_id
         )
-        logger.debug(f"Fetched appointment: {appointment}")
-        if not appointment:
-            logger.warning(f"No confirmed appointment found for user_id={user_id}")
-            raise ValueError("No confirmed appointment found")
-        if appointment["user_id"] == user_id:
-            logger.info(f"user_id={user_id} is a patient")
-            return "patient"
-        elif appointment["doctor_id"] == user_id:
-            logger.info(f"user_id={user_id} is a doctor")
-            return "doctor"
-        else:
-            logger.warning(f"user_id={user_id} is neither patient nor doctor in appointment")
-            return None
+    if not participants:
+        logger.warning(f"No confirmed appointment found for appointment_id={appointment_id}")
+        raise ValueError("No confirmed appointment found")
+    if user_id == participants["patient_id"]:
+        return ChatSession(appointment_id, user_id, "patient", participants["doctor_user_id"])
+    if user_id == participants["doctor_user_id"]:
+        return ChatSession(appointment_id, user_id, "doctor", participants["patient_id"])
+    raise ValueError("Unauthorized user for this appointment")
 
 async def connect_websocket(websocket: WebSocket, appointment_id: int, user_id: int):
-    """Manage WebSocket connection and authentication."""
+    """Accepts the socket, resolves its session and registers it for broadcasts."""
     logger.info(f"Connecting websocket for appointment_id={appointment_id}, user_id={user_id}")
     await websocket.accept()
     try:
-        user_role = await get_user_role(user_id)
+        session = await open_session(appointment_id, user_id)
     except Exception as e:
-        logger.error(f"Error getting user role: {e}")
+        logger.warning(f"Rejected user_id={user_id} for appointment_id={appointment_id}: {e}")
         await websocket.close(code=1008)
         raise
 
-    if not user_role:
-        logger.warning(f"Unauthorized user_id={user_id} for appointment_id={appointment_id}")
-        await websocket.close(code=1008)
-        raise ValueError("Unauthorized user for this appointment")
-
     if appointment_id not in active_connections:
         active_connections[appointment_id] = {}
         logger.debug(f"Created new active_connections entry for appointment_id={appointment_id}")
+    previous = active_connections[appointment_id].get(user_id)
+    if previous is not None and previous is not websocket:
+        chat_hub.unregister(previous)
     active_connections[appointment_id][user_id] = websocket
-    logger.info(f"WebSocket connected: appointment_id={appointment_id}, user_id={user_id}, role={user_role}")
-    return user_role
+    chat_hub.register(websocket)
+    if appointment_id not in _subscriptions:
+        _subscriptions[appointment_id] = functools.partial(send_local, appointment_id)
+        broadcaster.subscribe(chat_channel(appointment_id), _subscriptions[appointment_id])
+    logger.info(f"WebSocket connected: appointment_id={appointment_id}, user_id={user_id}, role={session.role}")
+    return session
 
 async def disconnect_websocket(appointment_id: int, user_id: int):
     logger.info(f"Disconnecting websocket for appointment_id={appointment_id}, user_id={user_id}")
@@ -70,10 +90,13 @@ async def disconnect_websocket(appointment_id: int, user_id: int):
     if appointment_id in active_connections:
         logger.debug(f"Appointment ID {appointment_id} found in active_connections.")
         if user_id in active_connections[appointment_id]:
-            del active_connections[appointment_id][user_id]
+            chat_hub.unregister(active_connections[appointment_id].pop(user_id))
             logger.debug(f"Removed user_id={user_id} from active_connections for appointment_id={appointment_id}")
             if not active_connections[appointment_id]:
                 del active_connections[appointment_id]
+                handler = _subscriptions.pop(appointment_id, None)
+                if handler:
+                    broadcaster.unsubscribe(chat_channel(appointment_id), handler)
                 logger.debug(f"Removed empty active_connections entry for appointment_id={appointment_id}")
         else:
             logger.warning(f"User_id={user_id} not found for appointment_id={appointment_id} during disconnect.")
@@ -0,0 +1,325 @@
+"""
+Batched persistence of messages sent on chat sockets.
+
+``chat_writer.write`` returns the message's chat_messages row. Two writers,
+chosen with CHAT_WRITE_BEHIND:
+
+- ``ChatWriter`` (default): the row is returned once stored. One task per
+  worker inserts everything queued while the previous batch was in flight in
+  one INSERT ... SELECT FROM unnest, up to CHAT_WRITE_BATCH_SIZE rows. A busy
+  worker makes one round trip per batch instead of three per message (BEGIN,
+  INSERT, COMMIT) and holds at most one pool connection for chat writes; an
+  idle one writes a message as soon as it arrives.
+- ``WriteBehindChatWriter``: the row is returned before it is stored, so
+  the message can be broadcast at once. Its id and sent_at come from one
+  short statement on the chat_messages sequence, issued for all messages
+  waiting on this worker at that moment (the next batch queues behind it).
+  Ids are therefore drawn in send order across workers, never from a block
+  held in advance, and sent_at is the database's LOCALTIMESTAMP, what the
+  column default stores. Rows are COPYed into chat_messages every
+  CHAT_FLUSH_MS, sooner once CHAT_WRITE_BATCH_SIZE are waiting. ``stop()``
+  flushes what is queued, so a graceful shutdown loses nothing; a crash
+  loses up to one flush interval.
+
+  Workers flush independently, so a message can be stored after one with a
+  higher id. History reads (ChatManager._fetch_page) therefore leave out
+  messages younger than ``history_settle`` seconds (CHAT_HISTORY_SETTLE_MS):
+  a client paging or syncing with an id cursor cannot move past a message
+  that is still queued. The window assumes flushes succeed within it; rows
+  held back by a database outage longer than that can still be skipped by a
+  cursor and have to be picked up by a full history reload.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+import asyncpg
+from shared.db import db
+
+logger = logging.getLogger(__name__)
+
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "200"))
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "false").lower() == "true"
+CHAT_FLUSH_MS = float(os.getenv("CHAT_FLUSH_MS", "50"))
+CHAT_HISTORY_SETTLE_MS = float(os.getenv("CHAT_HISTORY_SETTLE_MS", "1000"))
+# Attempts at the final flush before queued messages are given up on
+SHUTDOWN_FLUSH_ATTEMPTS = 5
+
+INSERT_MESSAGE_QUERY = """
+    INSERT INTO chat_messages (appointment_id, sender_id, receiver_id, message)
+    VALUES ($1, $2, $3, $4)
+    RETURNING id, appointment_id, sender_id, receiver_id, message, sent_at
+"""
+
+# Rows are inserted in array order, so their serial ids ascend in that order
+# even when other sessions insert concurrently; RETURNING itself is unordered.
+INSERT_MESSAGES_QUERY = """
+    INSERT INTO chat_messages (appointment_id, sender_id, receiver_id, message)
+    SELECT appointment_id, sender_id, receiver_id, message
+    FROM unnest($1::int[], $2::int[], $3::int[], $4::text[])
+        WITH ORDINALITY AS t(appointment_id, sender_id, receiver_id, message, ord)
+    ORDER BY ord
+    RETURNING id, appointment_id, sender_id, receiver_id, message, sent_at
+"""
+
+# sent_at is TIMESTAMP filled by CURRENT_TIMESTAMP, i.e. LOCALTIMESTAMP
+RESERVE_IDS_QUERY = """
+    SELECT nextval(pg_get_serial_sequence('chat_messages', 'id')) AS id, LOCALTIMESTAMP AS sent_at
+    FROM generate_series(1, $1)
+"""
+
+COPY_COLUMNS = ["id", "appointment_id", "sender_id", "receiver_id", "message", "sent_at"]
+
+# For rows a failed COPY may or may not have stored
+INSERT_STORED_MESSAGE_QUERY = """
+    INSERT INTO chat_messages (id, appointment_id, sender_id, receiver_id, message, sent_at)
+    VALUES ($1, $2, $3, $4, $5, $6)
+    ON CONFLICT (id) DO NOTHING
+"""
+
+Row = Tuple[int, int, int, str]
+
+
+class ChatWriter:
+    # Rows are visible once write() returns, so history reads need no margin
+    history_settle = 0.0
+
+    def __init__(self, batch_size: int = CHAT_WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue: List[Tuple[Row, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def _start(self) -> None:
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="chat-writer")
+
+    async def write(self, appointment_id: int, sender_id: int, receiver_id: int, message: str) -> dict:
+        """Stores one message and returns its row; raises what its INSERT raised."""
+        if self._task is None or self._task.done():
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(((appointment_id, sender_id, receiver_id, message), future))
+        self._wakeup.set()
+        return await future
+
+    async def _run(self) -> None:
+        while self._queue or not self._closing:
+            if not self._queue:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Row, asyncio.Future]]) -> None:
+        rows = [row for row, _ in batch]
+        try:
+            async with db.acquire() as conn:
+                if len(rows) == 1:
+                    records = [await conn.fetchrow(INSERT_MESSAGE_QUERY, *rows[0])]
+                else:
+                    columns = [list(column) for column in zip(*rows)]
+                    records = sorted(await conn.fetch(INSERT_MESSAGES_QUERY, *columns), key=lambda r: r["id"])
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad row fails the whole statement; retry one by one so only it fails
+                logger.error(f"[CHAT WRITER] Batch of {len(batch)} failed, retrying singly: {str(e)}")
+                for entry in batch:
+                    await self._flush([entry])
+                return
+            self.failed += 1
+            future = batch[0][1]
+            if not future.done():
+                future.set_exception(e)
+            return
+        self.written += len(records)
+        self.batches += 1
+        for (_, future), record in zip(batch, records):
+            if not future.done():
+                future.set_result(dict(record))
+
+    async def stop(self) -> None:
+        """Writes whatever is queued, then stops the task; a later write starts it again."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+
+class WriteBehindChatWriter:
+    def __init__(self, flush_ms: float = CHAT_FLUSH_MS, batch_size: int = CHAT_WRITE_BATCH_SIZE,
+                 settle_ms: float = CHAT_HISTORY_SETTLE_MS):
+        self.flush_interval = flush_ms / 1000
+        self.batch_size = batch_size
+        self.history_settle = settle_ms / 1000
+        self._awaiting_ids: List[asyncio.Future] = []
+        self._id_task: Optional[asyncio.Task] = None
+        self._rows: List[tuple] = []
+        self._pending: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.retries = 0
+        self.reservations = 0
+
+    def _start(self) -> None:
+        self._closing = False
+        self._pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="chat-writer")
+
+    async def _next_id(self) -> Tuple[int, datetime]:
+        future = asyncio.get_running_loop().create_future()
+        self._awaiting_ids.append(future)
+        if self._id_task is None or self._id_task.done():
+            self._id_task = asyncio.create_task(self._reserve_ids(), name="chat-writer-ids")
+        return await future
+
+    async def _reserve_ids(self) -> None:
+        while self._awaiting_ids:
+            waiting, self._awaiting_ids = self._awaiting_ids, []
+            try:
+                async with db.acquire() as conn:
+                    rows = await conn.fetch(RESERVE_IDS_QUERY, len(waiting))
+            except Exception as e:
+                logger.error(f"[CHAT WRITER] Reserving {len(waiting)} message id(s) failed: {str(e)}")
+                for future in waiting:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.reservations += 1
+            # In arrival order, so ids on one worker follow send order too
+            for future, row in zip(waiting, sorted(rows, key=lambda r: r[0])):
+                if not future.done():
+                    future.set_result((row[0], row[1]))
+
+    async def write(self, appointment_id: int, sender_id: int, receiver_id: int, message: str) -> dict:
+        """Queues one message and returns its row as it will be stored."""
+        if self._task is None or self._task.done():
+            self._start()
+        message_id, sent_at = await self._next_id()
+        row = (message_id, appointment_id, sender_id, receiver_id, message, sent_at)
+        self._rows.append(row)
+        self._pending.set()
+        if len(self._rows) >= self.batch_size:
+            self._full.set()
+        return dict(zip(COPY_COLUMNS, row))
+
+    async def _run(self) -> None:
+        while not self._closing:
+            await self._pending.wait()
+            if not self._closing and len(self._rows) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if not await self._flush() and not self._closing:
+                await asyncio.sleep(min(1.0, self.flush_interval * 10))
+
+    async def _flush(self) -> bool:
+        """One COPY of everything queued; False if it has to be retried."""
+        rows, self._rows = self._rows, []
+        self._pending.clear()
+        self._full.clear()
+        if not rows:
+            return True
+        try:
+            async with db.acquire() as conn:
+                await conn.copy_records_to_table("chat_messages", records=rows, columns=COPY_COLUMNS)
+        except asyncio.CancelledError:
+            self._rows[:0] = rows
+            raise
+        except (asyncpg.PostgresConnectionError, asyncpg.InterfaceError) as e:
+            return self._requeue(rows, e)
+        except asyncpg.PostgresError as e:
+            # A bad row (or one a lost COPY acknowledgement already stored) fails the whole COPY
+            logger.error(f"[CHAT WRITER] COPY of {len(rows)} message(s) failed, inserting singly: {str(e)}")
+            return await self._insert_singly(rows)
+        except Exception as e:
+            return self._requeue(rows, e)
+        self.written += len(rows)
+        self.batches += 1
+        return True
+
+    async def _insert_singly(self, rows: List[tuple]) -> bool:
+        done = 0
+        try:
+            async with db.acquire() as conn:
+                for row in rows:
+                    done += 1
+                    try:
+                        await conn.execute(INSERT_STORED_MESSAGE_QUERY, *row)
+                        self.written += 1
+                    except asyncpg.PostgresConnectionError:
+                        raise
+                    except asyncpg.PostgresError as e:
+                        self.failed += 1
+                        logger.error(f"[CHAT WRITER] Dropping message {row[0]}: {str(e)}")
+        except Exception as e:
+            # ON CONFLICT (id) DO NOTHING makes the retry safe if the failed row was stored
+            return self._requeue(rows[max(done - 1, 0):], e)
+        return True
+
+    def _requeue(self, rows: List[tuple], error: Exception) -> bool:
+        # Ahead of anything newer, for the next attempt
+        self._rows[:0] = rows
+        self._pending.set()
+        self.retries += 1
+        logger.error(f"[CHAT WRITER] Flush of {len(rows)} message(s) failed, will retry: {str(error)}")
+        return False
+
+    async def stop(self) -> None:
+        """Flushes what is queued, then stops the task; a later write starts it again."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._pending.set()
+        self._full.set()
+        await self._task
+        self._task = None
+        for attempt in range(SHUTDOWN_FLUSH_ATTEMPTS):
+            if not self._rows:
+                break
+            if attempt:
+                await asyncio.sleep(min(2 ** attempt * 0.1, 2))
+            await self._flush()
+        if self._rows:
+            logger.error(f"[CHAT WRITER] {len(self._rows)} message(s) not stored at shutdown")
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._rows),
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "retries": self.retries,
+            "reservations": self.reservations,
+        }
+
+
+def create_chat_writer(write_behind: bool = CHAT_WRITE_BEHIND):
+    return WriteBehindChatWriter() if write_behind else ChatWriter()
+
+
+chat_writer = create_chat_writer()
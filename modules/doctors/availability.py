@@ -0,0 +1,109 @@
+"""
+Windowed reads, schedule expansion and expiry of doctor_availability_slots.
+
+Slot reads are bounded by time instead of aggregating a doctor's whole slot
+history: the doctor detail payloads embed the next AVAILABILITY_WINDOW_DAYS
+of slots (AVAILABILITY_SLOTS_SQL), and DoctorManager.get_availability pages
+through any window by keyset on (available_at, id). Both are range scans on
+the (doctor_id, available_at) unique index from the initial schema.
+
+GENERATE_SLOTS_QUERY expands a doctor's weekly schedules (migration 0008)
+over a date range into slots in one INSERT ... SELECT over generate_series,
+skipping exceptions, past times and slots that already exist.
+
+``expire_availability_slots`` runs as the ``slot-expiry`` job and moves open
+slots in the past to 'expired', which keeps them out of the partial index on
+open slots (migration 0007) and out of the default status filter.
+"""
+
+import logging
+import os
+from shared.pagination import Keyset, SortKey
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory lock key; see also MIGRATION_LOCK_ID and ROLLUP_LOCK_ID.
+SLOT_EXPIRY_LOCK_ID = 720_190_004
+SLOT_EXPIRY_INTERVAL = int(os.getenv("SLOT_EXPIRY_INTERVAL", "300"))
+AVAILABILITY_WINDOW_DAYS = int(os.getenv("AVAILABILITY_WINDOW_DAYS", "14"))
+# Longest date range one generate_slots call expands
+SCHEDULE_MAX_RANGE_DAYS = int(os.getenv("SCHEDULE_MAX_RANGE_DAYS", "92"))
+
+SLOT_STATUSES = ("available", "booked", "expired")
+
+SLOT_KEYSET = Keyset(
+    SortKey("s.available_at", descending=False),
+    SortKey("s.id", descending=False),
+)
+
+# Upcoming slots of the doctor aliased ``d``, for the detail payloads
+AVAILABILITY_SLOTS_SQL = f"""
+    (
+        SELECT JSONB_AGG(
+            JSONB_BUILD_OBJECT(
+                'slot_id', das.id,
+                'available_at', das.available_at,
+                'status', das.status,
+                'created_at', das.created_at
+            ) ORDER BY das.available_at
+        )
+        FROM doctor_availability_slots das
+        WHERE das.doctor_id = d.id
+        AND das.available_at >= now()
+        AND das.available_at < now() + make_interval(days => {AVAILABILITY_WINDOW_DAYS})
+    ) AS availability_slots
+"""
+
+# $1 doctor_id, $2/$3 first/last local date. Slot starts are wall-clock times
+# in the schedule's time zone, so DST shifts are applied per day. Returns the
+# number of candidate slots and how many were inserted.
+GENERATE_SLOTS_QUERY = """
+    WITH candidates AS (
+        SELECT DISTINCT local_start AT TIME ZONE s.timezone AS available_at
+        FROM doctor_schedules s
+        CROSS JOIN (
+            SELECT $2::date + n AS day FROM generate_series(0, $3::date - $2::date) n
+        ) days
+        CROSS JOIN LATERAL generate_series(
+            days.day + s.start_time,
+            days.day + s.end_time - make_interval(mins => s.slot_minutes),
+            make_interval(mins => s.slot_minutes)
+        ) local_start
+        WHERE s.doctor_id = $1::int
+        AND EXTRACT(DOW FROM days.day) = s.weekday
+        AND local_start AT TIME ZONE s.timezone > now()
+        AND NOT EXISTS (
+            SELECT 1 FROM doctor_schedule_exceptions e
+            WHERE e.doctor_id = s.doctor_id
+            AND e.exception_date = days.day
+            AND (
+                e.start_time IS NULL
+                OR (local_start < days.day + e.end_time
+                    AND local_start + make_interval(mins => s.slot_minutes) > days.day + e.start_time)
+            )
+        )
+    ),
+    inserted AS (
+        INSERT INTO doctor_availability_slots (doctor_id, available_at, status)
+        SELECT $1::int, available_at, 'available' FROM candidates
+        ON CONFLICT (doctor_id, available_at) DO NOTHING
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM candidates) AS candidates,
+           (SELECT COUNT(*) FROM inserted) AS created
+"""
+
+
+async def expire_availability_slots(conn) -> int:
+    """Marks open slots whose start time has passed as 'expired'; returns how many."""
+    status = await conn.execute(
+        """
+        UPDATE doctor_availability_slots
+        SET status = 'expired'
+        WHERE status = 'available' AND available_at < now()
+        """
+    )
+    expired = int(status.split()[-1]) if isinstance(status, str) else 0
+    if expired:
+        logger.info(f"[SLOT EXPIRY] Expired {expired} past availability slot(s)")
+    return expired
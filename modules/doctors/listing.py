@@ -0,0 +1,160 @@
+"""
+doctor_listing projection (migration 0007) behind DoctorManager.get_doctors.
+
+One row per doctor with the review, experience and patient counts, today's
+appointment count and the next few open slots. ``refresh_doctor_listing``
+recomputes it with per-doctor lateral lookups and only rewrites rows whose
+values changed. It runs as the ``doctor-listing`` background job over all
+doctors, and for single doctors after the writes that change their row
+(reviews, slots, bookings) commit: the writer calls ``mark_listing_dirty``
+and a per-worker task refreshes the queued doctors on its own connection, so
+a booking never holds the doctor's listing row lock. Refreshes queued while
+one is in flight are coalesced into the next.
+
+Listing reads trail the source tables by a refresh round trip after those
+writes, and by at most one job interval for anything else (seeds, manual
+fixes, a refresh that failed or was lost with its worker).
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Iterable, Optional, Set
+from shared.db import db
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory lock key; see also MIGRATION_LOCK_ID and ROLLUP_LOCK_ID.
+DOCTOR_LISTING_LOCK_ID = 720_190_003
+DOCTOR_LISTING_INTERVAL = int(os.getenv("DOCTOR_LISTING_INTERVAL", "60"))
+DOCTOR_LISTING_SLOTS = int(os.getenv("DOCTOR_LISTING_SLOTS", "5"))
+
+REFRESH_QUERY = """
+    INSERT INTO doctor_listing (
+        doctor_id, review_count, review_avg, experience_count, patient_count,
+        appointments_on, appointment_count_today, next_slots, updated_at
+    )
+    SELECT
+        d.id,
+        r.review_count,
+        r.review_avg,
+        e.experience_count,
+        pc.patient_count,
+        CURRENT_DATE,
+        t.appointment_count,
+        s.next_slots,
+        CURRENT_TIMESTAMP
+    FROM doctors d
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS review_count, ROUND(AVG(rating), 2) AS review_avg
+        FROM doctors_reviews WHERE doctor_id = d.id
+    ) r
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS experience_count FROM doctors_experience WHERE doctor_id = d.id
+    ) e
+    CROSS JOIN LATERAL (
+        SELECT COUNT(DISTINCT patient_id) AS patient_count FROM doctors_patients WHERE doctor_id = d.id
+    ) pc
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS appointment_count FROM appointments
+        WHERE doctor_id = d.id AND slot_time >= CURRENT_DATE AND slot_time < CURRENT_DATE + 1
+    ) t
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(
+            JSONB_AGG(JSONB_BUILD_OBJECT('slot_id', open.id, 'available_at', open.available_at) ORDER BY open.available_at),
+            '[]'::jsonb
+        ) AS next_slots
+        FROM (
+            SELECT id, available_at FROM doctor_availability_slots
+            WHERE doctor_id = d.id AND status = 'available' AND available_at >= now()
+            ORDER BY available_at
+            LIMIT $1
+        ) open
+    ) s
+    WHERE $2::int[] IS NULL OR d.id = ANY($2::int[])
+    ON CONFLICT (doctor_id) DO UPDATE SET
+        review_count = EXCLUDED.review_count,
+        review_avg = EXCLUDED.review_avg,
+        experience_count = EXCLUDED.experience_count,
+        patient_count = EXCLUDED.patient_count,
+        appointments_on = EXCLUDED.appointments_on,
+        appointment_count_today = EXCLUDED.appointment_count_today,
+        next_slots = EXCLUDED.next_slots,
+        updated_at = EXCLUDED.updated_at
+    WHERE (
+        doctor_listing.review_count, doctor_listing.review_avg, doctor_listing.experience_count,
+        doctor_listing.patient_count, doctor_listing.appointments_on,
+        doctor_listing.appointment_count_today, doctor_listing.next_slots
+    ) IS DISTINCT FROM (
+        EXCLUDED.review_count, EXCLUDED.review_avg, EXCLUDED.experience_count,
+        EXCLUDED.patient_count, EXCLUDED.appointments_on,
+        EXCLUDED.appointment_count_today, EXCLUDED.next_slots
+    )
+"""
+
+# Columns get_doctors reads, for a doctor_listing joined as ``dl``
+LISTING_COLUMNS = """
+    COALESCE(dl.review_count, 0) AS review_count,
+    dl.review_avg,
+    COALESCE(dl.experience_count, 0) AS experience_count,
+    COALESCE(dl.patient_count, 0) AS patient_count,
+    CASE WHEN dl.appointments_on = CURRENT_DATE THEN dl.appointment_count_today ELSE 0 END AS appointment_count_today,
+    COALESCE(dl.next_slots, '[]'::jsonb) AS next_slots
+"""
+
+
+def decode_listing(doctor: dict) -> dict:
+    """next_slots arrives as JSON text (no jsonb codec on the pool)."""
+    doctor = dict(doctor)
+    if isinstance(doctor.get("next_slots"), str):
+        doctor["next_slots"] = json.loads(doctor["next_slots"])
+    return doctor
+
+
+async def refresh_doctor_listing(conn, doctor_ids: Optional[Iterable[int]] = None) -> int:
+    """Recomputes the listing rows of ``doctor_ids`` (all doctors when None); returns rows changed."""
+    ids = None if doctor_ids is None else list(doctor_ids)
+    status = await conn.execute(REFRESH_QUERY, DOCTOR_LISTING_SLOTS, ids)
+    changed = int(status.split()[-1]) if isinstance(status, str) else 0
+    if ids is None:
+        logger.info(f"[DOCTOR LISTING] Refreshed listing, {changed} row(s) changed")
+    return changed
+
+
+_dirty_doctors: Set[int] = set()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def mark_listing_dirty(doctor_ids: Iterable[int]) -> None:
+    """Queues a refresh of these doctors' rows; call once the write has committed."""
+    global _refresh_task
+    _dirty_doctors.update(doctor_ids)
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh_dirty(), name="doctor-listing-refresh")
+
+
+async def _refresh_dirty() -> None:
+    while _dirty_doctors:
+        # Sorted so concurrent refreshes lock listing rows in the same order
+        ids = sorted(_dirty_doctors)
+        _dirty_doctors.clear()
+        try:
+            async with db.acquire() as conn:
+                await refresh_doctor_listing(conn, ids)
+        except Exception as e:
+            # The doctor-listing job recomputes these within one interval
+            logger.error(f"[DOCTOR LISTING] Refresh of doctors {ids} failed: {str(e)}")
+
+
+async def flush_listing_refreshes() -> None:
+    """Waits for queued refreshes to finish; used at shutdown."""
+    if _refresh_task is not None:
+        await _refresh_task
+
+
+async def rebuild_doctor_listing() -> int:
+    """Full refresh outside the scheduler, e.g. from a shell after a data fix."""
+    async with db.get_connection() as conn:
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", DOCTOR_LISTING_LOCK_ID)
+        return await refresh_doctor_listing(conn)
@@ -1,8 +1,16 @@
-from .models import DoctorCreate, DoctorResponse
-from shared.db import db
+import asyncio
+from .models import DoctorCreate, DoctorResponse, ScheduleCreate, ScheduleExceptionCreate
+from shared.db import db, Read
+from shared.pagination import Keyset, SortKey, cursor_meta, cursor_total
+from shared.query import Filters, PagedQuery
+from shared.search import DOCTOR_SEARCH, like_pattern
+from .availability import (
+    AVAILABILITY_SLOTS_SQL, AVAILABILITY_WINDOW_DAYS, GENERATE_SLOTS_QUERY, SCHEDULE_MAX_RANGE_DAYS, SLOT_KEYSET, SLOT_STATUSES,
+)
+from .listing import LISTING_COLUMNS, decode_listing, mark_listing_dirty
 from .utils import get_todays_appointments, get_weekly_appointment_stats, get_doctor_stats  
 import datetime
-from modules.auth.utils import get_current_user, hash_password
+from modules.auth.utils import get_current_user, hash_password, run_password_job
 
 
 class DoctorManager:
@@ -12,7 +20,7 @@ class DoctorManager:
     async def create_doctor(doctor_item: DoctorCreate) -> dict:
         print('creating doctor hit')
 
-        password_hash = hash_password(doctor_item.password)
+        password_hash = await run_password_job(hash_password, doctor_item.password)
 
 
         async with db.get_connection() as conn:
@@ -64,6 +72,12 @@ class DoctorManager:
 
             return result
 
+    @staticmethod
+    async def _fetch_page(paged: PagedQuery, limit: int, offset: int) -> tuple:
+        async with db.get_connection(readonly=True) as conn:
+            rows, total = await paged.fetch(conn, limit, offset)
+            return total, rows
+
     @staticmethod
     async def get_doctors(
         page: int = 1,
@@ -73,63 +87,41 @@ class DoctorManager:
         min_rating: float = None,
         max_rating: float = None,
         specialty: str = None,
+        include_stats: bool = True,
+        cursor: str = None,
     ) -> dict:
         """
         Fetch doctors with optional filters, search, and pagination.
-        Returns a dict with 'data', 'total', 'page', 'page_size'.
+        Returns a dict with 'data', 'total', 'page', 'page_size', plus the
+        (cached) 'doctors_stats' block when include_stats is set.
+        A cursor ('' for the first page) replaces OFFSET with keyset paging
+        on (rating, created_at, id); meta_data then carries 'next_cursor'.
         """
-        filters = []
-        params = []
-        param_idx = 1
+        filters = Filters()
 
         # Search by name, title, bio, or location
         if search:
-            filters.append(
-                f"(d.first_name ILIKE ${param_idx} OR d.last_name ILIKE ${param_idx} OR d.title ILIKE ${param_idx} OR d.bio ILIKE ${param_idx} OR d.location ILIKE ${param_idx})"
-            )
-            params.append(f"%{search}%")
-            param_idx += 1
+            filters.add(DOCTOR_SEARCH.matches("d"), like_pattern(search))
 
         # Filter by location
         if location:
-            filters.append(f"d.location ILIKE ${param_idx}")
-            params.append(f"%{location}%")
-            param_idx += 1
+            filters.add("d.location ILIKE {}", f"%{location}%")
 
         # Filter by minimum rating
         if min_rating is not None:
-            filters.append(f"d.rating >= ${param_idx}")
-            params.append(min_rating)
-            param_idx += 1
+            filters.add("d.rating >= {}", min_rating)
 
         # Filter by maximum rating
         if max_rating is not None:
-            filters.append(f"d.rating <= ${param_idx}")
-            params.append(max_rating)
-            param_idx += 1
+            filters.add("d.rating <= {}", max_rating)
 
         # Filter by specialty (assuming specialty is stored in title or a separate field)
         if specialty:
-            filters.append(f"d.title ILIKE ${param_idx}")
-            params.append(f"%{specialty}%")
-            param_idx += 1
+            filters.add("d.title ILIKE {}", f"%{specialty}%")
 
-        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
-
-        # Calculate offset for pagination
-        offset = (page - 1) * page_size
         limit = page_size
-
-        # Count query for total
-        count_query = f"""
-            SELECT COUNT(*) FROM doctors d
-            {where_clause}
-        """
-
-        # Data query with pagination
-        # Fix: Use single $-style parameter placeholders, not double $$
-        data_query = f"""
-            SELECT 
+        paged = PagedQuery(
+            select=f"""
                 d.id AS doctor_id,
                 d.user_id,
                 d.first_name,
@@ -142,100 +134,61 @@ class DoctorManager:
                 d.rating,
                 d.profile_picture_url,
                 d.created_at,
-                (
-                    SELECT JSONB_AGG(
-                        JSONB_BUILD_OBJECT(
-                            'review_id', dr2.id,
-                            'user_id', dr2.user_id,
-                            'rating', dr2.rating,
-                            'comment', dr2.comment,
-                            'created_at', dr2.created_at
-                        )
-                    )
-                    FROM doctors_reviews dr2 
-                    WHERE dr2.doctor_id = d.id
-                ) AS reviews,
-                (
-                    SELECT JSONB_AGG(
-                        JSONB_BUILD_OBJECT(
-                            'experience_id', de2.id,
-                            'institution', de2.institution,
-                            'position', de2.position,
-                            'start_date', de2.start_date,
-                            'end_date', de2.end_date,
-                            'description', de2.description,
-                            'created_at', de2.created_at
-                        )
-                    )
-                    FROM doctors_experience de2 
-                    WHERE de2.doctor_id = d.id
-                ) AS experiences,
-                (
-                    SELECT JSONB_AGG(
-                        JSONB_BUILD_OBJECT(
-                            'slot_id', das2.id,
-                            'available_at', das2.available_at,
-                            'status', das2.status,
-                            'created_at', das2.created_at
-                        )
-                    )
-                    FROM doctor_availability_slots das2 
-                    WHERE das2.doctor_id = d.id
-                ) AS availability_slots,
-                -- Appointment count for current date
-                (
-                    SELECT COUNT(*) 
-                    FROM appointments a2 
-                    WHERE a2.doctor_id = d.id 
-                    AND DATE(a2.slot_time) = CURRENT_DATE
-                ) AS appointment_count_today,
-                -- Patient count from doctors_patients table
-                (
-                    SELECT COUNT(DISTINCT dp2.patient_id) 
-                    FROM doctors_patients dp2 
-                    WHERE dp2.doctor_id = d.id
-                ) AS patient_count,
-                -- List of today's appointments
-                JSONB_AGG(
-                    JSONB_BUILD_OBJECT(
-                        'appointment_id', a.id,
-                        'patient_id', a.patient_id,
-                        'slot_time', a.slot_time,
-                        'complain', a.complain,
-                        'status', a.status
-                    )
-                ) FILTER (WHERE a.id IS NOT NULL) AS appointments_today
-            FROM doctors d
-            LEFT JOIN appointments a ON d.id = a.doctor_id AND DATE(a.slot_time) = CURRENT_DATE
-            {where_clause}
-            GROUP BY d.id, d.user_id, d.first_name, d.last_name, d.title, d.bio, d.experience_years, d.location, d.rating, d.profile_picture_url, d.created_at
-            ORDER BY d.rating DESC NULLS LAST, d.created_at DESC
-            LIMIT ${param_idx} OFFSET ${param_idx + 1}
-        """
-
-        params_for_data = params.copy()
-        params_for_data.append(limit)
-        params_for_data.append(offset)
-
-        async with db.get_connection() as conn:
-            total = await conn.fetchval(count_query, *params)
-            rows = await conn.fetch(data_query, *params_for_data)
-            result = [dict(row) for row in rows] if rows else []
+                {LISTING_COLUMNS}
+            """,
+            # Summary counts and next slots come from the doctor_listing
+            # projection; get_doctor loads the full reviews/experiences/slots
+            from_clause="doctors d LEFT JOIN doctor_listing dl ON dl.doctor_id = d.id",
+            filters=filters,
+            order_by="d.rating DESC NULLS LAST, d.created_at DESC",
+            count_from="doctors d",
+        )
+        # Same order as the OFFSET query: NULL ratings last, id as tiebreaker
+        keyset = Keyset(
+            SortKey("d.rating", null_as="-1"),
+            SortKey("d.created_at", null_as="'0001-01-01'"),
+            SortKey("d.id"),
+        )
+
+        if cursor is not None:
+            data_query, params = paged.keyset_page(keyset, cursor, limit)
+
+            async def fetch_page():
+                async with db.get_connection(readonly=True) as conn:
+                    return await conn.fetch(data_query, *params)
+
+            page_reads = asyncio.gather(
+                cursor_total("doctors", *paged.count()),
+                fetch_page(),
+            )
+        else:
+            page_reads = DoctorManager._fetch_page(paged, limit, (page - 1) * page_size)
+        if include_stats:
+            (total, rows), stats = await asyncio.gather(page_reads, get_doctor_stats())
+        else:
+            total, rows = await page_reads
+        if cursor is not None:
+            result, next_cursor = keyset.paginate(rows, limit)
+            meta_data = cursor_meta(page_size, next_cursor, total)
+        else:
+            result = rows
             meta_data = {"total": total,
                 "page": page,
                 "page_size": page_size,}
-            stats = await get_doctor_stats()
-            return {
-                "doctors": result,
-                "doctors_stats": stats,
-                "meta_data": meta_data
-            }
+        result = [decode_listing(doctor) for doctor in result]
+        response = {
+            "doctors": result,
+            "meta_data": meta_data
+        }
+        if include_stats:
+            response["doctors_stats"] = stats
+        return response
 
     @staticmethod
     async def get_doctor(doctor_id: int) -> dict:
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             row = await conn.fetchrow(
-                """
+                f"""
                 SELECT 
                     d.id AS doctor_id,
                     d.user_id,
@@ -276,23 +229,12 @@ class DoctorManager:
                         FROM doctors_experience de 
                         WHERE de.doctor_id = d.id
                     ) AS experiences,
-                    (
-                        SELECT JSONB_AGG(
-                            JSONB_BUILD_OBJECT(
-                                'slot_id', das.id,
-                                'available_at', das.available_at,
-                                'status', das.status,
-                                'created_at', das.created_at
-                            )
-                        )
-                        FROM doctor_availability_slots das 
-                        WHERE das.doctor_id = d.id
-                    ) AS availability_slots,
+                    {AVAILABILITY_SLOTS_SQL},
                     (
                         SELECT COUNT(*) 
                         FROM appointments a 
                         WHERE a.doctor_id = d.id 
-                        AND DATE(a.slot_time) = CURRENT_DATE
+                        AND a.slot_time >= CURRENT_DATE AND a.slot_time < CURRENT_DATE + 1
                     ) AS appointment_count_today,
                     (
                         SELECT COUNT(DISTINCT dp.patient_id) 
@@ -322,7 +264,7 @@ class DoctorManager:
                         )
                     ) FILTER (WHERE a.id IS NOT NULL) AS appointments_today
                 FROM doctors d
-                LEFT JOIN appointments a ON d.id = a.doctor_id AND DATE(a.slot_time) = CURRENT_DATE
+                LEFT JOIN appointments a ON d.id = a.doctor_id AND a.slot_time >= CURRENT_DATE AND a.slot_time < CURRENT_DATE + 1
                 LEFT JOIN doctors_reviews dr ON d.id = dr.doctor_id
                 LEFT JOIN doctors_experience de ON d.id = de.doctor_id
                 LEFT JOIN doctors_patients dp ON d.id = dp.doctor_id
@@ -334,8 +276,10 @@ class DoctorManager:
             if row:
                 result = dict(row)
 
-                result['todays_appointment'] = await get_todays_appointments(doctor_id)
-                result['weekly_state'] = await get_weekly_appointment_stats(doctor_id)
+                result['todays_appointment'], result['weekly_state'] = await asyncio.gather(
+                    get_todays_appointments(doctor_id),
+                    get_weekly_appointment_stats(doctor_id),
+                )
 
             
                 # Convert datetime objects to ISO format strings
@@ -365,9 +309,9 @@ class DoctorManager:
             return None
 
     async def get_doctor_by_user_id(user_id: int) -> dict:
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             row = await conn.fetchrow(
-                """
+                f"""
                 SELECT 
                     d.id AS doctor_id,
                     d.user_id,
@@ -409,23 +353,12 @@ class DoctorManager:
                         FROM doctors_experience de 
                         WHERE de.doctor_id = d.id
                     ) AS experiences,
-                    (
-                        SELECT JSONB_AGG(
-                            JSONB_BUILD_OBJECT(
-                                'slot_id', das.id,
-                                'available_at', das.available_at,
-                                'status', das.status,
-                                'created_at', das.created_at
-                            )
-                        )
-                        FROM doctor_availability_slots das 
-                        WHERE das.doctor_id = d.id
-                    ) AS availability_slots,
+                    {AVAILABILITY_SLOTS_SQL},
                     (
                         SELECT COUNT(*) 
                         FROM appointments a 
                         WHERE a.doctor_id = d.id 
-                        AND DATE(a.slot_time) = CURRENT_DATE
+                        AND a.slot_time >= CURRENT_DATE AND a.slot_time < CURRENT_DATE + 1
                     ) AS appointment_count_today,
                     (
                         SELECT COUNT(DISTINCT dp.patient_id) 
@@ -442,7 +375,7 @@ class DoctorManager:
                         )
                     ) FILTER (WHERE a.id IS NOT NULL) AS appointments_today
                 FROM doctors d
-                LEFT JOIN appointments a ON d.id = a.doctor_id AND DATE(a.slot_time) = CURRENT_DATE
+                LEFT JOIN appointments a ON d.id = a.doctor_id AND a.slot_time >= CURRENT_DATE AND a.slot_time < CURRENT_DATE + 1
                 LEFT JOIN doctors_reviews dr ON d.id = dr.doctor_id
                 LEFT JOIN doctors_experience de ON d.id = de.doctor_id
                 LEFT JOIN doctors_patients dp ON d.id = dp.doctor_id
@@ -493,12 +426,13 @@ class DoctorManager:
                 rating,
                 comment
             )
-            if row:
-                result = dict(row)
-                if 'created_at' in result and isinstance(result['created_at'], datetime):
-                    result['created_at'] = result['created_at'].isoformat()
-                return result
-            return None
+        if row:
+            mark_listing_dirty([doctor_id])
+            result = dict(row)
+            if 'created_at' in result and isinstance(result['created_at'], datetime):
+                result['created_at'] = result['created_at'].isoformat()
+            return result
+        return None
 
     @staticmethod
     async def create_availability_slot(doctor_id: int, available_at: datetime.datetime):
@@ -558,18 +492,167 @@ class DoctorManager:
                 available_at
             )
 
-            if row:
-                result = dict(row)
-                # Convert datetime objects to ISO 8601 strings for consistent output
-                # isoformat() will include timezone offset since they are timezone-aware
-                if 'created_at' in result and isinstance(result['created_at'], datetime.datetime):
-                    result['created_at'] = result['created_at'].isoformat()
-                if 'available_at' in result and isinstance(result['available_at'], datetime.datetime):
-                    result['available_at'] = result['available_at'].isoformat()
-                return result
-            
-            # This part should ideally not be reached if INSERT RETURNING is successful,
-            # but good to have a fallback or handle specific cases.
-            return None
+        if row:
+            mark_listing_dirty([doctor_id])
+            result = dict(row)
+            # Convert datetime objects to ISO 8601 strings for consistent output
+            # isoformat() will include timezone offset since they are timezone-aware
+            if 'created_at' in result and isinstance(result['created_at'], datetime.datetime):
+                result['created_at'] = result['created_at'].isoformat()
+            if 'available_at' in result and isinstance(result['available_at'], datetime.datetime):
+                result['available_at'] = result['available_at'].isoformat()
+            return result
+        
+        # This part should ideally not be reached if INSERT RETURNING is successful,
+        # but good to have a fallback or handle specific cases.
+        return None
 
+    @staticmethod
+    async def get_availability(
+        doctor_id: int,
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        status: str = "available",
+        page_size: int = 50,
+        cursor: str = "",
+    ) -> dict:
+        """
+        A doctor's slots in [start, end), oldest first, one keyset page at a
+        time. The window defaults to now through AVAILABILITY_WINDOW_DAYS
+        ahead (naive bounds are taken as UTC); status=None returns every status. Pass meta_data['next_cursor']
+        back as cursor for the next page.
+
+        Raises:
+            ValueError: On an unknown status, an empty window or a bad cursor.
+        """
+        if status is not None and status not in SLOT_STATUSES:
+            raise ValueError(f"Invalid status: {status}. Must be one of {', '.join(SLOT_STATUSES)}")
+        if start is None:
+            start = datetime.datetime.now(datetime.timezone.utc)
+        elif start.tzinfo is None:
+            start = start.replace(tzinfo=datetime.timezone.utc)
+        if end is None:
+            end = start + datetime.timedelta(days=AVAILABILITY_WINDOW_DAYS)
+        elif end.tzinfo is None:
+            end = end.replace(tzinfo=datetime.timezone.utc)
+        if end <= start:
+            raise ValueError("end must be after start")
+
+        filters = Filters()
+        filters.add("s.doctor_id = {}", doctor_id)
+        filters.add("s.available_at >= {}", start)
+        filters.add("s.available_at < {}", end)
+        if status is not None:
+            filters.add("s.status = {}", status)
+        condition, cursor_params = SLOT_KEYSET.condition(cursor, filters.next_index)
+        if condition:
+            filters.add_numbered(condition, cursor_params)
+
+        async with db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT s.id AS slot_id, s.available_at, s.status, s.created_at, {SLOT_KEYSET.columns()}
+                FROM doctor_availability_slots s
+                {filters.where()}
+                {SLOT_KEYSET.order_by()}
+                LIMIT {SLOT_KEYSET.fetch_size(page_size)}
+                """,
+                *filters.params
+            )
+        slots, next_cursor = SLOT_KEYSET.paginate(rows, page_size)
+        return {"slots": slots, "meta_data": cursor_meta(page_size, next_cursor)}
+
+    @staticmethod
+    async def create_schedule(doctor_id: int, schedule: ScheduleCreate) -> dict:
+        """Adds a weekly working window; slots come from generate_slots. Raises ValueError if the doctor is not found."""
+        async with db.get_connection() as conn:
+            row = await conn.fetchrow(
+                """
+                INSERT INTO doctor_schedules (doctor_id, weekday, start_time, end_time, slot_minutes, timezone)
+                SELECT id, $2, $3, $4, $5, $6 FROM doctors WHERE id = $1
+                RETURNING id, doctor_id, weekday, start_time, end_time, slot_minutes, timezone, created_at
+                """,
+                doctor_id,
+                schedule.weekday,
+                schedule.start_time,
+                schedule.end_time,
+                schedule.slot_minutes,
+                schedule.timezone
+            )
+            if not row:
+                raise ValueError("Doctor not found")
+            return dict(row)
+
+    @staticmethod
+    async def add_schedule_exception(doctor_id: int, exception: ScheduleExceptionCreate) -> dict:
+        """Leaves a day, or part of one, out of generated slots. Raises ValueError if the doctor is not found."""
+        async with db.get_connection() as conn:
+            row = await conn.fetchrow(
+                """
+                INSERT INTO doctor_schedule_exceptions (doctor_id, exception_date, start_time, end_time, reason)
+                SELECT id, $2, $3, $4, $5 FROM doctors WHERE id = $1
+                RETURNING id, doctor_id, exception_date, start_time, end_time, reason, created_at
+                """,
+                doctor_id,
+                exception.exception_date,
+                exception.start_time,
+                exception.end_time,
+                exception.reason
+            )
+            if not row:
+                raise ValueError("Doctor not found")
+            return dict(row)
+
+    @staticmethod
+    async def get_schedules(doctor_id: int) -> dict:
+        """The doctor's weekly schedules and their exceptions from today on."""
+        schedules, exceptions = await db.fan_out(
+            Read.fetch(
+                """
+                SELECT id, weekday, start_time, end_time, slot_minutes, timezone, created_at
+                FROM doctor_schedules WHERE doctor_id = $1
+                ORDER BY weekday, start_time
+                """,
+                doctor_id
+            ),
+            Read.fetch(
+                """
+                SELECT id, exception_date, start_time, end_time, reason, created_at
+                FROM doctor_schedule_exceptions
+                WHERE doctor_id = $1 AND exception_date >= CURRENT_DATE
+                ORDER BY exception_date, start_time NULLS FIRST
+                """,
+                doctor_id
+            ),
+        )
+        return {
+            "schedules": [dict(row) for row in schedules],
+            "exceptions": [dict(row) for row in exceptions],
+        }
+
+    @staticmethod
+    async def generate_slots(doctor_id: int, start_date: datetime.date, end_date: datetime.date) -> dict:
+        """
+        Expands the doctor's schedules into availability slots for the local
+        dates start_date..end_date (inclusive) in a single statement.
+
+        Returns:
+            {'created': n, 'skipped': m}; skipped slots already existed.
 
+        Raises:
+            ValueError: If the doctor is not found or the range is empty or
+                        longer than SCHEDULE_MAX_RANGE_DAYS.
+        """
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+        if (end_date - start_date).days + 1 > SCHEDULE_MAX_RANGE_DAYS:
+            raise ValueError(f"Date range must not exceed {SCHEDULE_MAX_RANGE_DAYS} days")
+
+        async with db.get_connection() as conn:
+            if not await conn.fetchval("SELECT 1 FROM doctors WHERE id = $1", doctor_id):
+                raise ValueError("Doctor not found")
+            row = await conn.fetchrow(GENERATE_SLOTS_QUERY, doctor_id, start_date, end_date)
+        created = row["created"]
+        if created:
+            mark_listing_dirty([doctor_id])
+        return {"created": created, "skipped": row["candidates"] - created}
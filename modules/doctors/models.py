@@ -1,6 +1,7 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, validator
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 
 class Availability(BaseModel):
@@ -39,3 +40,43 @@ class ReviewCreate(BaseModel):
 
 class CreateAvailability(BaseModel):
     available_at: datetime
+
+class ScheduleCreate(BaseModel):
+    weekday: int = Field(..., ge=0, le=6)  # 0 = Sunday, as EXTRACT(DOW)
+    start_time: time
+    end_time: time
+    slot_minutes: int = Field(30, ge=5, le=480)
+    timezone: str = "Africa/Lagos"
+
+    @validator('end_time')
+    def validate_end_time(cls, v, values):
+        if 'start_time' in values and v <= values['start_time']:
+            raise ValueError('end_time must be after start_time')
+        return v
+
+    @validator('timezone')
+    def validate_timezone(cls, v):
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f'Unknown time zone: {v}')
+        return v
+
+class ScheduleExceptionCreate(BaseModel):
+    exception_date: date
+    start_time: Optional[time] = None  # None with end_time None: whole day off
+    end_time: Optional[time] = None
+    reason: Optional[str] = None
+
+    @validator('end_time', always=True)
+    def validate_end_time(cls, v, values):
+        start = values.get('start_time')
+        if (start is None) != (v is None):
+            raise ValueError('start_time and end_time must be given together')
+        if v is not None and v <= start:
+            raise ValueError('end_time must be after start_time')
+        return v
+
+class GenerateSlots(BaseModel):
+    start_date: date
+    end_date: date  # inclusive
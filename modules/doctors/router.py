@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from .models import DoctorCreate, DoctorResponse, ReviewCreate, CreateAvailability
+from fastapi import APIRouter, Depends, HTTPException, Request
+from .models import DoctorCreate, DoctorResponse, ReviewCreate, CreateAvailability, GenerateSlots, ScheduleCreate, ScheduleExceptionCreate
 from .manager import DoctorManager
-from modules.auth.utils import get_current_admin, get_current_user
-from shared.response import success_response, error_response
+from modules.auth.utils import get_current_admin, get_current_principal, get_current_user
+from shared.response import success_response, error_response, etag_response
 from decimal import Decimal
 from datetime import datetime
 import json
@@ -51,13 +51,21 @@ async def get_doctor_user_id(user_id: int):
 
 @router.get("/")
 async def get_all_doctors(
+    request: Request,
     page: int = 1,
     page_size: int = 10,
     search: str = None,
     specialty: str = None,
     city: str = None,
-    is_active: bool = None
+    is_active: bool = None,
+    include_stats: bool = True,
+    cursor: str = None
 ):
+    """
+    Pass include_stats=false when paging to skip the stats block; the response
+    carries an ETag, and a matching If-None-Match gets a 304. Pass cursor
+    (empty for the first page) to page by keyset instead of page numbers.
+    """
     try:
         filters = {}
         if specialty is not None:
@@ -71,15 +79,18 @@ async def get_all_doctors(
             page=page,
             page_size=page_size,
             search=search,
-            specialty=specialty
+            specialty=specialty,
+            include_stats=include_stats,
+            cursor=cursor
         )
-        
-       
 
-        return success_response(
+        return etag_response(
+            request,
             data=result,
             message="Doctors retrieved successfully"
         )
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
     except Exception as e:
         return error_response(str(e), status_code=500)
 
@@ -104,3 +115,83 @@ async def create_availability_slot(doctor_id: int, available_at: datetime, curre
         return error_response(str(e), status_code=400)
     except Exception as e:
         return error_response(str(e), status_code=500)
+
+@router.get("/{doctor_id}/availability")
+async def get_availability(
+    doctor_id: int,
+    start: datetime = None,
+    end: datetime = None,
+    status: str = "available",
+    page_size: int = 50,
+    cursor: str = ""
+):
+    """
+    Slots in [start, end), default the next 14 days of open slots. Pass
+    status=all for every status, and meta_data.next_cursor as cursor for the
+    next page.
+    """
+    try:
+        slots = await DoctorManager.get_availability(
+            doctor_id,
+            start=start,
+            end=end,
+            status=None if status == "all" else status,
+            page_size=page_size,
+            cursor=cursor
+        )
+        return success_response(data=slots, message="Availability retrieved successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except Exception as e:
+        return error_response(str(e), status_code=500)
+
+def _manages_doctor(current_user: dict, doctor_id: int) -> bool:
+    """Schedules are managed by the doctor themselves or an admin."""
+    return bool(current_user.get("is_admin")) or current_user.get("doctor_id") == doctor_id
+
+@router.get("/{doctor_id}/schedules")
+async def get_schedules(doctor_id: int, current_user: dict = Depends(get_current_principal)):
+    if not _manages_doctor(current_user, doctor_id):
+        return error_response("Not authorized to view this doctor's schedules", status_code=403)
+    try:
+        schedules = await DoctorManager.get_schedules(doctor_id)
+        return success_response(data=schedules, message="Schedules retrieved successfully")
+    except Exception as e:
+        return error_response(str(e), status_code=500)
+
+@router.post("/{doctor_id}/schedules")
+async def create_schedule(doctor_id: int, schedule: ScheduleCreate, current_user: dict = Depends(get_current_principal)):
+    if not _manages_doctor(current_user, doctor_id):
+        return error_response("Not authorized to manage this doctor's schedules", status_code=403)
+    try:
+        schedule_data = await DoctorManager.create_schedule(doctor_id, schedule)
+        return success_response(data=schedule_data, message="Schedule created successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except Exception as e:
+        return error_response(str(e), status_code=500)
+
+@router.post("/{doctor_id}/schedules/exceptions")
+async def add_schedule_exception(doctor_id: int, exception: ScheduleExceptionCreate, current_user: dict = Depends(get_current_principal)):
+    if not _manages_doctor(current_user, doctor_id):
+        return error_response("Not authorized to manage this doctor's schedules", status_code=403)
+    try:
+        exception_data = await DoctorManager.add_schedule_exception(doctor_id, exception)
+        return success_response(data=exception_data, message="Schedule exception added successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except Exception as e:
+        return error_response(str(e), status_code=500)
+
+@router.post("/{doctor_id}/availability/generate")
+async def generate_availability(doctor_id: int, slot_range: GenerateSlots, current_user: dict = Depends(get_current_principal)):
+    """Expands the doctor's schedules into slots for start_date..end_date; returns created/skipped counts."""
+    if not _manages_doctor(current_user, doctor_id):
+        return error_response("Not authorized to manage this doctor's schedules", status_code=403)
+    try:
+        counts = await DoctorManager.generate_slots(doctor_id, slot_range.start_date, slot_range.end_date)
+        return success_response(data=counts, message="Availability slots generated successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except Exception as e:
+        return error_response(str(e), status_code=500)
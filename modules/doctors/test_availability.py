@@ -0,0 +1,17 @@
+import pytest
+from unittest.mock import AsyncMock
+from modules.doctors.availability import AVAILABILITY_SLOTS_SQL, expire_availability_slots
+
+
+@pytest.mark.asyncio
+async def test_expire_availability_slots_reports_count():
+    conn = AsyncMock()
+    conn.execute.return_value = "UPDATE 4"
+    assert await expire_availability_slots(conn) == 4
+    query = conn.execute.call_args[0][0]
+    assert "SET status = 'expired'" in query and "status = 'available'" in query
+
+
+def test_embedded_slots_are_bounded_to_the_window():
+    assert "das.available_at >= now()" in AVAILABILITY_SLOTS_SQL
+    assert "make_interval(days => 14)" in AVAILABILITY_SLOTS_SQL
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, patch
+from modules.doctors.listing import DOCTOR_LISTING_SLOTS, REFRESH_QUERY, flush_listing_refreshes, mark_listing_dirty, refresh_doctor_listing
+from modules.doctors.manager import DoctorManager
+from shared.query import TOTAL_COLUMN
+
+
+@pytest.mark.asyncio
+async def test_refresh_doctor_listing_scopes_to_given_doctors():
+    conn = AsyncMock()
+    conn.execute.return_value = "INSERT 0 1"
+    assert await refresh_doctor_listing(conn, [7]) == 1
+    conn.execute.assert_awaited_once_with(REFRESH_QUERY, DOCTOR_LISTING_SLOTS, [7])
+
+    conn.execute.reset_mock()
+    conn.execute.return_value = "INSERT 0 0"
+    assert await refresh_doctor_listing(conn) == 0
+    conn.execute.assert_awaited_once_with(REFRESH_QUERY, DOCTOR_LISTING_SLOTS, None)
+
+
+@pytest.mark.asyncio
+@patch("modules.doctors.listing.db.acquire")
+async def test_mark_listing_dirty_coalesces_refreshes(mock_acquire):
+    conn = AsyncMock()
+    first_started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def execute(query, slots, ids):
+        first_started.set()
+        await release.wait()
+        return "INSERT 0 1"
+
+    conn.execute.side_effect = execute
+    mock_acquire.return_value.__aenter__.return_value = conn
+    mark_listing_dirty([7])
+    await first_started.wait()
+    # Queued while the first refresh is in flight: one more refresh for both
+    mark_listing_dirty([9])
+    mark_listing_dirty([3, 9])
+    release.set()
+    await flush_listing_refreshes()
+    assert [c.args[2] for c in conn.execute.await_args_list] == [[7], [3, 9]]
+
+
+@pytest.mark.asyncio
+@patch("modules.doctors.manager.mark_listing_dirty")
+@patch("modules.doctors.manager.db.get_connection")
+async def test_generate_slots_refreshes_listing_after_commit(mock_get_conn, mock_mark_dirty):
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = 1
+    mock_conn.fetchrow.return_value = {"created": 4, "candidates": 6}
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    mock_get_conn.return_value.__aexit__.side_effect = lambda *exc: mock_mark_dirty.assert_not_called()
+    result = await DoctorManager.generate_slots(2, date(2026, 1, 5), date(2026, 1, 6))
+    assert result == {"created": 4, "skipped": 2}
+    mock_mark_dirty.assert_called_once_with([2])
+    mock_conn.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@patch("modules.doctors.manager.db.get_connection")
+async def test_get_doctors_reads_listing_projection(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetch.return_value = [
+        {"doctor_id": 1, "title": "Psychiatrist", "review_count": 2, "patient_count": 3,
+         "next_slots": '[{"slot_id": 9, "available_at": "2026-01-05T09:00:00"}]', TOTAL_COLUMN: 1},
+    ]
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    result = await DoctorManager.get_doctors(include_stats=False)
+
+    query = mock_conn.fetch.call_args[0][0]
+    assert "LEFT JOIN doctor_listing dl" in query
+    assert "GROUP BY" not in query and "JSONB_AGG" not in query
+    assert query.count("SELECT") == 1
+    assert result["doctors"][0]["next_slots"] == [{"slot_id": 9, "available_at": "2026-01-05T09:00:00"}]
+    assert result["meta_data"]["total"] == 1
@@ -95,3 +95,76 @@ async def test_add_review_success(mock_get_conn):
     assert result["user_id"] == 2
     assert result["rating"] == 5
     assert result["comment"] == "Great doctor!"
+
+@pytest.mark.asyncio
+@patch("modules.doctors.manager.get_doctor_stats", new_callable=AsyncMock)
+@patch("modules.doctors.manager.db.get_connection")
+async def test_get_doctors_skips_stats_when_not_requested(mock_get_conn, mock_stats):
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = 0
+    mock_conn.fetch.return_value = []
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    result = await DoctorManager.get_doctors(include_stats=False)
+    mock_stats.assert_not_awaited()
+    assert "doctors_stats" not in result
+    assert result["meta_data"]["total"] == 0
+
+@pytest.mark.asyncio
+@patch("modules.doctors.manager.db.get_connection")
+async def test_get_availability_is_windowed_and_paged(mock_get_conn):
+    mock_conn = AsyncMock()
+    mock_conn.fetch.return_value = [
+        {"slot_id": i, "available_at": datetime(2026, 1, 5, 9 + i), "status": "available", "created_at": None,
+         "_cursor_0": datetime(2026, 1, 5, 9 + i), "_cursor_1": i}
+        for i in range(3)
+    ]
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    result = await DoctorManager.get_availability(1, page_size=2)
+
+    query, *params = mock_conn.fetch.call_args[0]
+    assert "s.available_at >= $2 AND s.available_at < $3 AND s.status = $4" in query
+    assert "LIMIT 3" in query
+    assert params[0] == 1 and params[3] == "available"
+    assert (params[2] - params[1]).days == 14
+    assert [slot["slot_id"] for slot in result["slots"]] == [0, 1]
+    assert result["meta_data"]["has_next"]
+
+    await DoctorManager.get_availability(1, status=None, cursor=result["meta_data"]["next_cursor"])
+    query, *params = mock_conn.fetch.call_args[0]
+    assert "s.status =" not in query and "(s.available_at, s.id) > ($4, $5)" in query
+    assert params[3:] == [datetime(2026, 1, 5, 10), 1]
+
+@pytest.mark.asyncio
+async def test_get_availability_rejects_bad_input():
+    with pytest.raises(ValueError):
+        await DoctorManager.get_availability(1, status="gone")
+    with pytest.raises(ValueError):
+        await DoctorManager.get_availability(1, start=datetime(2026, 1, 2), end=datetime(2026, 1, 1))
+
+@pytest.mark.asyncio
+@patch("modules.doctors.manager.db.get_connection")
+async def test_generate_slots_reports_created_and_skipped(mock_get_conn):
+    from datetime import date
+    from modules.doctors.availability import GENERATE_SLOTS_QUERY
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = 1
+    mock_conn.fetchrow.return_value = {"candidates": 40, "created": 28}
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    result = await DoctorManager.generate_slots(3, date(2026, 2, 1), date(2026, 2, 28))
+    assert result == {"created": 28, "skipped": 12}
+    mock_conn.fetchrow.assert_awaited_once_with(GENERATE_SLOTS_QUERY, 3, date(2026, 2, 1), date(2026, 2, 28))
+
+@pytest.mark.asyncio
+@patch("modules.doctors.manager.db.get_connection")
+async def test_generate_slots_validates_range_and_doctor(mock_get_conn):
+    from datetime import date
+    with pytest.raises(ValueError):
+        await DoctorManager.generate_slots(3, date(2026, 2, 2), date(2026, 2, 1))
+    with pytest.raises(ValueError):
+        await DoctorManager.generate_slots(3, date(2026, 1, 1), date(2026, 12, 31))
+    mock_conn = AsyncMock()
+    mock_conn.fetchval.return_value = None
+    mock_get_conn.return_value.__aenter__.return_value = mock_conn
+    with pytest.raises(ValueError, match="Doctor not found"):
+        await DoctorManager.generate_slots(3, date(2026, 2, 1), date(2026, 2, 2))
+    mock_conn.fetchrow.assert_not_awaited()
@@ -0,0 +1,33 @@
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, patch
+from .models import GenerateSlots
+from .router import generate_availability, get_schedules
+
+SLOT_RANGE = GenerateSlots(start_date=date(2026, 1, 5), end_date=date(2026, 1, 6))
+
+@pytest.mark.asyncio
+@patch("modules.doctors.router.DoctorManager.generate_slots", new_callable=AsyncMock)
+async def test_generate_availability_requires_own_doctor_or_admin(mock_generate):
+    mock_generate.return_value = {"created": 2, "skipped": 0}
+    patient = {"id": 1, "is_admin": False, "is_doctor": False, "patient_id": 4, "doctor_id": None}
+    other_doctor = {"id": 2, "is_admin": False, "is_doctor": True, "patient_id": None, "doctor_id": 8}
+    own_doctor = {**other_doctor, "doctor_id": 7}
+    admin = {"id": 3, "is_admin": True, "is_doctor": False, "patient_id": None, "doctor_id": None}
+
+    for user in (patient, other_doctor):
+        response = await generate_availability(7, SLOT_RANGE, current_user=user)
+        assert response.status_code == 403
+    mock_generate.assert_not_awaited()
+
+    for user in (own_doctor, admin):
+        response = await generate_availability(7, SLOT_RANGE, current_user=user)
+        assert response["data"] == {"created": 2, "skipped": 0}
+    assert mock_generate.await_count == 2
+
+@pytest.mark.asyncio
+@patch("modules.doctors.router.DoctorManager.get_schedules", new_callable=AsyncMock)
+async def test_get_schedules_rejects_other_doctors(mock_get_schedules):
+    response = await get_schedules(7, current_user={"id": 2, "is_admin": False, "doctor_id": 8})
+    assert response.status_code == 403
+    mock_get_schedules.assert_not_awaited()
@@ -1,5 +1,7 @@
 import datetime
+from shared.cache import cached
 from shared.db import db
+from shared.utils import STATS_CACHE_TTL
 
 
 
@@ -25,12 +27,8 @@ async def get_weekly_appointment_stats(doctor_id: int) -> dict:
         4: "Thursday",
         5: "Friday"
     }
-    # Get the current week's Monday
-    today = datetime.date.today()
-    monday = today - datetime.timedelta(days=today.weekday())
-    friday = monday + datetime.timedelta(days=4)
 
-    async with db.get_connection() as conn:
+    async with db.get_connection(readonly=True) as conn:
         rows = await conn.fetch(
             """
             SELECT 
@@ -38,14 +36,12 @@ async def get_weekly_appointment_stats(doctor_id: int) -> dict:
                 COUNT(*) AS count
             FROM appointments
             WHERE doctor_id = $1
-                AND slot_time::date >= $2
-                AND slot_time::date <= $3
-                AND EXTRACT(DOW FROM slot_time) BETWEEN 1 AND 5
+                -- Monday 00:00 up to Saturday 00:00 of the current week
+                AND slot_time >= CURRENT_DATE - (EXTRACT(ISODOW FROM CURRENT_DATE)::int - 1)
+                AND slot_time < CURRENT_DATE - (EXTRACT(ISODOW FROM CURRENT_DATE)::int - 1) + 5
             GROUP BY dow
             """,
-            doctor_id,
-            monday,
-            friday
+            doctor_id
         )
         # Initialize all weekdays to 0
         weekly_state = {name: 0 for name in weekday_map.values()}
@@ -62,8 +58,7 @@ async def get_todays_appointments(doctor_id: int):
     Fetches all appointments for the given doctor for the current date.
     Returns a dictionary with a list of today's appointments under the key 'todays_appointment'.
     """
-    today = datetime.date.today()
-    async with db.get_connection() as conn:
+    async with db.get_connection(readonly=True) as conn:
         rows = await conn.fetch(
             """
             SELECT 
@@ -74,11 +69,11 @@ async def get_todays_appointments(doctor_id: int):
                 status
             FROM appointments
             WHERE doctor_id = $1
-                AND DATE(slot_time) = $2
+                AND slot_time >= CURRENT_DATE
+                AND slot_time < CURRENT_DATE + 1
             ORDER BY slot_time ASC
             """,
-            doctor_id,
-            today
+            doctor_id
         )
         # Convert slot_time to isoformat if needed
         appointments = []
@@ -89,6 +84,7 @@ async def get_todays_appointments(doctor_id: int):
             appointments.append(appt)
         return {"todays_appointment": appointments}
 
+@cached("doctors.stats", ttl=STATS_CACHE_TTL)
 async def get_doctor_stats():
     """
     Returns statistics related to doctors:
@@ -97,33 +93,25 @@ async def get_doctor_stats():
     - specialties_count: Dictionary mapping specialty/title to count of doctors
     - appointments_today: Number of appointments scheduled for today
     """
-    today = datetime.date.today()
-    async with db.get_connection() as conn:
-        # Total doctors
-        total_doctors = await conn.fetchval("SELECT COUNT(*) FROM doctors")
-
-        # Total video calls
-        total_video_calls = await conn.fetchval("SELECT COUNT(*) FROM video_calls")
-
-        # Count of specialties (by title)
-        specialty_rows = await conn.fetch("""
-            SELECT title, COUNT(*) as count
-            FROM doctors
-            GROUP BY title
+    async with db.get_connection(readonly=True, replica=True) as conn:
+        # One round-trip instead of one per count
+        row = await conn.fetchrow("""
+            SELECT
+                (SELECT COUNT(*) FROM doctors) AS total_doctors,
+                (SELECT COUNT(*) FROM video_calls) AS total_video_calls,
+                (
+                    SELECT COUNT(*) FROM appointments
+                    WHERE slot_time >= CURRENT_DATE AND slot_time < CURRENT_DATE + 1
+                ) AS appointments_today
         """)
-        # specialties_count = {row['title']: row['count'] for row in specialty_rows if row['title']}
-
-        # Appointments slated for current date
-        appointments_today = await conn.fetchval("""
-            SELECT COUNT(*) FROM appointments
-            WHERE DATE(slot_time) = $1
-        """, today)
+        # specialties_count is still a fixed placeholder, so the per-title
+        # count is not queried.
 
     stat = {
-        "total_doctors": total_doctors,
-        "total_sessions": total_video_calls,
+        "total_doctors": row["total_doctors"],
+        "total_sessions": row["total_video_calls"],
         "specialties_count": 8,
-        "appointments_today": appointments_today
+        "appointments_today": row["appointments_today"]
     }
 
     return {"doctors_general_stat": stat}
@@ -3,16 +3,39 @@ from typing import List, Optional
 from .models import ProductListingModel, ProductDetailModel, ReviewResponseModel, ReviewCreateModel
 from .utils import fetch_all, fetch_one, execute_query
 from shared.db import db as db_connection
+from shared.pagination import Keyset, SortKey, cursor_meta
 import json
 
+# Sort columns allowed in cursor mode, with the value NULLs sort as
+PRODUCT_SORT_FIELDS = {
+    "id": None,
+    "name": None,
+    "price": None,
+    "average_rating": "0",
+    "total_reviews": "0",
+}
+
 async def get_products(category_id: Optional[str] = None, limit: int = 10, offset: int = 0, 
                       sort_by: str = 'id', sort_order: str = 'asc', q: Optional[str] = None, 
-                      is_high_demand: bool = False) -> List[ProductListingModel]:
-    """Fetch a list of products with filtering, pagination, and sorting."""
-    async with db_connection.get_connection() as conn:
-        query = """
+                      is_high_demand: bool = False, cursor: Optional[str] = None):
+    """
+    Fetch a list of products with filtering, pagination, and sorting.
+    With a cursor ('' for the first page) pages by keyset on (sort_by, id)
+    instead of OFFSET and returns {"products": [...], "meta": {...}}.
+    """
+    keyset = None
+    if cursor is not None:
+        if sort_by not in PRODUCT_SORT_FIELDS:
+            sort_by = "id"
+        descending = sort_order.lower() == "desc"
+        keys = [SortKey(f"p.{sort_by}", descending, null_as=PRODUCT_SORT_FIELDS[sort_by])]
+        if sort_by != "id":
+            keys.append(SortKey("p.id", descending))
+        keyset = Keyset(*keys)
+    async with db_connection.get_connection(readonly=True) as conn:
+        query = f"""
             SELECT p.id, p.name, p.price, p.image_urls[1] AS image_url, 
-                   p.average_rating, p.total_reviews, c.name AS category
+                   p.average_rating, p.total_reviews, c.name AS category{f", {keyset.columns()}" if keyset else ""}
             FROM products p
             JOIN categories c ON p.category_id = c.id
             WHERE 1=1
@@ -31,6 +54,16 @@ async def get_products(category_id: Optional[str] = None, limit: int = 10, offse
         if is_high_demand:
             query += " AND p.is_high_demand = TRUE"
             # No parameter needed for boolean check
+
+        if keyset:
+            condition, cursor_params = keyset.condition(cursor, param_count + 1)
+            if condition:
+                query += f" AND {condition}"
+                params.extend(cursor_params)
+            query += f" {keyset.order_by()} LIMIT {keyset.fetch_size(limit)}"
+            rows = await fetch_all(conn, query, tuple(params))
+            products, next_cursor = keyset.paginate(rows, limit)
+            return {"products": products, "meta": cursor_meta(limit, next_cursor)}
         
         query += f" ORDER BY {sort_by} {sort_order}"
         param_count += 1
@@ -46,7 +79,7 @@ async def get_products(category_id: Optional[str] = None, limit: int = 10, offse
 
 async def get_product_by_id(product_id: str) -> Optional[ProductDetailModel]:
     """Fetch detailed information for a single product."""
-    async with db_connection.get_connection() as conn:
+    async with db_connection.get_connection(readonly=True) as conn:
         query = """
             SELECT p.id, p.name, p.description, p.price, p.image_urls, 
                    p.average_rating, p.total_reviews, p.key_benefits, p.specifications, c.name AS category
@@ -64,7 +97,7 @@ async def get_product_by_id(product_id: str) -> Optional[ProductDetailModel]:
 
 async def get_product_reviews(product_id: str, limit: int = 5, offset: int = 0):
     """Fetch reviews for a specific product with pagination."""
-    async with db_connection.get_connection() as conn:
+    async with db_connection.get_connection(readonly=True) as conn:
         query = """
             SELECT r.id, r.rating, r.comment, u.first_name || ' ' || u.last_name AS user_name, r.created_at
             FROM product_reviews r
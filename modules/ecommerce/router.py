@@ -23,11 +23,14 @@ async def list_products(
     sort_by: str = "id",
     sort_order: str = "asc",
     q: Optional[str] = None,
-    is_high_demand: bool = False
+    is_high_demand: bool = False,
+    cursor: Optional[str] = None
 ):
     try:
-        products = await get_products(category_id, limit, offset, sort_by, sort_order, q, is_high_demand)
+        products = await get_products(category_id, limit, offset, sort_by, sort_order, q, is_high_demand, cursor)
         return success_response(data=products, message="products fectched successfully")  
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching products: {str(e)}")
 
@@ -3,29 +3,19 @@ import asyncpg
 from typing import Optional, List, Any, Tuple
 import os
 from contextlib import asynccontextmanager
-
-async def get_db_connection() -> asyncpg.Connection:
-    """Establish a connection to the PostgreSQL database."""
-    try:
-        conn = await asyncpg.connect(
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            database=os.getenv("POSTGRES_DB"),
-            host=os.getenv("POSTGRES_HOST", "localhost"),
-            port=os.getenv("POSTGRES_PORT", "5432")
-        )
-        return conn
-    except Exception as e:
-        raise ConnectionError(f"Failed to connect to database: {str(e)}")
+from shared.db import db
 
 @asynccontextmanager
-async def db_connection():
-    """Context manager for database connection."""
-    conn = await get_db_connection()
-    try:
+async def db_connection(readonly: bool = False):
+    """
+    Context manager for a connection from the shared pool. No transaction is
+    opened: each statement commits on its own, as it did on the per-request
+    connections this replaced. Call sites that need several writes to commit
+    together open ``conn.transaction()`` themselves. ``readonly`` is kept for
+    existing callers and changes nothing.
+    """
+    async with db.acquire() as conn:
         yield conn
-    finally:
-        await conn.close()
 
 async def execute_query(conn: asyncpg.Connection, query: str, params: Tuple = ()) -> None:
     """Execute a raw SQL query that does not return results."""
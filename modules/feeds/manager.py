@@ -1,5 +1,6 @@
 from .models import FeedItemCreate, FeedItemResponse
 from shared.db import db
+from shared.pagination import Keyset, SortKey, cursor_meta
 import os
 import mimetypes
 from typing import Optional
@@ -28,8 +29,31 @@ async def create_feed_item(item: FeedItemCreate, user_id: int, file_path: Option
         result['created_at'] = result['created_at'].isoformat()
         return result
 
-async def get_feeds(limit: int = 10, offset: int = 0) -> list:
-    async with db.get_connection() as conn:
+FEED_KEYSET = Keyset(SortKey("created_at"), SortKey("id"))
+
+async def get_feeds(limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
+    """
+    Newest feed items first. With a cursor ('' for the first page) pages by
+    keyset instead of OFFSET and returns {"feeds": [...], "meta": {...next_cursor}}.
+    """
+    if cursor is not None:
+        condition, params = FEED_KEYSET.condition(cursor, 1)
+        async with db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT id, title, content_type, content, description, created_at, created_by,
+                    {FEED_KEYSET.columns()}
+                FROM feed_items
+                {f"WHERE {condition}" if condition else ""}
+                {FEED_KEYSET.order_by()}
+                LIMIT {FEED_KEYSET.fetch_size(limit)}
+                """,
+                *params
+            )
+        feeds, next_cursor = FEED_KEYSET.paginate(rows, limit)
+        return {"feeds": feeds, "meta": cursor_meta(limit, next_cursor)}
+
+    async with db.get_connection(readonly=True) as conn:
         rows = await conn.fetch(
             """
             SELECT id, title, content_type, content, description, created_at, created_by
@@ -10,11 +10,13 @@ from typing import List, Optional
 router = APIRouter()
 
 @router.get("/feeds")
-async def get_feed(limit: int = 10, offset: int = 0):
+async def get_feed(limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
     try:
-        feeds = await get_feeds(limit, offset)
+        feeds = await get_feeds(limit, offset, cursor)
         # print("data gotten returning data", feeds)
         return success_response(data=feeds, message="Feeds retrieved successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
     except Exception as e:
         return error_response(str(e), status_code=500)
 
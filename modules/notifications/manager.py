@@ -1,11 +1,24 @@
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Optional
 from .models import NotificationCreate, NotificationUpdate, NotificationResponse, NotificationStatus, NotificationType
 from shared.db import db
+from shared.pagination import Keyset, SortKey, cursor_meta, cursor_total
+from shared.query import Filters, PagedQuery
+from shared.search import PATIENT_NAME_SEARCH, USER_EMAIL_SEARCH, like_pattern
 
 logger = logging.getLogger(__name__)
 
+# Nullable sort columns and the value they sort as in cursor mode, where
+# keyset comparisons would otherwise drop NULL rows. The sentinel is finite so
+# it survives the round trip through the cursor.
+NULLABLE_SORT_FIELDS = {
+    "user_id": "0",
+    "scheduled_at": "'0001-01-01'",
+    "read_at": "'0001-01-01'",
+}
+
 class NotificationManager:
     @staticmethod
     async def create_notification(notification_data: NotificationCreate) -> dict:
@@ -42,7 +55,7 @@ class NotificationManager:
         """Get notifications for a user with optional filtering"""
         logger.info(f"[NOTIFICATION MANAGER] Getting notifications for user: {user_id}")
         
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             query = """
                 SELECT id, user_id, title, message, notification_type, status, priority, data, created_at, read_at, scheduled_at
                 FROM notifications
@@ -133,7 +146,7 @@ class NotificationManager:
         """Get count of unread notifications for a user"""
         logger.info(f"[NOTIFICATION MANAGER] Getting unread count for user: {user_id}")
         
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             count = await conn.fetchval(
                 """
                 SELECT COUNT(*) 
@@ -183,7 +196,7 @@ class NotificationManager:
         """Get notification preferences for a user"""
         logger.info(f"[NOTIFICATION MANAGER] Getting notification preferences for user: {user_id}")
         
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             result = await conn.fetchrow(
                 """
                 SELECT user_id, email_notifications, push_notifications, sms_notifications, 
@@ -214,150 +227,113 @@ class NotificationManager:
         scheduled_at_from: Optional[datetime] = None,
         scheduled_at_to: Optional[datetime] = None,
         sort_by: str = "created_at",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
     ) -> dict:
         """
         Get all notifications with pagination and filters (Admin only)
         Returns: {notifications: List[dict], total_count: int, total_pages: int, current_page: int}
+        With a cursor (empty string for the first page) pages by keyset on (sort_by, id)
+        instead of OFFSET; the result then carries next_cursor and an estimated or cached total.
         """
         logger.info(f"[NOTIFICATION MANAGER] Getting all notifications with filters - page: {page}, page_size: {page_size}")
         
-        async with db.get_connection() as conn:
-            # Build the base query with filters
-            base_query = """
-                SELECT 
-                    n.id,
-                    n.user_id,
-                    n.title,
-                    n.message,
-                    n.notification_type,
-                    n.status,
-                    n.priority,
-                    n.data,
-                    n.read_at,
-                    n.scheduled_at,
-                    n.created_at,
-                    u.email as user_email,
-                    p.first_name,
-                    p.last_name
-                FROM notifications n
-                JOIN users u ON n.user_id = u.id
-                LEFT JOIN patients p ON p.user_id = u.id
-                WHERE 1=1
-            """
-            
-            # Build count query
-            count_query = """
-                SELECT COUNT(*) 
-                FROM notifications n
+        # Validate sort parameters
+        valid_sort_fields = ["id", "user_id", "notification_type", "status", "priority", "created_at", "scheduled_at", "read_at"]
+        if sort_by not in valid_sort_fields:
+            sort_by = "created_at"
+
+        if sort_order.lower() not in ["asc", "desc"]:
+            sort_order = "desc"
+
+        keyset = Keyset(
+            SortKey(f"n.{sort_by}", sort_order.lower() == "desc", null_as=NULLABLE_SORT_FIELDS.get(sort_by)),
+            SortKey("n.id", sort_order.lower() == "desc"),
+        )
+
+        filters = Filters()
+        if status:
+            filters.add("n.status = {}", status)
+        if notification_type:
+            filters.add("n.notification_type = {}", notification_type)
+        if priority:
+            filters.add("n.priority = {}", priority)
+        if user_search:
+            filters.add(
+                f"({USER_EMAIL_SEARCH.ids_matching('n.user_id')} OR {PATIENT_NAME_SEARCH.ids_matching('n.user_id', key='user_id')})",
+                like_pattern(user_search),
+            )
+        if created_at_from:
+            filters.add("n.created_at >= {}", created_at_from)
+        if created_at_to:
+            filters.add("n.created_at <= {}", created_at_to)
+        if scheduled_at_from:
+            filters.add("n.scheduled_at >= {}", scheduled_at_from)
+        if scheduled_at_to:
+            filters.add("n.scheduled_at <= {}", scheduled_at_to)
+
+        paged = PagedQuery(
+            select="""
+                n.id,
+                n.user_id,
+                n.title,
+                n.message,
+                n.notification_type,
+                n.status,
+                n.priority,
+                n.data,
+                n.read_at,
+                n.scheduled_at,
+                n.created_at,
+                u.email as user_email,
+                p.first_name,
+                p.last_name
+            """,
+            from_clause="""
+                notifications n
                 JOIN users u ON n.user_id = u.id
                 LEFT JOIN patients p ON p.user_id = u.id
-                WHERE 1=1
-            """
-            
-            # Parameters for both queries
-            params = []
-            param_count = 0
-            
-            # Add filters
-            if status:
-                param_count += 1
-                base_query += f" AND n.status = ${param_count}"
-                count_query += f" AND n.status = ${param_count}"
-                params.append(status)
-            
-            if notification_type:
-                param_count += 1
-                base_query += f" AND n.notification_type = ${param_count}"
-                count_query += f" AND n.notification_type = ${param_count}"
-                params.append(notification_type)
-            
-            if priority:
-                param_count += 1
-                base_query += f" AND n.priority = ${param_count}"
-                count_query += f" AND n.priority = ${param_count}"
-                params.append(priority)
-            
-            if user_search:
-                param_count += 1
-                base_query += f" AND (u.email ILIKE ${param_count} OR p.first_name ILIKE ${param_count} OR p.last_name ILIKE ${param_count} OR CONCAT(p.first_name, ' ', p.last_name) ILIKE ${param_count})"
-                count_query += f" AND (u.email ILIKE ${param_count} OR p.first_name ILIKE ${param_count} OR p.last_name ILIKE ${param_count} OR CONCAT(p.first_name, ' ', p.last_name) ILIKE ${param_count})"
-                params.append(f"%{user_search}%")
-            
-            if created_at_from:
-                param_count += 1
-                base_query += f" AND n.created_at >= ${param_count}"
-                count_query += f" AND n.created_at >= ${param_count}"
-                params.append(created_at_from)
-            
-            if created_at_to:
-                param_count += 1
-                base_query += f" AND n.created_at <= ${param_count}"
-                count_query += f" AND n.created_at <= ${param_count}"
-                params.append(created_at_to)
-            
-            if scheduled_at_from:
-                param_count += 1
-                base_query += f" AND n.scheduled_at >= ${param_count}"
-                count_query += f" AND n.scheduled_at >= ${param_count}"
-                params.append(scheduled_at_from)
-            
-            if scheduled_at_to:
-                param_count += 1
-                base_query += f" AND n.scheduled_at <= ${param_count}"
-                count_query += f" AND n.scheduled_at <= ${param_count}"
-                params.append(scheduled_at_to)
-            
-            # Validate sort parameters
-            valid_sort_fields = ["id", "user_id", "notification_type", "status", "priority", "created_at", "scheduled_at", "read_at"]
-            if sort_by not in valid_sort_fields:
-                sort_by = "created_at"
-            
-            if sort_order.lower() not in ["asc", "desc"]:
-                sort_order = "desc"
-            
-            # Add sorting
-            base_query += f" ORDER BY n.{sort_by} {sort_order.upper()}"
-            
-            # Add pagination
-            offset = (page - 1) * page_size
-            param_count += 1
-            base_query += f" LIMIT ${param_count}"
-            params.append(page_size)
-            
-            param_count += 1
-            base_query += f" OFFSET ${param_count}"
-            params.append(offset)
-            
-            # Execute queries
-            total_count = await conn.fetchval(count_query, *params[:-2])  # Exclude LIMIT and OFFSET params
-            rows = await conn.fetch(base_query, *params)
-            
-            # Process results
-            notifications = []
-            for row in rows:
-                notification = dict(row)
-                # Convert datetime objects to ISO format for JSON serialization
-                if notification.get("created_at"):
-                    notification["created_at"] = notification["created_at"].isoformat()
-                if notification.get("read_at"):
-                    notification["read_at"] = notification["read_at"].isoformat()
-                if notification.get("scheduled_at"):
-                    notification["scheduled_at"] = notification["scheduled_at"].isoformat()
-                notifications.append(notification)
-            
-            # Calculate pagination info
-            total_pages = (total_count + page_size - 1) // page_size
-            
-            result = {
-                "notifications": notifications,
-                "total_count": total_count,
-                "total_pages": total_pages,
-                "current_page": page,
-                "page_size": page_size,
-                "has_next": page < total_pages,
-                "has_previous": page > 1
-            }
-            
-            logger.info(f"[NOTIFICATION MANAGER] Retrieved {len(notifications)} notifications out of {total_count} total")
-            return result
+            """,
+            filters=filters,
+            order_by=f"n.{sort_by} {sort_order.upper()}",
+        )
+
+        async with db.get_connection(readonly=True, replica=True) as conn:
+            if cursor is not None:
+                query, params = paged.keyset_page(keyset, cursor, page_size)
+                rows, total = await asyncio.gather(
+                    conn.fetch(query, *params),
+                    cursor_total("notifications", *paged.count(), replica=True),
+                )
+                notifications, next_cursor = keyset.paginate(rows, page_size)
+            else:
+                notifications, total_count = await paged.fetch(conn, page_size, (page - 1) * page_size)
+
+        # Convert datetime objects to ISO format for JSON serialization
+        for notification in notifications:
+            if notification.get("created_at"):
+                notification["created_at"] = notification["created_at"].isoformat()
+            if notification.get("read_at"):
+                notification["read_at"] = notification["read_at"].isoformat()
+            if notification.get("scheduled_at"):
+                notification["scheduled_at"] = notification["scheduled_at"].isoformat()
+
+        if cursor is not None:
+            logger.info(f"[NOTIFICATION MANAGER] Retrieved {len(notifications)} notifications by cursor")
+            return {"notifications": notifications, **cursor_meta(page_size, next_cursor, total)}
+
+        # Calculate pagination info
+        total_pages = (total_count + page_size - 1) // page_size
+
+        result = {
+            "notifications": notifications,
+            "total_count": total_count,
+            "total_pages": total_pages,
+            "current_page": page,
+            "page_size": page_size,
+            "has_next": page < total_pages,
+            "has_previous": page > 1
+        }
+
+        logger.info(f"[NOTIFICATION MANAGER] Retrieved {len(notifications)} notifications out of {total_count} total")
+        return result
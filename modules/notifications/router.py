@@ -4,7 +4,7 @@ import json
 from .models import NotificationCreate, NotificationUpdate, NotificationResponse, NotificationPreferences, NotificationStatus
 from .manager import NotificationManager
 from .utils import manager
-from modules.auth.utils import get_current_user, get_current_admin, get_current_user_ws
+from modules.auth.utils import get_current_principal, get_current_admin, get_current_user_ws
 from shared.response import success_response, error_response
 
 router = APIRouter()
@@ -18,6 +18,8 @@ async def create_notification(
     try:
         notification = await NotificationManager.create_notification(notification_data)
         return success_response(data=notification, message="Notification created successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
     except Exception as e:
         return error_response(str(e), status_code=500)
 
@@ -26,7 +28,7 @@ async def get_my_notifications(
     status: Optional[NotificationStatus] = Query(None, description="Filter by notification status"),
     limit: int = Query(50, ge=1, le=100, description="Number of notifications to return"),
     offset: int = Query(0, ge=0, description="Number of notifications to skip"),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
     """Get current user's notifications with optional filtering"""
     try:
@@ -41,7 +43,7 @@ async def get_my_notifications(
         return error_response(str(e), status_code=500)
 
 @router.get("/unread-count")
-async def get_unread_count(current_user: dict = Depends(get_current_user)):
+async def get_unread_count(current_user: dict = Depends(get_current_principal)):
     """Get count of unread notifications for current user"""
     try:
         count = await NotificationManager.get_unread_count(current_user["id"])
@@ -52,7 +54,7 @@ async def get_unread_count(current_user: dict = Depends(get_current_user)):
 @router.put("/{notification_id}/read")
 async def mark_notification_read(
     notification_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
     """Mark a notification as read"""
     try:
@@ -64,7 +66,7 @@ async def mark_notification_read(
         return error_response(str(e), status_code=500)
 
 @router.put("/mark-all-read")
-async def mark_all_notifications_read(current_user: dict = Depends(get_current_user)):
+async def mark_all_notifications_read(current_user: dict = Depends(get_current_principal)):
     """Mark all notifications as read for current user"""
     try:
         await NotificationManager.mark_all_notifications_read(current_user["id"])
@@ -75,7 +77,7 @@ async def mark_all_notifications_read(current_user: dict = Depends(get_current_u
 @router.delete("/{notification_id}")
 async def delete_notification(
     notification_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
     """Delete a notification"""
     try:
@@ -105,7 +107,7 @@ async def send_bulk_notification(
         return error_response(str(e), status_code=500)
 
 @router.get("/preferences")
-async def get_notification_preferences(current_user: dict = Depends(get_current_user)):
+async def get_notification_preferences(current_user: dict = Depends(get_current_principal)):
     """Get notification preferences for current user"""
     try:
         preferences = await NotificationManager.get_notification_preferences(current_user["id"])
@@ -118,7 +120,7 @@ async def get_notification_preferences(current_user: dict = Depends(get_current_
 @router.put("/preferences")
 async def update_notification_preferences(
     preferences: NotificationPreferences,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
     """Update notification preferences for current user"""
     try:
@@ -142,6 +144,7 @@ async def get_all_notifications_admin(
     scheduled_at_to: Optional[str] = Query(None, description="Filter by scheduled date to (YYYY-MM-DD)"),
     sort_by: str = Query("created_at", description="Sort by field"),
     sort_order: str = Query("desc", description="Sort order (asc/desc)"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor; pass an empty value for the first page"),
     current_admin: dict = Depends(get_current_admin)
 ):
     """
@@ -159,6 +162,9 @@ async def get_all_notifications_admin(
     - id, user_id, notification_type, status, priority, created_at, scheduled_at, read_at
     
     Sort order: asc or desc
+
+    Pass cursor (empty for the first page) to page by keyset instead of page
+    numbers; follow next_cursor until it is null.
     """
     try:
         # Parse date strings to datetime objects
@@ -219,8 +225,14 @@ async def get_all_notifications_admin(
             scheduled_at_from=scheduled_at_from_dt,
             scheduled_at_to=scheduled_at_to_dt,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            cursor=cursor
         )
+        if cursor is not None:
+            return success_response(
+                data=result,
+                message=f"Retrieved {len(result['notifications'])} notifications"
+            )
         
         return success_response(
             data=result, 
@@ -261,22 +273,22 @@ async def websocket_endpoint(websocket: WebSocket):
                     notification_type = message.get("notification_type")
                     if notification_type:
                         manager.subscribe_user(user_id, notification_type)
-                        await websocket.send_text(json.dumps({
+                        await manager.send_personal_message({
                             "type": "subscribed",
                             "notification_type": notification_type
-                        }))
+                        }, user_id)
                 
                 elif message.get("type") == "unsubscribe":
                     notification_type = message.get("notification_type")
                     if notification_type:
                         manager.unsubscribe_user(user_id, notification_type)
-                        await websocket.send_text(json.dumps({
+                        await manager.send_personal_message({
                             "type": "unsubscribed",
                             "notification_type": notification_type
-                        }))
+                        }, user_id)
                 
                 elif message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
+                    await manager.send_personal_message({"type": "pong"}, user_id)
                 
         except WebSocketDisconnect:
             manager.disconnect(user_id)
@@ -1,8 +1,8 @@
-import json
 import logging
 from typing import Dict, Set
 from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
+from shared.ws_hub import connection_hub
 
 logger = logging.getLogger(__name__)
 
@@ -12,52 +12,47 @@ class ConnectionManager:
         self.active_connections: Dict[int, WebSocket] = {}
         # Store user subscriptions: {user_id: Set[notification_types]}
         self.user_subscriptions: Dict[int, Set[str]] = {}
+        # Outbound queues; a user who falls behind loses the oldest notifications
+        # from the socket (they stay in the notifications table)
+        self.hub = connection_hub("notifications", policy="drop")
 
     async def connect(self, websocket: WebSocket, user_id: int):
         """Connect a user to the WebSocket"""
         await websocket.accept()
+        previous = self.active_connections.get(user_id)
+        if previous is not None and previous is not websocket:
+            self.hub.unregister(previous)
         self.active_connections[user_id] = websocket
+        self.hub.register(websocket)
         self.user_subscriptions[user_id] = set()
         logger.info(f"[WEBSOCKET] User {user_id} connected")
 
     def disconnect(self, user_id: int):
         """Disconnect a user from the WebSocket"""
         if user_id in self.active_connections:
-            del self.active_connections[user_id]
+            self.hub.unregister(self.active_connections.pop(user_id))
         if user_id in self.user_subscriptions:
             del self.user_subscriptions[user_id]
         logger.info(f"[WEBSOCKET] User {user_id} disconnected")
 
     async def send_personal_message(self, message: dict, user_id: int):
-        """Send a message to a specific user"""
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_text(json.dumps(message))
-                logger.info(f"[WEBSOCKET] Message sent to user {user_id}")
-            except Exception as e:
-                logger.error(f"[WEBSOCKET] Failed to send message to user {user_id}: {e}")
-                self.disconnect(user_id)
+        """Queue a message for a specific user"""
+        websocket = self.active_connections.get(user_id)
+        if websocket is not None and self.hub.send(websocket, message):
+            logger.info(f"[WEBSOCKET] Message queued for user {user_id}")
 
     async def broadcast(self, message: dict, notification_type: str = None):
         """Broadcast a message to all connected users or users subscribed to a specific type"""
-        disconnected_users = []
-        
-        for user_id, websocket in self.active_connections.items():
-            try:
-                # If notification_type is specified, only send to subscribed users
-                if notification_type and user_id in self.user_subscriptions:
-                    if notification_type not in self.user_subscriptions[user_id]:
-                        continue
-                
-                await websocket.send_text(json.dumps(message))
-                logger.info(f"[WEBSOCKET] Broadcast message sent to user {user_id}")
-            except Exception as e:
-                logger.error(f"[WEBSOCKET] Failed to send broadcast to user {user_id}: {e}")
-                disconnected_users.append(user_id)
-        
-        # Clean up disconnected users
-        for user_id in disconnected_users:
-            self.disconnect(user_id)
+        if notification_type:
+            # Users without a subscription entry receive every type
+            targets = [
+                websocket for user_id, websocket in self.active_connections.items()
+                if user_id not in self.user_subscriptions or notification_type in self.user_subscriptions[user_id]
+            ]
+        else:
+            targets = list(self.active_connections.values())
+        queued = self.hub.broadcast(targets, message)
+        logger.info(f"[WEBSOCKET] Broadcast queued for {queued} of {len(targets)} user(s)")
 
     def subscribe_user(self, user_id: int, notification_type: str):
         """Subscribe a user to a specific notification type"""
@@ -1,6 +1,10 @@
+import asyncio
 from shared.db import db
+from shared.pagination import Keyset, SortKey, cursor_meta, cursor_total
+from shared.query import Filters, PagedQuery
+from shared.search import PATIENT_SEARCH, like_pattern
 import logging
-from modules.auth.utils import get_current_user, hash_password
+from modules.auth.utils import get_current_user, hash_password, run_password_job, invalidate_principal
 from .models import PatientCreate, PatientUpdate, PatientResponse
 from modules.appointments.models import AppointmentResponse
 from datetime import datetime
@@ -8,6 +12,11 @@ from .utils import get_patient_stats
 
 logger = logging.getLogger(__name__)
 
+async def _fetch_page(paged: PagedQuery, limit: int, offset: int) -> tuple:
+    async with db.get_connection(readonly=True, replica=True) as conn:
+        rows, total = await paged.fetch(conn, limit, offset)
+        return total, rows
+
 async def get_all_patients(
     page: int = 1,
     page_size: int = 20,
@@ -15,53 +24,35 @@ async def get_all_patients(
     therapy_name: str = None,
     created_at_from: datetime = None,
     created_at_to: datetime = None,
+    include_stats: bool = True,
+    cursor: str = None,
 ) -> dict:
     """
     Fetch all patients with optional search, filters, and pagination.
     - search: matches first_name, last_name, address, occupation, phone_number, emergency_contact_name, emergency_contact_phone
     - therapy_name: filter by therapy name (string)
     - created_at_from, created_at_to: filter by created_at datetime range
+    - include_stats: add the (cached) 'pateint_stats' block
+    - cursor: page by patient id after this cursor instead of OFFSET ('' for the first page)
     Returns dict with 'data', 'total', 'page', 'page_size'
     """
-    filters = []
-    params = []
-    param_idx = 1
+    filters = Filters()
 
     if search:
-        filters.append(
-            f"(p.first_name ILIKE ${param_idx} OR p.last_name ILIKE ${param_idx} OR p.address ILIKE ${param_idx} OR p.occupation ILIKE ${param_idx} OR p.phone_number ILIKE ${param_idx} OR p.emergency_contact_name ILIKE ${param_idx} OR p.emergency_contact_phone ILIKE ${param_idx})"
-        )
-        params.append(f"%{search}%")
-        param_idx += 1
+        filters.add(PATIENT_SEARCH.matches("p"), like_pattern(search))
 
     if therapy_name is not None:
-        filters.append(f"t.therapy_type ILIKE ${param_idx}")
-        params.append(f"%{therapy_name}%")
-        param_idx += 1
+        filters.add("t.therapy_type ILIKE {}", f"%{therapy_name}%")
 
     if created_at_from is not None:
-        filters.append(f"p.created_at >= ${param_idx}")
-        params.append(created_at_from)
-        param_idx += 1
+        filters.add("p.created_at >= {}", created_at_from)
 
     if created_at_to is not None:
-        filters.append(f"p.created_at <= ${param_idx}")
-        params.append(created_at_to)
-        param_idx += 1
-
-    where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+        filters.add("p.created_at <= {}", created_at_to)
 
-    offset = (page - 1) * page_size
     limit = page_size
-
-    count_query = f"""
-        SELECT COUNT(*) FROM patients p
-        LEFT JOIN therapy t ON p.therapy_type = t.id
-        {where_clause}
-    """
-
-    data_query = f"""
-        SELECT 
+    paged = PagedQuery(
+        select="""
             p.id AS patient_id,
             p.user_id,
             p.first_name,
@@ -97,53 +88,75 @@ async def get_all_patients(
                         )
                     ) FILTER (WHERE asumm.id IS NOT NULL), '[]'
                 ) AS appointment_history
-        FROM patients p
-        LEFT JOIN appointments_summary asumm ON p.user_id = asumm.patient_id
-        LEFT JOIN therapy t ON p.therapy_type = t.id
-        {where_clause}
-        GROUP BY 
+        """,
+        from_clause="""
+            patients p
+            LEFT JOIN appointments_summary asumm ON p.user_id = asumm.patient_id
+            LEFT JOIN therapy t ON p.therapy_type = t.id
+        """,
+        filters=filters,
+        order_by="p.id",
+        group_by="""
             p.id, p.user_id, p.first_name, p.last_name, p.date_of_birth, p.address, p.phone_number, 
             p.occupation, p.therapy_criticality, p.emergency_contact_name, p.emergency_contact_phone, 
             p.marital_status, p.profile_image_url, p.created_at, p.account_type, p.session_count, t.therapy_type
-        ORDER BY p.id
-        LIMIT ${param_idx} OFFSET ${param_idx + 1}
-    """
+        """,
+        count_from="patients p LEFT JOIN therapy t ON p.therapy_type = t.id",
+    )
+    keyset = Keyset(SortKey("p.id", descending=False))
 
-    params_for_data = params.copy()
-    params_for_data.append(limit)
-    params_for_data.append(offset)
+    if cursor is not None:
+        data_query, params = paged.keyset_page(keyset, cursor, limit)
 
-    async with db.get_connection() as conn:
-        total = await conn.fetchval(count_query, *params)
-        rows = await conn.fetch(data_query, *params_for_data)
-        result = [dict(row) for row in rows]
-        for row in result:
-            if 'created_at' in row and isinstance(row['created_at'], datetime):
-                row['created_at'] = row['created_at'].isoformat()
-            if 'updated_at' in row and isinstance(row['updated_at'], datetime):
-                row['updated_at'] = row['updated_at'].isoformat()
-            if 'date_of_birth' in row and isinstance(row['date_of_birth'], datetime):
-                row['date_of_birth'] = row['date_of_birth'].isoformat()
-            if 'summary_created_at' in row and isinstance(row['summary_created_at'], datetime):
-                row['summary_created_at'] = row['summary_created_at'].isoformat()
-            if 'summary_updated_at' in row and isinstance(row['summary_updated_at'], datetime):
-                row['summary_updated_at'] = row['summary_updated_at'].isoformat()
-            if 'follow_up_date' in row and isinstance(row['follow_up_date'], datetime):
-                row['follow_up_date'] = row['follow_up_date'].isoformat()
+        async def fetch_page():
+            async with db.get_connection(readonly=True, replica=True) as conn:
+                return await conn.fetch(data_query, *params)
+
+        page_reads = asyncio.gather(
+            cursor_total("patients", *paged.count(), replica=True),
+            fetch_page(),
+        )
+    else:
+        page_reads = _fetch_page(paged, limit, (page - 1) * page_size)
+    if include_stats:
+        (total, rows), stats = await asyncio.gather(page_reads, get_patient_stats())
+    else:
+        total, rows = await page_reads
+    if cursor is not None:
+        result, next_cursor = keyset.paginate(rows, limit)
+    else:
+        result = rows
+    for row in result:
+        if 'created_at' in row and isinstance(row['created_at'], datetime):
+            row['created_at'] = row['created_at'].isoformat()
+        if 'updated_at' in row and isinstance(row['updated_at'], datetime):
+            row['updated_at'] = row['updated_at'].isoformat()
+        if 'date_of_birth' in row and isinstance(row['date_of_birth'], datetime):
+            row['date_of_birth'] = row['date_of_birth'].isoformat()
+        if 'summary_created_at' in row and isinstance(row['summary_created_at'], datetime):
+            row['summary_created_at'] = row['summary_created_at'].isoformat()
+        if 'summary_updated_at' in row and isinstance(row['summary_updated_at'], datetime):
+            row['summary_updated_at'] = row['summary_updated_at'].isoformat()
+        if 'follow_up_date' in row and isinstance(row['follow_up_date'], datetime):
+            row['follow_up_date'] = row['follow_up_date'].isoformat()
+    if cursor is not None:
+        meta_data = cursor_meta(page_size, next_cursor, total)
+    else:
         meta_data = {
             "total": total,
             "page": page,
             "page_size": page_size,
         }
-        stats = await get_patient_stats()
-        return {
-            "patients": result,
-            "pateint_stats": stats,
-            "meta_data": meta_data,
-        }
+    response = {
+        "patients": result,
+        "meta_data": meta_data,
+    }
+    if include_stats:
+        response["pateint_stats"] = stats
+    return response
 
 async def get_patient_by_user_id(user_id: int) -> dict:
-    async with db.get_connection() as conn:
+    async with db.get_connection(readonly=True) as conn:
         row = await conn.fetchrow(
             """
             SELECT 
@@ -182,7 +195,7 @@ async def get_patient_by_user_id(user_id: int) -> dict:
         return None
     
 async def get_patient_using_id(patient_id: int) -> dict:
-    async with db.get_connection() as conn:
+    async with db.get_connection(readonly=True) as conn:
         row = await conn.fetchrow(
             """
                 SELECT 
@@ -258,8 +271,8 @@ async def get_patient_using_id(patient_id: int) -> dict:
         return None
 
 async def create_patient(patient_data: PatientCreate) -> dict:
+    password_hash = await run_password_job(hash_password, patient_data.password)
     async with db.get_connection() as conn:
-        password_hash = hash_password(patient_data.password)
        
         if not patient_data.user_id:
             try:
@@ -326,14 +339,15 @@ async def create_patient(patient_data: PatientCreate) -> dict:
             """,
             patient_id
         )
-        result = dict(row)
-        if 'created_at' in result and isinstance(result['created_at'], datetime):
-            result['created_at'] = result['created_at'].isoformat()
-        if 'updated_at' in result and isinstance(result['updated_at'], datetime):
-            result['updated_at'] = result['updated_at'].isoformat()
-        if 'date_of_birth' in result and isinstance(result['date_of_birth'], datetime):
-            result['date_of_birth'] = result['date_of_birth'].isoformat()
-        return result
+    invalidate_principal(user_id=user_id)
+    result = dict(row)
+    if 'created_at' in result and isinstance(result['created_at'], datetime):
+        result['created_at'] = result['created_at'].isoformat()
+    if 'updated_at' in result and isinstance(result['updated_at'], datetime):
+        result['updated_at'] = result['updated_at'].isoformat()
+    if 'date_of_birth' in result and isinstance(result['date_of_birth'], datetime):
+        result['date_of_birth'] = result['date_of_birth'].isoformat()
+    return result
 
 async def update_patient(patient_id: int, patient_data: PatientUpdate) -> dict:
     async with db.get_connection() as conn:
@@ -422,11 +436,12 @@ async def delete_patient(user_id: int) -> bool:
                 return False
             await conn.execute("DELETE FROM patients WHERE user_id = $1", user_id)
             await conn.execute("DELETE FROM users WHERE id = $1", user_id)
-            logger.info(f"[PATIENT MANAGER] Deleted patient and user for user_id={user_id}")
-            return True
+    invalidate_principal(user_id=user_id)
+    logger.info(f"[PATIENT MANAGER] Deleted patient and user for user_id={user_id}")
+    return True
 
 async def get_patient_appointments(patient_id: int):
-    async with db.get_connection() as conn:
+    async with db.get_connection(readonly=True) as conn:
         rows = await conn.fetch(
             """
             SELECT 
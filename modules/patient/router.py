@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from .models import PatientCreate, PatientUpdate, PatientResponse
 from .manager import get_patient_by_user_id, create_patient, update_patient, delete_patient, get_all_patients, get_patient_using_id
 from modules.auth.utils import get_current_user
-from shared.response import success_response
+from shared.response import success_response, etag_response
 
 router = APIRouter()
 
@@ -28,6 +28,7 @@ async def create_patient_endpoint(patient_data: PatientCreate, current_user: dic
 
 @router.get("")
 async def get_patients(
+    request: Request,
     page: int = 1,
     page_size: int = 10,
     search: str = None,
@@ -35,10 +36,15 @@ async def get_patients(
     therapy_criticality: str = None,
     created_at_from: str = None,
     created_at_to: str = None,
+    include_stats: bool = True,
+    cursor: str = None,
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get all patients with optional filters, search, and pagination.
+    Pass include_stats=false when paging to skip the stats block; the response
+    carries an ETag, and a matching If-None-Match gets a 304. Pass cursor
+    (empty for the first page) to page by keyset instead of page numbers.
     """
     try:
         filters = {}
@@ -67,12 +73,16 @@ async def get_patients(
             therapy_name=therapy_name,
             created_at_from=created_at_from_dt,
             created_at_to=created_at_to_dt,
+            include_stats=include_stats,
+            cursor=cursor,
         )
         if not patients:
             raise HTTPException(status_code=404, detail="No patients found")
-        return success_response(message="Patients fetched successfully", data=patients)
+        return etag_response(request, message="Patients fetched successfully", data=patients)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -1,9 +1,12 @@
 
 
 
+from shared.cache import cached
 from shared.db import db
+from shared.utils import STATS_CACHE_TTL
 import datetime
 
+@cached("patients.stats", ttl=STATS_CACHE_TTL)
 async def get_patient_stats():
     """
     Returns a dictionary with:
@@ -13,33 +16,28 @@ async def get_patient_stats():
         - total_subscribed_patients: Patients with account_type = 'subscribe'
         - total_appointments_today: Appointments scheduled for current date
     """
-    async with db.get_connection() as conn:
-        # Total patients
-        total_patients = await conn.fetchval("SELECT COUNT(*) FROM patients")
-        # Total active patients
-        total_active_patients = await conn.fetchval(
-            "SELECT COUNT(*) FROM patients WHERE account_status = 'active'"
-        )
-        # Total inactive patients
-        total_inactive_patients = await conn.fetchval(
-            "SELECT COUNT(*) FROM patients WHERE account_status = 'inactive'"
-        )
-        # Total subscribed patients
-        total_subscribed_patients = await conn.fetchval(
-            "SELECT COUNT(*) FROM patients WHERE account_type = 'subscribe'"
-        )
-        # Total appointments scheduled for current date
-        total_appointments_today = await conn.fetchval(
+    async with db.get_connection(readonly=True, replica=True) as conn:
+        # A single scan of patients with FILTERed counts, plus today's
+        # appointments, in one round-trip
+        row = await conn.fetchrow(
             """
-            SELECT COUNT(*) FROM appointments
-            WHERE DATE(slot_time) = CURRENT_DATE
+            SELECT
+                COUNT(*) AS total_patients,
+                COUNT(*) FILTER (WHERE account_status = 'active') AS total_active_patients,
+                COUNT(*) FILTER (WHERE account_status = 'inactive') AS total_inactive_patients,
+                COUNT(*) FILTER (WHERE account_type = 'subscribe') AS total_subscribed_patients,
+                (
+                    SELECT COUNT(*) FROM appointments
+                    WHERE slot_time >= CURRENT_DATE AND slot_time < CURRENT_DATE + 1
+                ) AS total_appointments_today
+            FROM patients
             """
         )
 
     return {
-        "total_patients": total_patients or 0,
-        "total_active_patients": total_active_patients or 0,
-        "total_inactive_patients": total_inactive_patients or 0,
-        "total_subscribed_patients": total_subscribed_patients or 0,
-        "total_appointments_today": total_appointments_today or 0,
+        "total_patients": row["total_patients"] or 0,
+        "total_active_patients": row["total_active_patients"] or 0,
+        "total_inactive_patients": row["total_inactive_patients"] or 0,
+        "total_subscribed_patients": row["total_subscribed_patients"] or 0,
+        "total_appointments_today": row["total_appointments_today"] or 0,
     }
@@ -1,11 +1,23 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import List, Optional
 from .models import SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse, SubscriptionPlan, SubscriptionStatus, SubscriptionType
 from shared.db import db
+from shared.pagination import Keyset, SortKey, cursor_meta, cursor_total
+from shared.query import Filters, PagedQuery
+from shared.search import PATIENT_NAME_SEARCH, USER_EMAIL_SEARCH, like_pattern
 
 logger = logging.getLogger(__name__)
 
+# Nullable sort columns and the value they sort as in cursor mode, where
+# keyset comparisons would otherwise drop NULL rows. The sentinel is finite so
+# it survives the round trip through the cursor.
+NULLABLE_SORT_FIELDS = {
+    "user_id": "0",
+    "end_date": "'0001-01-01'",
+}
+
 class SubscriptionManager:
     @staticmethod
     async def create_subscription(subscription_data: SubscriptionCreate) -> dict:
@@ -40,7 +52,7 @@ class SubscriptionManager:
         """Get the current active subscription for a user"""
         logger.info(f"[SUBSCRIPTION MANAGER] Getting subscription for user: {user_id}")
         
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             result = await conn.fetchrow(
                 """
                 SELECT id, user_id, subscription_type, status, start_date, end_date, auto_renew, payment_method, created_at, updated_at
@@ -93,9 +105,8 @@ class SubscriptionManager:
                 logger.warning(f"[SUBSCRIPTION MANAGER] No fields to update for subscription: {subscription_id}")
                 return None
             
-            # Add updated_at timestamp
-            fields.append("updated_at = $%d" % (len(values) + 1))
-            values.append(datetime.utcnow())
+            # Stamped by the database clock, which the stats rollups compare it against
+            fields.append("updated_at = CURRENT_TIMESTAMP")
             
             values.append(subscription_id)
             query = f"""
@@ -123,10 +134,9 @@ class SubscriptionManager:
             result = await conn.execute(
                 """
                 UPDATE subscriptions 
-                SET status = 'cancelled', updated_at = $1
-                WHERE id = $2
+                SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
                 """,
-                datetime.utcnow(),
                 subscription_id
             )
             
@@ -142,7 +152,7 @@ class SubscriptionManager:
         """Get all available subscription plans"""
         logger.info("[SUBSCRIPTION MANAGER] Getting subscription plans")
         
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             rows = await conn.fetch(
                 """
                 SELECT id, name, type, price, currency, duration_days, features, is_active
@@ -161,7 +171,7 @@ class SubscriptionManager:
         """Check for subscriptions that are about to expire or have expired"""
         logger.info("[SUBSCRIPTION MANAGER] Checking subscription expiry")
         
-        async with db.get_connection() as conn:
+        async with db.get_connection(readonly=True) as conn:
             # Get subscriptions expiring in the next 7 days or already expired
             rows = await conn.fetch(
                 """
@@ -192,169 +202,123 @@ class SubscriptionManager:
         auto_renew: Optional[bool] = None,
         payment_method: Optional[str] = None,
         sort_by: str = "created_at",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
     ) -> dict:
         """
         Get all subscriptions with pagination and filters (Admin only)
         Returns: {subscriptions: List[dict], total_count: int, total_pages: int, current_page: int}
+        With a cursor (empty string for the first page) pages by keyset on (sort_by, id)
+        instead of OFFSET; the result then carries next_cursor and an estimated or cached total.
         """
         logger.info(f"[SUBSCRIPTION MANAGER] Getting all subscriptions with filters - page: {page}, page_size: {page_size}")
         
-        async with db.get_connection() as conn:
-            # Build the base query with filters
-            base_query = """
-                SELECT 
-                    s.id,
-                    s.user_id,
-                    s.subscription_type,
-                    s.status,
-                    s.start_date,
-                    s.end_date,
-                    s.auto_renew,
-                    s.payment_method,
-                    s.created_at,
-                    s.updated_at,
-                    u.email as user_email,
-                    p.first_name,
-                    p.last_name,
-                    sp.id as plan_id,
-                    sp.name as plan_name,
-                    sp.price as plan_price,
-                    sp.currency as plan_currency
-                FROM subscriptions s
-                JOIN users u ON s.user_id = u.id
-                LEFT JOIN patients p ON p.user_id = u.id
-                LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                WHERE 1=1
-            """
-            
-            # Build count query
-            count_query = """
-                SELECT COUNT(*) 
-                FROM subscriptions s
+        # Validate sort parameters
+        valid_sort_fields = ["id", "user_id", "subscription_type", "status", "start_date", "end_date", "created_at", "updated_at"]
+        if sort_by not in valid_sort_fields:
+            sort_by = "created_at"
+
+        if sort_order.lower() not in ["asc", "desc"]:
+            sort_order = "desc"
+
+        keyset = Keyset(
+            SortKey(f"s.{sort_by}", sort_order.lower() == "desc", null_as=NULLABLE_SORT_FIELDS.get(sort_by)),
+            SortKey("s.id", sort_order.lower() == "desc"),
+        )
+
+        filters = Filters()
+        if status:
+            filters.add("s.status = {}", status)
+        if subscription_type:
+            filters.add("s.subscription_type = {}", subscription_type)
+        if plan_id:
+            filters.add("s.plan_id = {}", plan_id)
+        if user_search:
+            filters.add(
+                f"({USER_EMAIL_SEARCH.ids_matching('s.user_id')} OR {PATIENT_NAME_SEARCH.ids_matching('s.user_id', key='user_id')})",
+                like_pattern(user_search),
+            )
+        if start_date_from:
+            filters.add("s.start_date >= {}", start_date_from)
+        if start_date_to:
+            filters.add("s.start_date <= {}", start_date_to)
+        if end_date_from:
+            filters.add("s.end_date >= {}", end_date_from)
+        if end_date_to:
+            filters.add("s.end_date <= {}", end_date_to)
+        if auto_renew is not None:
+            filters.add("s.auto_renew = {}", auto_renew)
+        if payment_method:
+            filters.add("s.payment_method ILIKE {}", f"%{payment_method}%")
+
+        paged = PagedQuery(
+            select="""
+                s.id,
+                s.user_id,
+                s.subscription_type,
+                s.status,
+                s.start_date,
+                s.end_date,
+                s.auto_renew,
+                s.payment_method,
+                s.created_at,
+                s.updated_at,
+                u.email as user_email,
+                p.first_name,
+                p.last_name,
+                sp.id as plan_id,
+                sp.name as plan_name,
+                sp.price as plan_price,
+                sp.currency as plan_currency
+            """,
+            from_clause="""
+                subscriptions s
                 JOIN users u ON s.user_id = u.id
                 LEFT JOIN patients p ON p.user_id = u.id
                 LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                WHERE 1=1
-            """
-            
-            # Parameters for both queries
-            params = []
-            param_count = 0
-            
-            # Add filters
-            if status:
-                param_count += 1
-                base_query += f" AND s.status = ${param_count}"
-                count_query += f" AND s.status = ${param_count}"
-                params.append(status)
-            
-            if subscription_type:
-                param_count += 1
-                base_query += f" AND s.subscription_type = ${param_count}"
-                count_query += f" AND s.subscription_type = ${param_count}"
-                params.append(subscription_type)
-            
-            if plan_id:
-                param_count += 1
-                base_query += f" AND s.plan_id = ${param_count}"
-                count_query += f" AND s.plan_id = ${param_count}"
-                params.append(plan_id)
-            
-            if user_search:
-                param_count += 1
-                base_query += f" AND (u.email ILIKE ${param_count} OR p.first_name ILIKE ${param_count} OR p.last_name ILIKE ${param_count} OR CONCAT(p.first_name, ' ', p.last_name) ILIKE ${param_count})"
-                count_query += f" AND (u.email ILIKE ${param_count} OR p.first_name ILIKE ${param_count} OR p.last_name ILIKE ${param_count} OR CONCAT(p.first_name, ' ', p.last_name) ILIKE ${param_count})"
-                params.append(f"%{user_search}%")
-            
-            if start_date_from:
-                param_count += 1
-                base_query += f" AND s.start_date >= ${param_count}"
-                count_query += f" AND s.start_date >= ${param_count}"
-                params.append(start_date_from)
-            
-            if start_date_to:
-                param_count += 1
-                base_query += f" AND s.start_date <= ${param_count}"
-                count_query += f" AND s.start_date <= ${param_count}"
-                params.append(start_date_to)
-            
-            if end_date_from:
-                param_count += 1
-                base_query += f" AND s.end_date >= ${param_count}"
-                count_query += f" AND s.end_date >= ${param_count}"
-                params.append(end_date_from)
-            
-            if end_date_to:
-                param_count += 1
-                base_query += f" AND s.end_date <= ${param_count}"
-                count_query += f" AND s.end_date <= ${param_count}"
-                params.append(end_date_to)
-            
-            if auto_renew is not None:
-                param_count += 1
-                base_query += f" AND s.auto_renew = ${param_count}"
-                count_query += f" AND s.auto_renew = ${param_count}"
-                params.append(auto_renew)
-            
-            if payment_method:
-                param_count += 1
-                base_query += f" AND s.payment_method ILIKE ${param_count}"
-                count_query += f" AND s.payment_method ILIKE ${param_count}"
-                params.append(f"%{payment_method}%")
-            
-            # Validate sort parameters
-            valid_sort_fields = ["id", "user_id", "subscription_type", "status", "start_date", "end_date", "created_at", "updated_at"]
-            if sort_by not in valid_sort_fields:
-                sort_by = "created_at"
-            
-            if sort_order.lower() not in ["asc", "desc"]:
-                sort_order = "desc"
-            
-            # Add sorting
-            base_query += f" ORDER BY s.{sort_by} {sort_order.upper()}"
-            
-            # Add pagination
-            offset = (page - 1) * page_size
-            param_count += 1
-            base_query += f" LIMIT ${param_count}"
-            params.append(page_size)
-            
-            param_count += 1
-            base_query += f" OFFSET ${param_count}"
-            params.append(offset)
-            
-            # Execute queries
-            total_count = await conn.fetchval(count_query, *params[:-2])  # Exclude LIMIT and OFFSET params
-            rows = await conn.fetch(base_query, *params)
-            
-            # Process results
-            subscriptions = []
-            for row in rows:
-                subscription = dict(row)
-                # Convert datetime objects to ISO format for JSON serialization
-                if subscription.get("start_date"):
-                    subscription["start_date"] = subscription["start_date"].isoformat()
-                if subscription.get("end_date"):
-                    subscription["end_date"] = subscription["end_date"].isoformat()
-                if subscription.get("created_at"):
-                    subscription["created_at"] = subscription["created_at"].isoformat()
-                if subscription.get("updated_at"):
-                    subscription["updated_at"] = subscription["updated_at"].isoformat()
-                subscriptions.append(subscription)
-            
-            # Calculate pagination info
-            total_pages = (total_count + page_size - 1) // page_size
-            
-            result = {
-                "subscriptions": subscriptions,
-                "total_count": total_count,
-                "total_pages": total_pages,
-                "current_page": page,
-                "page_size": page_size,
-                "has_next": page < total_pages,
-                "has_previous": page > 1
-            }
-            
-            logger.info(f"[SUBSCRIPTION MANAGER] Retrieved {len(subscriptions)} subscriptions out of {total_count} total")
-            return result
+            """,
+            filters=filters,
+            order_by=f"s.{sort_by} {sort_order.upper()}",
+        )
+
+        async with db.get_connection(readonly=True, replica=True) as conn:
+            if cursor is not None:
+                query, params = paged.keyset_page(keyset, cursor, page_size)
+                rows, total = await asyncio.gather(
+                    conn.fetch(query, *params),
+                    cursor_total("subscriptions", *paged.count(), replica=True),
+                )
+                subscriptions, next_cursor = keyset.paginate(rows, page_size)
+            else:
+                subscriptions, total_count = await paged.fetch(conn, page_size, (page - 1) * page_size)
+
+        # Convert datetime objects to ISO format for JSON serialization
+        for subscription in subscriptions:
+            if subscription.get("start_date"):
+                subscription["start_date"] = subscription["start_date"].isoformat()
+            if subscription.get("end_date"):
+                subscription["end_date"] = subscription["end_date"].isoformat()
+            if subscription.get("created_at"):
+                subscription["created_at"] = subscription["created_at"].isoformat()
+            if subscription.get("updated_at"):
+                subscription["updated_at"] = subscription["updated_at"].isoformat()
+
+        if cursor is not None:
+            logger.info(f"[SUBSCRIPTION MANAGER] Retrieved {len(subscriptions)} subscriptions by cursor")
+            return {"subscriptions": subscriptions, **cursor_meta(page_size, next_cursor, total)}
+
+        # Calculate pagination info
+        total_pages = (total_count + page_size - 1) // page_size
+
+        result = {
+            "subscriptions": subscriptions,
+            "total_count": total_count,
+            "total_pages": total_pages,
+            "current_page": page,
+            "page_size": page_size,
+            "has_next": page < total_pages,
+            "has_previous": page > 1
+        }
+
+        logger.info(f"[SUBSCRIPTION MANAGER] Retrieved {len(subscriptions)} subscriptions out of {total_count} total")
+        return result
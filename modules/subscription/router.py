@@ -3,7 +3,7 @@ from typing import List, Optional
 from datetime import datetime
 from .models import SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse, SubscriptionPlan
 from .manager import SubscriptionManager
-from modules.auth.utils import get_current_user, get_current_admin
+from modules.auth.utils import get_current_principal, get_current_admin
 from shared.response import success_response, error_response
 
 router = APIRouter()
@@ -17,11 +17,13 @@ async def create_subscription(
     try:
         subscription = await SubscriptionManager.create_subscription(subscription_data)
         return success_response(data=subscription, message="Subscription created successfully")
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
     except Exception as e:
         return error_response(str(e), status_code=500)
 
 @router.get("/me")
-async def get_my_subscription(current_user: dict = Depends(get_current_user)):
+async def get_my_subscription(current_user: dict = Depends(get_current_principal)):
     """Get current user's subscription"""
     try:
         subscription = await SubscriptionManager.get_user_subscription(current_user["id"])
@@ -98,6 +100,7 @@ async def get_all_subscriptions_admin(
     payment_method: Optional[str] = Query(None, description="Filter by payment method (partial match)"),
     sort_by: str = Query("created_at", description="Sort by field"),
     sort_order: str = Query("desc", description="Sort order (asc/desc)"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor; pass an empty value for the first page"),
     current_admin: dict = Depends(get_current_admin)
 ):
     """
@@ -117,6 +120,9 @@ async def get_all_subscriptions_admin(
     - id, user_id, subscription_type, status, start_date, end_date, created_at, updated_at
     
     Sort order: asc or desc
+
+    Pass cursor (empty for the first page) to page by keyset instead of page
+    numbers; follow next_cursor until it is null.
     """
     try:
         # Parse date strings to datetime objects
@@ -179,8 +185,14 @@ async def get_all_subscriptions_admin(
             auto_renew=auto_renew,
             payment_method=payment_method,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            cursor=cursor
         )
+        if cursor is not None:
+            return success_response(
+                data=result,
+                message=f"Retrieved {len(result['subscriptions'])} subscriptions"
+            )
         
         return success_response(
             data=result, 
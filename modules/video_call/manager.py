@@ -3,7 +3,7 @@ from .models import CallInitiate, CallResponse
 from shared.db import db
 from datetime import datetime
 
-from .utils import active_calls
+from .utils import active_calls, video_hub
 
 logger = logging.getLogger(__name__)
 
@@ -45,8 +45,7 @@ class VideoCallManager:
         logger.info(f"Broadcasting signal for appointment_id={appointment_id}, signal_data={signal_data}")
         logger.info(f"checking active calls: {active_calls}")
         if appointment_id in active_calls:
-            for user_id, websocket in active_calls[appointment_id].items():
-                logger.debug(f"Sending signal to user_id={user_id}")
-                await websocket.send_json(signal_data)
+            queued = video_hub.broadcast(active_calls[appointment_id].values(), signal_data)
+            logger.debug(f"Queued signal for {queued} participant(s)")
         else:
             logger.warning(f"No active calls found for appointment_id={appointment_id}")
\ No newline at end of file
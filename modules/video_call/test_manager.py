@@ -1,7 +1,9 @@
+import json
 import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
 from modules.video_call.manager import VideoCallManager
+from modules.video_call.utils import video_hub
 from datetime import datetime
 
 @pytest.mark.asyncio
@@ -47,10 +49,16 @@ async def test_broadcast_signal_no_active_calls(mock_active_calls):
 async def test_broadcast_signal_with_active_calls(mock_active_calls):
     # Simulate an active call with a mock websocket
     class MockWebSocket:
-        async def send_json(self, data):
-            self.sent = data
+        async def send_text(self, data):
+            self.sent = json.loads(data)
     ws = MockWebSocket()
     mock_active_calls[1] = {2: ws}
-    await VideoCallManager.broadcast_signal(1, {"type": "offer", "sdp": "test"})
+    video_hub.register(ws)
+    try:
+        await VideoCallManager.broadcast_signal(1, {"type": "offer", "sdp": "test"})
+        # Delivery happens on the socket's writer task
+        await video_hub.drain()
+    finally:
+        video_hub.unregister(ws)
     assert hasattr(ws, "sent")
     assert ws.sent == {"type": "offer", "sdp": "test"} 
\ No newline at end of file
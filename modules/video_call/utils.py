@@ -2,11 +2,14 @@ import logging
 from fastapi import WebSocket, WebSocketDisconnect
 from typing import Dict
 from shared.db import db
+from shared.ws_hub import connection_hub
 
 logger = logging.getLogger("video_call.utils")
 
 # In-memory storage for active video call WebSocket connections
 active_calls: Dict[int, Dict[int, WebSocket]] = {}  # appointment_id -> {user_id: websocket}
+# Signalling with a missing offer or candidate is broken, so slow sockets are closed
+video_hub = connection_hub("video_call", policy="close")
 
 async def connect_websocket(websocket: WebSocket, appointment_id: int, user_id: int):
     logger.info(f"WebSocket connect requested: appointment_id={appointment_id}, user_id={user_id}")
@@ -17,7 +20,7 @@ async def connect_websocket(websocket: WebSocket, appointment_id: int, user_id:
     # the router endpoint is the correct place for the first (and only) accept().
 
     # Verify appointment and user
-    async with db.get_connection() as conn:
+    async with db.get_connection(readonly=True) as conn:
         appointment = await conn.fetchrow(
             """
             SELECT patient_id, doctor_id, status FROM appointments
@@ -39,7 +42,11 @@ async def connect_websocket(websocket: WebSocket, appointment_id: int, user_id:
         active_calls[appointment_id] = {user_id: websocket}
         logger.info(f"after adding appointment id active call data: {active_calls}")
 
+    previous = active_calls[appointment_id].get(user_id)
+    if previous is not None and previous is not websocket:
+        video_hub.unregister(previous)
     active_calls[appointment_id][user_id] = websocket
+    video_hub.register(websocket)
     logger.info(f"WebSocket connected: appointment_id={appointment_id}, user_id={user_id}")
     logger.debug(f"Current active_calls: {active_calls}")
     patient_id = appointment['patient_id']
@@ -50,7 +57,7 @@ async def disconnect_websocket(appointment_id: int, user_id: int):
     """Handle WebSocket disconnection and update call status."""
     logger.info(f"Disconnecting WebSocket: appointment_id={appointment_id}, user_id={user_id}")
     if appointment_id in active_calls and user_id in active_calls[appointment_id]:
-        del active_calls[appointment_id][user_id]
+        video_hub.unregister(active_calls[appointment_id].pop(user_id))
         logger.debug(f"Removed user_id={user_id} from active_calls[{appointment_id}]")
         if not active_calls[appointment_id]:
             logger.info(f"No more active users for appointment_id={appointment_id}, ending call in DB")
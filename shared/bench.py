@@ -0,0 +1,65 @@
+"""
+Small helpers for the bench_*.py scripts that load-test a running server.
+
+The scripts are run by hand against a local instance (``python -m
+modules.auth.bench_principal``); they are not collected by pytest.
+"""
+
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(samples) * 1000, 2) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+async def measure(call: Callable[[], Awaitable[bool]], requests: int = 500, concurrency: int = 20) -> Dict[str, float]:
+    """
+    Runs ``call`` ``requests`` times with at most ``concurrency`` in flight.
+    ``call`` returns True on success; failures are counted but not timed.
+    """
+    samples: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await call()
+            except Exception:
+                ok = False
+            if ok:
+                samples.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return summarize(samples, time.perf_counter() - started, errors)
+
+
+def print_report(label: str, stats: Dict[str, float]) -> None:
+    print(
+        f"{label:<40} n={stats['requests']:<6} err={stats['errors']:<4} "
+        f"rps={stats['rps']:<8} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+    )
@@ -0,0 +1,138 @@
+"""
+Multi-process delivery check for the Postgres broadcast backend.
+
+Starts BENCH_WORKERS processes, each with its own PostgresBroadcast on
+BENCH_DB_DSN, standing in for gunicorn workers. Every process subscribes to
+BENCH_CHANNELS chat channels and publishes BENCH_MESSAGES messages spread
+over them. The parent then checks that:
+
+- every process received every message on every channel, its own included;
+- each channel's messages arrived in the same order in every process;
+- each publisher's messages kept their publish order within a channel.
+
+It also prints publish-to-delivery latency and message throughput.
+shared/test_broadcast_postgres.py runs the same check under pytest.
+
+Usage:
+    BENCH_DB_DSN=postgresql://.../amcan_bench python -m shared.bench_broadcast
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+import asyncpg
+from shared.bench import summarize
+from shared.broadcast import PostgresBroadcast
+
+BENCH_DB_DSN = os.getenv("BENCH_DB_DSN")
+WORKERS = int(os.getenv("BENCH_WORKERS", "4"))
+CHANNELS = int(os.getenv("BENCH_CHANNELS", "8"))
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "2000"))
+SETTLE_SECONDS = float(os.getenv("BENCH_SETTLE_SECONDS", "5"))
+
+
+async def run_worker(dsn: str, worker: int, workers: int, channels: int, messages: int, ready, go, results) -> None:
+    backend = PostgresBroadcast(connect=lambda: asyncpg.connect(dsn))
+    received = defaultdict(list)
+    latencies = []
+    expected = workers * messages
+    done = asyncio.Event()
+    count = 0
+
+    def handler_for(channel):
+        async def handle(message):
+            nonlocal count
+            received[channel].append((message["w"], message["i"]))
+            latencies.append(time.time() - message["t"])
+            count += 1
+            if count == expected:
+                done.set()
+        return handle
+
+    for c in range(channels):
+        backend.subscribe(f"chat:{c}", handler_for(f"chat:{c}"))
+    await backend.start()
+    # Blocking is fine here: nothing is published until every worker listens
+    ready.wait()
+    go.wait()
+    started = time.perf_counter()
+    for i in range(messages):
+        await backend.publish(f"chat:{i % channels}", {"w": worker, "i": i, "t": time.time()})
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    try:
+        await asyncio.wait_for(done.wait(), SETTLE_SECONDS + messages / 1000)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+    stats = backend.stats()
+    await backend.stop()
+    results.put((worker, dict(received), summarize(latencies, elapsed), stats))
+
+
+def worker_main(*args) -> None:
+    asyncio.run(run_worker(*args))
+
+
+def run(dsn: str, workers: int = WORKERS, channels: int = CHANNELS, messages: int = MESSAGES) -> tuple:
+    """Runs ``workers`` publishing processes; returns ({worker: (received, latency, stats)}, elapsed)."""
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Barrier(workers + 1)
+    go = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker_main, args=(dsn, w, workers, channels, messages, ready, go, results))
+        for w in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        ready.wait(timeout=60)
+        started = time.perf_counter()
+        go.wait(timeout=60)
+        collected = {}
+        for _ in processes:
+            worker, received, latency, stats = results.get(timeout=60 + SETTLE_SECONDS + messages / 1000)
+            collected[worker] = (received, latency, stats)
+        elapsed = time.perf_counter() - started
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+    return collected, elapsed
+
+
+def check(results: dict, workers: int = WORKERS, channels: int = CHANNELS, messages: int = MESSAGES) -> None:
+    expected_per_channel = workers * messages // channels
+    reference = results[0][0]
+    for worker, (received, _, _) in results.items():
+        for c in range(channels):
+            channel = f"chat:{c}"
+            got = received.get(channel, [])
+            assert len(got) == expected_per_channel, f"worker {worker} {channel}: {len(got)}/{expected_per_channel}"
+            assert got == reference[channel], f"worker {worker} saw {channel} in a different order"
+            for publisher in range(workers):
+                sequence = [i for w, i in got if w == publisher]
+                assert sequence == sorted(sequence), f"{channel}: publisher {publisher} reordered"
+
+
+def main():
+    if not BENCH_DB_DSN:
+        raise SystemExit("Set BENCH_DB_DSN to a scratch database")
+    collected, elapsed = run(BENCH_DB_DSN)
+    check(collected)
+    total = WORKERS * MESSAGES
+    print(f"{WORKERS} workers x {MESSAGES} messages over {CHANNELS} channels: all delivered, order consistent")
+    print(f"throughput: {total / elapsed:.0f} msg/s published, {total * WORKERS / elapsed:.0f} deliveries/s")
+    for worker, (_, latency, stats) in sorted(collected.items()):
+        print(
+            f"worker {worker}: p50={latency['p50_ms']}ms p95={latency['p95_ms']}ms p99={latency['p99_ms']}ms "
+            f"notifies={stats['notifies']} ({stats['published'] / max(stats['notifies'], 1):.1f} msg/notify)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark for the stats fan-out.
+
+Times the patient/doctor stats reads three ways against the configured
+database: the old one-fetchval-after-another on a single connection,
+db.fan_out() over pooled connections, and the single statement the stats
+helpers now issue. Also times DoctorManager.get_doctor's two follow-up reads
+sequentially vs gathered. Reports p50/p95 per variant.
+
+Usage:
+    BENCH_DOCTOR_ID=1 python -m shared.bench_fanout
+"""
+
+import asyncio
+import os
+import time
+from modules.doctors.utils import get_doctor_stats, get_todays_appointments, get_weekly_appointment_stats
+from modules.patient.utils import get_patient_stats
+from shared.bench import summarize
+from shared.db import db, init_db, close_db, Read
+
+DOCTOR_ID = int(os.getenv("BENCH_DOCTOR_ID", "1"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+
+PATIENT_COUNTS = [
+    "SELECT COUNT(*) FROM patients",
+    "SELECT COUNT(*) FROM patients WHERE account_status = 'active'",
+    "SELECT COUNT(*) FROM patients WHERE account_status = 'inactive'",
+    "SELECT COUNT(*) FROM patients WHERE account_type = 'subscribe'",
+]
+DOCTOR_COUNTS = [
+    "SELECT COUNT(*) FROM doctors",
+    "SELECT COUNT(*) FROM video_calls",
+]
+TODAY_COUNT = "SELECT COUNT(*) FROM appointments WHERE slot_time >= CURRENT_DATE AND slot_time < CURRENT_DATE + 1"
+
+
+async def sequential(queries):
+    async with db.get_connection(readonly=True) as conn:
+        for query in queries:
+            await conn.fetchval(query)
+        await conn.fetchval(TODAY_COUNT)
+
+
+async def fanned_out(queries):
+    await db.fan_out(*(Read.fetchval(q) for q in queries), Read.fetchval(TODAY_COUNT))
+
+
+async def doctor_detail_sequential():
+    await get_todays_appointments(DOCTOR_ID)
+    await get_weekly_appointment_stats(DOCTOR_ID)
+
+
+async def doctor_detail_gathered():
+    await asyncio.gather(get_todays_appointments(DOCTOR_ID), get_weekly_appointment_stats(DOCTOR_ID))
+
+
+async def run(label, call):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t0)
+    stats = summarize(samples, time.perf_counter() - started)
+    print(f"{label:<40} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms")
+
+
+async def main():
+    await init_db()
+    try:
+        await run("patient stats [sequential]", lambda: sequential(PATIENT_COUNTS))
+        await run("patient stats [fan_out]", lambda: fanned_out(PATIENT_COUNTS))
+        await run("patient stats [single statement]", get_patient_stats)
+        await run("doctor stats [sequential]", lambda: sequential(DOCTOR_COUNTS))
+        await run("doctor stats [fan_out]", lambda: fanned_out(DOCTOR_COUNTS))
+        await run("doctor stats [single statement]", get_doctor_stats)
+        await run("doctor detail extras [sequential]", doctor_detail_sequential)
+        await run("doctor detail extras [gather]", doctor_detail_gathered)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Benchmark for OFFSET vs keyset (cursor) pagination on the admin appointment list.
+
+Seeds a scratch database (BENCH_DB_DSN) with BENCH_APPOINTMENTS appointments
+(1M by default) using the bench_time_ranges seed, applies the migrations, then
+times AppointmentManager.get_all_appointments for page 1 and page 5000 in
+both modes. The deep cursor is taken from the row just before page 5000, so
+both modes return the same rows; page mode also pays its COUNT(*) each call.
+
+Usage:
+    BENCH_DB_DSN=postgresql://.../amcan_bench python -m shared.bench_pagination
+"""
+
+import asyncio
+import os
+import time
+import asyncpg
+from modules.appointments.manager import AppointmentManager
+from shared import bench_time_ranges
+from shared.bench import summarize
+from shared.db import db
+from shared.migrations import migrate
+from shared.pagination import encode_cursor
+
+BENCH_DB_DSN = os.getenv("BENCH_DB_DSN")
+APPOINTMENTS = int(os.getenv("BENCH_APPOINTMENTS", "1000000"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "20"))
+PAGE_SIZE = 20
+DEEP_PAGE = 5000
+
+
+async def run(label, **kwargs):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        result = await AppointmentManager.get_all_appointments(page_size=PAGE_SIZE, **kwargs)
+        samples.append(time.perf_counter() - t0)
+    stats = summarize(samples, time.perf_counter() - started)
+    first = result["appointments"][0]["appointment_id"] if result["appointments"] else None
+    print(f"{label:<24} p50={stats['p50_ms']:>9}ms p95={stats['p95_ms']:>9}ms  first_id={first}")
+
+
+async def main():
+    if not BENCH_DB_DSN:
+        raise SystemExit("Set BENCH_DB_DSN to a scratch database")
+    pool = await asyncpg.create_pool(dsn=BENCH_DB_DSN, min_size=1, max_size=4)
+    db.pool = pool
+    bench_time_ranges.APPOINTMENTS = APPOINTMENTS
+    try:
+        await migrate()
+        async with pool.acquire() as conn:
+            await bench_time_ranges.seed(conn)
+            before_deep = await conn.fetchrow(
+                "SELECT slot_time, id FROM appointments ORDER BY slot_time DESC, id DESC OFFSET $1 LIMIT 1",
+                (DEEP_PAGE - 1) * PAGE_SIZE - 1,
+            )
+        deep_cursor = encode_cursor([before_deep["slot_time"], before_deep["id"]])
+
+        await run("page 1 [offset]", page=1)
+        await run("page 1 [cursor]", cursor="")
+        await run(f"page {DEEP_PAGE} [offset]", page=DEEP_PAGE)
+        await run(f"page {DEEP_PAGE} [cursor]", cursor=deep_cursor)
+    finally:
+        db.pool = None
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Benchmark for read-only connections.
+
+Runs a few read paths directly against the database twice: once forcing the
+old transactional get_connection() and once with readonly=True as shipped.
+It reports the number of statements sent per call (BEGIN/COMMIT included)
+and the p50/p95 latency.
+
+Usage:
+    BENCH_USER_ID=1 python -m shared.bench_readonly
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from modules.feeds.manager import get_feeds
+from modules.notifications.manager import NotificationManager
+from shared.bench import summarize
+from shared.db import db, init_db, close_db
+from shared.utils import GeneralStats
+
+USER_ID = int(os.getenv("BENCH_USER_ID", "1"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+
+statements = 0
+
+
+def count_statement(record):
+    global statements
+    statements += 1
+
+
+async def attach_counter(connection):
+    connection.add_query_logger(count_statement)
+
+
+async def run(label, call):
+    global statements
+    statements = 0
+    samples = []
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t0)
+    stats = summarize(samples, time.perf_counter() - started)
+    print(f"{label:<45} statements/call={statements / ITERATIONS:<6.2f} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms")
+
+
+async def main():
+    db.add_init_hook(attach_counter)
+    await init_db()
+    readonly_get_connection = db.get_connection
+
+    @asynccontextmanager
+    async def transactional_get_connection(readonly=False):
+        async with readonly_get_connection(readonly=False) as conn:
+            yield conn
+
+    calls = [
+        ("notifications.get_unread_count", lambda: NotificationManager.get_unread_count(USER_ID)),
+        ("feeds.get_feeds", lambda: get_feeds(10, 0)),
+        ("GeneralStats.get_dashboard_stats", GeneralStats.get_dashboard_stats),
+    ]
+    try:
+        for name, call in calls:
+            db.get_connection = transactional_get_connection
+            await run(f"{name} [transaction]", call)
+            db.get_connection = readonly_get_connection
+            await run(f"{name} [readonly]", call)
+    finally:
+        db.get_connection = readonly_get_connection
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
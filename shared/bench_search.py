@@ -0,0 +1,94 @@
+"""
+Benchmark for trigram search on the patient list.
+
+Seeds a scratch database (BENCH_DB_DSN) with BENCH_PATIENTS patients (1M by
+default) with generated names, addresses and phone numbers, applies the
+migrations, then times the old per-column ``ILIKE '%term%'`` predicate against
+the indexed search document (shared.search.PATIENT_SEARCH), and finally the
+full get_all_patients(search=...) call. The plan node should change from a
+Seq Scan to a Bitmap Heap Scan on idx_patients_search_trgm.
+
+Usage:
+    BENCH_DB_DSN=postgresql://.../amcan_bench python -m shared.bench_search
+"""
+
+import asyncio
+import os
+import time
+import asyncpg
+from modules.patient.manager import get_all_patients
+from shared.bench import summarize
+from shared.bench_time_ranges import run
+from shared.db import db
+from shared.migrations import migrate
+from shared.search import PATIENT_SEARCH, like_pattern
+
+BENCH_DB_DSN = os.getenv("BENCH_DB_DSN")
+PATIENTS = int(os.getenv("BENCH_PATIENTS", "1000000"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "20"))
+TERMS = ("ngozi", "okafor", "lekki", "0803 41")
+
+LEGACY_CONDITION = (
+    "p.first_name ILIKE $1 OR p.last_name ILIKE $1 OR p.address ILIKE $1 OR p.occupation ILIKE $1 "
+    "OR p.phone_number ILIKE $1 OR p.emergency_contact_name ILIKE $1 OR p.emergency_contact_phone ILIKE $1"
+)
+
+
+async def seed(conn):
+    if await conn.fetchval("SELECT COUNT(*) FROM patients") >= PATIENTS:
+        return
+    print(f"Seeding {PATIENTS} patients...")
+    await conn.execute(
+        """
+        INSERT INTO patients (first_name, last_name, address, occupation, phone_number,
+                              emergency_contact_name, emergency_contact_phone)
+        SELECT (ARRAY['Ngozi', 'Chidi', 'Amaka', 'Tunde', 'Bola', 'Emeka'])[1 + g % 6] || g,
+               (ARRAY['Okafor', 'Adeyemi', 'Bello', 'Eze', 'Nwosu'])[1 + g % 5],
+               g || ' ' || (ARRAY['Lekki', 'Ikeja', 'Yaba', 'Wuse', 'Garki'])[1 + g % 5] || ' Road',
+               (ARRAY['Teacher', 'Engineer', 'Trader', 'Nurse'])[1 + g % 4],
+               '0803 ' || lpad((g % 10000000)::text, 7, '0'),
+               'Contact ' || g,
+               '0805 ' || lpad(((g * 7) % 10000000)::text, 7, '0')
+        FROM generate_series(1, $1) g
+        """,
+        PATIENTS,
+    )
+    await conn.execute("ANALYZE patients")
+
+
+async def time_manager(term):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        await get_all_patients(search=term, include_stats=False)
+        samples.append(time.perf_counter() - t0)
+    stats = summarize(samples, time.perf_counter() - started)
+    print(f"{'get_all_patients ' + repr(term):<32} p50={stats['p50_ms']:>9}ms p95={stats['p95_ms']:>9}ms")
+
+
+async def main():
+    if not BENCH_DB_DSN:
+        raise SystemExit("Set BENCH_DB_DSN to a scratch database")
+    pool = await asyncpg.create_pool(dsn=BENCH_DB_DSN, min_size=1, max_size=4)
+    db.pool = pool
+    try:
+        await migrate()
+        async with pool.acquire() as conn:
+            await seed(conn)
+            for term in TERMS:
+                pattern = like_pattern(term)
+                await run(conn, f"{term!r} [per-column ILIKE]", f"SELECT COUNT(*) FROM patients p WHERE {LEGACY_CONDITION}", pattern)
+                await run(
+                    conn, f"{term!r} [trigram]",
+                    f"SELECT COUNT(*) FROM patients p WHERE {PATIENT_SEARCH.matches('p').format('$1')}", pattern,
+                )
+        for term in TERMS:
+            await time_manager(term)
+    finally:
+        db.pool = None
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
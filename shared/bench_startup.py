@@ -0,0 +1,52 @@
+"""
+Benchmark for worker startup.
+
+Times what each gunicorn worker used to do on boot (run the full schema
+script and the seed probes) against what it does now (verify the schema
+version). Run against an already-migrated database.
+
+Usage:
+    python -m shared.bench_startup
+"""
+
+import asyncio
+import os
+import time
+from shared.bench import summarize
+from shared.db import init_db, close_db
+from shared.migrations import discover_migrations, verify_schema
+from shared.db import db
+from shared.seed import seed_data
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "10"))
+
+
+async def legacy_startup():
+    # The old create_tables() body: the whole baseline script, every boot.
+    async with db.get_connection() as conn:
+        await conn.execute(discover_migrations()[0].sql)
+    await seed_data()
+
+
+async def run(label, call):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t0)
+    stats = summarize(samples, time.perf_counter() - started)
+    print(f"{label:<30} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms")
+
+
+async def main():
+    await init_db()
+    try:
+        await run("create_tables + seed_data", legacy_startup)
+        await run("verify_schema", verify_schema)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark for the half-open time-range stats filters.
+
+Seeds a scratch database (BENCH_DB_DSN) with BENCH_APPOINTMENTS appointments
+(5M by default, spread over two years) via generate_series, applies the
+migrations, then times the old ``DATE()`` / ``EXTRACT()`` predicates against
+the range predicates now used by the stats helpers. For each pair it prints
+the p50/p95 of the query and the top plan node, which should change from a
+Seq Scan to an index scan.
+
+Usage:
+    BENCH_DB_DSN=postgresql://.../amcan_bench python -m shared.bench_time_ranges
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import date
+import asyncpg
+from shared.bench import summarize
+from shared.db import db
+from shared.migrations import migrate
+from shared.time_ranges import day_range, month_range
+
+BENCH_DB_DSN = os.getenv("BENCH_DB_DSN")
+APPOINTMENTS = int(os.getenv("BENCH_APPOINTMENTS", "5000000"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "50"))
+
+
+async def seed(conn):
+    if await conn.fetchval("SELECT COUNT(*) FROM appointments") >= APPOINTMENTS:
+        return
+    print(f"Seeding {APPOINTMENTS} appointments...")
+    await conn.execute(
+        """
+        INSERT INTO users (email, password_hash, is_doctor)
+        SELECT 'bench_user_' || g || '@example.com', 'x', g <= 500
+        FROM generate_series(1, 10500) g
+        ON CONFLICT (email) DO NOTHING;
+
+        INSERT INTO doctors (user_id, first_name, last_name)
+        SELECT id, 'Doc', 'Tor' FROM users WHERE email LIKE 'bench_user_%' AND is_doctor;
+        """
+    )
+    await conn.execute(
+        """
+        WITH d AS (SELECT array_agg(id) AS ids FROM doctors),
+             u AS (SELECT array_agg(id) AS ids FROM users WHERE NOT is_doctor)
+        INSERT INTO appointments (doctor_id, patient_id, slot_time, status)
+        SELECT d.ids[1 + (g % array_length(d.ids, 1))],
+               u.ids[1 + ((g * 7919) % array_length(u.ids, 1))],
+               now() - interval '2 years' + (g % 1051200) * interval '1 minute',
+               (ARRAY['pending', 'confirmed', 'cancelled'])[1 + g % 3]
+        FROM generate_series(1, $1) g, d, u
+        """,
+        APPOINTMENTS,
+    )
+    await conn.execute("ANALYZE appointments")
+
+
+async def top_node(conn, query, *args) -> str:
+    raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    while plan.get("Plans") and plan["Node Type"] in ("Aggregate", "Gather", "Finalize Aggregate", "Partial Aggregate"):
+        plan = plan["Plans"][0]
+    return plan["Node Type"]
+
+
+async def run(conn, label, query, *args):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        await conn.fetchval(query, *args)
+        samples.append(time.perf_counter() - t0)
+    stats = summarize(samples, time.perf_counter() - started)
+    node = await top_node(conn, query, *args)
+    print(f"{label:<32} p50={stats['p50_ms']:>9}ms p95={stats['p95_ms']:>9}ms  {node}")
+
+
+async def main():
+    if not BENCH_DB_DSN:
+        raise SystemExit("Set BENCH_DB_DSN to a scratch database")
+    pool = await asyncpg.create_pool(dsn=BENCH_DB_DSN, min_size=1, max_size=2)
+    db.pool = pool
+    try:
+        await migrate()
+        today = date.today()
+        async with pool.acquire() as conn:
+            await seed(conn)
+            cases = [
+                (
+                    "today",
+                    ("SELECT COUNT(*) FROM appointments WHERE DATE(slot_time) = $1", today),
+                    ("SELECT COUNT(*) FROM appointments WHERE slot_time >= $1 AND slot_time < $2", *day_range(today)),
+                ),
+                (
+                    "this month",
+                    (
+                        "SELECT COUNT(*) FROM appointments "
+                        "WHERE EXTRACT(MONTH FROM slot_time) = $1 AND EXTRACT(YEAR FROM slot_time) = $2",
+                        today.month, today.year,
+                    ),
+                    (
+                        "SELECT COUNT(*) FROM appointments WHERE slot_time >= $1 AND slot_time < $2",
+                        *month_range(today.year, today.month),
+                    ),
+                ),
+            ]
+            for name, before, after in cases:
+                await run(conn, f"{name} [function]", *before)
+                await run(conn, f"{name} [range]", *after)
+    finally:
+        db.pool = None
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Broadcast latency to many notification sockets through the connection hub.
+
+Connects BENCH_SOCKETS (10k) fake sockets to the notifications
+ConnectionManager. Each send takes BENCH_SEND_MS, standing in for the
+socket write; BENCH_SLOW_PCT percent of the sockets take BENCH_SLOW_MS
+instead. Runs BENCH_ROUNDS broadcasts and prints how long the broadcast call
+took and the broadcast-to-receive latency over the healthy sockets, then the
+same for one broadcast awaited socket by socket as before the hub (skip with
+BENCH_SERIAL=0). No database or server is needed.
+
+Usage:
+    python -m shared.bench_ws_hub
+"""
+
+import asyncio
+import os
+import time
+from shared.bench import summarize
+from modules.notifications.utils import manager
+
+SOCKETS = int(os.getenv("BENCH_SOCKETS", "10000"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+SEND_MS = float(os.getenv("BENCH_SEND_MS", "0.5"))
+SLOW_PCT = float(os.getenv("BENCH_SLOW_PCT", "0.5"))
+SLOW_MS = float(os.getenv("BENCH_SLOW_MS", "200"))
+SERIAL = os.getenv("BENCH_SERIAL", "1") == "1"
+
+
+class FakeSocket:
+    def __init__(self, delay: float, samples: list):
+        self.delay = delay
+        self.samples = samples
+        self.sent_at = 0.0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        await asyncio.sleep(self.delay)
+        if self.samples is not None:
+            self.samples.append(time.perf_counter() - self.sent_at)
+
+    async def close(self, code=None, reason=None):
+        pass
+
+
+async def wait_for(samples: list, expected: int, timeout: float = 30) -> None:
+    deadline = time.perf_counter() + timeout
+    while len(samples) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.001)
+
+
+def report(label: str, call_ms: float, samples: list, elapsed: float) -> None:
+    stats = summarize(samples, elapsed)
+    print(
+        f"{label:<22} call={call_ms:8.2f}ms  delivered={stats['requests']:<6} "
+        f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+    )
+
+
+async def main():
+    slow_every = int(100 / SLOW_PCT) if SLOW_PCT else 0
+    samples: list = []
+    sockets = []
+    for user_id in range(SOCKETS):
+        slow = slow_every and user_id % slow_every == 0
+        websocket = FakeSocket(SLOW_MS / 1000 if slow else SEND_MS / 1000, None if slow else samples)
+        sockets.append(websocket)
+        await manager.connect(websocket, user_id)
+    healthy = sum(1 for websocket in sockets if websocket.samples is not None)
+    print(f"{SOCKETS} sockets ({SOCKETS - healthy} slow at {SLOW_MS}ms/send), {SEND_MS}ms/send otherwise")
+
+    for round_no in range(ROUNDS):
+        samples.clear()
+        started = time.perf_counter()
+        for websocket in sockets:
+            websocket.sent_at = started
+        await manager.broadcast({"type": "notification", "data": {"round": round_no}})
+        call_ms = (time.perf_counter() - started) * 1000
+        await wait_for(samples, healthy)
+        report(f"hub round {round_no + 1}", call_ms, samples, time.perf_counter() - started)
+    print(f"hub stats: {manager.hub.stats()}")
+
+    if SERIAL:
+        samples.clear()
+        started = time.perf_counter()
+        for websocket in sockets:
+            websocket.sent_at = started
+        # What ConnectionManager.broadcast did before the hub
+        for websocket in sockets:
+            await websocket.send_text("{}")
+        report("serial (pre-hub)", (time.perf_counter() - started) * 1000, samples, time.perf_counter() - started)
+
+    await manager.hub.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,332 @@
+"""
+Pub/sub behind the WebSocket fan-out (chat today).
+
+Each gunicorn worker only holds its own sockets, so a message has to reach
+every worker that has a subscriber for its channel. Publishers call
+``broadcaster.publish(channel, message)``; every worker with a handler
+subscribed to ``channel`` has it awaited with ``message`` (a JSON-able value).
+
+Backends, chosen with BROADCAST_BACKEND:
+
+- ``memory``: delivers in-process. Correct only with a single worker.
+- ``postgres``: LISTEN/NOTIFY on one dedicated connection per worker, so no
+  extra service is needed. Published messages are queued and flushed every
+  BROADCAST_FLUSH_MS (sooner once BROADCAST_BATCH_SIZE are waiting), packed
+  several to a NOTIFY payload; one larger than a payload is split into
+  fragments and reassembled. Delivery to the publishing worker also goes
+  through Postgres, so every worker sees one channel's messages in the same
+  order: the order Postgres committed the notifies.
+
+Delivery is at most once: messages published while a worker's listener is
+reconnecting are not replayed to it (chat clients catch up from history).
+"""
+
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncpg
+from shared.db import db
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory")
+BROADCAST_FLUSH_MS = float(os.getenv("BROADCAST_FLUSH_MS", "2"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "200"))
+
+PG_CHANNEL = "amcan_broadcast"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more; leave room for the envelope.
+NOTIFY_PAYLOAD_LIMIT = 7900
+ENVELOPE_ALLOWANCE = 64
+FRAGMENT_CHARS = NOTIFY_PAYLOAD_LIMIT - 2 * ENVELOPE_ALLOWANCE
+RECONNECT_MAX_DELAY = 30.0
+
+Handler = Callable[[Any], Awaitable[None]]
+ConnectFunc = Callable[[], Awaitable[asyncpg.Connection]]
+
+
+class BroadcastBackend(ABC):
+    """Subscriber bookkeeping and local delivery shared by the backends."""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.handler_errors = 0
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def unsubscribe(self, channel: str, handler: Handler) -> None:
+        handlers = self._handlers.get(channel)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[channel]
+
+    def subscribed(self, channel: str) -> bool:
+        return channel in self._handlers
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Any) -> None:
+        ...
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def _deliver(self, channel: str, message: Any) -> None:
+        """Awaits this worker's handlers for ``channel`` in turn; one failing does not skip the rest."""
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(message)
+                self.delivered += 1
+            except Exception as e:
+                self.handler_errors += 1
+                logger.error(f"[BROADCAST] Handler for {channel} failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "channels": len(self._handlers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "handler_errors": self.handler_errors,
+        }
+
+
+class MemoryBroadcast(BroadcastBackend):
+    async def publish(self, channel: str, message: Any) -> None:
+        self.published += 1
+        await self._deliver(channel, message)
+
+
+class PostgresBroadcast(BroadcastBackend):
+    def __init__(self, connect: ConnectFunc, flush_ms: float = BROADCAST_FLUSH_MS,
+                 batch_size: int = BROADCAST_BATCH_SIZE):
+        super().__init__()
+        self._connect = connect
+        self.flush_interval = flush_ms / 1000
+        self.batch_size = batch_size
+        self.origin = uuid.uuid4().hex[:12]
+        self._seq = itertools.count()
+        self._conn: Optional[asyncpg.Connection] = None
+        self._outbox: List[str] = []
+        self._pending: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._inbox: Optional[asyncio.Queue] = None
+        self._fragments: Dict[Tuple[str, int], List[str]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.notifies = 0
+        self.reconnects = 0
+
+    @staticmethod
+    def encode(channel: str, message: Any) -> str:
+        return json.dumps([channel, message], separators=(",", ":"), ensure_ascii=False, default=str)
+
+    async def publish(self, channel: str, message: Any) -> None:
+        if self._pending is None:
+            raise RuntimeError("PostgresBroadcast.start() has not been awaited")
+        self._outbox.append(self.encode(channel, message))
+        self.published += 1
+        self._pending.set()
+        if len(self._outbox) >= self.batch_size:
+            self._full.set()
+
+    def _envelope(self, body: str) -> str:
+        return f'{{"o":"{self.origin}","s":{next(self._seq)},{body}}}'
+
+    def pack(self, entries: List[str]) -> List[str]:
+        """NOTIFY payloads for ``entries``, in order: as many per payload as fit, fragments for oversized ones."""
+        limit = NOTIFY_PAYLOAD_LIMIT - ENVELOPE_ALLOWANCE
+        payloads: List[str] = []
+        batch: List[str] = []
+        size = 0
+
+        def close_batch():
+            nonlocal batch, size
+            if batch:
+                payloads.append(self._envelope(f'"m":[{",".join(batch)}]'))
+            batch, size = [], 0
+
+        for entry in entries:
+            length = len(entry.encode())
+            if length > limit:
+                close_batch()
+                raw = base64.b64encode(entry.encode()).decode()
+                chunks = [raw[i:i + FRAGMENT_CHARS] for i in range(0, len(raw), FRAGMENT_CHARS)]
+                seq = next(self._seq)
+                for index, chunk in enumerate(chunks):
+                    payloads.append(
+                        f'{{"o":"{self.origin}","s":{seq},"f":{index},"n":{len(chunks)},"d":"{chunk}"}}'
+                    )
+                continue
+            if batch and size + length + 1 > limit:
+                close_batch()
+            batch.append(entry)
+            size += length + 1
+        close_batch()
+        return payloads
+
+    async def _send(self, entries: List[str]) -> None:
+        payloads = self.pack(entries)
+        # unnest() yields the payloads in array order, and notifies from one
+        # transaction are delivered in the order they were sent.
+        await self._conn.execute(
+            "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS t(payload)",
+            PG_CHANNEL,
+            payloads,
+        )
+        self.notifies += len(payloads)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._pending.wait()
+            if len(self._outbox) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush()
+
+    async def _flush(self) -> None:
+        entries, self._outbox = self._outbox, []
+        self._pending.clear()
+        self._full.clear()
+        if not entries:
+            return
+        try:
+            if self._conn is None or self._conn.is_closed():
+                raise ConnectionError("listener connection is down")
+            await self._send(entries)
+        except asyncio.CancelledError:
+            self._outbox[:0] = entries
+            raise
+        except Exception as e:
+            # Keep them (ahead of anything newer) for the next attempt
+            self._outbox[:0] = entries
+            self._pending.set()
+            logger.error(f"[BROADCAST] Flush of {len(entries)} message(s) failed: {str(e)}")
+            await asyncio.sleep(min(1.0, self.flush_interval * 100))
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self._inbox.put_nowait(payload)
+
+    def decode(self, payload: str) -> List[Tuple[str, Any]]:
+        """(channel, message) pairs of one payload; [] for a fragment that is not the last."""
+        body = json.loads(payload)
+        if "f" not in body:
+            return [tuple(entry) for entry in body["m"]]
+        key = (body["o"], body["s"])
+        if body["f"] == 0:
+            self._fragments[key] = []
+        parts = self._fragments.get(key)
+        if parts is None:
+            return []  # started before this listener connected
+        parts.append(body["d"])
+        if body["f"] < body["n"] - 1:
+            return []
+        del self._fragments[key]
+        return [tuple(json.loads(base64.b64decode("".join(parts))))]
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            payload = await self._inbox.get()
+            try:
+                messages = self.decode(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"[BROADCAST] Dropping malformed notification: {str(e)}")
+                continue
+            for channel, message in messages:
+                if channel in self._handlers:
+                    await self._deliver(channel, message)
+
+    async def _open(self) -> None:
+        conn = await self._connect()
+        await conn.add_listener(PG_CHANNEL, self._on_notify)
+        conn.add_termination_listener(self._on_terminated)
+        self._conn = conn
+        self._fragments.clear()
+
+    def _on_terminated(self, connection) -> None:
+        if self._stopping or (self._reconnect_task and not self._reconnect_task.done()):
+            return
+        logger.warning("[BROADCAST] Listener connection lost, reconnecting")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 0.5
+        while not self._stopping:
+            try:
+                await self._open()
+                self.reconnects += 1
+                logger.info("[BROADCAST] Listener reconnected")
+                return
+            except Exception as e:
+                logger.error(f"[BROADCAST] Reconnect failed: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._inbox = asyncio.Queue()
+        await self._open()
+        self._tasks = [
+            asyncio.create_task(self._flush_loop(), name="broadcast:flush"),
+            asyncio.create_task(self._dispatch_loop(), name="broadcast:dispatch"),
+        ]
+        logger.info(f"[BROADCAST] Listening on {PG_CHANNEL} as {self.origin}")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks + ([self._reconnect_task] if self._reconnect_task else []):
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._conn is not None and not self._conn.is_closed():
+            if self._outbox:
+                try:
+                    await self._send(self._outbox)
+                    self._outbox = []
+                except Exception as e:
+                    logger.error(f"[BROADCAST] Final flush failed: {str(e)}")
+            await self._conn.close()
+        self._conn = None
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "queued": len(self._outbox),
+            "notifies": self.notifies,
+            "reconnects": self.reconnects,
+            "connected": self._conn is not None and not self._conn.is_closed(),
+        })
+        return stats
+
+
+def create_broadcast(kind: str = BROADCAST_BACKEND) -> BroadcastBackend:
+    if kind == "memory":
+        return MemoryBroadcast()
+    if kind == "postgres":
+        return PostgresBroadcast(db.connect_dedicated)
+    raise ValueError(f"Unknown BROADCAST_BACKEND: {kind}")
+
+
+broadcaster = create_broadcast()
@@ -0,0 +1,237 @@
+"""
+In-process caching primitives shared across modules.
+
+Entries live in the memory of a single gunicorn worker, so anything cached
+here must tolerate being up to ``ttl`` seconds stale on the other workers.
+"""
+
+import asyncio
+import copy
+import functools
+import inspect
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple, Union
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def pop_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry for which ``predicate(key, value)`` is true; returns the count."""
+        doomed = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+        for key in doomed:
+            del self._data[key]
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        now = time.monotonic()
+        return ((key, value) for key, (expires_at, value) in list(self._data.items()) if expires_at > now)
+
+    def __contains__(self, key: Hashable) -> bool:
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    Storage behind ``cached``. Async so a shared store (e.g. Redis) can replace
+    the in-process default without touching call sites; ``get`` returns
+    ``MISSING`` on a miss so ``None`` stays cacheable.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self, prefix: str = "") -> None:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """Per-worker LRU backend built on TTLCache."""
+
+    def __init__(self, maxsize: int = 1024):
+        self._cache = TTLCache(maxsize=maxsize)
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key, MISSING)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.pop(key)
+
+    async def clear(self, prefix: str = "") -> None:
+        self._cache.pop_where(lambda key, _: key.startswith(prefix))
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+TTL = Union[float, Callable[..., float]]
+
+
+class CachedFunction:
+    """
+    An async function wrapped by ``cached``. Concurrent misses on one key share
+    a single call of the function (single-flight); the load runs in its own
+    task, so a caller that is cancelled does not cancel it for the others.
+    Failures are not cached.
+    """
+
+    def __init__(self, func: Callable[..., Awaitable[Any]], name: str, ttl: TTL,
+                 backend: CacheBackend, copy_result: bool):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.ttl = ttl
+        self.backend = backend
+        self.copy_result = copy_result
+        self.stats = CacheStats()
+        self._signature = inspect.signature(func)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def _bind(self, args, kwargs) -> inspect.BoundArguments:
+        bound = self._signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound
+
+    def key(self, *args, **kwargs) -> str:
+        """Cache key for a call; defaults are applied so equivalent calls share it."""
+        bound = self._bind(args, kwargs)
+        return f"{self.name}:{sorted(bound.arguments.items())!r}"
+
+    def _ttl_for(self, args, kwargs) -> float:
+        return self.ttl(*args, **kwargs) if callable(self.ttl) else self.ttl
+
+    def _out(self, value: Any) -> Any:
+        return copy.deepcopy(value) if self.copy_result else value
+
+    async def _load(self, key: str, args, kwargs) -> Any:
+        value = await self.func(*args, **kwargs)
+        await self.backend.set(key, value, self._ttl_for(args, kwargs))
+        return value
+
+    def _loaded(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.errors += 1
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        key = self.key(*args, **kwargs)
+        value = await self.backend.get(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            return self._out(value)
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats.misses += 1
+            task = asyncio.ensure_future(self._load(key, args, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._loaded, key))
+        else:
+            self.stats.coalesced += 1
+        return self._out(await asyncio.shield(task))
+
+    async def invalidate(self, *args, **kwargs) -> None:
+        """Drops one call's entry, or every entry of this function when called without arguments."""
+        if args or kwargs:
+            await self.backend.delete(self.key(*args, **kwargs))
+        else:
+            await self.backend.clear(f"{self.name}:")
+
+
+default_backend: CacheBackend = MemoryBackend()
+cache_registry: Dict[str, CachedFunction] = {}
+
+
+def cached(name: str, ttl: TTL, backend: Optional[CacheBackend] = None, copy_result: bool = True):
+    """
+    Caches an async function's results under ``name``. ``ttl`` is seconds, or
+    a callable taking the function's arguments and returning seconds, for
+    per-key lifetimes. Results are deep-copied on the way out unless
+    ``copy_result=False``, so callers may mutate what they get back.
+    """
+    if name in cache_registry:
+        raise ValueError(f"Duplicate cache name: {name}")
+
+    def decorate(func: Callable[..., Awaitable[Any]]) -> CachedFunction:
+        wrapped = CachedFunction(func, name, ttl, backend or default_backend, copy_result)
+        cache_registry[name] = wrapped
+        return wrapped
+
+    return decorate
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {name: wrapped.stats.as_dict() for name, wrapped in sorted(cache_registry.items())}
+
+
+async def clear_caches() -> None:
+    for wrapped in cache_registry.values():
+        await wrapped.invalidate()
@@ -1,49 +1,300 @@
+import asyncio
 import asyncpg
-from typing import Optional
+import time
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional
 from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Pool sizing is per gunicorn worker: 4 workers x DB_POOL_MAX_SIZE must stay
+# well under Postgres' max_connections on the 512 MB database container.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", 300))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 10))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+# Connections a single fan_out() call may hold at once, so one request's batch
+# never drains the pool.
+DB_FANOUT_CONCURRENCY = int(os.getenv("DB_FANOUT_CONCURRENCY", 3))
+
+# Optional streaming replica for heavy reads (admin listings and stats).
+DB_REPLICA_DSN = os.getenv("DB_REPLICA_DSN")
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 10))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 5))
+
+# Zero when fully caught up (or not in recovery at all); otherwise seconds
+# since the last replayed transaction.
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8
+    END
+"""
+
+ConnectionHook = Callable[[asyncpg.Connection], Awaitable[None]]
+
+
+class Read(NamedTuple):
+    """One independent read for Database.fan_out()."""
+    method: str
+    query: str
+    args: tuple = ()
+
+    @classmethod
+    def fetch(cls, query: str, *args) -> "Read":
+        return cls("fetch", query, args)
+
+    @classmethod
+    def fetchrow(cls, query: str, *args) -> "Read":
+        return cls("fetchrow", query, args)
+
+    @classmethod
+    def fetchval(cls, query: str, *args) -> "Read":
+        return cls("fetchval", query, args)
+
+
+class PoolMetrics:
+    """Acquire-side counters for the pool, reported by Database.pool_stats()."""
+
+    def __init__(self):
+        self.acquired = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
 class Database:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        self.metrics = PoolMetrics()
+        self.init_hooks: List[ConnectionHook] = []
+        self.replica_pool: Optional[asyncpg.Pool] = None
+        self.replica_metrics = PoolMetrics()
+        self._replica_healthy = True
+        self._replica_checked_at = float("-inf")
+        self._replica_check_lock = asyncio.Lock()
+
+    def add_init_hook(self, hook: ConnectionHook):
+        """Registers a coroutine run once on every new pooled connection (must precede connect())."""
+        self.init_hooks.append(hook)
+
+    async def _init_connection(self, connection: asyncpg.Connection):
+        for hook in self.init_hooks:
+            await hook(connection)
+
+    def _pool_options(self) -> dict:
+        return {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "max_inactive_connection_lifetime": DB_POOL_MAX_INACTIVE_LIFETIME,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {
+                "application_name": "amcan_backend",
+                "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS),
+            },
+            "init": self._init_connection,
+        }
+
+    @staticmethod
+    def _connect_params() -> dict:
+        return {
+            "user": os.getenv("DB_USER", "postgres"),
+            "password": os.getenv("DB_PASSWORD", "password"),
+            "database": os.getenv("DB_NAME", "amcan_db_lgzh"),
+            "host": os.getenv("DB_HOST", "localhost"),
+            "port": int(os.getenv("DB_PORT", 5432)),
+        }
 
     async def connect(self):
-        db_user = os.getenv("DB_USER", "postgres")
-        db_password = os.getenv("DB_PASSWORD", "password")
-        db_name = os.getenv("DB_NAME", "amcan_db_lgzh")
-        db_host = os.getenv("DB_HOST", "localhost")
-        db_port = int(os.getenv("DB_PORT", 5432))
+        params = self._connect_params()
 
-        print(f"[DB] Attempting connection with user='{db_user}', host='{db_host}', port={db_port}, db='{db_name}'")
+        print(f"[DB] Attempting connection with user='{params['user']}', host='{params['host']}', port={params['port']}, db='{params['database']}'")
+        print(f"[DB] Pool min_size={DB_POOL_MIN_SIZE}, max_size={DB_POOL_MAX_SIZE}, statement_cache_size={DB_STATEMENT_CACHE_SIZE}")
         try:
-            self.pool = await asyncpg.create_pool(
-                user=db_user,
-                password=db_password,
-                database=db_name,
-                host=db_host,
-                port=db_port
-            )
+            self.pool = await asyncpg.create_pool(**params, **self._pool_options())
             print("[DB] Successfully connected to the database.")
         except Exception as e:
             print(f"[DB] Failed to connect: {e}")
             raise
+        await self.connect_replica()
+
+    async def connect_replica(self):
+        """Opens the optional replica pool; failures leave all reads on the primary."""
+        if not DB_REPLICA_DSN:
+            return
+        try:
+            self.replica_pool = await asyncpg.create_pool(dsn=DB_REPLICA_DSN, **self._pool_options())
+            print("[DB] Connected to read replica.")
+        except Exception as e:
+            self.replica_pool = None
+            print(f"[DB] Read replica unavailable, reads will use the primary: {e}")
+
+    async def connect_dedicated(self) -> asyncpg.Connection:
+        """
+        Opens an unpooled connection to the primary for session state that
+        must outlive a checkout, such as LISTEN (shared.broadcast). The caller
+        closes it.
+        """
+        return await asyncpg.connect(
+            **self._connect_params(),
+            server_settings={"application_name": "amcan_backend:dedicated"},
+        )
 
     async def disconnect(self):
+        if self.replica_pool:
+            await self.replica_pool.close()
         if self.pool:
             await self.pool.close()
 
+    async def _checkout(self, pool: asyncpg.Pool, metrics: PoolMetrics) -> asyncpg.Connection:
+        metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = await pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            metrics.waiting -= 1
+        waited = time.perf_counter() - started
+        metrics.acquired += 1
+        metrics.total_wait += waited
+        metrics.max_wait = max(metrics.max_wait, waited)
+        metrics.in_use += 1
+        return connection
+
+    async def _checkin(self, pool: asyncpg.Pool, metrics: PoolMetrics, connection: asyncpg.Connection):
+        metrics.in_use -= 1
+        await pool.release(connection)
+
     @asynccontextmanager
-    async def get_connection(self):
+    async def acquire(self):
+        """Checks a connection out of the primary pool, recording wait time and saturation."""
         if not self.pool:
             raise Exception("Database not initialized")
-        async with self.pool.acquire() as connection:
-            async with connection.transaction():
+        connection = await self._checkout(self.pool, self.metrics)
+        try:
+            yield connection
+        finally:
+            await self._checkin(self.pool, self.metrics, connection)
+
+    async def replica_available(self) -> bool:
+        """
+        True when the replica pool exists and its replay lag was within
+        DB_REPLICA_MAX_LAG_SECONDS at the last check. Lag is re-probed at most
+        every DB_REPLICA_CHECK_INTERVAL seconds.
+        """
+        if not self.replica_pool:
+            return False
+        if time.monotonic() - self._replica_checked_at < DB_REPLICA_CHECK_INTERVAL:
+            return self._replica_healthy
+        async with self._replica_check_lock:
+            if time.monotonic() - self._replica_checked_at >= DB_REPLICA_CHECK_INTERVAL:
+                self._replica_healthy = await self._probe_replica()
+                self._replica_checked_at = time.monotonic()
+        return self._replica_healthy
+
+    async def _probe_replica(self) -> bool:
+        try:
+            async with self.replica_pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT) as connection:
+                lag = await connection.fetchval(REPLICA_LAG_QUERY)
+        except Exception as e:
+            print(f"[DB] Replica health check failed, using primary: {e}")
+            return False
+        if lag is not None and lag > DB_REPLICA_MAX_LAG_SECONDS:
+            print(f"[DB] Replica lagging {lag:.1f}s (max {DB_REPLICA_MAX_LAG_SECONDS}s), using primary")
+            return False
+        return True
+
+    def _mark_replica_unhealthy(self, error: Exception):
+        print(f"[DB] Replica acquire failed, using primary: {error}")
+        self._replica_healthy = False
+        self._replica_checked_at = time.monotonic()
+
+    @asynccontextmanager
+    async def get_connection(self, readonly: bool = False, replica: bool = False):
+        """
+        Yields a pooled connection inside a transaction. With readonly=True no
+        transaction is opened, saving the BEGIN/COMMIT round-trips on pure reads;
+        each statement then runs in its own implicit transaction.
+        readonly=True, replica=True additionally routes to the read replica when
+        one is configured and healthy, and silently falls back to the primary.
+        """
+        if readonly and replica and await self.replica_available():
+            try:
+                connection = await self._checkout(self.replica_pool, self.replica_metrics)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                self._mark_replica_unhealthy(e)
+            else:
+                try:
+                    yield connection
+                finally:
+                    await self._checkin(self.replica_pool, self.replica_metrics, connection)
+                return
+
+        async with self.acquire() as connection:
+            if readonly:
                 yield connection
+            else:
+                async with connection.transaction():
+                    yield connection
+
+    async def fan_out(self, *reads: Read, replica: bool = False) -> List[Any]:
+        """
+        Runs independent reads concurrently, each on its own readonly pooled
+        connection, and returns their results in order. Latency becomes the
+        slowest read instead of the sum of all of them. The reads do not share
+        a snapshot, so only batch queries that need not agree with each other.
+        """
+        slots = asyncio.Semaphore(DB_FANOUT_CONCURRENCY)
+
+        async def run(read: Read):
+            async with slots:
+                async with self.get_connection(readonly=True, replica=replica) as connection:
+                    return await getattr(connection, read.method)(read.query, *read.args)
+
+        return list(await asyncio.gather(*(run(read) for read in reads)))
+
+    @staticmethod
+    def _describe(pool: Optional[asyncpg.Pool], metrics: PoolMetrics) -> dict:
+        stats = metrics.as_dict()
+        if pool:
+            stats.update({
+                "size": pool.get_size(),
+                "idle": pool.get_idle_size(),
+                "min_size": pool.get_min_size(),
+                "max_size": pool.get_max_size(),
+            })
+        return stats
+
+    def pool_stats(self) -> dict:
+        stats = self._describe(self.pool, self.metrics)
+        if self.replica_pool:
+            stats["replica"] = self._describe(self.replica_pool, self.replica_metrics)
+            stats["replica"]["healthy"] = self._replica_healthy
+        return stats
+
 
 db = Database()
 
 async def init_db():
-    await db.connect()
\ No newline at end of file
+    await db.connect()
+
+async def close_db():
+    await db.disconnect()
@@ -0,0 +1,86 @@
+"""
+Periodic background jobs.
+
+Every app worker runs the same jobs, so each tick takes a transaction-scoped
+advisory lock first: the worker that gets it does the work, the others skip
+the tick. The job function receives the locked connection and runs inside its
+transaction.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional
+from shared.db import db
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_JOBS_ENABLED = os.getenv("BACKGROUND_JOBS_ENABLED", "true").lower() == "true"
+
+JobFunc = Callable[..., Awaitable[None]]
+
+
+class PeriodicJob:
+    def __init__(self, name: str, interval: float, func: JobFunc, lock_id: int):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.lock_id = lock_id
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> bool:
+        """Runs one tick; returns False when another worker holds the lock."""
+        async with db.get_connection() as conn:
+            if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", self.lock_id):
+                return False
+            await self.func(conn)
+            return True
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[JOBS] {self.name} failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name=f"job:{self.name}")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class JobScheduler:
+    def __init__(self):
+        self.jobs: Dict[str, PeriodicJob] = {}
+
+    def register(self, name: str, interval: float, func: JobFunc, lock_id: int) -> PeriodicJob:
+        job = PeriodicJob(name, interval, func, lock_id)
+        self.jobs[name] = job
+        return job
+
+    def start(self):
+        if not BACKGROUND_JOBS_ENABLED:
+            logger.info("[JOBS] Background jobs disabled")
+            return
+        for job in self.jobs.values():
+            job.start()
+        logger.info(f"[JOBS] Started {len(self.jobs)} job(s): {', '.join(self.jobs)}")
+
+    async def stop(self):
+        for job in self.jobs.values():
+            await job.stop()
+
+
+scheduler = JobScheduler()
@@ -0,0 +1,49 @@
+-- migrate: no-transaction
+-- Indexes behind the per-user and per-appointment lookups in the managers.
+-- Built CONCURRENTLY so applying them does not block writes on a live database.
+-- A failed concurrent build leaves an INVALID index that IF NOT EXISTS will skip;
+-- drop it by hand before re-running the migration.
+
+-- AppointmentManager.get_appointments_for_doctor / book_appointment slot checks
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_doctor_slot
+    ON appointments (doctor_id, slot_time);
+
+-- AppointmentManager.get_patient_appointments (ORDER BY slot_time DESC)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_patient_slot
+    ON appointments (patient_id, slot_time DESC);
+
+-- ChatManager.get_chat_history
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_messages_appointment_sent
+    ON chat_messages (appointment_id, sent_at);
+
+-- VideoCallManager.update_call_status / disconnect_websocket
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_video_calls_appointment_status
+    ON video_calls (appointment_id, status);
+
+-- DoctorManager.get_doctor_by_user_id, get_current_user principal joins
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_user_id
+    ON doctors (user_id);
+
+-- get_patient_by_user_id, get_current_user principal joins
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_user_id
+    ON patients (user_id);
+
+-- DoctorManager review aggregates and rating subqueries
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_reviews_doctor_id
+    ON doctors_reviews (doctor_id);
+
+-- DoctorManager patient-count subqueries
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_patients_doctor_id
+    ON doctors_patients (doctor_id);
+
+-- Patient listings joining appointments_summary on patient_id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_summary_patient_id
+    ON appointments_summary (patient_id);
+
+-- get_feeds (ORDER BY created_at DESC LIMIT/OFFSET)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_feed_items_created_at
+    ON feed_items (created_at DESC);
+
+-- blog get_blog_posts_by_mood (mood_relevance ? $1)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_blog_posts_mood_relevance
+    ON blog_posts USING GIN (mood_relevance);
@@ -0,0 +1,21 @@
+-- migrate: no-transaction
+-- Btree indexes behind the "today" / "this month" / "this year" stats filters,
+-- which now compare the raw column against a half-open range (shared.time_ranges).
+
+-- Today's appointment counts (doctor/patient/admin dashboards)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_slot_time
+    ON appointments (slot_time);
+
+-- Revenue and subscription stats by month/year
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_subscriptions_created_at
+    ON subscriptions (created_at);
+
+-- Dashboard "new this month" / "new today" counts
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_created_at
+    ON patients (created_at);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_created_at
+    ON doctors (created_at);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_video_calls_created_at
+    ON video_calls (created_at);
@@ -0,0 +1,54 @@
+-- migrate: no-transaction
+-- Rollup tables behind the admin /stats endpoints, maintained by the
+-- stats-rollup background job (shared.rollups). Everything here is derived
+-- data: a full rebuild from the source tables is always safe.
+
+-- New rows per day in patients / doctors / video_calls
+CREATE TABLE IF NOT EXISTS stats_daily_counts (
+    day DATE NOT NULL,
+    metric VARCHAR(32) NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, metric)
+);
+
+-- Active subscriptions and their plan revenue, by creation day / plan type / currency
+CREATE TABLE IF NOT EXISTS stats_daily_revenue (
+    day DATE NOT NULL,
+    plan_type VARCHAR(50) NOT NULL,
+    currency VARCHAR(3) NOT NULL,
+    subscription_count BIGINT NOT NULL DEFAULT 0,
+    revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, plan_type, currency)
+);
+
+-- Video calls per doctor (as initiator or receiver), per day and in total
+CREATE TABLE IF NOT EXISTS stats_doctor_calls_daily (
+    day DATE NOT NULL,
+    doctor_id INTEGER NOT NULL,
+    call_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, doctor_id)
+);
+
+CREATE TABLE IF NOT EXISTS stats_doctor_calls (
+    doctor_id INTEGER PRIMARY KEY,
+    call_count BIGINT NOT NULL DEFAULT 0
+);
+
+-- Platform-wide totals snapshot, rewritten on every refresh
+CREATE TABLE IF NOT EXISTS stats_totals (
+    metric VARCHAR(32) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS stats_rollup_state (
+    name VARCHAR(64) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL,
+    full_refreshed_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stats_doctor_calls_count
+    ON stats_doctor_calls (call_count DESC);
+
+-- Finds subscriptions whose status changed since the last refresh
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_subscriptions_updated_at
+    ON subscriptions (updated_at);
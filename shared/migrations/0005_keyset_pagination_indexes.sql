@@ -0,0 +1,36 @@
+-- migrate: no-transaction
+-- Composite (sort key, id) indexes behind cursor-mode list endpoints
+-- (shared.pagination). A row comparison such as (slot_time, id) < ($1, $2)
+-- only becomes an index range scan when an index covers both columns.
+-- Each composite also serves every lookup on its leading column, so the
+-- single-column index it supersedes is dropped after it is built.
+
+-- AppointmentManager.get_all_appointments (slot_time DESC, id DESC)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_slot_time_id
+    ON appointments (slot_time, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_appointments_slot_time;
+
+-- Admin notification and subscription lists, default sort created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_created_at_id
+    ON notifications (created_at, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_notifications_created_at;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_subscriptions_created_at_id
+    ON subscriptions (created_at, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_subscriptions_created_at;
+
+-- get_feeds / get_all_blog_posts (created_at DESC, id DESC)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_feed_items_created_at_id
+    ON feed_items (created_at, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_feed_items_created_at;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_blog_posts_created_at_id
+    ON blog_posts (created_at, id);
+
+-- DoctorManager.get_doctors sorts on the same COALESCE expressions it pages by
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_listing_keyset
+    ON doctors ((COALESCE(rating, -1)), (COALESCE(created_at, '0001-01-01')), id);
@@ -0,0 +1,30 @@
+-- migrate: no-transaction
+-- Trigram GIN indexes for the managers' search parameters (shared.search).
+-- Each index expression must match SearchDocument.sql() exactly for the planner
+-- to use it for '%term%' ILIKE searches.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- DoctorManager.get_doctors search
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_search_trgm
+    ON doctors USING GIN ((coalesce(first_name::text, '') || ' ' || coalesce(last_name::text, '') || ' ' || coalesce(title::text, '') || ' ' || coalesce(bio::text, '') || ' ' || coalesce(location::text, '')) gin_trgm_ops);
+
+-- get_all_appointments search on the doctor's name
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_name_trgm
+    ON doctors USING GIN ((coalesce(first_name::text, '') || ' ' || coalesce(last_name::text, '')) gin_trgm_ops);
+
+-- get_all_patients search
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_search_trgm
+    ON patients USING GIN ((coalesce(first_name::text, '') || ' ' || coalesce(last_name::text, '') || ' ' || coalesce(address::text, '') || ' ' || coalesce(occupation::text, '') || ' ' || coalesce(phone_number::text, '') || ' ' || coalesce(emergency_contact_name::text, '') || ' ' || coalesce(emergency_contact_phone::text, '')) gin_trgm_ops);
+
+-- Patient name in the appointment, notification and subscription searches
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_name_trgm
+    ON patients USING GIN ((coalesce(first_name::text, '') || ' ' || coalesce(last_name::text, '')) gin_trgm_ops);
+
+-- get_all_appointments search on the complaint
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_complain_trgm
+    ON appointments USING GIN ((coalesce(complain::text, '')) gin_trgm_ops);
+
+-- Notification and subscription user_search on email
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_email_trgm
+    ON users USING GIN ((coalesce(email::text, '')) gin_trgm_ops);
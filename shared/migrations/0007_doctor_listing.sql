@@ -0,0 +1,28 @@
+-- migrate: no-transaction
+-- Denormalized per-doctor summary read by DoctorManager.get_doctors instead of
+-- per-row correlated subqueries. Maintained by the doctor-listing background job
+-- and refreshed per doctor by the managers that write reviews, slots and
+-- bookings (modules.doctors.listing). Derived data: a full rebuild is always safe.
+
+CREATE TABLE IF NOT EXISTS doctor_listing (
+    doctor_id INTEGER PRIMARY KEY REFERENCES doctors(id) ON DELETE CASCADE,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    review_avg NUMERIC(3,2),
+    experience_count INTEGER NOT NULL DEFAULT 0,
+    patient_count INTEGER NOT NULL DEFAULT 0,
+    -- appointment_count_today is only valid while appointments_on = CURRENT_DATE
+    appointments_on DATE NOT NULL DEFAULT CURRENT_DATE,
+    appointment_count_today INTEGER NOT NULL DEFAULT 0,
+    -- Next open slots: [{"slot_id", "available_at"}] in time order
+    next_slots JSONB NOT NULL DEFAULT '[]',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-doctor lookups in the refresh (reviews, doctors_patients and slots are
+-- already covered by 0001/0002)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctors_experience_doctor_id
+    ON doctors_experience (doctor_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doctor_availability_slots_open
+    ON doctor_availability_slots (doctor_id, available_at)
+    WHERE status = 'available';
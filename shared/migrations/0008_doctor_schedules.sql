@@ -0,0 +1,37 @@
+-- Recurring weekly availability templates, expanded into
+-- doctor_availability_slots by DoctorManager.generate_slots
+-- (modules.doctors.availability.GENERATE_SLOTS_QUERY).
+
+-- One working window per row; several rows per weekday are allowed.
+-- weekday follows EXTRACT(DOW): 0 = Sunday ... 6 = Saturday. Times are wall
+-- clock times in the schedule's IANA time zone.
+CREATE TABLE IF NOT EXISTS doctor_schedules (
+    id SERIAL PRIMARY KEY,
+    doctor_id INTEGER NOT NULL REFERENCES doctors(id) ON DELETE CASCADE,
+    weekday SMALLINT NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    slot_minutes INTEGER NOT NULL DEFAULT 30 CHECK (slot_minutes BETWEEN 5 AND 480),
+    timezone VARCHAR(64) NOT NULL DEFAULT 'Africa/Lagos',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CHECK (end_time > start_time)
+);
+
+CREATE INDEX IF NOT EXISTS idx_doctor_schedules_doctor_id ON doctor_schedules (doctor_id);
+
+-- Days (or part of a day, when start_time/end_time are set) to leave out
+-- when generating slots, in the schedule's local time.
+CREATE TABLE IF NOT EXISTS doctor_schedule_exceptions (
+    id SERIAL PRIMARY KEY,
+    doctor_id INTEGER NOT NULL REFERENCES doctors(id) ON DELETE CASCADE,
+    exception_date DATE NOT NULL,
+    start_time TIME,
+    end_time TIME,
+    reason TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CHECK ((start_time IS NULL) = (end_time IS NULL)),
+    CHECK (end_time > start_time)
+);
+
+CREATE INDEX IF NOT EXISTS idx_doctor_schedule_exceptions_doctor_date
+    ON doctor_schedule_exceptions (doctor_id, exception_date);
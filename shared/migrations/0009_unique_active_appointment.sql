@@ -0,0 +1,32 @@
+-- migrate: no-transaction
+-- At most one active (pending or confirmed) appointment per doctor and slot
+-- time. AppointmentManager.book_appointment claims the slot row atomically;
+-- this index also covers writes that do not go through the slot row
+-- (reschedule_appointment, update_appointment).
+
+-- Existing duplicates would fail the index build. Which booking to keep is a
+-- business decision, so stop here and list them rather than cancel any.
+DO $$
+DECLARE
+    duplicates text;
+BEGIN
+    SELECT string_agg(
+        format('doctor_id=%s slot_time=%s appointment ids=%s', doctor_id, slot_time, ids),
+        E'\n'
+    )
+    INTO duplicates
+    FROM (
+        SELECT doctor_id, slot_time, array_agg(id ORDER BY id) AS ids
+        FROM appointments
+        WHERE status IN ('pending', 'confirmed')
+        GROUP BY doctor_id, slot_time
+        HAVING COUNT(*) > 1
+    ) d;
+    IF duplicates IS NOT NULL THEN
+        RAISE EXCEPTION 'Duplicate active appointments; cancel all but one per slot, then re-run migrations:%', E'\n' || duplicates;
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_appointments_doctor_slot_active
+    ON appointments (doctor_id, slot_time)
+    WHERE status IN ('pending', 'confirmed');
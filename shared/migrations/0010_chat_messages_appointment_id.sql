@@ -0,0 +1,10 @@
+-- migrate: no-transaction
+-- Chat history is read by id within an appointment: latest page, older pages
+-- (id < before_id) and catch-up after a reconnect (id > after_id), all
+-- range scans on this index. It replaces the (appointment_id, sent_at)
+-- index from 0002, which only the old unpaginated history read used.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_messages_appointment_id
+    ON chat_messages (appointment_id, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_chat_messages_appointment_sent;
@@ -0,0 +1,161 @@
+"""
+Versioned schema migrations.
+
+Migrations are the ``NNNN_description.sql`` files in this package, applied in
+version order and recorded in the ``schema_version`` table. They are run once
+per deploy with ``python main.py --migrate``; app workers only verify that the
+database is at the latest version.
+
+Each file runs inside a single transaction unless its first line is
+``-- migrate: no-transaction`` (needed for ``CREATE INDEX CONCURRENTLY``). Such
+files are executed one ``;``-terminated statement at a time, so every statement
+in them must be idempotent (``IF NOT EXISTS``) to survive a retried run.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+from shared.db import db
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+# Arbitrary application-wide key for pg_advisory_lock; only one process migrates at a time.
+MIGRATION_LOCK_ID = 720_190_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+    def statements(self) -> List[str]:
+        """Splits the file on statement-terminating semicolons at line ends.
+
+        Semicolons inside a ``$$``-quoted body (``DO $$ ... $$;``) do not end
+        the statement.
+        """
+        statements, current = [], []
+        in_dollar_quote = False
+        for line in self.sql.splitlines():
+            if not current and (not line.strip() or line.strip().startswith("--")):
+                continue
+            current.append(line)
+            if line.count("$$") % 2:
+                in_dollar_quote = not in_dollar_quote
+            if not in_dollar_quote and line.rstrip().endswith(";"):
+                statement = "\n".join(current).strip()
+                if statement:
+                    statements.append(statement)
+                current = []
+        trailing = "\n".join(current).strip()
+        if trailing:
+            statements.append(trailing)
+        return statements
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            migrations.append(Migration(int(match.group(1)), match.group(2), f.read()))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def latest_version(migrations: Optional[List[Migration]] = None) -> int:
+    migrations = discover_migrations() if migrations is None else migrations
+    return migrations[-1].version if migrations else 0
+
+
+async def _ensure_version_table(conn):
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+async def _applied_versions(conn) -> set:
+    rows = await conn.fetch("SELECT version FROM schema_version")
+    return {row["version"] for row in rows}
+
+
+async def _apply(conn, migration: Migration):
+    logger.info(f"[MIGRATIONS] Applying {migration.version:04d}_{migration.name}")
+    record = "INSERT INTO schema_version (version, name) VALUES ($1, $2)"
+    if migration.transactional:
+        async with conn.transaction():
+            await conn.execute(migration.sql)
+            await conn.execute(record, migration.version, migration.name)
+    else:
+        for statement in migration.statements():
+            await conn.execute(statement)
+        await conn.execute(record, migration.version, migration.name)
+
+
+async def migrate(migrations: Optional[List[Migration]] = None) -> List[int]:
+    """
+    Applies pending migrations under an advisory lock and returns the versions
+    applied. Safe to call from several processes at once: the others wait for
+    the lock and then find nothing left to do.
+    """
+    migrations = discover_migrations() if migrations is None else migrations
+    applied_now = []
+    async with db.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            await _ensure_version_table(conn)
+            applied = await _applied_versions(conn)
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                await _apply(conn, migration)
+                applied_now.append(migration.version)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+    if applied_now:
+        logger.info(f"[MIGRATIONS] Applied {len(applied_now)} migration(s), now at version {applied_now[-1]}")
+    else:
+        logger.info("[MIGRATIONS] Schema already up to date")
+    return applied_now
+
+
+async def current_version() -> int:
+    async with db.get_connection(readonly=True) as conn:
+        exists = await conn.fetchval("SELECT to_regclass('schema_version') IS NOT NULL")
+        if not exists:
+            return 0
+        return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+
+
+async def verify_schema() -> int:
+    """Raises RuntimeError unless every known migration has been applied."""
+    expected = latest_version()
+    version = await current_version()
+    if version < expected:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {expected}. "
+            "Run `python main.py --migrate` before starting the app."
+        )
+    return version
@@ -0,0 +1,167 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Page mode (``LIMIT n OFFSET k``) makes Postgres produce and discard ``k`` rows,
+so deep pages get slower linearly, and every page also pays a full COUNT(*).
+Cursor mode instead continues strictly after the last row of the previous page:
+
+    keyset = Keyset(SortKey("a.slot_time"), SortKey("a.id"))
+    condition, cursor_params = keyset.condition(cursor, param_idx)
+    query = f"SELECT ..., {keyset.columns()} FROM ... WHERE ... {keyset.order_by()} LIMIT {keyset.fetch_size(n)}"
+    items, next_cursor = keyset.paginate(rows, n)
+
+The last sort key must be unique (normally the primary key) so the order is
+total. Cursors are opaque, URL-safe strings; an empty cursor (``?cursor=``)
+asks for the first page in cursor mode. Totals in cursor mode come from
+``cursor_total``: a planner estimate for unfiltered lists, otherwise an exact
+count cached for PAGINATION_COUNT_TTL seconds.
+"""
+
+import base64
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from shared.cache import cached
+from shared.db import db
+
+PAGINATION_COUNT_TTL = float(os.getenv("PAGINATION_COUNT_TTL", 30))
+
+CURSOR_COLUMN_PREFIX = "_cursor_"
+
+
+@dataclass(frozen=True)
+class SortKey:
+    expr: str
+    descending: bool = True
+    # SQL literal substituted for NULL, since keyset comparisons skip NULLs
+    null_as: Optional[str] = None
+
+    @property
+    def sql(self) -> str:
+        return f"COALESCE({self.expr}, {self.null_as})" if self.null_as else self.expr
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return [_decode_value(v) for v in values]
+
+
+class Keyset:
+    def __init__(self, *keys: SortKey):
+        if not keys:
+            raise ValueError("Keyset needs at least one sort key")
+        self.keys = keys
+
+    def columns(self) -> str:
+        """Select-list entries carrying each row's sort values, for the next cursor."""
+        return ", ".join(f"{key.sql} AS {CURSOR_COLUMN_PREFIX}{i}" for i, key in enumerate(self.keys))
+
+    def order_by(self) -> str:
+        return "ORDER BY " + ", ".join(f"{key.sql} {'DESC' if key.descending else 'ASC'}" for key in self.keys)
+
+    @staticmethod
+    def fetch_size(limit: int) -> int:
+        """One extra row tells whether another page follows."""
+        return limit + 1
+
+    def condition(self, cursor: Optional[str], param_idx: int) -> Tuple[Optional[str], list]:
+        """
+        WHERE fragment selecting rows after ``cursor`` (None for the first
+        page), numbered from ``$param_idx``, and its parameters.
+        """
+        if not cursor:
+            return None, []
+        values = decode_cursor(cursor)
+        if len(values) != len(self.keys):
+            raise ValueError("Invalid cursor")
+        placeholders = [f"${param_idx + i}" for i in range(len(values))]
+        directions = {key.descending for key in self.keys}
+        if len(directions) == 1:
+            op = "<" if self.keys[0].descending else ">"
+            lhs = ", ".join(key.sql for key in self.keys)
+            return f"({lhs}) {op} ({', '.join(placeholders)})", values
+        # Mixed directions: (k0 after v0) OR (k0 = v0 AND k1 after v1) OR ...
+        branches = []
+        for i, key in enumerate(self.keys):
+            terms = [f"{self.keys[j].sql} = {placeholders[j]}" for j in range(i)]
+            terms.append(f"{key.sql} {'<' if key.descending else '>'} {placeholders[i]}")
+            branches.append("(" + " AND ".join(terms) + ")")
+        return "(" + " OR ".join(branches) + ")", values
+
+    def paginate(self, rows: Sequence[Any], limit: int) -> Tuple[List[dict], Optional[str]]:
+        """Trims the look-ahead row and returns (items, next_cursor)."""
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and items:
+            last = items[-1]
+            next_cursor = encode_cursor([last[f"{CURSOR_COLUMN_PREFIX}{i}"] for i in range(len(self.keys))])
+        for item in items:
+            for i in range(len(self.keys)):
+                item.pop(f"{CURSOR_COLUMN_PREFIX}{i}", None)
+        return items, next_cursor
+
+
+@cached("pagination.count", ttl=PAGINATION_COUNT_TTL)
+async def cached_count(query: str, params: tuple = (), replica: bool = False) -> int:
+    async with db.get_connection(readonly=True, replica=replica) as conn:
+        return await conn.fetchval(query, *params)
+
+
+async def estimated_count(table: str, replica: bool = False) -> int:
+    """Row count from planner statistics; free, but only as fresh as the last ANALYZE."""
+    async with db.get_connection(readonly=True, replica=replica) as conn:
+        estimate = await conn.fetchval(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass($1)", table
+        )
+    return max(int(estimate or 0), 0)
+
+
+async def cursor_total(table: str, count_query: str, params: Sequence[Any] = (), replica: bool = False) -> Dict[str, Any]:
+    """Total for cursor-mode meta: estimated when unfiltered, else a cached exact count."""
+    if not params:
+        return {"total": await estimated_count(table, replica), "total_estimated": True}
+    return {"total": await cached_count(count_query, tuple(params), replica), "total_estimated": False}
+
+
+def cursor_meta(page_size: int, next_cursor: Optional[str], total: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None,
+        **(total or {}),
+    }
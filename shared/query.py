@@ -0,0 +1,123 @@
+"""
+WHERE-clause and page builders shared by the list managers.
+
+Filters collects conditions and numbers their ``$n`` placeholders, replacing
+the hand-kept ``filters``/``params``/``param_idx`` triples. ``{}`` in a
+condition takes the next value; ``{0}`` lets one value appear several times
+(literal braces must be doubled):
+
+    filters = Filters()
+    if doctor_id is not None:
+        filters.add("a.doctor_id = {}", doctor_id)
+    if search:
+        filters.add("(d.first_name ILIKE {0} OR d.last_name ILIKE {0})", f"%{search}%")
+
+PagedQuery turns the select list, FROM clause and filters into one statement
+returning the page together with ``count(*) OVER()``, so the joins and
+filters run once instead of once for a COUNT and again for the rows. The
+window total is only missing when the page is past the end; fetch() then
+falls back to a separate count.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+from shared.pagination import Keyset
+
+TOTAL_COLUMN = "_total_count"
+
+
+class Filters:
+    def __init__(self):
+        self.conditions: List[str] = []
+        self.params: List[Any] = []
+
+    @property
+    def next_index(self) -> int:
+        return len(self.params) + 1
+
+    def param(self, value: Any) -> str:
+        """Binds ``value`` and returns its placeholder."""
+        self.params.append(value)
+        return f"${len(self.params)}"
+
+    def add(self, condition: str, *values: Any) -> "Filters":
+        placeholders = [self.param(value) for value in values]
+        self.conditions.append(condition.format(*placeholders))
+        return self
+
+    def add_numbered(self, condition: str, params: Iterable[Any]) -> "Filters":
+        """Adds a condition already numbered from next_index, e.g. Keyset.condition()."""
+        self.conditions.append(condition)
+        self.params.extend(params)
+        return self
+
+    def copy(self) -> "Filters":
+        clone = Filters()
+        clone.conditions = list(self.conditions)
+        clone.params = list(self.params)
+        return clone
+
+    def where(self) -> str:
+        return f"WHERE {' AND '.join(self.conditions)}" if self.conditions else ""
+
+
+@dataclass
+class PagedQuery:
+    select: str
+    from_clause: str
+    filters: Filters
+    order_by: str
+    group_by: str = ""
+    # FROM clause for count() when the extra joins only feed aggregates
+    count_from: str = ""
+
+    def _body(self, filters: Filters) -> str:
+        group_by = f"GROUP BY {self.group_by}" if self.group_by else ""
+        return f"FROM {self.from_clause} {filters.where()} {group_by}"
+
+    def page(self, limit: int, offset: int) -> Tuple[str, list]:
+        """Rows for one page plus the filtered total in TOTAL_COLUMN."""
+        filters = self.filters.copy()
+        body = self._body(filters)
+        query = (
+            f"SELECT {self.select}, count(*) OVER() AS {TOTAL_COLUMN} {body} "
+            f"ORDER BY {self.order_by} LIMIT {filters.param(limit)} OFFSET {filters.param(offset)}"
+        )
+        return query, filters.params
+
+    def count(self) -> Tuple[str, list]:
+        if self.count_from:
+            return f"SELECT COUNT(*) FROM {self.count_from} {self.filters.where()}", list(self.filters.params)
+        body = self._body(self.filters)
+        if self.group_by:
+            return f"SELECT COUNT(*) FROM (SELECT 1 {body}) grouped", list(self.filters.params)
+        return f"SELECT COUNT(*) {body}", list(self.filters.params)
+
+    def keyset_page(self, keyset: Keyset, cursor: Optional[str], limit: int) -> Tuple[str, list]:
+        """Cursor-mode page (see shared.pagination); no window total, which would only count the rows after the cursor."""
+        filters = self.filters.copy()
+        condition, cursor_params = keyset.condition(cursor, filters.next_index)
+        if condition:
+            filters.add_numbered(condition, cursor_params)
+        query = (
+            f"SELECT {self.select}, {keyset.columns()} {self._body(filters)} "
+            f"{keyset.order_by()} LIMIT {keyset.fetch_size(limit)}"
+        )
+        return query, filters.params
+
+    async def fetch(self, conn, limit: int, offset: int) -> Tuple[List[dict], int]:
+        query, params = self.page(limit, offset)
+        rows, total = split_total(await conn.fetch(query, *params))
+        if total is None and offset:
+            count_query, count_params = self.count()
+            total = await conn.fetchval(count_query, *count_params)
+        return rows, total or 0
+
+
+def split_total(rows: Sequence[Any]) -> Tuple[List[dict], Optional[int]]:
+    """Strips TOTAL_COLUMN from page rows; the total is None for an empty page."""
+    items = [dict(row) for row in rows]
+    total = None
+    for item in items:
+        total = item.pop(TOTAL_COLUMN, total)
+    return items, total
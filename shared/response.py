@@ -1,4 +1,8 @@
+import hashlib
+import json
 from typing import Any, Dict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
 from decimal import Decimal
@@ -25,4 +29,26 @@ def error_response(message: str, status_code: int = 400, data: Any = None) -> JS
         "message": message,
         "data": data
     }
-    return JSONResponse(content=response, status_code=status_code)
\ No newline at end of file
+    return JSONResponse(content=response, status_code=status_code)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored.
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def etag_response(request: Request, data: Any = None, message: str = "Success") -> Response:
+    """
+    success_response with an ETag computed over the encoded body. Answers 304
+    with no body when the client's If-None-Match already names that ETag, so
+    unchanged list pages are not re-sent.
+    """
+    content = jsonable_encoder(success_response(data=data, message=message))
+    body = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
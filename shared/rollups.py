@@ -0,0 +1,172 @@
+"""
+Analytics rollups behind the admin /stats endpoints.
+
+``refresh_rollups`` keeps the ``stats_*`` tables (migration 0004) in step with
+the source tables. It runs as the ``stats-rollup`` background job:
+
+- an incremental refresh recomputes every day since the previous refresh
+  (minus ``ROLLUP_OVERLAP`` for late commits), plus the creation days of
+  subscriptions whose ``updated_at`` moved since then;
+- a full rebuild runs on the first refresh and then every
+  ``STATS_ROLLUP_FULL_REBUILD_HOURS``, which also picks up deleted rows.
+
+GeneralStats reads only these tables, so its numbers trail the source tables
+by at most one refresh interval.
+"""
+
+import logging
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, List
+from shared.db import db
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "platform"
+# pg_advisory lock key; see also MIGRATION_LOCK_ID.
+ROLLUP_LOCK_ID = 720_190_002
+STATS_ROLLUP_INTERVAL = int(os.getenv("STATS_ROLLUP_INTERVAL", "60"))
+STATS_ROLLUP_FULL_REBUILD_HOURS = int(os.getenv("STATS_ROLLUP_FULL_REBUILD_HOURS", "24"))
+# created_at/updated_at are stamped at transaction start, so a row can commit
+# after a refresh with a timestamp before it.
+ROLLUP_OVERLAP = timedelta(minutes=10)
+
+REVENUE_COLUMNS = """
+    s.subscription_type,
+    COALESCE(sp.currency, 'NGN'),
+    COUNT(*),
+    COALESCE(SUM(sp.price), 0)
+"""
+
+
+async def _refresh_daily_counts(conn, since_day: date):
+    await conn.execute("DELETE FROM stats_daily_counts WHERE day >= $1", since_day)
+    await conn.execute("""
+        INSERT INTO stats_daily_counts (day, metric, value)
+        SELECT created_at::date, 'patients', COUNT(*) FROM patients WHERE created_at >= $1::date GROUP BY 1
+        UNION ALL
+        SELECT created_at::date, 'doctors', COUNT(*) FROM doctors WHERE created_at >= $1::date GROUP BY 1
+        UNION ALL
+        SELECT created_at::date, 'video_calls', COUNT(*) FROM video_calls WHERE created_at >= $1::date GROUP BY 1
+    """, since_day)
+
+
+async def _refresh_daily_revenue(conn, since_day: date, dirty_days: List[date]):
+    await conn.execute(
+        "DELETE FROM stats_daily_revenue WHERE day >= $1 OR day = ANY($2::date[])",
+        since_day, dirty_days
+    )
+    await conn.execute(f"""
+        INSERT INTO stats_daily_revenue (day, plan_type, currency, subscription_count, revenue)
+        SELECT s.created_at::date, {REVENUE_COLUMNS}
+        FROM subscriptions s
+        LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
+        WHERE s.created_at >= $1::date AND s.status = 'active'
+        GROUP BY 1, 2, 3
+    """, since_day)
+    if dirty_days:
+        await conn.execute(f"""
+            INSERT INTO stats_daily_revenue (day, plan_type, currency, subscription_count, revenue)
+            SELECT dirty.day, {REVENUE_COLUMNS}
+            FROM unnest($1::date[]) AS dirty(day)
+            JOIN subscriptions s ON s.created_at >= dirty.day AND s.created_at < dirty.day + 1
+            LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
+            WHERE s.status = 'active'
+            GROUP BY 1, 2, 3
+        """, dirty_days)
+
+
+async def _refresh_doctor_calls(conn, since_day: date, full: bool):
+    removed = await conn.fetch(
+        "DELETE FROM stats_doctor_calls_daily WHERE day >= $1 RETURNING doctor_id", since_day
+    )
+    added = await conn.fetch("""
+        INSERT INTO stats_doctor_calls_daily (day, doctor_id, call_count)
+        SELECT vc.created_at::date, d.id, COUNT(*)
+        FROM video_calls vc
+        JOIN doctors d ON d.user_id IN (vc.initiator_id, vc.receiver_id)
+        WHERE vc.created_at >= $1::date
+        GROUP BY 1, 2
+        RETURNING doctor_id
+    """, since_day)
+    if full:
+        await conn.execute("DELETE FROM stats_doctor_calls")
+        await conn.execute("""
+            INSERT INTO stats_doctor_calls (doctor_id, call_count)
+            SELECT doctor_id, SUM(call_count) FROM stats_doctor_calls_daily GROUP BY doctor_id
+        """)
+        return
+    touched = list({row["doctor_id"] for row in removed} | {row["doctor_id"] for row in added})
+    if not touched:
+        return
+    await conn.execute("DELETE FROM stats_doctor_calls WHERE doctor_id = ANY($1::int[])", touched)
+    await conn.execute("""
+        INSERT INTO stats_doctor_calls (doctor_id, call_count)
+        SELECT doctor_id, SUM(call_count) FROM stats_doctor_calls_daily
+        WHERE doctor_id = ANY($1::int[])
+        GROUP BY doctor_id
+    """, touched)
+
+
+async def _refresh_totals(conn):
+    await conn.execute("DELETE FROM stats_totals")
+    await conn.execute("""
+        INSERT INTO stats_totals (metric, value)
+        SELECT metric, SUM(value) FROM stats_daily_counts GROUP BY metric
+        UNION ALL
+        SELECT 'active_subscriptions', COUNT(*) FROM subscriptions WHERE status = 'active'
+        UNION ALL
+        SELECT 'subscribed_patients', COUNT(DISTINCT user_id) FROM subscriptions WHERE status = 'active'
+    """)
+
+
+async def refresh_rollups(conn, full: bool = False) -> Dict[str, Any]:
+    """
+    Brings the rollup tables up to date. Must run inside a transaction (the
+    background job provides one) so readers never see a half-applied refresh.
+    """
+    now = await conn.fetchval("SELECT LOCALTIMESTAMP")
+    state = await conn.fetchrow(
+        "SELECT refreshed_at, full_refreshed_at FROM stats_rollup_state WHERE name = $1", ROLLUP_NAME
+    )
+    full = (
+        full
+        or state is None
+        or now - state["full_refreshed_at"] >= timedelta(hours=STATS_ROLLUP_FULL_REBUILD_HOURS)
+    )
+
+    if full:
+        since_day, dirty_days = date.min, []
+    else:
+        since = state["refreshed_at"] - ROLLUP_OVERLAP
+        since_day = since.date()
+        rows = await conn.fetch("""
+            SELECT DISTINCT created_at::date AS day FROM subscriptions
+            WHERE updated_at >= $1 AND created_at < $2::date
+        """, since, since_day)
+        dirty_days = [row["day"] for row in rows]
+
+    await _refresh_daily_counts(conn, since_day)
+    await _refresh_daily_revenue(conn, since_day, dirty_days)
+    await _refresh_doctor_calls(conn, since_day, full)
+    await _refresh_totals(conn)
+
+    await conn.execute("""
+        INSERT INTO stats_rollup_state (name, refreshed_at, full_refreshed_at)
+        VALUES ($1, $2, $2)
+        ON CONFLICT (name) DO UPDATE SET
+            refreshed_at = EXCLUDED.refreshed_at,
+            full_refreshed_at = CASE WHEN $3 THEN EXCLUDED.full_refreshed_at
+                                     ELSE stats_rollup_state.full_refreshed_at END
+    """, ROLLUP_NAME, now, full)
+
+    summary = {"full": full, "since": since_day, "dirty_days": len(dirty_days), "refreshed_at": now}
+    logger.info(f"[ROLLUPS] Refreshed {'all days' if full else f'from {since_day}'} (+{len(dirty_days)} dirty day(s))")
+    return summary
+
+
+async def rebuild_rollups() -> Dict[str, Any]:
+    """Full rebuild outside the scheduler, e.g. from a shell after a data fix."""
+    async with db.get_connection() as conn:
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", ROLLUP_LOCK_ID)
+        return await refresh_rollups(conn, full=True)
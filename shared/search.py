@@ -0,0 +1,73 @@
+"""
+Trigram search behind the list managers' ``search`` parameters.
+
+Each SearchDocument is the searchable text of one table, concatenated into a
+single expression. Migration 0006 builds a pg_trgm GIN index on exactly that
+expression, so ``document ILIKE '%term%'`` becomes a bitmap index scan
+instead of one leading-wildcard ILIKE per column over the whole table.
+The expression in the migration and ``SearchDocument.sql()`` must stay
+identical or the planner will not use the index (test_search checks this).
+
+    filters.add(DOCTOR_SEARCH.matches("d"), like_pattern(search))
+
+Searches across a join (an appointment's patient name) use ids_matching(),
+which resolves the matching ids through the other table's index first.
+
+Terms shorter than three characters have no trigrams and fall back to a scan.
+Results keep each endpoint's existing sort order, so page and cursor
+pagination behave the same with or without a search term.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+def like_pattern(term: str) -> str:
+    """``%term%`` with LIKE wildcards in the user's term escaped."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+@dataclass(frozen=True)
+class SearchDocument:
+    table: str
+    columns: Tuple[str, ...]
+
+    def sql(self, alias: Optional[str] = None) -> str:
+        prefix = f"{alias}." if alias else ""
+        return " || ' ' || ".join(f"coalesce({prefix}{column}::text, '')" for column in self.columns)
+
+    def matches(self, alias: Optional[str] = None) -> str:
+        """Condition for Filters.add(); the pattern binds to ``{0}``."""
+        return f"({self.sql(alias)}) ILIKE {{0}}"
+
+    def ids_matching(self, column: str, key: str = "id") -> str:
+        """
+        Condition on a column referencing this table. The subquery runs once as
+        an init plan on the trigram index and the array probes ``column``'s
+        btree index, so searches across a join stay index-driven.
+        """
+        return f"{column} = ANY(ARRAY(SELECT {key} FROM {self.table} WHERE {self.matches()}))"
+
+
+DOCTOR_SEARCH = SearchDocument("doctors", ("first_name", "last_name", "title", "bio", "location"))
+DOCTOR_NAME_SEARCH = SearchDocument("doctors", ("first_name", "last_name"))
+PATIENT_SEARCH = SearchDocument(
+    "patients",
+    (
+        "first_name", "last_name", "address", "occupation", "phone_number",
+        "emergency_contact_name", "emergency_contact_phone",
+    ),
+)
+PATIENT_NAME_SEARCH = SearchDocument("patients", ("first_name", "last_name"))
+APPOINTMENT_COMPLAIN_SEARCH = SearchDocument("appointments", ("complain",))
+USER_EMAIL_SEARCH = SearchDocument("users", ("email",))
+
+SEARCH_DOCUMENTS = (
+    DOCTOR_SEARCH,
+    DOCTOR_NAME_SEARCH,
+    PATIENT_SEARCH,
+    PATIENT_NAME_SEARCH,
+    APPOINTMENT_COMPLAIN_SEARCH,
+    USER_EMAIL_SEARCH,
+)
@@ -6,6 +6,10 @@ Provides endpoints for accessing platform statistics and analytics
 from fastapi import APIRouter, Depends, Query
 from typing import Optional, Literal
 from .utils import GeneralStats
+from .broadcast import broadcaster
+from .cache import cache_stats
+from .db import db
+from .ws_hub import hub_stats
 from .response import success_response, error_response
 from modules.auth.utils import get_current_admin
 
@@ -60,3 +64,55 @@ async def get_revenue_analytics(
         )
     except Exception as e:
         return error_response(str(e), status_code=500)
+
+@router.get("/db-pool")
+async def get_db_pool_stats(current_admin: dict = Depends(get_current_admin)):
+    """
+    Get connection pool saturation metrics for this worker (Admin only)
+    """
+    try:
+        return success_response(
+            data=db.pool_stats(),
+            message="Database pool statistics retrieved successfully"
+        )
+    except Exception as e:
+        return error_response(str(e), status_code=500)
+
+@router.get("/cache")
+async def get_cache_stats(current_admin: dict = Depends(get_current_admin)):
+    """
+    Get hit/miss counters of the cached stats functions for this worker (Admin only)
+    """
+    try:
+        return success_response(
+            data=cache_stats(),
+            message="Cache statistics retrieved successfully"
+        )
+    except Exception as e:
+        return error_response(str(e), status_code=500)
+
+@router.get("/broadcast")
+async def get_broadcast_stats(current_admin: dict = Depends(get_current_admin)):
+    """
+    Get pub/sub backend counters (published, delivered, queued) for this worker (Admin only)
+    """
+    try:
+        return success_response(
+            data=broadcaster.stats(),
+            message="Broadcast statistics retrieved successfully"
+        )
+    except Exception as e:
+        return error_response(str(e), status_code=500)
+
+@router.get("/ws-hubs")
+async def get_ws_hub_stats(current_admin: dict = Depends(get_current_admin)):
+    """
+    Get WebSocket send queue depth and dropped/closed counters per hub for this worker (Admin only)
+    """
+    try:
+        return success_response(
+            data=hub_stats(),
+            message="WebSocket hub statistics retrieved successfully"
+        )
+    except Exception as e:
+        return error_response(str(e), status_code=500)
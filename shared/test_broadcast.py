@@ -0,0 +1,110 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from .broadcast import NOTIFY_PAYLOAD_LIMIT, BroadcastBackend, MemoryBroadcast, PostgresBroadcast
+
+
+@pytest.mark.asyncio
+async def test_memory_broadcast_delivers_to_channel_subscribers_only():
+    backend = MemoryBroadcast()
+    received = []
+
+    async def good(message):
+        received.append(message)
+
+    async def bad(message):
+        raise RuntimeError("socket closed")
+
+    backend.subscribe("chat:1", bad)
+    backend.subscribe("chat:1", good)
+    await backend.publish("chat:1", {"n": 1})
+    await backend.publish("chat:2", {"n": 2})
+    assert received == [{"n": 1}]
+    assert backend.stats()["handler_errors"] == 1
+
+    backend.unsubscribe("chat:1", good)
+    backend.unsubscribe("chat:1", bad)
+    assert not backend.subscribed("chat:1")
+
+
+def test_pack_batches_small_messages_and_fragments_large_ones():
+    backend = PostgresBroadcast(connect=AsyncMock())
+    small = [backend.encode("chat:1", {"n": i}) for i in range(300)]
+    big = backend.encode("chat:2", {"text": "ü" * 20000})
+    payloads = backend.pack(small + [big] + small[:2])
+    assert all(len(p.encode()) < NOTIFY_PAYLOAD_LIMIT for p in payloads)
+
+    decoded = [pair for payload in payloads for pair in backend.decode(payload)]
+    assert decoded[:300] == [("chat:1", {"n": i}) for i in range(300)]
+    assert decoded[300] == ("chat:2", {"text": "ü" * 20000})
+    assert decoded[301:] == [("chat:1", {"n": 0}), ("chat:1", {"n": 1})]
+    # 300 small messages share far fewer notifies than one each
+    assert len(payloads) < 20
+
+
+@pytest.mark.asyncio
+async def test_postgres_broadcast_round_trips_through_notify_in_order():
+    conn = AsyncMock()
+    conn.add_termination_listener = MagicMock()
+    conn.is_closed = MagicMock(return_value=False)
+    backend = PostgresBroadcast(connect=AsyncMock(return_value=conn), flush_ms=1, batch_size=50)
+
+    async def loopback(query, channel, payloads):
+        # What Postgres would send back to every listener, this one included
+        for payload in payloads:
+            backend._on_notify(conn, 0, channel, payload)
+
+    conn.execute.side_effect = loopback
+    received = []
+
+    async def handler(message):
+        received.append(message["n"])
+
+    backend.subscribe("chat:7", handler)
+    await backend.start()
+    try:
+        for i in range(120):
+            await backend.publish("chat:7", {"n": i})
+            await backend.publish("chat:8", {"n": -i})  # nobody listens here
+        for _ in range(100):
+            if len(received) == 120:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await backend.stop()
+
+    assert received == list(range(120))
+    # 240 messages went out in a handful of batched notifies
+    assert backend.notifies < 20
+    conn.add_listener.assert_awaited_once()
+    conn.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_postgres_broadcast_requeues_on_failed_flush():
+    conn = AsyncMock()
+    conn.add_termination_listener = MagicMock()
+    conn.is_closed = MagicMock(return_value=False)
+    conn.execute.side_effect = [OSError("connection reset"), None]
+    backend = PostgresBroadcast(connect=AsyncMock(return_value=conn), flush_ms=1)
+    # Drive _flush by hand rather than through the background loop
+    backend._pending, backend._full = asyncio.Event(), asyncio.Event()
+    await backend._open()
+    await backend.publish("chat:1", {"n": 1})
+    await backend._flush()
+    assert backend.stats()["queued"] == 1
+    await backend._flush()
+    assert backend.stats()["queued"] == 0
+    sent = conn.execute.await_args.args[2]
+    assert json.loads(sent[0])["m"] == [["chat:1", {"n": 1}]]
+
+
+def test_broadcast_backend_requires_publish():
+    class SilentBackend(BroadcastBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        SilentBackend()
+    with pytest.raises(TypeError):
+        BroadcastBackend()
@@ -0,0 +1,31 @@
+"""
+Multi-process delivery test for PostgresBroadcast over real LISTEN/NOTIFY.
+
+Runs only when TEST_DB_DSN points at a scratch database. It uses the
+shared.bench_broadcast harness: TEST_BROADCAST_WORKERS processes, each with
+its own listener connection, publish over the same chat channels. The test
+asserts that every process received every message, that each channel arrived
+in the same order in every process, and that no publisher's messages were
+reordered.
+"""
+
+import os
+import pytest
+from shared.bench_broadcast import check, run
+
+TEST_DB_DSN = os.getenv("TEST_DB_DSN")
+WORKERS = int(os.getenv("TEST_BROADCAST_WORKERS", "4"))
+CHANNELS = int(os.getenv("TEST_BROADCAST_CHANNELS", "4"))
+MESSAGES = int(os.getenv("TEST_BROADCAST_MESSAGES", "500"))
+
+pytestmark = pytest.mark.skipif(not TEST_DB_DSN, reason="set TEST_DB_DSN to a scratch database")
+
+
+def test_every_process_sees_every_channel_in_one_order():
+    collected, elapsed = run(TEST_DB_DSN, WORKERS, CHANNELS, MESSAGES)
+    assert sorted(collected) == list(range(WORKERS))
+    check(collected, WORKERS, CHANNELS, MESSAGES)
+    for worker, (_, _, stats) in collected.items():
+        assert stats["handler_errors"] == 0, f"worker {worker}: handler errors"
+        assert stats["queued"] == 0, f"worker {worker}: {stats['queued']} message(s) never flushed"
+    print(f"{WORKERS * MESSAGES * WORKERS} deliveries in {elapsed * 1000:.0f}ms")
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from .cache import MISSING, CacheBackend, CachedFunction, MemoryBackend, TTLCache
+
+
+def make_cached(func, ttl=60.0, copy_result=True):
+    return CachedFunction(func, "test", ttl, MemoryBackend(), copy_result)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_call():
+    calls = 0
+
+    async def load(x):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"x": x}
+
+    cached = make_cached(load)
+    results = await asyncio.gather(*(cached(1) for _ in range(10)))
+    assert calls == 1
+    assert all(r == {"x": 1} for r in results)
+    assert await cached(x=1) == {"x": 1}
+    assert calls == 1
+    assert cached.stats.as_dict()["misses"] == 1
+    assert cached.stats.coalesced == 9
+    assert cached.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_results_are_copied_and_failures_not_cached():
+    load = AsyncMock(side_effect=[RuntimeError("boom"), {"n": [1]}])
+    cached = make_cached(load)
+    with pytest.raises(RuntimeError):
+        await cached()
+    first = await cached()
+    first["n"].append(2)
+    assert await cached() == {"n": [1]}
+    assert load.await_count == 2
+    assert cached.stats.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_per_key_ttl_and_invalidate():
+    load = AsyncMock(side_effect=lambda year: year)
+    cached = make_cached(load, ttl=lambda year: 0 if year == 2024 else 60)
+    await cached(2024)
+    await cached(2024)
+    await cached(2023)
+    await cached(2023)
+    assert load.await_count == 3
+    await cached.invalidate()
+    await cached(2023)
+    assert load.await_count == 4
+
+
+def test_cache_backend_requires_every_operation():
+    class PartialBackend(CacheBackend):
+        async def get(self, key):
+            return MISSING
+
+    with pytest.raises(TypeError):
+        PartialBackend()
+    with pytest.raises(TypeError):
+        CacheBackend()
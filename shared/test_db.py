@@ -0,0 +1,167 @@
+import asyncio
+import asyncpg
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from .db import DB_FANOUT_CONCURRENCY, Database, Read
+
+
+def fake_pool():
+    pool = MagicMock()
+    pool.acquire = AsyncMock(return_value=MagicMock())
+    pool.release = AsyncMock()
+    pool.get_size.return_value = 2
+    pool.get_idle_size.return_value = 1
+    pool.get_min_size.return_value = 2
+    pool.get_max_size.return_value = 10
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_acquire_tracks_in_use_and_wait():
+    database = Database()
+    database.pool = fake_pool()
+    async with database.acquire():
+        assert database.metrics.in_use == 1
+    stats = database.pool_stats()
+    assert stats["acquired"] == 1
+    assert stats["in_use"] == 0
+    assert stats["max_size"] == 10
+    database.pool.release.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_acquire_counts_timeouts():
+    database = Database()
+    database.pool = fake_pool()
+    database.pool.acquire.side_effect = asyncio.TimeoutError()
+    with pytest.raises(asyncio.TimeoutError):
+        async with database.acquire():
+            pass
+    assert database.metrics.timeouts == 1
+    assert database.metrics.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_init_hooks_run_on_new_connection():
+    database = Database()
+    hook = AsyncMock()
+    database.add_init_hook(hook)
+    connection = MagicMock()
+    await database._init_connection(connection)
+    hook.assert_awaited_once_with(connection)
+
+
+@pytest.mark.asyncio
+async def test_readonly_connection_skips_transaction():
+    database = Database()
+    database.pool = fake_pool()
+    connection = database.pool.acquire.return_value
+    async with database.get_connection(readonly=True) as conn:
+        assert conn is connection
+    connection.transaction.assert_not_called()
+    async with database.get_connection():
+        pass
+    connection.transaction.assert_called_once()
+
+
+def database_with_replica():
+    database = Database()
+    database.pool = fake_pool()
+    database.replica_pool = fake_pool()
+    database.replica_pool.acquire.return_value = MagicMock(name="replica_connection")
+    return database
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_route_to_replica_when_healthy():
+    database = database_with_replica()
+    database._probe_replica = AsyncMock(return_value=True)
+    async with database.get_connection(readonly=True, replica=True) as conn:
+        assert conn is database.replica_pool.acquire.return_value
+    assert database.replica_metrics.acquired == 1
+    assert database.metrics.acquired == 0
+    database.replica_pool.release.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_writes_never_route_to_replica():
+    database = database_with_replica()
+    database._probe_replica = AsyncMock(return_value=True)
+    async with database.get_connection(replica=True) as conn:
+        assert conn is database.pool.acquire.return_value
+    database.replica_pool.acquire.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_falls_back_to_primary():
+    database = database_with_replica()
+    database._probe_replica = AsyncMock(return_value=False)
+    async with database.get_connection(readonly=True, replica=True) as conn:
+        assert conn is database.pool.acquire.return_value
+    database.replica_pool.acquire.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_replica_acquire_failure_falls_back_and_marks_unhealthy():
+    database = database_with_replica()
+    database._probe_replica = AsyncMock(return_value=True)
+    database.replica_pool.acquire.side_effect = OSError("connection refused")
+    async with database.get_connection(readonly=True, replica=True) as conn:
+        assert conn is database.pool.acquire.return_value
+    assert await database.replica_available() is False
+
+
+@pytest.mark.asyncio
+async def test_replica_health_is_probed_once_per_interval():
+    database = database_with_replica()
+    database._probe_replica = AsyncMock(return_value=True)
+    for _ in range(3):
+        assert await database.replica_available() is True
+    database._probe_replica.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_fan_out_runs_reads_concurrently_and_keeps_order():
+    database = Database()
+    database.pool = fake_pool()
+    running = peak = 0
+
+    async def slow_fetchval(query, *args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return f"{query}:{args}"
+
+    database.pool.acquire.side_effect = lambda timeout=None: MagicMock(fetchval=slow_fetchval)
+    reads = [Read.fetchval(f"q{i}", i) for i in range(DB_FANOUT_CONCURRENCY + 2)]
+    results = await database.fan_out(*reads)
+    assert results == [f"q{i}:({i},)" for i in range(len(reads))]
+    assert peak == DB_FANOUT_CONCURRENCY
+    assert database.metrics.in_use == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not (os.getenv("TEST_DB_DSN") and os.getenv("TEST_REPLICA_DSN")),
+    reason="set TEST_DB_DSN and TEST_REPLICA_DSN to two local databases",
+)
+async def test_replica_routing_against_two_databases():
+    database = Database()
+    database.pool = await asyncpg.create_pool(dsn=os.getenv("TEST_DB_DSN"), min_size=1, max_size=2)
+    database.replica_pool = await asyncpg.create_pool(dsn=os.getenv("TEST_REPLICA_DSN"), min_size=1, max_size=2)
+    try:
+        async with database.get_connection(readonly=True, replica=True) as conn:
+            replica_name = await conn.fetchval("SELECT current_database()")
+        async with database.get_connection(readonly=True) as conn:
+            primary_name = await conn.fetchval("SELECT current_database()")
+        assert replica_name != primary_name
+        await database.replica_pool.close()
+        database._replica_checked_at = float("-inf")
+        async with database.get_connection(readonly=True, replica=True) as conn:
+            assert await conn.fetchval("SELECT current_database()") == primary_name
+    finally:
+        database.replica_pool = None
+        await database.pool.close()
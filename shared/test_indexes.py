@@ -0,0 +1,186 @@
+"""
+EXPLAIN ANALYZE regression tests for the hot-path index packs (migrations 0002+).
+
+These run only when TEST_DB_DSN points at a scratch database. The first run
+migrates it and seeds ~1M appointments (a few minutes); later runs reuse the
+data. Each query mirrors the WHERE/ORDER BY shape of the manager method named
+in its id, and the test asserts the planner reaches the table through the
+expected index instead of a sequential scan.
+"""
+
+import json
+import os
+import asyncpg
+import pytest
+import pytest_asyncio
+from shared.db import db
+from shared.migrations import migrate
+
+TEST_DB_DSN = os.getenv("TEST_DB_DSN")
+SEED_APPOINTMENTS = int(os.getenv("TEST_SEED_APPOINTMENTS", "1000000"))
+
+pytestmark = pytest.mark.skipif(not TEST_DB_DSN, reason="set TEST_DB_DSN to a scratch database")
+
+
+async def seed_explain_dataset(conn, appointments: int = SEED_APPOINTMENTS):
+    """Bulk-seeds a realistic spread of rows with generate_series; idempotent."""
+    if await conn.fetchval("SELECT COUNT(*) FROM appointments") >= appointments:
+        return
+    await conn.execute(
+        """
+        INSERT INTO users (email, password_hash, is_doctor)
+        SELECT 'explain_user_' || g || '@example.com', 'x', g <= 500
+        FROM generate_series(1, 50500) g
+        ON CONFLICT (email) DO NOTHING;
+
+        INSERT INTO doctors (user_id, first_name, last_name)
+        SELECT id, 'Doc', 'Tor' FROM users WHERE email LIKE 'explain_user_%' AND is_doctor;
+
+        INSERT INTO patients (user_id, first_name, last_name)
+        SELECT id, 'Pat', 'Ient' FROM users WHERE email LIKE 'explain_user_%' AND NOT is_doctor;
+        """
+    )
+    await conn.execute(
+        """
+        WITH d AS (SELECT array_agg(id) AS ids FROM doctors),
+             p AS (SELECT array_agg(user_id) AS ids FROM patients)
+        INSERT INTO appointments (doctor_id, patient_id, slot_time, status, created_at)
+        SELECT d.ids[1 + (g % array_length(d.ids, 1))],
+               p.ids[1 + ((g * 7919) % array_length(p.ids, 1))],
+               now() - interval '2 years' + (g % 1051200) * interval '1 minute',
+               (ARRAY['pending', 'confirmed', 'cancelled'])[1 + g % 3],
+               now() - (g % 730) * interval '1 day'
+        FROM generate_series(1, $1) g, d, p
+        """,
+        appointments,
+    )
+    await conn.execute(
+        """
+        INSERT INTO appointments_summary (doctor_id, patient_id, diagnosis)
+        SELECT doctor_id, patient_id, 'n/a' FROM appointments WHERE id % 10 = 0;
+
+        INSERT INTO chat_messages (appointment_id, sender_id, receiver_id, message, sent_at)
+        SELECT a.id, a.patient_id, d.user_id, 'hello', a.slot_time + (g * interval '1 minute')
+        FROM appointments a JOIN doctors d ON d.id = a.doctor_id, generate_series(1, 3) g
+        WHERE a.id % 5 = 0;
+
+        INSERT INTO video_calls (appointment_id, initiator_id, receiver_id, status)
+        SELECT a.id, a.patient_id, d.user_id, (ARRAY['initiated', 'active', 'ended'])[1 + a.id % 3]
+        FROM appointments a JOIN doctors d ON d.id = a.doctor_id
+        WHERE a.id % 4 = 0;
+
+        INSERT INTO doctors_reviews (doctor_id, user_id, rating, comment)
+        SELECT doctor_id, patient_id, 1 + id % 5, 'ok' FROM appointments WHERE id % 20 = 0;
+
+        INSERT INTO doctors_patients (doctor_id, patient_id)
+        SELECT doctor_id, patient_id FROM appointments WHERE id % 20 = 1;
+
+        INSERT INTO feed_items (title, content_type, created_at)
+        SELECT 'feed ' || g, 'article', now() - g * interval '1 minute'
+        FROM generate_series(1, 200000) g;
+
+        INSERT INTO blog_posts (title, content_type, mood_relevance, user_id)
+        SELECT 'post ' || g, 'article',
+               CASE WHEN g % 100 = 0 THEN '{"Manic": 0.9}'::jsonb ELSE '{"Happy": 0.5, "Calm": 0.4}'::jsonb END,
+               (SELECT MIN(id) FROM users)
+        FROM generate_series(1, 100000) g;
+
+        ANALYZE;
+        """
+    )
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def explain_conn():
+    pool = await asyncpg.create_pool(dsn=TEST_DB_DSN, min_size=1, max_size=2)
+    previous_pool, db.pool = db.pool, pool
+    try:
+        await migrate()
+        async with pool.acquire() as conn:
+            await seed_explain_dataset(conn)
+            yield conn
+    finally:
+        db.pool = previous_pool
+        await pool.close()
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, query: str, *args) -> list:
+    raw = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", *args)
+    plan = json.loads(raw)[0]["Plan"] if isinstance(raw, str) else raw[0]["Plan"]
+    return list(plan_nodes(plan))
+
+
+HOT_PATH_QUERIES = [
+    (
+        "AppointmentManager.get_appointments_for_doctor",
+        "SELECT * FROM appointments a WHERE a.doctor_id = (SELECT MIN(id) FROM doctors) ORDER BY a.slot_time DESC",
+        "appointments", "idx_appointments_doctor_slot",
+    ),
+    (
+        "AppointmentManager.get_patient_appointments",
+        "SELECT * FROM appointments a WHERE a.patient_id = (SELECT MIN(user_id) FROM patients) ORDER BY a.slot_time DESC",
+        "appointments", "idx_appointments_patient_slot",
+    ),
+    (
+        "ChatManager.get_chat_history",
+        "SELECT * FROM chat_messages WHERE appointment_id = 500 AND id < 100000 ORDER BY id DESC LIMIT 51",
+        "chat_messages", "idx_chat_messages_appointment_id",
+    ),
+    (
+        "VideoCallManager.update_call_status",
+        "SELECT * FROM video_calls WHERE appointment_id = 400 AND status = 'initiated'",
+        "video_calls", "idx_video_calls_appointment_status",
+    ),
+    (
+        "DoctorManager.get_doctor_by_user_id",
+        "SELECT * FROM doctors d WHERE d.user_id = (SELECT MIN(id) FROM users WHERE is_doctor)",
+        "doctors", "idx_doctors_user_id",
+    ),
+    (
+        "get_patient_by_user_id",
+        "SELECT * FROM patients p WHERE p.user_id = (SELECT MAX(id) FROM users)",
+        "patients", "idx_patients_user_id",
+    ),
+    (
+        "DoctorManager.get_doctor reviews",
+        "SELECT * FROM doctors_reviews dr WHERE dr.doctor_id = (SELECT MIN(id) FROM doctors)",
+        "doctors_reviews", "idx_doctors_reviews_doctor_id",
+    ),
+    (
+        "get_all_patients appointments_summary join",
+        "SELECT * FROM appointments_summary asumm WHERE asumm.patient_id = (SELECT MIN(user_id) FROM patients)",
+        "appointments_summary", "idx_appointments_summary_patient_id",
+    ),
+    (
+        "get_feeds",
+        "SELECT * FROM feed_items ORDER BY created_at DESC LIMIT 10 OFFSET 0",
+        "feed_items", "idx_feed_items_created_at_id",
+    ),
+    (
+        "get_blog_posts_by_mood",
+        "SELECT * FROM blog_posts bp WHERE (bp.mood_relevance ? 'Manic') AND (bp.mood_relevance->>'Manic')::float > 0",
+        "blog_posts", "idx_blog_posts_mood_relevance",
+    ),
+    (
+        "get_todays_appointments_count",
+        "SELECT COUNT(*) FROM appointments WHERE slot_time >= CURRENT_DATE AND slot_time < CURRENT_DATE + 1",
+        "appointments", "idx_appointments_slot_time_id",
+    ),
+]
+
+
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.parametrize("label,query,table,index", HOT_PATH_QUERIES, ids=[q[0] for q in HOT_PATH_QUERIES])
+async def test_hot_path_query_uses_index(explain_conn, label, query, table, index):
+    nodes = await explain(explain_conn, query)
+    scans = [n for n in nodes if n.get("Relation Name") == table]
+    assert scans, f"{label}: {table} not in plan"
+    assert all(n["Node Type"] != "Seq Scan" for n in scans), f"{label}: sequential scan on {table}"
+    # Bitmap plans name the index on the child Bitmap Index Scan node.
+    assert any(n.get("Index Name") == index for n in nodes), f"{label}: {index} not used"
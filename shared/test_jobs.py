@@ -0,0 +1,21 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from .jobs import PeriodicJob
+
+
+@pytest.mark.asyncio
+@patch("shared.jobs.db.get_connection")
+async def test_job_runs_only_when_lock_is_acquired(mock_get_conn):
+    conn = AsyncMock()
+    mock_get_conn.return_value.__aenter__.return_value = conn
+    func = AsyncMock()
+    job = PeriodicJob("test", 60, func, lock_id=1)
+
+    conn.fetchval.return_value = True
+    assert await job.run_once()
+    func.assert_awaited_once_with(conn)
+
+    func.reset_mock()
+    conn.fetchval.return_value = False
+    assert not await job.run_once()
+    func.assert_not_awaited()
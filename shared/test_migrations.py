@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from .migrations import Migration, discover_migrations, latest_version, migrate, verify_schema
+
+
+def test_discover_migrations_is_ordered_and_starts_with_baseline():
+    migrations = discover_migrations()
+    versions = [m.version for m in migrations]
+    assert versions == sorted(versions)
+    assert migrations[0].version == 1
+    assert migrations[0].name == "initial_schema"
+    assert migrations[0].transactional
+
+
+def test_no_transaction_migration_is_split_into_statements():
+    migration = Migration(2, "indexes", (
+        "-- migrate: no-transaction\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS a ON t(x);\n"
+        "\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS b\n"
+        "    ON t(y);\n"
+    ))
+    assert not migration.transactional
+    assert migration.statements() == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS a ON t(x);",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS b\n    ON t(y);",
+    ]
+
+
+
+def test_dollar_quoted_block_is_one_statement():
+    migration = Migration(3, "check", (
+        "-- migrate: no-transaction\n"
+        "DO $$\n"
+        "BEGIN\n"
+        "    PERFORM 1;\n"
+        "END $$;\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS a ON t(x);\n"
+    ))
+    assert migration.statements() == [
+        "DO $$\nBEGIN\n    PERFORM 1;\nEND $$;",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS a ON t(x);",
+    ]
+
+@pytest.mark.asyncio
+@patch("shared.migrations.db.acquire")
+async def test_migrate_applies_only_pending_versions(mock_acquire):
+    conn = AsyncMock()
+    conn.transaction = MagicMock()
+    conn.fetch.return_value = [{"version": 1}]
+    mock_acquire.return_value.__aenter__.return_value = conn
+    migrations = [Migration(1, "initial_schema", "SELECT 1;"), Migration(2, "next", "SELECT 2;")]
+    applied = await migrate(migrations)
+    assert applied == [2]
+    executed = [call.args[0] for call in conn.execute.await_args_list]
+    assert "SELECT 2;" in executed
+    assert "SELECT 1;" not in executed
+    assert executed[0].startswith("SELECT pg_advisory_lock")
+    assert executed[-1].startswith("SELECT pg_advisory_unlock")
+
+
+@pytest.mark.asyncio
+@patch("shared.migrations.current_version", new_callable=AsyncMock)
+async def test_verify_schema_rejects_outdated_database(mock_version):
+    mock_version.return_value = latest_version() - 1
+    with pytest.raises(RuntimeError, match="--migrate"):
+        await verify_schema()
+    mock_version.return_value = latest_version()
+    assert await verify_schema() == latest_version()
@@ -0,0 +1,45 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from .pagination import Keyset, SortKey, cursor_meta, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_typed_values():
+    values = [datetime(2024, 5, 16, 9, 30), Decimal("4.5"), 42, "blog_ab12"]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == values
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor([1])[:-2] + "@@", "eyJhIjoxfQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        Keyset(SortKey("a.slot_time"), SortKey("a.id")).condition(cursor, 1)
+
+
+def test_uniform_directions_use_a_row_comparison():
+    keyset = Keyset(SortKey("a.slot_time"), SortKey("a.id"))
+    sql, params = keyset.condition(encode_cursor([datetime(2024, 1, 1), 9]), 3)
+    assert sql == "(a.slot_time, a.id) < ($3, $4)"
+    assert params == [datetime(2024, 1, 1), 9]
+    assert keyset.order_by() == "ORDER BY a.slot_time DESC, a.id DESC"
+    assert keyset.condition("", 3) == (None, [])
+
+
+def test_mixed_directions_and_null_fallbacks_expand_to_or_branches():
+    keyset = Keyset(SortKey("p.name", descending=False), SortKey("p.rating", null_as="0"))
+    sql, _ = keyset.condition(encode_cursor(["b", 3]), 1)
+    assert sql == "((p.name > $1) OR (p.name = $1 AND COALESCE(p.rating, 0) < $2))"
+
+
+def test_paginate_trims_look_ahead_row_and_strips_cursor_columns():
+    keyset = Keyset(SortKey("d.rating"), SortKey("d.id"))
+    rows = [{"doctor_id": i, "_cursor_0": 5 - i, "_cursor_1": i} for i in range(1, 4)]
+
+    items, next_cursor = keyset.paginate(rows, 2)
+    assert items == [{"doctor_id": 1}, {"doctor_id": 2}]
+    assert decode_cursor(next_cursor) == [3, 2]
+    assert cursor_meta(2, next_cursor)["has_next"]
+
+    items, next_cursor = keyset.paginate(rows[:2], 2)
+    assert len(items) == 2 and next_cursor is None
@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import AsyncMock
+from .pagination import Keyset, SortKey, encode_cursor
+from .query import Filters, PagedQuery, TOTAL_COLUMN
+
+
+def make_paged(**kwargs):
+    filters = Filters()
+    filters.add("a.status = {}", "pending")
+    filters.add("(d.first_name ILIKE {0} OR p.first_name ILIKE {0})", "%ann%")
+    return PagedQuery(
+        select="a.id",
+        from_clause="appointments a JOIN doctors d ON a.doctor_id = d.id JOIN patients p ON a.patient_id = p.id",
+        filters=filters,
+        order_by="a.slot_time DESC",
+        **kwargs,
+    )
+
+
+def test_filters_number_placeholders_and_reuse_values():
+    paged = make_paged()
+    assert paged.filters.where() == "WHERE a.status = $1 AND (d.first_name ILIKE $2 OR p.first_name ILIKE $2)"
+    assert paged.filters.params == ["pending", "%ann%"]
+    assert Filters().where() == ""
+
+
+def test_page_is_one_statement_with_window_total():
+    paged = make_paged()
+    query, params = paged.page(20, 40)
+    assert query.count("SELECT") == 1
+    assert f"count(*) OVER() AS {TOTAL_COLUMN}" in query
+    assert query.endswith("ORDER BY a.slot_time DESC LIMIT $3 OFFSET $4")
+    assert params == ["pending", "%ann%", 20, 40]
+    # Building a page leaves the shared filters untouched
+    assert paged.filters.params == ["pending", "%ann%"]
+
+
+def test_count_variants():
+    assert make_paged().count()[0].startswith("SELECT COUNT(*) FROM appointments a")
+    grouped, _ = make_paged(group_by="a.id").count()
+    assert grouped.startswith("SELECT COUNT(*) FROM (SELECT 1 FROM appointments a") and "GROUP BY a.id" in grouped
+    light, params = make_paged(count_from="appointments a").count()
+    assert light.startswith("SELECT COUNT(*) FROM appointments a WHERE a.status = $1")
+    assert params == ["pending", "%ann%"]
+
+
+def test_keyset_page_numbers_cursor_after_filters():
+    keyset = Keyset(SortKey("a.slot_time"), SortKey("a.id"))
+    query, params = make_paged().keyset_page(keyset, encode_cursor(["x", 5]), 10)
+    assert "(a.slot_time, a.id) < ($3, $4)" in query
+    assert "OVER()" not in query and query.endswith("LIMIT 11")
+    assert params == ["pending", "%ann%", "x", 5]
+
+
+@pytest.mark.asyncio
+async def test_fetch_splits_total_and_counts_only_past_the_end():
+    paged = make_paged()
+    conn = AsyncMock()
+    conn.fetch.return_value = [{"id": 1, TOTAL_COLUMN: 42}, {"id": 2, TOTAL_COLUMN: 42}]
+    assert await paged.fetch(conn, 2, 0) == ([{"id": 1}, {"id": 2}], 42)
+    conn.fetchval.assert_not_called()
+
+    conn.fetch.return_value = []
+    assert await paged.fetch(conn, 20, 0) == ([], 0)
+    conn.fetchval.assert_not_called()
+
+    conn.fetchval.return_value = 42
+    assert await paged.fetch(conn, 20, 1000) == ([], 42)
+    conn.fetchval.assert_awaited_once()
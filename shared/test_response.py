@@ -0,0 +1,30 @@
+from datetime import datetime
+from decimal import Decimal
+from fastapi import Request
+from .response import etag_response
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+PAGE = {"doctors": [{"id": 1, "rating": Decimal("4.5"), "created_at": datetime(2024, 5, 1)}], "meta_data": {"total": 1}}
+
+
+def test_etag_is_stable_for_equal_payloads():
+    first = etag_response(make_request(), data=PAGE)
+    second = etag_response(make_request(), data=dict(PAGE))
+    assert first.status_code == 200
+    assert first.headers["etag"] == second.headers["etag"]
+    changed = etag_response(make_request(), data={**PAGE, "meta_data": {"total": 2}})
+    assert changed.headers["etag"] != first.headers["etag"]
+
+
+def test_matching_if_none_match_returns_304_without_body():
+    etag = etag_response(make_request(), data=PAGE).headers["etag"]
+    response = etag_response(make_request(f'"other", {etag}'), data=PAGE)
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+    assert etag_response(make_request('"other"'), data=PAGE).status_code == 200
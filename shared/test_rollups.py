@@ -0,0 +1,107 @@
+import json
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from .cache import clear_caches
+from .rollups import ROLLUP_OVERLAP, refresh_rollups
+from .utils import GeneralStats
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def fresh_stats_cache():
+    await clear_caches()
+    yield
+    await clear_caches()
+
+
+def rollup_conn(state):
+    conn = AsyncMock()
+    conn.fetchval.return_value = datetime(2024, 5, 16, 12, 0)
+    conn.fetchrow.return_value = state
+    conn.fetch.return_value = []
+    return conn
+
+
+def executed(conn):
+    return [call.args for call in conn.execute.await_args_list]
+
+
+@pytest.mark.asyncio
+async def test_first_refresh_is_a_full_rebuild():
+    conn = rollup_conn(None)
+    summary = await refresh_rollups(conn)
+    assert summary["full"]
+    assert summary["since"] == date.min
+    assert any(args[0] == "DELETE FROM stats_doctor_calls" for args in executed(conn))
+
+
+@pytest.mark.asyncio
+async def test_incremental_refresh_recomputes_recent_and_dirty_days():
+    last = datetime(2024, 5, 16, 0, 5)
+    conn = rollup_conn({"refreshed_at": last, "full_refreshed_at": last})
+    dirty = [{"day": date(2024, 1, 3)}]
+    conn.fetch.side_effect = [dirty, [], [{"doctor_id": 7}]]
+
+    summary = await refresh_rollups(conn)
+
+    assert not summary["full"]
+    assert summary["since"] == (last - ROLLUP_OVERLAP).date() == date(2024, 5, 15)
+    assert summary["dirty_days"] == 1
+    calls = executed(conn)
+    revenue_delete = next(args for args in calls if args[0].startswith("DELETE FROM stats_daily_revenue"))
+    assert revenue_delete[1:] == (date(2024, 5, 15), [date(2024, 1, 3)])
+    assert any(args[0].startswith("DELETE FROM stats_doctor_calls WHERE") and args[1] == [7] for args in calls)
+
+
+@pytest.mark.asyncio
+async def test_stale_full_rebuild_is_forced():
+    last = datetime(2024, 5, 16, 11, 59)
+    conn = rollup_conn({"refreshed_at": last, "full_refreshed_at": last - timedelta(days=2)})
+    assert (await refresh_rollups(conn))["full"]
+
+
+@pytest.mark.asyncio
+@patch("shared.utils.db.get_connection")
+async def test_dashboard_stats_read_from_rollups_in_one_query(mock_get_conn):
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {
+        "refreshed_at": datetime(2024, 5, 16, 12, 0),
+        "totals": json.dumps({"patients": 40, "doctors": 5, "video_calls": 90, "active_subscriptions": 12}),
+        "today": json.dumps({"patients": 2}),
+        "monthly_revenue": 1500,
+    }
+    mock_get_conn.return_value.__aenter__.return_value = conn
+
+    stats = await GeneralStats.get_dashboard_stats()
+
+    conn.fetchrow.assert_awaited_once()
+    conn.fetchval.assert_not_called()
+    assert stats["overview"] == {
+        "total_patients": 40, "total_doctors": 5, "active_subscriptions": 12, "total_video_calls": 90
+    }
+    assert stats["today"] == {"new_patients": 2, "new_doctors": 0, "video_calls": 0}
+    assert stats["this_month"]["revenue"] == 1500.0
+    assert stats["refreshed_at"] == "2024-05-16T12:00:00"
+
+
+@pytest.mark.asyncio
+@patch("shared.utils.db.get_connection")
+async def test_revenue_analytics_zero_fills_months(mock_get_conn):
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {
+        "refreshed_at": None,
+        "monthly": json.dumps([{"month": 3, "currency": "NGN", "subscription_count": 2, "revenue": 200.5}]),
+        "daily": "[]",
+        "plans": json.dumps([{"plan_type": "basic", "currency": "NGN", "subscription_count": 2, "revenue": 200.5}]),
+    }
+    mock_get_conn.return_value.__aenter__.return_value = conn
+    # Today on the database clock, for the last-7-days window
+    conn.fetchval.return_value = date(2024, 5, 16)
+
+    analytics = await GeneralStats.get_revenue_analytics(2024, "year")
+
+    assert len(analytics["monthly_breakdown"]) == 12
+    assert analytics["monthly_breakdown"][2]["revenue"] == 200.5
+    assert analytics["total_revenue"] == 200.5
+    assert analytics["plan_breakdown"][0]["plan_type"] == "basic"
@@ -0,0 +1,27 @@
+import os
+from .migrations import MIGRATIONS_DIR
+from .query import Filters
+from .search import PATIENT_NAME_SEARCH, PATIENT_SEARCH, SEARCH_DOCUMENTS, like_pattern
+
+
+def test_like_pattern_escapes_wildcards():
+    assert like_pattern("ann") == "%ann%"
+    assert like_pattern("50%_off\\") == "%50\\%\\_off\\\\%"
+
+
+def test_every_document_has_a_matching_trigram_index():
+    with open(os.path.join(MIGRATIONS_DIR, "0006_trigram_search.sql")) as f:
+        migration = f.read()
+    for document in SEARCH_DOCUMENTS:
+        assert f"ON {document.table} USING GIN (({document.sql()}) gin_trgm_ops)" in migration
+
+
+def test_conditions_bind_one_pattern_for_every_use():
+    filters = Filters()
+    filters.add("a.status = {}", "pending")
+    filters.add(f"({PATIENT_NAME_SEARCH.ids_matching('a.patient_id')} OR {PATIENT_SEARCH.matches('p')})", "%ann%")
+    where = filters.where()
+    assert where.count("$2") == 2 and "$3" not in where
+    assert "a.patient_id = ANY(ARRAY(SELECT id FROM patients WHERE (coalesce(first_name::text, '')" in where
+    assert "(coalesce(p.first_name::text, '') || ' ' || coalesce(p.last_name::text, '')" in where
+    assert filters.params == ["pending", "%ann%"]
@@ -0,0 +1,26 @@
+import pytest
+from datetime import date, datetime
+from .time_ranges import bucket_range, day_range, month_range, week_range, year_range
+
+
+def test_day_range_is_half_open_midnight_to_midnight():
+    assert day_range(date(2024, 2, 29)) == (datetime(2024, 2, 29), datetime(2024, 3, 1))
+
+
+def test_week_range_starts_on_monday():
+    # 2024-05-16 is a Thursday
+    assert week_range(date(2024, 5, 16)) == (datetime(2024, 5, 13), datetime(2024, 5, 20))
+    assert week_range(date(2024, 5, 13))[0] == datetime(2024, 5, 13)
+
+
+def test_month_range_rolls_over_december():
+    assert month_range(2024, 11) == (datetime(2024, 11, 1), datetime(2024, 12, 1))
+    assert month_range(2024, 12) == (datetime(2024, 12, 1), datetime(2025, 1, 1))
+
+
+def test_bucket_range_dispatches_and_rejects_unknown_bucket():
+    day = date(2024, 12, 31)
+    assert bucket_range("year", day) == year_range(2024)
+    assert bucket_range("month", day) == month_range(2024, 12)
+    with pytest.raises(ValueError, match="Unknown time bucket"):
+        bucket_range("quarter", day)
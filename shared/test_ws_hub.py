@@ -0,0 +1,124 @@
+import asyncio
+import json
+import pytest
+from .ws_hub import SLOW_CONSUMER_CLOSE_CODE, ConnectionHub
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.received = []
+        self.close_code = None
+        self.gate = None
+
+    async def send_text(self, data):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("connection reset")
+        self.received.append(json.loads(data))
+
+    async def close(self, code=None, reason=None):
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_broadcast_does_not_wait_for_slow_or_dead_sockets():
+    hub = ConnectionHub("test", send_timeout=5)
+    fast = [FakeWebSocket() for _ in range(3)]
+    slow = FakeWebSocket(delay=0.5)
+    dead = FakeWebSocket(fail=True)
+    for websocket in [slow, dead, *fast]:
+        hub.register(websocket)
+    try:
+        assert hub.broadcast([slow, dead, *fast], {"n": 1}) == 5
+        await asyncio.sleep(0.05)
+        assert all(ws.received == [{"n": 1}] for ws in fast)
+        assert slow.received == []
+        # The dead socket's writer dropped it; the slow one is still registered
+        assert dead not in hub and slow in hub
+        assert hub.stats()["send_errors"] == 1
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_keeps_newest_frames():
+    hub = ConnectionHub("test", policy="drop", queue_size=2)
+    ws = FakeWebSocket()
+    ws.gate = asyncio.Event()
+    hub.register(ws)
+    try:
+        hub.send(ws, {"n": 0})
+        await asyncio.sleep(0)  # the writer takes frame 0 and blocks on the gate
+        for n in range(1, 6):
+            assert hub.send(ws, {"n": n})
+        assert hub.stats()["max_queue_depth"] == 2
+        ws.gate.set()
+        await hub.drain()
+        assert ws.received == [{"n": 0}, {"n": 4}, {"n": 5}]
+        stats = hub.stats()
+        assert stats["dropped"] == 3 and stats["sent"] == 3 and stats["queued"] == 0
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_close_policy_closes_slow_consumer():
+    hub = ConnectionHub("test", policy="close", queue_size=2)
+    ws = FakeWebSocket()
+    ws.gate = asyncio.Event()
+    hub.register(ws)
+    try:
+        assert hub.send(ws, {"n": 0})
+        await asyncio.sleep(0)  # the writer takes frame 0 and blocks on the gate
+        assert hub.send(ws, {"n": 1}) and hub.send(ws, {"n": 2})
+        assert not hub.send(ws, {"n": 3})
+        await asyncio.sleep(0.01)
+        assert ws not in hub
+        assert ws.close_code == SLOW_CONSUMER_CLOSE_CODE
+        assert hub.stats()["slow_closed"] == 1
+        # Later sends to the closed socket are refused
+        assert not hub.send(ws, {"n": 4})
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_send_timeout_closes_socket():
+    hub = ConnectionHub("test", send_timeout=0.01)
+    ws = FakeWebSocket(delay=1)
+    hub.register(ws)
+    try:
+        hub.send(ws, {"n": 1})
+        await asyncio.sleep(0.1)
+        assert ws not in hub
+        assert ws.close_code == SLOW_CONSUMER_CLOSE_CODE
+        assert hub.stats()["timeouts"] == 1
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_waits_for_one_socket_and_is_released_by_unregister():
+    hub = ConnectionHub("test")
+    ws = FakeWebSocket()
+    stuck = FakeWebSocket()
+    stuck.gate = asyncio.Event()
+    hub.register(ws)
+    hub.register(stuck)
+    try:
+        hub.broadcast([ws, stuck], {"n": 1})
+        hub.send(stuck, {"n": 2})
+        await asyncio.wait_for(hub.flush(ws), 1)
+        assert ws.received == [{"n": 1}]
+        waiter = asyncio.create_task(hub.flush(stuck))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        hub.unregister(stuck)
+        await asyncio.wait_for(waiter, 1)
+    finally:
+        await hub.close()
@@ -0,0 +1,62 @@
+"""
+Half-open timestamp ranges for calendar buckets.
+
+Filter with ``col >= $start AND col < $end`` instead of ``DATE(col) = ...`` or
+``EXTRACT(... FROM col) = ...``: the range form can use a btree index on the
+column, the function forms cannot.
+
+There is no default "today": the app host's clock and timezone can differ
+from the database's, and CURRENT_DATE is what the rollups and the doctor
+listing count by. Queries about today compare against CURRENT_DATE in SQL;
+code that needs the date itself takes it from ``db_today``.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Tuple
+
+TimeRange = Tuple[datetime, datetime]
+
+BUCKETS = ("day", "week", "month", "year")
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+async def db_today(conn) -> date:
+    """Today's date on the database clock (CURRENT_DATE)."""
+    return await conn.fetchval("SELECT CURRENT_DATE")
+
+
+def day_range(day: date) -> TimeRange:
+    start = _midnight(day)
+    return start, start + timedelta(days=1)
+
+
+def week_range(day: date) -> TimeRange:
+    """Monday 00:00 of ``day``'s week up to the following Monday."""
+    start = _midnight(day - timedelta(days=day.weekday()))
+    return start, start + timedelta(days=7)
+
+
+def month_range(year: int, month: int) -> TimeRange:
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def year_range(year: int) -> TimeRange:
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def bucket_range(bucket: str, day: date) -> TimeRange:
+    """Range of the ``day``/``week``/``month``/``year`` bucket containing ``day``."""
+    if bucket == "day":
+        return day_range(day)
+    if bucket == "week":
+        return week_range(day)
+    if bucket == "month":
+        return month_range(day.year, day.month)
+    if bucket == "year":
+        return year_range(day.year)
+    raise ValueError(f"Unknown time bucket: {bucket}. Expected one of {', '.join(BUCKETS)}")
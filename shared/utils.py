@@ -1,19 +1,60 @@
 """
 General Statistics Utility Functions
 Provides comprehensive analytics and statistics for the platform
+
+All figures are read from the stats_* rollup tables maintained by
+shared.rollups, one query per call.
 """
 
+import json
 import logging
+import os
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional, Any, Literal
+from typing import Dict, List, Optional, Any, Literal, Tuple
+from shared.cache import cached
 from shared.db import db
+from shared.time_ranges import TimeRange, db_today, year_range
 
 logger = logging.getLogger(__name__)
 
+# Seconds a worker may serve a computed stats payload before recomputing it.
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", 30))
+# Closed years only move when an old subscription changes status.
+PAST_YEAR_STATS_CACHE_TTL = float(os.getenv("PAST_YEAR_STATS_CACHE_TTL", 600))
+
+REFRESHED_AT_SQL = "(SELECT refreshed_at FROM stats_rollup_state WHERE name = 'platform') AS refreshed_at"
+TOTALS_SQL = "(SELECT COALESCE(jsonb_object_agg(metric, value), '{}') FROM stats_totals) AS totals"
+# Calendar bounds on the database clock, which the rollups bucket by
+YEAR_START_SQL = "date_trunc('year', CURRENT_DATE)::date"
+MONTH_START_SQL = "date_trunc('month', CURRENT_DATE)::date"
+
+
+def _day_bounds(time_range: TimeRange) -> Tuple[date, date]:
+    start, end = time_range
+    return start.date(), end.date()
+
+
+def _json(value, default):
+    if value is None:
+        return default
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _revenue_cache_ttl(year: Optional[int] = None, filter_by: str = "month") -> float:
+    if year is not None and year < datetime.now().year:
+        return PAST_YEAR_STATS_CACHE_TTL
+    return STATS_CACHE_TTL
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
 class GeneralStats:
     """General statistics and analytics for the platform"""
 
     @staticmethod
+    @cached("stats.platform", ttl=STATS_CACHE_TTL)
     async def get_platform_stats() -> Dict[str, Any]:
         """
         Get comprehensive platform statistics
@@ -31,162 +72,148 @@ class GeneralStats:
         logger.info("[GENERAL STATS] Getting comprehensive platform statistics")
 
         try:
-            async with db.get_connection() as conn:
-                # Get basic counts
-                total_patients = await conn.fetchval("SELECT COUNT(*) FROM patients")
-                total_doctors = await conn.fetchval("SELECT COUNT(*) FROM doctors")
-                total_subscribed_patients = await conn.fetchval(
-                    "SELECT COUNT(DISTINCT s.user_id) FROM subscriptions s WHERE s.status = 'active'"
-                )
-                total_video_call_sessions = await conn.fetchval("SELECT COUNT(*) FROM video_calls")
-
-                # Get top 5 doctors with highest video call sessions
-                top_doctors = await conn.fetch("""
-                    SELECT 
-                        d.id,
-                        d.first_name,
-                        d.last_name,
-                        d.title,
-                        d.rating,
-                        COUNT(vc.id) as video_call_count
-                    FROM doctors d
-                    LEFT JOIN video_calls vc ON (d.user_id = vc.initiator_id OR d.user_id = vc.receiver_id)
-                    GROUP BY d.id, d.first_name, d.last_name, d.title, d.rating
-                    ORDER BY video_call_count DESC
-                    LIMIT 5
+            async with db.get_connection(readonly=True, replica=True) as conn:
+                row = await conn.fetchrow(f"""
+                    SELECT
+                        CURRENT_DATE AS today,
+                        {REFRESHED_AT_SQL},
+                        {TOTALS_SQL},
+                        (
+                            SELECT COALESCE(jsonb_object_agg(metric, total), '{{}}')
+                            FROM (
+                                SELECT metric, SUM(value) AS total
+                                FROM stats_daily_counts
+                                WHERE day >= {MONTH_START_SQL} AND day < ({MONTH_START_SQL} + interval '1 month')::date
+                                GROUP BY metric
+                            ) m
+                        ) AS this_month,
+                        (
+                            SELECT COALESCE(jsonb_agg(r), '[]')
+                            FROM (
+                                SELECT
+                                    EXTRACT(MONTH FROM day)::int AS month,
+                                    currency,
+                                    SUM(subscription_count)::bigint AS subscription_count,
+                                    SUM(revenue) AS total_revenue
+                                FROM stats_daily_revenue
+                                WHERE day >= {YEAR_START_SQL} AND day < ({YEAR_START_SQL} + interval '1 year')::date
+                                GROUP BY 1, 2
+                            ) r
+                        ) AS monthly_revenue,
+                        (
+                            SELECT COALESCE(jsonb_agg(t ORDER BY t.video_call_count DESC), '[]')
+                            FROM (
+                                SELECT
+                                    d.id,
+                                    d.first_name,
+                                    d.last_name,
+                                    d.title,
+                                    d.rating,
+                                    COALESCE(c.call_count, 0) AS video_call_count
+                                FROM doctors d
+                                LEFT JOIN stats_doctor_calls c ON c.doctor_id = d.id
+                                ORDER BY video_call_count DESC
+                                LIMIT 5
+                            ) t
+                        ) AS top_doctors,
+                        (
+                            SELECT COALESCE(jsonb_agg(n ORDER BY n.created_at DESC), '[]')
+                            FROM (
+                                SELECT
+                                    n.id,
+                                    n.title,
+                                    n.message,
+                                    n.notification_type,
+                                    n.status,
+                                    n.priority,
+                                    n.created_at,
+                                    u.email as user_email,
+                                    p.first_name,
+                                    p.last_name
+                                FROM notifications n
+                                JOIN users u ON n.user_id = u.id
+                                LEFT JOIN patients p ON p.user_id = u.id
+                                ORDER BY n.created_at DESC
+                                LIMIT 5
+                            ) n
+                        ) AS recent_notifications
                 """)
-
-                # Get 5 most recent notifications
-                recent_notifications = await conn.fetch("""
-                    SELECT 
-                        n.id,
-                        n.title,
-                        n.message,
-                        n.notification_type,
-                        n.status,
-                        n.priority,
-                        n.created_at,
-                        u.email as user_email,
-                        p.first_name,
-                        p.last_name
-                    FROM notifications n
-                    JOIN users u ON n.user_id = u.id
-                    LEFT JOIN patients p ON p.user_id = u.id
-                    ORDER BY n.created_at DESC
-                    LIMIT 5
-                """)
-
-                # Get monthly revenue for current year (Jan-Dec, zero-filled)
-                current_year = datetime.now().year
-                monthly_revenue_raw = await conn.fetch("""
-                    SELECT 
-                        EXTRACT(MONTH FROM s.created_at) as month,
-                        COUNT(*) as subscription_count,
-                        COALESCE(SUM(sp.price), 0) as total_revenue,
-                        sp.currency
-                    FROM subscriptions s
-                    LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                    WHERE EXTRACT(YEAR FROM s.created_at) = $1
-                    AND s.status = 'active'
-                    GROUP BY EXTRACT(MONTH FROM s.created_at), sp.currency
-                """, current_year)
-
-                # Fill months Jan-Dec, even if zero
-                monthly_revenue_map = {int(row["month"]): row for row in monthly_revenue_raw}
-                monthly_revenue_list = []
-                for m in range(1, 13):
-                    row = monthly_revenue_map.get(m)
-                    month_name = datetime(current_year, m, 1).strftime("%B")
-                    monthly_revenue_list.append({
-                        "month": month_name,
-                        "month_number": m,
-                        "year": current_year,
-                        "subscription_count": row["subscription_count"] if row else 0,
-                        "total_revenue": float(row["total_revenue"]) if row else 0.0,
-                        "currency": (row["currency"] if row and row["currency"] else "NGN")
-                    })
-
-                # Calculate additional metrics
-                active_subscriptions = await conn.fetchval(
-                    "SELECT COUNT(*) FROM subscriptions WHERE status = 'active'"
-                )
-
-                total_revenue_current_year = await conn.fetchval("""
-                    SELECT COALESCE(SUM(sp.price), 0) 
-                    FROM subscriptions s
-                    LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                    WHERE EXTRACT(YEAR FROM s.created_at) = $1 AND s.status = 'active'
-                """, current_year)
-
-                # Get platform growth metrics
-                current_month = datetime.now().month
-                new_patients_this_month = await conn.fetchval("""
-                    SELECT COUNT(*) FROM patients 
-                    WHERE EXTRACT(MONTH FROM created_at) = $1 AND EXTRACT(YEAR FROM created_at) = $2
-                """, current_month, current_year)
-
-                new_doctors_this_month = await conn.fetchval("""
-                    SELECT COUNT(*) FROM doctors 
-                    WHERE EXTRACT(MONTH FROM created_at) = $1 AND EXTRACT(YEAR FROM created_at) = $2
-                """, current_month, current_year)
-
-                video_calls_this_month = await conn.fetchval("""
-                    SELECT COUNT(*) FROM video_calls 
-                    WHERE EXTRACT(MONTH FROM created_at) = $1 AND EXTRACT(YEAR FROM created_at) = $2
-                """, current_month, current_year)
-
-                # Process results
-                top_doctors_list = [{
-                    "id": doctor["id"],
-                    "name": f"{doctor['first_name']} {doctor['last_name']}",
-                    "title": doctor["title"],
-                    "rating": float(doctor["rating"]) if doctor["rating"] else 0.0,
-                    "video_call_count": doctor["video_call_count"]
-                } for doctor in top_doctors]
-
-                recent_notifications_list = [{
-                    "id": notification["id"],
-                    "title": notification["title"],
-                    "message": notification["message"],
-                    "notification_type": notification["notification_type"],
-                    "status": notification["status"],
-                    "priority": notification["priority"],
-                    "created_at": notification["created_at"].isoformat() if notification["created_at"] else None,
-                    "user_email": notification["user_email"],
-                    "user_name": f"{notification['first_name']} {notification['last_name']}" if notification["first_name"] and notification["last_name"] else "Unknown"
-                } for notification in recent_notifications]
-
-                stats = {
-                    "basic_counts": {
-                        "total_patients": total_patients,
-                        "total_doctors": total_doctors,
-                        "total_subscribed_patients": total_subscribed_patients,
-                        "total_video_call_sessions": total_video_call_sessions,
-                        "active_subscriptions": active_subscriptions
-                    },
-                    "top_doctors": top_doctors_list,
-                    "recent_notifications": recent_notifications_list,
-                    "monthly_revenue": monthly_revenue_list,
-                    "financial_summary": {
-                        "total_revenue_current_year": float(total_revenue_current_year) if total_revenue_current_year else 0.0,
-                        "currency": "NGN"
-                    },
-                    "growth_metrics": {
-                        "new_patients_this_month": new_patients_this_month,
-                        "new_doctors_this_month": new_doctors_this_month,
-                        "video_calls_this_month": video_calls_this_month
-                    },
-                    "generated_at": datetime.now().isoformat()
-                }
-
-                logger.info(f"[GENERAL STATS] Successfully retrieved platform statistics")
-                return stats
+            current_year = row["today"].year
+
+            totals = _json(row["totals"], {})
+            this_month = _json(row["this_month"], {})
+
+            # Fill months Jan-Dec, even if zero
+            monthly_revenue_map = {int(r["month"]): r for r in _json(row["monthly_revenue"], [])}
+            monthly_revenue_list = []
+            for m in range(1, 13):
+                revenue = monthly_revenue_map.get(m)
+                month_name = datetime(current_year, m, 1).strftime("%B")
+                monthly_revenue_list.append({
+                    "month": month_name,
+                    "month_number": m,
+                    "year": current_year,
+                    "subscription_count": revenue["subscription_count"] if revenue else 0,
+                    "total_revenue": float(revenue["total_revenue"]) if revenue else 0.0,
+                    "currency": (revenue["currency"] if revenue and revenue["currency"] else "NGN")
+                })
+            total_revenue_current_year = sum(
+                float(r["total_revenue"]) for r in _json(row["monthly_revenue"], [])
+            )
+
+            top_doctors_list = [{
+                "id": doctor["id"],
+                "name": f"{doctor['first_name']} {doctor['last_name']}",
+                "title": doctor["title"],
+                "rating": float(doctor["rating"]) if doctor["rating"] else 0.0,
+                "video_call_count": doctor["video_call_count"]
+            } for doctor in _json(row["top_doctors"], [])]
+
+            recent_notifications_list = [{
+                "id": notification["id"],
+                "title": notification["title"],
+                "message": notification["message"],
+                "notification_type": notification["notification_type"],
+                "status": notification["status"],
+                "priority": notification["priority"],
+                "created_at": notification["created_at"],
+                "user_email": notification["user_email"],
+                "user_name": f"{notification['first_name']} {notification['last_name']}" if notification["first_name"] and notification["last_name"] else "Unknown"
+            } for notification in _json(row["recent_notifications"], [])]
+
+            stats = {
+                "basic_counts": {
+                    "total_patients": totals.get("patients", 0),
+                    "total_doctors": totals.get("doctors", 0),
+                    "total_subscribed_patients": totals.get("subscribed_patients", 0),
+                    "total_video_call_sessions": totals.get("video_calls", 0),
+                    "active_subscriptions": totals.get("active_subscriptions", 0)
+                },
+                "top_doctors": top_doctors_list,
+                "recent_notifications": recent_notifications_list,
+                "monthly_revenue": monthly_revenue_list,
+                "financial_summary": {
+                    "total_revenue_current_year": total_revenue_current_year,
+                    "currency": "NGN"
+                },
+                "growth_metrics": {
+                    "new_patients_this_month": this_month.get("patients", 0),
+                    "new_doctors_this_month": this_month.get("doctors", 0),
+                    "video_calls_this_month": this_month.get("video_calls", 0)
+                },
+                "generated_at": datetime.now().isoformat(),
+                "refreshed_at": _iso(row["refreshed_at"])
+            }
+
+            logger.info(f"[GENERAL STATS] Successfully retrieved platform statistics")
+            return stats
 
         except Exception as e:
             logger.error(f"[GENERAL STATS] Error getting platform statistics: {str(e)}")
             raise Exception(f"Failed to get platform statistics: {str(e)}")
 
     @staticmethod
+    @cached("stats.dashboard", ttl=STATS_CACHE_TTL)
     async def get_dashboard_stats() -> Dict[str, Any]:
         """
         Get simplified dashboard statistics for quick overview
@@ -197,71 +224,56 @@ class GeneralStats:
         logger.info("[GENERAL STATS] Getting dashboard statistics")
 
         try:
-            async with db.get_connection() as conn:
-                # Get key metrics
-                total_patients = await conn.fetchval("SELECT COUNT(*) FROM patients")
-                total_doctors = await conn.fetchval("SELECT COUNT(*) FROM doctors")
-                active_subscriptions = await conn.fetchval(
-                    "SELECT COUNT(*) FROM subscriptions WHERE status = 'active'"
-                )
-                total_video_calls = await conn.fetchval("SELECT COUNT(*) FROM video_calls")
-
-                # Get today's metrics
-                today = datetime.now().date()
-                new_patients_today = await conn.fetchval("""
-                    SELECT COUNT(*) FROM patients 
-                    WHERE DATE(created_at) = $1
-                """, today)
-
-                new_doctors_today = await conn.fetchval("""
-                    SELECT COUNT(*) FROM doctors 
-                    WHERE DATE(created_at) = $1
-                """, today)
-
-                video_calls_today = await conn.fetchval("""
-                    SELECT COUNT(*) FROM video_calls 
-                    WHERE DATE(created_at) = $1
-                """, today)
-
-                # Get this month's revenue
-                current_month = datetime.now().month
-                current_year = datetime.now().year
-                monthly_revenue = await conn.fetchval("""
-                    SELECT COALESCE(SUM(sp.price), 0) 
-                    FROM subscriptions s
-                    LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                    WHERE EXTRACT(MONTH FROM s.created_at) = $1 
-                    AND EXTRACT(YEAR FROM s.created_at) = $2 
-                    AND s.status = 'active'
-                """, current_month, current_year)
-
-                dashboard_stats = {
-                    "overview": {
-                        "total_patients": total_patients,
-                        "total_doctors": total_doctors,
-                        "active_subscriptions": active_subscriptions,
-                        "total_video_calls": total_video_calls
-                    },
-                    "today": {
-                        "new_patients": new_patients_today,
-                        "new_doctors": new_doctors_today,
-                        "video_calls": video_calls_today
-                    },
-                    "this_month": {
-                        "revenue": float(monthly_revenue) if monthly_revenue else 0.0,
-                        "currency": "NGN"
-                    },
-                    "generated_at": datetime.now().isoformat()
-                }
-
-                logger.info(f"[GENERAL STATS] Successfully retrieved dashboard statistics")
-                return dashboard_stats
+            async with db.get_connection(readonly=True, replica=True) as conn:
+                row = await conn.fetchrow(f"""
+                    SELECT
+                        {REFRESHED_AT_SQL},
+                        {TOTALS_SQL},
+                        (
+                            SELECT COALESCE(jsonb_object_agg(metric, value), '{{}}')
+                            FROM stats_daily_counts
+                            WHERE day = CURRENT_DATE
+                        ) AS today,
+                        (
+                            SELECT COALESCE(SUM(revenue), 0)
+                            FROM stats_daily_revenue
+                            WHERE day >= {MONTH_START_SQL} AND day < ({MONTH_START_SQL} + interval '1 month')::date
+                        ) AS monthly_revenue
+                """)
+
+            totals = _json(row["totals"], {})
+            today_counts = _json(row["today"], {})
+            monthly_revenue = row["monthly_revenue"]
+
+            dashboard_stats = {
+                "overview": {
+                    "total_patients": totals.get("patients", 0),
+                    "total_doctors": totals.get("doctors", 0),
+                    "active_subscriptions": totals.get("active_subscriptions", 0),
+                    "total_video_calls": totals.get("video_calls", 0)
+                },
+                "today": {
+                    "new_patients": today_counts.get("patients", 0),
+                    "new_doctors": today_counts.get("doctors", 0),
+                    "video_calls": today_counts.get("video_calls", 0)
+                },
+                "this_month": {
+                    "revenue": float(monthly_revenue) if monthly_revenue else 0.0,
+                    "currency": "NGN"
+                },
+                "generated_at": datetime.now().isoformat(),
+                "refreshed_at": _iso(row["refreshed_at"])
+            }
+
+            logger.info(f"[GENERAL STATS] Successfully retrieved dashboard statistics")
+            return dashboard_stats
 
         except Exception as e:
             logger.error(f"[GENERAL STATS] Error getting dashboard statistics: {str(e)}")
             raise Exception(f"Failed to get dashboard statistics: {str(e)}")
 
     @staticmethod
+    @cached("stats.revenue", ttl=_revenue_cache_ttl)
     async def get_revenue_analytics(
         year: Optional[int] = None,
         filter_by: Literal["month", "week", "year"] = "month"
@@ -276,134 +288,127 @@ class GeneralStats:
         Returns:
             Dictionary containing revenue analytics
         """
-        if year is None:
-            year = datetime.now().year
-
         logger.info(f"[GENERAL STATS] Getting revenue analytics for year {year}, filter: {filter_by}")
 
         try:
-            async with db.get_connection() as conn:
-                analytics = {
+            async with db.get_connection(readonly=True, replica=True) as conn:
+                today = await db_today(conn)
+                if year is None:
+                    year = today.year
+                # Last 7 days including today
+                week_days = [(today - timedelta(days=i)) for i in range(6, -1, -1)]
+                row = await conn.fetchrow(f"""
+                    SELECT
+                        {REFRESHED_AT_SQL},
+                        (
+                            SELECT COALESCE(jsonb_agg(r), '[]')
+                            FROM (
+                                SELECT
+                                    EXTRACT(MONTH FROM day)::int AS month,
+                                    currency,
+                                    SUM(subscription_count)::bigint AS subscription_count,
+                                    SUM(revenue) AS revenue
+                                FROM stats_daily_revenue
+                                WHERE day >= $1 AND day < $2
+                                GROUP BY 1, 2
+                            ) r
+                        ) AS monthly,
+                        (
+                            SELECT COALESCE(jsonb_agg(w), '[]')
+                            FROM (
+                                SELECT
+                                    day,
+                                    currency,
+                                    SUM(subscription_count)::bigint AS subscription_count,
+                                    SUM(revenue) AS revenue
+                                FROM stats_daily_revenue
+                                WHERE day >= $3 AND day < $4
+                                GROUP BY 1, 2
+                            ) w
+                        ) AS daily,
+                        (
+                            SELECT COALESCE(jsonb_agg(p ORDER BY p.revenue DESC), '[]')
+                            FROM (
+                                SELECT
+                                    plan_type,
+                                    currency,
+                                    SUM(subscription_count)::bigint AS subscription_count,
+                                    SUM(revenue) AS revenue
+                                FROM stats_daily_revenue
+                                WHERE day >= $1 AND day < $2
+                                GROUP BY 1, 2
+                            ) p
+                        ) AS plans
+                """, *_day_bounds(year_range(year)), week_days[0], today + timedelta(days=1))
+
+            analytics = {
+                "year": year,
+                "currency": "NGN",
+                "monthly_breakdown": [],
+                "weekly_breakdown": [],
+                "yearly_breakdown": [],
+                "plan_breakdown": [],
+                "total_revenue": 0.0,
+                "generated_at": datetime.now().isoformat(),
+                "refreshed_at": _iso(row["refreshed_at"])
+            }
+            monthly_data = _json(row["monthly"], [])
+
+            # Monthly breakdown (Jan-Dec, zero-filled)
+            if filter_by == "month" or filter_by == "year":
+                monthly_map = {int(r["month"]): r for r in monthly_data}
+                monthly_breakdown = []
+                for m in range(1, 13):
+                    revenue = monthly_map.get(m)
+                    month_name = datetime(year, m, 1).strftime("%B")
+                    monthly_breakdown.append({
+                        "month": month_name,
+                        "month_number": m,
+                        "subscription_count": revenue["subscription_count"] if revenue else 0,
+                        "revenue": float(revenue["revenue"]) if revenue else 0.0,
+                        "currency": (revenue["currency"] if revenue and revenue["currency"] else "NGN")
+                    })
+                analytics["monthly_breakdown"] = monthly_breakdown
+
+            # Weekly breakdown (last 7 days, zero-filled)
+            if filter_by == "week":
+                week_map = {date.fromisoformat(r["day"]): r for r in _json(row["daily"], [])}
+                weekly_breakdown = []
+                for d in week_days:
+                    revenue = week_map.get(d)
+                    weekly_breakdown.append({
+                        "date": d.isoformat(),
+                        "day": d.strftime("%a"),  # 👈 Add short weekday name
+                        "subscription_count": revenue["subscription_count"] if revenue else 0,
+                        "revenue": float(revenue["revenue"]) if revenue else 0.0,
+                        "currency": (revenue["currency"] if revenue and revenue["currency"] else "NGN")
+                    })
+                analytics["weekly_breakdown"] = weekly_breakdown
+
+            # Yearly breakdown (total for the year)
+            if filter_by == "year":
+                yearly_revenue = sum(float(r["revenue"]) for r in monthly_data)
+                analytics["yearly_breakdown"] = [{
                     "year": year,
-                    "currency": "NGN",
-                    "monthly_breakdown": [],
-                    "weekly_breakdown": [],
-                    "yearly_breakdown": [],
-                    "plan_breakdown": [],
-                    "total_revenue": 0.0,
-                    "generated_at": datetime.now().isoformat()
-                }
-
-                # Monthly breakdown (Jan-Dec, zero-filled)
-                if filter_by == "month" or filter_by == "year":
-                    monthly_data = await conn.fetch("""
-                        SELECT 
-                            EXTRACT(MONTH FROM s.created_at) as month,
-                            COUNT(*) as subscription_count,
-                            COALESCE(SUM(sp.price), 0) as revenue,
-                            sp.currency
-                        FROM subscriptions s
-                        LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                        WHERE EXTRACT(YEAR FROM s.created_at) = $1
-                        AND s.status = 'active'
-                        GROUP BY EXTRACT(MONTH FROM s.created_at), sp.currency
-                    """, year)
-                    monthly_map = {int(row["month"]): row for row in monthly_data}
-                    monthly_breakdown = []
-                    for m in range(1, 13):
-                        row = monthly_map.get(m)
-                        month_name = datetime(year, m, 1).strftime("%B")
-                        monthly_breakdown.append({
-                            "month": month_name,
-                            "month_number": m,
-                            "subscription_count": row["subscription_count"] if row else 0,
-                            "revenue": float(row["revenue"]) if row else 0.0,
-                            "currency": (row["currency"] if row and row["currency"] else "NGN")
-                        })
-                    analytics["monthly_breakdown"] = monthly_breakdown
-
-                # Weekly breakdown (last 7 days, zero-filled)
-                if filter_by == "week":
-                    today = datetime.now().date()
-                    # Generate last 7 days list (Mon-Sun style, depending on today)
-                    week_days = [(today - timedelta(days=i)) for i in range(6, -1, -1)]
-                    week_map = {}
-
-                    week_data = await conn.fetch("""
-                        SELECT 
-                            DATE(s.created_at) as day,
-                            COUNT(*) as subscription_count,
-                            COALESCE(SUM(sp.price), 0) as revenue,
-                            sp.currency
-                        FROM subscriptions s
-                        LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                        WHERE s.created_at >= $1
-                        AND s.created_at < $2
-                        AND s.status = 'active'
-                        GROUP BY day, sp.currency
-                    """, week_days[0], today + timedelta(days=1))
-
-                    for row in week_data:
-                        week_map[row["day"]] = row
-
-                    weekly_breakdown = []
-                    for d in week_days:
-                        row = week_map.get(d)
-                        weekly_breakdown.append({
-                            "date": d.isoformat(),
-                            "day": d.strftime("%a"),  # 👈 Add short weekday name
-                            "subscription_count": row["subscription_count"] if row else 0,
-                            "revenue": float(row["revenue"]) if row else 0.0,
-                            "currency": (row["currency"] if row and row["currency"] else "NGN")
-                        })
-
-                    analytics["weekly_breakdown"] = weekly_breakdown
-
-
-                # Yearly breakdown (total for the year)
-                if filter_by == "year":
-                    yearly_revenue = await conn.fetchval("""
-                        SELECT COALESCE(SUM(sp.price), 0) 
-                        FROM subscriptions s
-                        LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                        WHERE EXTRACT(YEAR FROM s.created_at) = $1 AND s.status = 'active'
-                    """, year)
-                    analytics["yearly_breakdown"] = [{
-                        "year": year,
-                        "revenue": float(yearly_revenue) if yearly_revenue else 0.0,
-                        "currency": "NGN"
-                    }]
-                    analytics["total_revenue"] = float(yearly_revenue) if yearly_revenue else 0.0
-                else:
-                    # For month/week, sum up the revenue
-                    if filter_by == "month":
-                        analytics["total_revenue"] = sum(m["revenue"] for m in analytics["monthly_breakdown"])
-                    elif filter_by == "week":
-                        analytics["total_revenue"] = sum(w["revenue"] for w in analytics["weekly_breakdown"])
-
-                # Plan-wise breakdown (always for the year)
-                plan_data = await conn.fetch("""
-                    SELECT 
-                        s.subscription_type,
-                        COUNT(*) as subscription_count,
-                        COALESCE(SUM(sp.price), 0) as revenue,
-                        sp.currency
-                    FROM subscriptions s
-                    LEFT JOIN subscription_plans sp ON s.plan_id = sp.id
-                    WHERE EXTRACT(YEAR FROM s.created_at) = $1
-                    AND s.status = 'active'
-                    GROUP BY s.subscription_type, sp.currency
-                    ORDER BY revenue DESC
-                """, year)
-                analytics["plan_breakdown"] = [{
-                    "plan_type": data["subscription_type"],
-                    "subscription_count": data["subscription_count"],
-                    "revenue": float(data["revenue"]) if data["revenue"] else 0.0,
-                    "currency": data["currency"] or "NGN"
-                } for data in plan_data]
-
-                logger.info(f"[GENERAL STATS] Successfully retrieved revenue analytics for {year} ({filter_by})")
-                return analytics
+                    "revenue": yearly_revenue,
+                    "currency": "NGN"
+                }]
+                analytics["total_revenue"] = yearly_revenue
+            elif filter_by == "month":
+                analytics["total_revenue"] = sum(m["revenue"] for m in analytics["monthly_breakdown"])
+            elif filter_by == "week":
+                analytics["total_revenue"] = sum(w["revenue"] for w in analytics["weekly_breakdown"])
+
+            # Plan-wise breakdown (always for the year)
+            analytics["plan_breakdown"] = [{
+                "plan_type": data["plan_type"],
+                "subscription_count": data["subscription_count"],
+                "revenue": float(data["revenue"]) if data["revenue"] else 0.0,
+                "currency": data["currency"] or "NGN"
+            } for data in _json(row["plans"], [])]
+
+            logger.info(f"[GENERAL STATS] Successfully retrieved revenue analytics for {year} ({filter_by})")
+            return analytics
 
         except Exception as e:
             logger.error(f"[GENERAL STATS] Error getting revenue analytics: {str(e)}")
@@ -0,0 +1,221 @@
+"""
+Outbound side of the WebSocket endpoints (chat, video call signalling,
+notifications).
+
+A ``ConnectionHub`` gives each registered socket a bounded queue of
+outgoing frames and a writer task that drains it, so ``send`` and
+``broadcast`` only enqueue: a broadcast encodes its message once and never
+waits on a client, and a slow or dead client only backs up its own queue.
+
+When a socket's queue is full (WS_SEND_QUEUE_SIZE frames) the hub applies
+its slow-consumer policy:
+
+- ``drop``: discard the oldest queued frame to make room. For streams where
+  a client can catch up elsewhere (notifications are also stored).
+- ``close``: close the socket with 1013 (try again later). For streams that
+  are useless with gaps (chat, call signalling); the client reconnects.
+
+A single send that takes longer than WS_SEND_TIMEOUT seconds closes the
+socket under either policy.
+
+Owners keep their own routing (which sockets belong to which appointment or
+user) and call ``register`` / ``unregister`` from their connect and
+disconnect paths. Counters per hub are served by ``/stats/ws-hubs``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+SLOW_CONSUMER_POLICIES = ("drop", "close")
+# RFC 6455 "Try Again Later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def encode(message: Any) -> str:
+    return message if isinstance(message, str) else json.dumps(message, default=str)
+
+
+class Connection:
+    """One registered socket: its pending frames and the task writing them."""
+
+    __slots__ = ("websocket", "queue", "task")
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+
+class ConnectionHub:
+    def __init__(self, name: str, policy: str = "drop", queue_size: int = WS_SEND_QUEUE_SIZE,
+                 send_timeout: float = WS_SEND_TIMEOUT):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy: {policy}")
+        self.name = name
+        self.policy = policy
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self._connections: Dict[WebSocket, Connection] = {}
+        self._closing: set = set()
+        self.sent = 0
+        self.dropped = 0
+        self.slow_closed = 0
+        self.timeouts = 0
+        self.send_errors = 0
+
+    def __contains__(self, websocket: WebSocket) -> bool:
+        return websocket in self._connections
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def register(self, websocket: WebSocket) -> None:
+        """Starts the writer for an accepted socket; registering twice is a no-op."""
+        if websocket in self._connections:
+            return
+        conn = Connection(websocket, self.queue_size)
+        conn.task = asyncio.create_task(self._write(conn), name=f"ws-hub:{self.name}")
+        self._connections[websocket] = conn
+
+    def unregister(self, websocket: WebSocket) -> None:
+        """Stops the writer and discards unsent frames. Does not close the socket."""
+        conn = self._connections.pop(websocket, None)
+        if conn is None:
+            return
+        if conn.task is not asyncio.current_task():
+            conn.task.cancel()
+        # Release anyone waiting in flush() or drain()
+        while not conn.queue.empty():
+            conn.queue.get_nowait()
+            conn.queue.task_done()
+
+    def send(self, websocket: WebSocket, message: Any) -> bool:
+        """Queues ``message`` for one socket; False if it is not registered or was closed as slow."""
+        conn = self._connections.get(websocket)
+        return conn is not None and self._offer(conn, encode(message))
+
+    def broadcast(self, websockets: Iterable[WebSocket], message: Any) -> int:
+        """Queues ``message`` (encoded once) for each registered socket in ``websockets``; returns how many took it."""
+        frame = encode(message)
+        queued = 0
+        for websocket in websockets:
+            conn = self._connections.get(websocket)
+            if conn is not None and self._offer(conn, frame):
+                queued += 1
+        return queued
+
+    def _offer(self, conn: Connection, frame: str) -> bool:
+        try:
+            conn.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.policy == "drop":
+            conn.queue.get_nowait()
+            conn.queue.task_done()
+            conn.queue.put_nowait(frame)
+            self.dropped += 1
+            return True
+        self.dropped += 1
+        self.slow_closed += 1
+        logger.warning(f"[WS HUB] {self.name}: closing slow consumer with {conn.queue.qsize()} frames queued")
+        self._close_later(conn, "Slow consumer")
+        return False
+
+    async def _write(self, conn: Connection) -> None:
+        websocket = conn.websocket
+        while True:
+            frame = await conn.queue.get()
+            try:
+                # asyncio.timeout rather than wait_for: no extra task per frame
+                async with asyncio.timeout(self.send_timeout):
+                    await websocket.send_text(frame)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.warning(f"[WS HUB] {self.name}: send timed out after {self.send_timeout}s, closing socket")
+                self.unregister(websocket)
+                await self._close_socket(websocket, "Send timeout")
+                return
+            except Exception as e:
+                # The socket is gone; the owner's receive loop sees the disconnect
+                self.send_errors += 1
+                logger.info(f"[WS HUB] {self.name}: send failed, dropping socket: {str(e)}")
+                self.unregister(websocket)
+                return
+            finally:
+                conn.queue.task_done()
+            self.sent += 1
+
+    def _close_later(self, conn: Connection, reason: str) -> None:
+        self.unregister(conn.websocket)
+        task = asyncio.create_task(self._close_socket(conn.websocket, reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_socket(self, websocket: WebSocket, reason: str) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason=reason), self.send_timeout)
+        except Exception:
+            pass
+
+    async def flush(self, websocket: WebSocket) -> None:
+        """Waits until the frames queued so far for one socket are written, or it is unregistered."""
+        conn = self._connections.get(websocket)
+        if conn is not None:
+            await conn.queue.join()
+
+    async def drain(self) -> None:
+        """Waits until every frame queued so far has been written (or dropped)."""
+        await asyncio.gather(*(conn.queue.join() for conn in list(self._connections.values())))
+
+    async def close(self) -> None:
+        """Stops every writer; used at shutdown."""
+        tasks = [conn.task for conn in self._connections.values()]
+        for websocket in list(self._connections):
+            self.unregister(websocket)
+        await asyncio.gather(*tasks, *self._closing, return_exceptions=True)
+
+    def stats(self) -> dict:
+        depths = [conn.queue.qsize() for conn in self._connections.values()]
+        return {
+            "policy": self.policy,
+            "connections": len(depths),
+            "queue_size": self.queue_size,
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "slow_closed": self.slow_closed,
+            "timeouts": self.timeouts,
+            "send_errors": self.send_errors,
+        }
+
+
+hub_registry: Dict[str, ConnectionHub] = {}
+
+
+def connection_hub(name: str, policy: str = "drop", **options) -> ConnectionHub:
+    """Creates a hub listed in ``hub_stats`` and closed by ``close_hubs``."""
+    if name in hub_registry:
+        raise ValueError(f"Duplicate connection hub name: {name}")
+    hub = ConnectionHub(name, policy, **options)
+    hub_registry[name] = hub
+    return hub
+
+
+def hub_stats() -> Dict[str, dict]:
+    return {name: hub.stats() for name, hub in sorted(hub_registry.items())}
+
+
+async def close_hubs() -> None:
+    for hub in hub_registry.values():
+        await hub.close()